@@ -1,10 +1,11 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from flask_session import Session
 import numpy as np
 import joblib
 import os
 import logging
+import time
 import pandas as pd
 from dotenv import load_dotenv
 
@@ -13,34 +14,45 @@ load_dotenv()
 from sklearn.preprocessing import LabelEncoder
 import re
 import csv
+from itertools import islice
 from sklearn import preprocessing
 from sklearn.tree import DecisionTreeClassifier, _tree
 import requests
 import json
 from PIL import Image
 import io
-from transformers import pipeline
 import PyPDF2
-import easyocr
 import warnings
 from config import init_db
 from migrations import run_migrations
 from auth import auth_bp
-from data_routes import data_bp
-from appointment_routes import appointment_bp
+from data_routes import data_bp, prediction_writer
+from appointment_routes import appointment_bp, chat_broker
+from appointment_sweeper import AppointmentSweeper, appointment_sweeper_settings
+from risk_forecast import RiskForecaster, risk_forecast_settings
 from settings_routes import settings_bp
 from health_analytics import analytics_bp
 from doctor_routes import doctor_bp
 from doctor_recommendation import doctor_recommendation_bp
 from models import User, DoctorAvailability, db, Prediction
-from cardiovascular_multimodal import predict_cardiovascular, generate_report as generate_cardio_report
-
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
-    logging.warning("Groq package not installed. Run: pip install groq")
+from model_registry import ModelRegistry, warmup_from_env
+from tabular_models import TABULAR_FEATURES, build_feature_matrix, score_matrix, risk_level_for
+from micro_batcher import MicroBatcher, microbatch_settings
+from model_compiler import COMPILED_DIR, compiled_model_exists, load_compiled
+from report_jobs import ReportJobQueue, QueueFullError, FINISHED_STATES, report_job_settings
+from result_cache import ResultCache, cache_key, result_cache_settings
+from parameter_extractor import ParameterExtractor
+from pdf_extraction import pdf_text, pdf_settings
+from ocr_tiling import TiledOCR, preprocess_image_for_ocr, group_ocr_lines, ocr_settings
+from llm_client import LLMClient, LLMUnavailable, llm_settings
+from response_cache import ResponseCache, prompt_variant, response_cache_settings
+from json_stream import JSONStreamParser
+from list_cursors import list_etag, not_modified, with_etag
+from risk_summary import pending_review_count
+from hospital_store import HospitalStore, hospital_store_settings, hospital_refresh_settings
+from hospital_enrichment import HospitalEnricher, hospital_enrichment_settings, hospital_enrichment_cache_settings
+from hospital_recommendations import (HospitalRecommendations, DEFERRED, FINISHED_STATES as RECOMMENDATION_FINISHED_STATES,
+                                      hospital_recommendation_settings, hospital_recommendation_mode)
 
 # Suppress EasyOCR warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='torch')
@@ -86,26 +98,24 @@ app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
 app.register_blueprint(doctor_bp, url_prefix='/api/doctor')
 app.register_blueprint(doctor_recommendation_bp, url_prefix='/api/recommend')
 
-# Initialize EasyOCR reader (load once at startup)
-_ocr_reader = None
-try:
-    logger.info("Loading EasyOCR reader with GPU...")
-    _ocr_reader = easyocr.Reader(['en'], gpu=True)
-    logger.info("EasyOCR reader loaded successfully with GPU")
-except Exception as e:
-    logger.error(f"Failed to load EasyOCR with GPU: {str(e)}")
-    logger.info("Falling back to CPU mode...")
-    try:
-        _ocr_reader = easyocr.Reader(['en'], gpu=False)
-        logger.info("EasyOCR reader loaded successfully with CPU")
-    except Exception as e2:
-        logger.error(f"Failed to load EasyOCR: {str(e2)}")
-        _ocr_reader = None
+# Accepted appointments whose time has passed are marked completed by a periodic
+# UPDATE, so the appointment list endpoints stay pure reads (started in start_background_work)
+_appointment_sweeper_settings = appointment_sweeper_settings()
+appointment_sweeper = AppointmentSweeper(app, _appointment_sweeper_settings['interval_seconds'])
+
+# Risk trajectories (EWMA, trend with a confidence band, change points) are computed
+# in batches for the users whose predictions changed, and read by the endpoints
+_risk_forecast_settings = risk_forecast_settings()
+risk_forecaster = RiskForecaster(app, _risk_forecast_settings['interval_seconds'], _risk_forecast_settings['horizon_days'])
 
 # Get the absolute path to the backend directory
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Load each model and scaler individually so a failure doesn't block others
+# Models are loaded lazily through the registry: each one is loaded the first
+# time an endpoint needs it and shared by all threads afterwards. A model that
+# failed to load is tried again once MODEL_RETRY_SECONDS have passed.
+model_registry = ModelRegistry(retry_seconds=float(os.getenv('MODEL_RETRY_SECONDS', '60')))
+
 _diabetes_path = os.path.join(BACKEND_DIR, 'diabetes.pkl')
 _d_scaler_path = os.path.join(BACKEND_DIR, 'd_scaler.pkl')
 _liver_path = os.path.join(BACKEND_DIR, 'liver_model.pkl')
@@ -114,65 +124,162 @@ _kidney_path = os.path.join(BACKEND_DIR, 'kidney_model.pkl')
 _h_scaler_path = os.path.join(BACKEND_DIR, 'h_scaler.pkl')
 _heart_path = os.path.join(BACKEND_DIR, 'cardio_random_forest.pkl')
 
-# Initialize to None by default
-_diabetes_err = _liver_err = _kidney_err = _heart_err = None
+def _load_ocr_reader():
+    import easyocr
+    try:
+        logger.info("Loading EasyOCR reader with GPU...")
+        return easyocr.Reader(['en'], gpu=True)
+    except Exception as e:
+        logger.error(f"Failed to load EasyOCR with GPU: {str(e)}")
+        logger.info("Falling back to CPU mode...")
+        return easyocr.Reader(['en'], gpu=False)
+
+# Tabular models prefer the NumPy-only compiled export (see model_compiler.py)
+# when it exists; USE_COMPILED_MODELS=false forces the original pickles.
+USE_COMPILED_MODELS = os.getenv('USE_COMPILED_MODELS', 'true').lower() == 'true'
+
+# MODEL_MMAP=true memory-maps model arrays so worker processes share them
+# read-only. Compiled models are fully mapped; for plain pickles joblib's
+# mmap_mode only covers estimators holding plain numpy arrays (linear models,
+# scalers), since sklearn trees copy their nodes on unpickling.
+MODEL_MMAP = os.getenv('MODEL_MMAP', 'false').lower() == 'true'
+
+def _load_tabular(name, model_path, scaler_path=None):
+    compiled_dir = os.path.join(COMPILED_DIR, name)
+    if USE_COMPILED_MODELS and compiled_model_exists(compiled_dir):
+        logger.info(f"Using compiled {name} model from {compiled_dir} (mmap={MODEL_MMAP})")
+        return load_compiled(compiled_dir, mmap=MODEL_MMAP)
+    mmap_mode = 'r' if MODEL_MMAP else None
+    scaler = joblib.load(scaler_path, mmap_mode=mmap_mode) if scaler_path else None
+    return joblib.load(model_path, mmap_mode=mmap_mode), scaler
+
+def _load_diabetes():
+    return _load_tabular('diabetes', _diabetes_path, _d_scaler_path)
+
+def _load_liver():
+    return _load_tabular('liver', _liver_path)
+
+def _load_kidney():
+    return _load_tabular('kidney', _kidney_path, _k_scaler_path)
+
+def _load_heart():
+    # Random Forest - no scaler needed
+    return _load_tabular('heart', _heart_path)
 
-diabetes_model = None
-diabetes_scaler = None
-liver_model = None
-kidney_model = None
-kidney_scaler = None
-heart_model = None
-heart_scaler = None
+# Bone fracture and Hugging Face models
+_bone_hf_model_id = 'Hemgg/bone-fracture-detection-using-xray'
+_bone_allowed_ext = {'.jpg', '.jpeg', '.png'}
 
-try:
-    diabetes_model = joblib.load(_diabetes_path)
-    diabetes_scaler = joblib.load(_d_scaler_path)
-    logger.info("Diabetes model and scaler loaded successfully")
-except Exception as e:
-    _diabetes_err = str(e)
-    logger.error(f"Failed to load diabetes model/scaler: {_diabetes_err}", exc_info=True)
+def _load_bone_pipeline():
+    from transformers import pipeline
+    return pipeline(task='image-classification', model=_bone_hf_model_id, device=-1)
+
+def _load_ner_pipeline():
+    from transformers import pipeline
+    return pipeline("ner", model="d4data/biomedical-ner-all", aggregation_strategy="simple", device=-1)
+
+def _load_summarizer_pipeline():
+    from transformers import pipeline
+    return pipeline("text2text-generation", model="google/flan-t5-large", device=-1, max_length=512)
+
+def _load_table_qa_pipeline():
+    from transformers import pipeline
+    return pipeline("table-question-answering", model="google/tapas-base-finetuned-wtq", device=-1)
+
+model_registry.register('diabetes', _load_diabetes, 'diabetes.pkl + d_scaler.pkl')
+model_registry.register('liver', _load_liver, 'liver_model.pkl')
+model_registry.register('kidney', _load_kidney, 'kidney_model.pkl + k_scaler.pkl')
+model_registry.register('heart', _load_heart, 'cardio_random_forest.pkl')
+model_registry.register('ocr', _load_ocr_reader, 'EasyOCR reader (en)')
+model_registry.register('bone_fracture', _load_bone_pipeline, _bone_hf_model_id)
+model_registry.register('ner', _load_ner_pipeline, 'd4data/biomedical-ner-all')
+model_registry.register('summarizer', _load_summarizer_pipeline, 'google/flan-t5-large')
+model_registry.register('table_qa', _load_table_qa_pipeline, 'google/tapas-base-finetuned-wtq')
+
+def get_tabular_model(name):
+    """Return (model, scaler) for a tabular model, or (None, None) if it failed to load."""
+    loaded = model_registry.get(name)
+    return loaded if loaded else (None, None)
+
+# Optional preloading, e.g. MODEL_WARMUP=diabetes,heart or MODEL_WARMUP=all
+warmup_from_env(model_registry)
+
+# Concurrent single-row predictions are grouped into small matrices by a
+# per-model micro-batcher (MICROBATCH_ENABLED / MICROBATCH_MAX_SIZE / MICROBATCH_MAX_WAIT_MS)
+_microbatch_settings = microbatch_settings()
+_micro_batchers = {}
+
+def _tabular_scorer(name):
+    def score(matrix):
+        model, scaler = get_tabular_model(name)
+        if model is None:
+            raise RuntimeError(f"{name} model not loaded")
+        return score_matrix(model, scaler, matrix)
+    return score
+
+if _microbatch_settings['enabled']:
+    for _name in TABULAR_FEATURES:
+        _micro_batchers[_name] = MicroBatcher(
+            _name,
+            _tabular_scorer(_name),
+            max_batch_size=_microbatch_settings['max_batch_size'],
+            max_wait_ms=_microbatch_settings['max_wait_ms']
+        )
 
-try:
-    import sklearn
-    sklearn_version = sklearn.__version__
-    liver_model = joblib.load(_liver_path)
-    logger.info("Liver model loaded successfully")
-except Exception as e:
-    _liver_err = str(e)
-    logger.warning(f"Liver model not available due to compatibility issue. Liver predictions will be disabled.")
+def score_tabular_row(name, model, scaler, features):
+    """Score one feature row, through the micro-batcher when enabled. Returns (label, probability)."""
+    batcher = _micro_batchers.get(name)
+    if batcher is not None:
+        return batcher.submit(features)
+    labels, probabilities = score_matrix(model, scaler, np.array(features).reshape(1, -1))
+    return labels[0], probabilities[0]
+
+# Results for uploaded files are cached by content hash (RESULT_CACHE_* settings).
+# Each key includes the version of the step that produced it: bump the version
+# when the model or the extraction code changes so stale results are not served.
+result_cache = ResultCache(**result_cache_settings())
+RESULT_CACHE_VERSIONS = {
+    'pdf_text': f'pypdf2-{PyPDF2.__version__}:1',
+    'ocr_text': f"easyocr-en+tesseract-psm6:1:{ocr_settings()['mode']}",
+    'report_parameters': 'analyze_parameters:1',
+    'bone_fracture': f'{_bone_hf_model_id}:1',
+}
 
-try:
-    kidney_scaler = joblib.load(_k_scaler_path)
-    kidney_model = joblib.load(_kidney_path)
-    logger.info("Kidney model and scaler loaded successfully")
-except Exception as e:
-    _kidney_err = str(e)
-    logger.error(f"Failed to load kidney model/scaler: {_kidney_err}", exc_info=True)
+def cached_result(namespace, data, compute, should_cache=None):
+    """Return compute()'s result for data from the result cache, computing it on a miss."""
+    key = cache_key(data, RESULT_CACHE_VERSIONS[namespace])
+    return result_cache.get_or_compute(namespace, key, compute, should_cache)
 
-try:
-    heart_model = joblib.load(_heart_path)
-    logger.info("Heart disease model loaded successfully (Random Forest - no scaler needed)")
-except Exception as e:
-    _heart_err = str(e)
-    logger.error(f"Failed to load heart model: {_heart_err}", exc_info=True)
-# Bone fracture and Hugging Face models
-_bone_hf_model_id = 'Hemgg/bone-fracture-detection-using-xray'
-_bone_allowed_ext = {'.jpg', '.jpeg', '.png'}
-_bone_pipeline = None
-_bone_model_err = None
+# All Groq calls go through one shared client: pooled keep-alive connections,
+# per-endpoint concurrency limits, budgeted retries and a circuit breaker (LLM_* settings).
+# When it raises LLMUnavailable, endpoints use their rule-based fallbacks.
+llm = LLMClient(**llm_settings())
 
-try:
-    logger.info(f"Loading bone fracture model '{_bone_hf_model_id}'...")
-    _bone_pipeline = pipeline(
-        task='image-classification',
-        model=_bone_hf_model_id,
-        device=-1
-    )
-    logger.info(f"Bone fracture model '{_bone_hf_model_id}' loaded successfully")
-except Exception as e:
-    _bone_model_err = str(e)
-    logger.error(f"Failed to load bone fracture model: {_bone_model_err}", exc_info=True)
+# Chatbot answers are cached by normalized prompt and system prompt (RESPONSE_CACHE_*).
+# With RESPONSE_CACHE_SEMANTIC=true, near-identical questions also match, using a small
+# sentence encoder (needs sentence-transformers); otherwise only exact matches count.
+RESPONSE_CACHE_SEMANTIC = os.getenv('RESPONSE_CACHE_SEMANTIC', 'false').lower() == 'true'
+_sentence_encoder_id = os.getenv('RESPONSE_CACHE_ENCODER', 'sentence-transformers/all-MiniLM-L6-v2')
+
+def _load_sentence_encoder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(_sentence_encoder_id, device='cpu')
+
+model_registry.register('sentence_encoder', _load_sentence_encoder, _sentence_encoder_id)
+
+def _encode_prompt(text):
+    encoder = model_registry.get('sentence_encoder')
+    return None if encoder is None else encoder.encode(text, normalize_embeddings=True)
+
+response_cache = ResponseCache(encode=_encode_prompt if RESPONSE_CACHE_SEMANTIC else None,
+                               **response_cache_settings())
+
+# Hospital lookups are answered from a local copy of OSM hospitals (HOSPITAL_* settings).
+# Areas not in the store yet are fetched from Overpass once, a tile at a time, and
+# kept; a background thread re-fetches tiles that are older than their TTL.
+hospital_store = HospitalStore(**hospital_store_settings())
+_hospital_refresh_settings = hospital_refresh_settings()
+HOSPITAL_SEARCH_RADIUS_KM = 60
 
 def preprocess_bone_image(image_bytes):
     try:
@@ -197,7 +304,7 @@ def preprocess_bone_image(image_bytes):
 
 @app.route('/api/predict/diabetes', methods=['POST'])
 def predict_diabetes():
-    print(f"diabetes_model: {diabetes_model}, diabetes_scaler: {diabetes_scaler}")
+    diabetes_model, diabetes_scaler = get_tabular_model('diabetes')
     if diabetes_model is None or diabetes_scaler is None:
         return jsonify({'error': 'Diabetes prediction model not loaded properly'}), 503
 
@@ -212,15 +319,8 @@ def predict_diabetes():
             float(data['age'])       # Age
         ]
 
-        # Convert to numpy array and reshape
-        features_array = np.array(features).reshape(1, -1)
-
-        # Scale the features
-        scaled_features = diabetes_scaler.transform(features_array)
-
-        # Make prediction
-        prediction = diabetes_model.predict(scaled_features)[0]
-        probability = diabetes_model.predict_proba(scaled_features)[0][1]
+        # Scale and score the features
+        prediction, probability = score_tabular_row('diabetes', diabetes_model, diabetes_scaler, features)
 
         # Determine risk level
         if probability < 0.33:
@@ -246,8 +346,7 @@ def predict_diabetes():
             try:
                 lat = float(lat)
                 lon = float(lon)
-                hospitals = get_nearby_diabetes_hospitals(lat, lon)
-                response['hospitals'] = hospitals
+                add_hospital_recommendations(response, get_nearby_diabetes_hospitals, lat, lon)
             except Exception as e:
                 logger.error(f"Error fetching hospitals: {str(e)}")
                 response['hospital_error'] = 'Unable to fetch nearby hospitals'
@@ -262,7 +361,7 @@ def predict_diabetes():
                     # Get doctor_id from request if patient selected a doctor
                     doctor_id = data.get('doctor_id')
                     
-                    pred = Prediction(
+                    prediction_id = prediction_writer.save(
                         user_id=session['user_id'],
                         disease_type='diabetes',
                         prediction_result=risk_level,
@@ -270,11 +369,9 @@ def predict_diabetes():
                         risk_level=risk_level,
                         input_data=data
                     )
-                    db.session.add(pred)
-                    db.session.commit()
                     
-                    response['prediction_id'] = str(pred.id)
-                    logger.info(f"✅ Prediction saved: ID={pred.id}, User={session['user_id']}, Type=diabetes")
+                    response['prediction_id'] = prediction_id
+                    logger.info(f"✅ Prediction saved: ID={prediction_id}, User={session['user_id']}, Type=diabetes")
             except Exception as e:
                 logger.error(f"Failed to save prediction: {str(e)}")
                 try:
@@ -290,6 +387,7 @@ def predict_diabetes():
 
 @app.route('/api/predict/liver', methods=['POST'])
 def predict_liver():
+    liver_model, _ = get_tabular_model('liver')
     if liver_model is None:
         return jsonify({'error': 'Liver prediction model not loaded properly'}), 503
 
@@ -310,12 +408,8 @@ def predict_liver():
             float(data.get('Albumin_and_Globulin_Ratio', 0))
         ]
 
-        # Convert to numpy array and reshape
-        features_array = np.array(features).reshape(1, -1)
-        
         # Make prediction
-        prediction = liver_model.predict(features_array)[0]
-        probability = liver_model.predict_proba(features_array)[0][1]
+        prediction, probability = score_tabular_row('liver', liver_model, None, features)
 
         # Determine risk level based on probability
         if probability >= 0.8:
@@ -341,8 +435,7 @@ def predict_liver():
             try:
                 lat = float(lat)
                 lon = float(lon)
-                hospitals = get_nearby_specialty_hospitals(lat, lon, ['hepatology', 'gastroenterology', 'general medicine', 'internal medicine'])
-                response['hospitals'] = hospitals
+                add_hospital_recommendations(response, get_nearby_specialty_hospitals, lat, lon, ['hepatology', 'gastroenterology', 'general medicine', 'internal medicine'])
             except Exception as e:
                 logger.error(f"Error fetching hospitals: {str(e)}")
                 response['hospital_error'] = 'Unable to fetch nearby hospitals'
@@ -351,7 +444,7 @@ def predict_liver():
         from flask import session
         if 'user_id' in session:
             try:
-                pred = Prediction(
+                prediction_writer.save(
                     user_id=session['user_id'],
                     disease_type='liver',
                     prediction_result=risk_level,
@@ -359,8 +452,6 @@ def predict_liver():
                     risk_level=risk_level,
                     input_data=data
                 )
-                db.session.add(pred)
-                db.session.commit()
             except Exception as e:
                 logger.error(f"Failed to save prediction: {str(e)}")
                 try:
@@ -375,6 +466,7 @@ def predict_liver():
 
 @app.route('/api/predict/kidney', methods=['POST'])
 def predict_kidney():
+    kidney_model, kidney_scaler = get_tabular_model('kidney')
     if kidney_model is None or kidney_scaler is None:
         return jsonify({'error': 'Kidney prediction model not loaded properly'}), 503
 
@@ -409,15 +501,8 @@ def predict_kidney():
             float(data.get('anemia', 0))
         ]
 
-        # Convert to numpy array and reshape
-        features_array = np.array(features).reshape(1, -1)
-        
-        # Scale the features
-        scaled_features = kidney_scaler.transform(features_array)
-        
-        # Make prediction
-        prediction = kidney_model.predict(scaled_features)[0]
-        probability = kidney_model.predict_proba(scaled_features)[0][1]
+        # Scale and score the features
+        prediction, probability = score_tabular_row('kidney', kidney_model, kidney_scaler, features)
 
         # Determine risk level based on probability
         if probability >= 0.8:
@@ -443,8 +528,7 @@ def predict_kidney():
             try:
                 lat = float(lat)
                 lon = float(lon)
-                hospitals = get_nearby_specialty_hospitals(lat, lon, ['nephrology', 'urology', 'general medicine', 'internal medicine'])
-                response['hospitals'] = hospitals
+                add_hospital_recommendations(response, get_nearby_specialty_hospitals, lat, lon, ['nephrology', 'urology', 'general medicine', 'internal medicine'])
             except Exception as e:
                 logger.error(f"Error fetching hospitals: {str(e)}")
                 response['hospital_error'] = 'Unable to fetch nearby hospitals'
@@ -453,7 +537,7 @@ def predict_kidney():
         from flask import session
         if 'user_id' in session:
             try:
-                pred = Prediction(
+                prediction_writer.save(
                     user_id=session['user_id'],
                     disease_type='kidney',
                     prediction_result=risk_level,
@@ -461,8 +545,6 @@ def predict_kidney():
                     risk_level=risk_level,
                     input_data=data
                 )
-                db.session.add(pred)
-                db.session.commit()
             except Exception as e:
                 logger.error(f"Failed to save prediction: {str(e)}")
                 try:
@@ -477,6 +559,7 @@ def predict_kidney():
 
 @app.route('/api/predict/heart', methods=['POST'])
 def predict_heart():
+    heart_model, _ = get_tabular_model('heart')
     if heart_model is None:
         return jsonify({'error': 'Heart disease model not loaded properly'}), 503
 
@@ -498,12 +581,8 @@ def predict_heart():
             float(data.get('active', 0))         # 0=No, 1=Yes
         ]
 
-        # Convert to numpy array and reshape
-        features_array = np.array(features).reshape(1, -1)
-        
         # Make prediction (no scaling needed for Random Forest)
-        prediction = heart_model.predict(features_array)[0]
-        probability = heart_model.predict_proba(features_array)[0][1]
+        prediction, probability = score_tabular_row('heart', heart_model, None, features)
 
         # Determine risk level based on probability
         if probability >= 0.8:
@@ -529,8 +608,7 @@ def predict_heart():
             try:
                 lat = float(lat)
                 lon = float(lon)
-                hospitals = get_nearby_specialty_hospitals(lat, lon, ['cardiology', 'cardiac surgery', 'general medicine', 'internal medicine'])
-                response['hospitals'] = hospitals
+                add_hospital_recommendations(response, get_nearby_specialty_hospitals, lat, lon, ['cardiology', 'cardiac surgery', 'general medicine', 'internal medicine'])
             except Exception as e:
                 logger.error(f"Error fetching hospitals: {str(e)}")
                 response['hospital_error'] = 'Unable to fetch nearby hospitals'
@@ -539,7 +617,7 @@ def predict_heart():
         from flask import session
         if 'user_id' in session:
             try:
-                pred = Prediction(
+                prediction_writer.save(
                     user_id=session['user_id'],
                     disease_type='heart',
                     prediction_result=risk_level,
@@ -547,8 +625,6 @@ def predict_heart():
                     risk_level=risk_level,
                     input_data=data
                 )
-                db.session.add(pred)
-                db.session.commit()
             except Exception as e:
                 logger.error(f"Failed to save prediction: {str(e)}")
                 try:
@@ -562,45 +638,135 @@ def predict_heart():
         logger.error(f"Heart prediction error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 400
 
+MAX_BATCH_ROWS = int(os.getenv('MAX_BATCH_ROWS', '10000'))
+
+def _read_batch_rows(max_rows):
+    """Read batch rows from a JSON array ({"rows": [...]} also accepted) or a CSV upload.
+
+    A CSV is parsed only up to max_rows + 1 rows, enough to tell that it is too long.
+    """
+    if 'file' in request.files:
+        file = request.files['file']
+        if not file.filename.lower().endswith('.csv'):
+            raise ValueError('Unsupported file type. Upload a CSV file with a header row.')
+        content = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+        return list(islice(csv.DictReader(content), max_rows + 1))
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of rows or a CSV file upload')
+    return data
+
+@app.route('/api/predict/<disease>/batch', methods=['POST'])
+def predict_batch(disease):
+    """Score many rows for one tabular model in a single vectorized pass.
+
+    Batch results are not saved to the caller's prediction history and do not
+    include hospital recommendations, since rows usually belong to other patients.
+    """
+    if disease not in TABULAR_FEATURES:
+        return jsonify({'error': f'Unknown model: {disease}', 'supported': list(TABULAR_FEATURES.keys())}), 404
+
+    model, scaler = get_tabular_model(disease)
+    if model is None or (disease in ('diabetes', 'kidney') and scaler is None):
+        return jsonify({'error': f'{disease.capitalize()} prediction model not loaded properly'}), 503
+
+    try:
+        rows = _read_batch_rows(MAX_BATCH_ROWS)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not rows:
+        return jsonify({'error': 'No rows provided'}), 400
+    if len(rows) > MAX_BATCH_ROWS:
+        return jsonify({'error': f'Too many rows. Maximum per batch is {MAX_BATCH_ROWS}.'}), 413
+
+    try:
+        matrix, valid_indices, errors = build_feature_matrix(disease, rows)
+        labels, probabilities = score_matrix(model, scaler, matrix)
+
+        results = [None] * len(rows)
+        for idx, message in errors.items():
+            results[idx] = {'index': idx, 'error': message}
+        for idx, label, probability in zip(valid_indices, labels.tolist(), probabilities.tolist()):
+            results[idx] = {
+                'index': idx,
+                'prediction': int(label),
+                'probability': float(probability),
+                'risk_level': risk_level_for(disease, probability)
+            }
+
+        return jsonify({
+            'disease': disease,
+            'total': len(rows),
+            'scored': len(valid_indices),
+            'failed': len(errors),
+            'results': results
+        })
+    except Exception as e:
+        logger.error(f"Error in {disease} batch prediction: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
     try:
         return jsonify({
             'status': 'Backend server is running',
             'models_loaded': {
-                'diabetes': diabetes_model is not None,
-                'liver': liver_model is not None,
-                'kidney': kidney_model is not None,
-                'heart': heart_model is not None
+                name: model_registry.is_loaded(name)
+                for name in ('diabetes', 'liver', 'kidney', 'heart')
             }
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Health endpoint to report which models are available and any load errors
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics for tuning: micro-batch sizes, report job queue depth, result cache hit ratios, OCR stage timings, hospital store coverage, enrichment cache hits, deferred hospital lookups, LLM latency/breaker state, chatbot cache hits, consultation chat subscribers, appointment sweeps and risk forecast runs."""
+    return jsonify({
+        'micro_batching': {
+            'enabled': _microbatch_settings['enabled'],
+            'models': {name: batcher.stats() for name, batcher in _micro_batchers.items()}
+        },
+        'report_jobs': report_jobs.stats(),
+        'result_cache': result_cache.stats(),
+        'tiled_ocr': dict(tiled_ocr.stats(), enabled=_ocr_settings['mode'] == 'tiled'),
+        'hospital_store': hospital_store.stats(),
+        'hospital_enrichment': hospital_enricher.stats(),
+        'hospital_recommendations': hospital_recommendations.stats(),
+        'llm': llm.stats(),
+        'response_cache': response_cache.stats(),
+        'chat': chat_broker.stats(),
+        'appointment_sweeper': appointment_sweeper.stats(),
+        'risk_forecaster': risk_forecaster.stats(),
+        'prediction_writer': prediction_writer.stats()
+    })
+
+# Health endpoint to report model state, load times and any load errors.
+# Models load on first use, so 'not_loaded' is a normal state, not a failure.
 @app.route('/api/health', methods=['GET'])
 def health():
+    models = model_registry.status()
     return jsonify({
         'status': 'ok',
-        'models_loaded': {
-            'diabetes': diabetes_model is not None,
-            'liver': liver_model is not None,
-            'kidney': kidney_model is not None and kidney_scaler is not None,
-            'heart': heart_model is not None
-        },
-        'errors': {
-            'diabetes': _diabetes_err,
-            'liver': _liver_err,
-            'kidney': _kidney_err,
-            'heart': _heart_err
-        }
+        'models_loaded': {name: info['state'] == 'loaded' for name, info in models.items()},
+        'errors': {name: info['error'] for name, info in models.items()},
+        'models': models
     })
 
-@app.route('/api/predict/bone-fracture', methods=['POST'])
-def predict_bone_fracture():
+def _classify_bone_image(image_bytes):
+    """Run the fracture classifier. Returns its predictions as plain dicts, or None if the model is unavailable."""
+    _bone_pipeline = model_registry.get('bone_fracture')
     if _bone_pipeline is None:
-        return jsonify({'error': 'Bone fracture model not loaded', 'details': _bone_model_err}), 503
+        return None
+    img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    preds = _bone_pipeline(img)
+    return [{'label': p['label'], 'score': float(p['score'])} for p in preds]
 
+@app.route('/api/predict/bone-fracture', methods=['POST'])
+def predict_bone_fracture():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part in the request'}), 400
 
@@ -613,12 +779,12 @@ def predict_bone_fracture():
         return jsonify({'error': 'Unsupported file type. Allowed: JPG, JPEG, PNG'}), 400
 
     try:
-        # Read raw bytes and ensure Pillow compatibility
+        # Read raw bytes; the same X-ray uploaded again is served from the result cache
         image_bytes = file.read()
-        img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-
-        # Run inference using Transformers pipeline directly with PIL image
-        preds = _bone_pipeline(img)
+        preds = cached_result('bone_fracture', image_bytes, lambda: _classify_bone_image(image_bytes),
+                              should_cache=bool)
+        if preds is None:
+            return jsonify({'error': 'Bone fracture model not loaded', 'details': model_registry.error('bone_fracture')}), 503
         logger.info(f"Model predictions: {preds}")
         
         if not preds:
@@ -707,7 +873,7 @@ def predict_bone_fracture():
         from flask import session
         if 'user_id' in session:
             try:
-                pred = Prediction(
+                prediction_writer.save(
                     user_id=session['user_id'],
                     disease_type='bone_fracture',
                     prediction_result=norm_label,
@@ -715,8 +881,6 @@ def predict_bone_fracture():
                     risk_level=severity,
                     input_data={'confidence': confidence_pct, 'urgency': urgency}
                 )
-                db.session.add(pred)
-                db.session.commit()
             except Exception as e:
                 logger.error(f"Failed to save prediction: {str(e)}")
                 try:
@@ -736,9 +900,8 @@ def transcribe_audio():
             return jsonify({'error': 'No audio file provided'}), 400
         
         audio_file = request.files['audio']
-        GROQ_API_KEY = os.getenv('GROQ_API_KEY')
         
-        if not GROQ_API_KEY or not GROQ_AVAILABLE:
+        if not llm.available:
             return jsonify({'error': 'Transcription service unavailable'}), 503
         
         # Save to temp file with proper extension
@@ -749,8 +912,8 @@ def transcribe_audio():
         
         try:
             with open(tmp_path, 'rb') as f:
-                client = Groq(api_key=GROQ_API_KEY)
-                transcription = client.audio.transcriptions.create(
+                transcription = llm.transcribe(
+                    'transcribe_audio',
                     file=("audio.webm", f.read(), "audio/webm"),
                     model="whisper-large-v3",
                     language="en",
@@ -765,7 +928,8 @@ def transcribe_audio():
             severity = None
             
             try:
-                completion = client.chat.completions.create(
+                completion = llm.chat(
+                    'transcribe_audio',
                     model="llama-3.1-8b-instant",
                     messages=[{
                         "role": "user",
@@ -801,38 +965,33 @@ JSON format: {{"duration": "value or null", "severity": "value or null"}}"""
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
             raise e
+    except LLMUnavailable as e:
+        logger.warning(f"Transcription unavailable: {str(e)}")
+        return jsonify({'error': 'Transcription service unavailable'}), 503
     except Exception as e:
         logger.error(f"Transcription error: {str(e)}", exc_info=True)
         return jsonify({'error': f'Failed to transcribe: {str(e)}'}), 500
 
-@app.route('/api/groq-chat', methods=['POST'])
-def groq_chat():
-    try:
-        data = request.get_json()
-        user_message = data.get('message', '').strip()
+CHAT_NOT_CONFIGURED_RESPONSE = 'AI assistant is temporarily unavailable. Please consult a healthcare professional.'
+CHAT_FAILED_RESPONSE = ('I apologize, but I am temporarily unavailable. For medical concerns, '
+                        'please consult a healthcare professional directly.')
 
-        if not user_message:
-            return jsonify({'error': 'Message is required'}), 400
+def sse_event(event, data):
+    """One server-sent event frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-        
-        if not GROQ_API_KEY or not GROQ_AVAILABLE:
-            return jsonify({
-                'response': 'AI assistant is temporarily unavailable. Please consult a healthcare professional.'
-            }), 200
-        
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        # Detect if this is a meal plan request
-        is_meal_plan = 'meal plan' in user_message.lower() or 'days' in user_message.lower()
-        
-        if is_meal_plan:
-            system_prompt = """You are a nutrition AI. Respond ONLY with valid JSON, no other text.
+def _groq_chat_request(user_message):
+    """(variant, chat.completions kwargs) for a chatbot message; the variant keys the response cache"""
+    # Detect if this is a meal plan request
+    is_meal_plan = 'meal plan' in user_message.lower() or 'days' in user_message.lower()
+    
+    if is_meal_plan:
+        system_prompt = """You are a nutrition AI. Respond ONLY with valid JSON, no other text.
 Format: {"days":[{"day":1,"breakfast":"text","lunch":"text","dinner":"text"}],"avoidFoods":["text"],"nutritionTips":["text"]}
 Create exactly 7 days. Use Indian meals."""
-            max_tokens = 1500
-        else:
-            system_prompt = """You are a healthcare information assistant.
+        max_tokens = 1500
+    else:
+        system_prompt = """You are a healthcare information assistant.
 Provide general medical information only. Do NOT diagnose or prescribe.
 
 Format:
@@ -844,31 +1003,144 @@ What You Can Do Now:
 
 When to See a Doctor:
 - escalation"""
-            max_tokens = 350
+        max_tokens = 350
+
+    variant = prompt_variant('meal_plan' if is_meal_plan else 'health_info', system_prompt)
+    return variant, {
+        'model': "llama-3.1-8b-instant",
+        'messages': [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ],
+        'temperature': 0.1,
+        'max_tokens': max_tokens,
+        'top_p': 0.9
+    }
+
+@app.route('/api/groq-chat', methods=['POST'])
+def groq_chat():
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '').strip()
+
+        if not user_message:
+            return jsonify({'error': 'Message is required'}), 400
+
+        variant, chat_kwargs = _groq_chat_request(user_message)
+        cached, match = response_cache.get(variant, user_message)
+        if cached is not None:
+            return jsonify({'response': cached, 'cached': match})
+
+        if not llm.available:
+            return jsonify({'response': CHAT_NOT_CONFIGURED_RESPONSE}), 200
         
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.1,
-            max_tokens=max_tokens,
-            top_p=0.9
-        )
+        start = time.perf_counter()
+        completion = llm.chat('groq_chat', **chat_kwargs)
         
         answer = completion.choices[0].message.content.strip()
         
         if not answer:
             return jsonify({'error': 'Empty response from Groq'}), 500
 
+        response_cache.put(variant, user_message, answer, (time.perf_counter() - start) * 1000)
         return jsonify({'response': answer})
 
     except Exception as e:
-        logger.error(f"Groq error: {str(e)}", exc_info=True)
-        return jsonify({
-            'response': 'I apologize, but I am temporarily unavailable. For medical concerns, please consult a healthcare professional directly.'
-        }), 200
+        if isinstance(e, LLMUnavailable):
+            logger.warning(f"Groq unavailable: {str(e)}")
+        else:
+            logger.error(f"Groq error: {str(e)}", exc_info=True)
+        return jsonify({'response': CHAT_FAILED_RESPONSE}), 200
+
+@app.route('/api/groq-chat/stream', methods=['POST'])
+def groq_chat_stream():
+    """Server-sent events: 'token' events as the answer is generated, then 'done' with the whole answer.
+
+    A cached answer comes as a single 'done' event. If Groq fails, an 'error'
+    event carries the apology to show instead of the partial answer.
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '').strip()
+    if not user_message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    variant, chat_kwargs = _groq_chat_request(user_message)
+    cached, match = response_cache.get(variant, user_message)
+
+    def events():
+        if cached is not None:
+            yield sse_event('done', {'response': cached, 'cached': match})
+            return
+        if not llm.available:
+            yield sse_event('done', {'response': CHAT_NOT_CONFIGURED_RESPONSE})
+            return
+
+        start = time.perf_counter()
+        parts = []
+        try:
+            for token in llm.stream('groq_chat', **chat_kwargs):
+                parts.append(token)
+                yield sse_event('token', {'text': token})
+        except Exception as e:
+            if isinstance(e, LLMUnavailable):
+                logger.warning(f"Groq stream unavailable after {len(parts)} tokens: {str(e)}")
+            else:
+                logger.error(f"Groq stream error: {str(e)}", exc_info=True)
+            yield sse_event('error', {'response': CHAT_FAILED_RESPONSE})
+            return
+
+        answer = ''.join(parts).strip()
+        if not answer:
+            yield sse_event('error', {'error': 'Empty response from Groq', 'response': CHAT_FAILED_RESPONSE})
+            return
+        response_cache.put(variant, user_message, answer, (time.perf_counter() - start) * 1000)
+        yield sse_event('done', {'response': answer})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/groq-chat/cache', methods=['GET'])
+def groq_chat_cache_stats():
+    """Chatbot response cache: entries per prompt variant, exact/similar hit counts and estimated LLM time saved"""
+    return jsonify(response_cache.stats())
+
+NEARBY_ADDRESS_KEYS = ['addr:street', 'addr:city', 'addr:state']
+ADDRESS_KEYS = ['addr:housenumber', 'addr:street', 'addr:city', 'addr:state', 'addr:postcode', 'addr:country']
+
+def find_nearby_hospitals(lat, lon, limit, address_keys=ADDRESS_KEYS, radius_km=HOSPITAL_SEARCH_RADIUS_KM):
+    """Nearest hospitals from the local hospital store, as dicts for the API responses.
+
+    Returns None if the area is not in the store and could not be fetched.
+    """
+    found = hospital_store.nearest(lat, lon, limit, radius_km)
+    if found is None:
+        return None
+
+    hospitals = []
+    for distance, record in found:
+        tags = record['tags']
+        address_parts = []
+        if 'addr:full' in tags:
+            address_parts.append(tags['addr:full'])
+        else:
+            for key in address_keys:
+                if key in tags:
+                    address_parts.append(tags[key])
+        address = ', '.join(address_parts) if address_parts else 'Address not available'
+
+        hospitals.append({
+            'osm_id': record['id'],
+            'name': tags.get('name', 'Unnamed Hospital'),
+            'distance': f"{distance:.1f} km",
+            'latitude': record['lat'],
+            'longitude': record['lon'],
+            'address': address,
+            'type': 'Government' if 'government' in tags.get('operator', '').lower() else 'Private',
+            'phone': tags.get('phone', ''),
+            'website': tags.get('website', ''),
+            'emergency': tags.get('emergency', '') == 'yes'
+        })
+    return hospitals
 
 @app.route('/api/hospitals/nearby', methods=['GET'])
 def get_nearby_hospitals():
@@ -882,67 +1154,15 @@ def get_nearby_hospitals():
         lat = float(lat)
         lon = float(lon)
 
-        # Try Overpass API first
-        try:
-            overpass_query = f"""
-            [out:json][timeout:10];
-            (
-              node["amenity"="hospital"](around:60000,{lat},{lon});
-              way["amenity"="hospital"](around:60000,{lat},{lon});
-            );
-            out center meta;
-            """
-
-            response = requests.post(
-                'https://overpass-api.de/api/interpreter',
-                data=overpass_query,
-                headers={'Content-Type': 'text/plain'},
-                timeout=10
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                hospitals = []
-
-                for element in data.get('elements', []):
-                    tags = element.get('tags', {})
-                    name = tags.get('name', 'Unnamed Hospital')
-
-                    if element['type'] == 'node':
-                        h_lat, h_lon = element['lat'], element['lon']
-                    elif 'center' in element:
-                        h_lat, h_lon = element['center']['lat'], element['center']['lon']
-                    else:
-                        continue
-
-                    distance = calculate_distance(lat, lon, h_lat, h_lon)
-                    address_parts = []
-                    if 'addr:full' in tags:
-                        address_parts.append(tags['addr:full'])
-                    else:
-                        for key in ['addr:street', 'addr:city', 'addr:state']:
-                            if key in tags:
-                                address_parts.append(tags[key])
-                    address = ', '.join(address_parts) if address_parts else 'Address not available'
-
-                    hospital = {
-                        'name': name,
-                        'distance': f"{distance:.1f} km",
-                        'latitude': h_lat,
-                        'longitude': h_lon,
-                        'address': address,
-                        'type': 'Government' if 'government' in tags.get('operator', '').lower() else 'Private',
-                        'phone': tags.get('phone', ''),
-                        'specialties': ['General Medicine', 'Emergency'],
-                        'rating': 4.0,
-                        'recommendation_reason': 'Available healthcare facility'
-                    }
-                    hospitals.append(hospital)
-
-                hospitals.sort(key=lambda x: float(x['distance'].split()[0]))
-                return jsonify({'hospitals': hospitals[:5]})
-        except:
-            pass
+        hospitals = find_nearby_hospitals(lat, lon, limit=5, address_keys=NEARBY_ADDRESS_KEYS)
+        if hospitals is not None:
+            for hospital in hospitals:
+                hospital.update({
+                    'specialties': ['General Medicine', 'Emergency'],
+                    'rating': 4.0,
+                    'recommendation_reason': 'Available healthcare facility'
+                })
+            return jsonify({'hospitals': hospitals})
 
         # Fallback to mock data
         mock_hospitals = [
@@ -990,12 +1210,14 @@ def get_nearby_hospitals():
         return jsonify({'error': 'Unable to fetch hospitals'}), 500
 
 def analyze_hospital_with_groq(hospital):
-    """Analyze hospital using Groq API to get specialties and rating."""
+    """Analyze hospital using Groq API to get specialties and rating.
+
+    Returns (specialties, rating, reason), or None if the analysis failed;
+    hospital_enricher caches successes and fills in defaults for failures.
+    """
     try:
-        GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-        if not GROQ_API_KEY:
-            return [], 3.0, "Analysis unavailable"
-        GROQ_API_URL = 'https://api.groq.com/openai/v1/chat/completions'
+        if not llm.available:
+            return None
 
         prompt = f"""
         Analyze the following hospital based on its public information:
@@ -1010,23 +1232,16 @@ def analyze_hospital_with_groq(hospital):
         If information is limited, make reasonable assumptions based on typical hospital data.
         """
 
-        payload = {
-            "messages": [{"role": "user", "content": prompt}],
-            "model": "llama-3.1-8b-instant",
-            "temperature": 0.3
-        }
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {GROQ_API_KEY}'
-        }
-
-        response = requests.post(GROQ_API_URL, json=payload, headers=headers, timeout=10)
-        if response.status_code == 200:
-            groq_data = response.json()
-            content = groq_data['choices'][0]['message']['content']
+        completion = llm.chat(
+            'hospital_enrichment',
+            messages=[{"role": "user", "content": prompt}],
+            model="llama-3.1-8b-instant",
+            temperature=0.3,
+            timeout=10
+        )
+        content = completion.choices[0].message.content
+        if content:
             # Try to extract JSON from the response
-            import json
-            import re
             try:
                 # First, try direct JSON parse
                 parsed = json.loads(content)
@@ -1049,89 +1264,32 @@ def analyze_hospital_with_groq(hospital):
                 else:
                     logger.error(f"No JSON found in Groq response for {hospital['name']}, content: {content}")
         else:
-            logger.warning(f"Groq API error for {hospital['name']}: {response.status_code}")
-
-        # Fallback: Provide default analysis if Groq fails
-        default_specialties = ["General Medicine", "Emergency"]
-        default_rating = 3.5
-        default_reason = "Basic healthcare services available"
-        return default_specialties, default_rating, default_reason
+            logger.warning(f"Empty Groq response for {hospital['name']}")
+        return None
+    except LLMUnavailable as e:
+        logger.warning(f"Groq unavailable for {hospital['name']}: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Error analyzing hospital {hospital['name']} with Groq: {str(e)}")
-        return [], 3.0, "Analysis unavailable"
+        return None
+
+# Groq analyses are cached per hospital (OSM id + name) for HOSPITAL_ENRICH_TTL_HOURS.
+# Misses run concurrently; a lookup waits at most HOSPITAL_ENRICH_DEADLINE_SECONDS
+# and uses default specialties for hospitals whose analysis is not back yet.
+hospital_enricher = HospitalEnricher(
+    analyze_hospital_with_groq,
+    cache=ResultCache(**hospital_enrichment_cache_settings()),
+    **hospital_enrichment_settings()
+)
 
 def get_nearby_specialty_hospitals(lat, lon, specialties):
     """Fetch nearby hospitals and filter for specific specialties."""
     try:
-        overpass_query = f"""
-        [out:json][timeout:25];
-        (
-          node["amenity"="hospital"](around:60000,{lat},{lon});
-          way["amenity"="hospital"](around:60000,{lat},{lon});
-          relation["amenity"="hospital"](around:60000,{lat},{lon});
-        );
-        out center meta;
-        """
-
-        response = requests.post(
-            'https://overpass-api.de/api/interpreter',
-            data=overpass_query,
-            headers={'Content-Type': 'text/plain'},
-            timeout=30
-        )
-
-        if response.status_code == 504 or response.status_code != 200:
-            logger.warning(f"Overpass API returned status {response.status_code}")
+        top_hospitals = find_nearby_hospitals(lat, lon, limit=10)
+        if top_hospitals is None:
             return []
 
-        data = response.json()
-        hospitals = []
-
-        for element in data.get('elements', []):
-            tags = element.get('tags', {})
-            name = tags.get('name', 'Unnamed Hospital')
-
-            if element['type'] == 'node':
-                h_lat, h_lon = element['lat'], element['lon']
-            elif 'center' in element:
-                h_lat, h_lon = element['center']['lat'], element['center']['lon']
-            else:
-                continue
-
-            distance = calculate_distance(lat, lon, h_lat, h_lon)
-
-            address_parts = []
-            if 'addr:full' in tags:
-                address_parts.append(tags['addr:full'])
-            else:
-                for key in ['addr:housenumber', 'addr:street', 'addr:city', 'addr:state', 'addr:postcode', 'addr:country']:
-                    if key in tags:
-                        address_parts.append(tags[key])
-            address = ', '.join(address_parts) if address_parts else 'Address not available'
-
-            hospital = {
-                'name': name,
-                'distance': f"{distance:.1f} km",
-                'latitude': h_lat,
-                'longitude': h_lon,
-                'address': address,
-                'type': 'Government' if 'government' in tags.get('operator', '').lower() else 'Private',
-                'phone': tags.get('phone', ''),
-                'website': tags.get('website', ''),
-                'emergency': tags.get('emergency', '') == 'yes'
-            }
-            hospitals.append(hospital)
-
-        hospitals.sort(key=lambda x: float(x['distance'].split()[0]))
-        top_hospitals = hospitals[:10]
-
-        enriched_hospitals = []
-        for hospital in top_hospitals:
-            specs, rating, reason = analyze_hospital_with_groq(hospital)
-            hospital['specialties'] = specs
-            hospital['rating'] = rating
-            hospital['recommendation_reason'] = reason
-            enriched_hospitals.append(hospital)
+        enriched_hospitals = hospital_enricher.enrich(top_hospitals)
 
         filtered_hospitals = []
         for hospital in enriched_hospitals:
@@ -1155,92 +1313,13 @@ def get_nearby_specialty_hospitals(lat, lon, specialties):
 def get_nearby_diabetes_hospitals(lat, lon):
     """Fetch nearby hospitals and filter for diabetes-related specialties."""
     try:
-        # Overpass API query for hospitals within 60km radius
-        overpass_query = f"""
-        [out:json][timeout:25];
-        (
-          node["amenity"="hospital"](around:60000,{lat},{lon});
-          way["amenity"="hospital"](around:60000,{lat},{lon});
-          relation["amenity"="hospital"](around:60000,{lat},{lon});
-        );
-        out center meta;
-        """
-
-        response = requests.post(
-            'https://overpass-api.de/api/interpreter',
-            data=overpass_query,
-            headers={'Content-Type': 'text/plain'},
-            timeout=30
-        )
-
-        if response.status_code == 504 or response.status_code != 200:
-            logger.warning(f"Overpass API returned status {response.status_code}")
+        # Hospitals within 60km, nearest first
+        top_hospitals = find_nearby_hospitals(lat, lon, limit=10)
+        if top_hospitals is None:
             return []
 
-        data = response.json()
-        hospitals = []
-
-        for element in data.get('elements', []):
-            tags = element.get('tags', {})
-            name = tags.get('name', 'Unnamed Hospital')
-
-            # Get coordinates
-            if element['type'] == 'node':
-                h_lat, h_lon = element['lat'], element['lon']
-            elif 'center' in element:
-                h_lat, h_lon = element['center']['lat'], element['center']['lon']
-            else:
-                continue
-
-            # Calculate distance
-            distance = calculate_distance(lat, lon, h_lat, h_lon)
-
-            # Build address
-            address_parts = []
-            if 'addr:full' in tags:
-                address_parts.append(tags['addr:full'])
-            else:
-                if 'addr:housenumber' in tags:
-                    address_parts.append(tags['addr:housenumber'])
-                if 'addr:street' in tags:
-                    address_parts.append(tags['addr:street'])
-                if 'addr:city' in tags:
-                    address_parts.append(tags['addr:city'])
-                if 'addr:state' in tags:
-                    address_parts.append(tags['addr:state'])
-                if 'addr:postcode' in tags:
-                    address_parts.append(tags['addr:postcode'])
-                if 'addr:country' in tags:
-                    address_parts.append(tags['addr:country'])
-            address = ', '.join(address_parts) if address_parts else tags.get('addr:street', 'Address not available')
-
-            hospital = {
-                'name': name,
-                'distance': f"{distance:.1f} km",
-                'latitude': h_lat,
-                'longitude': h_lon,
-                'address': address,
-                'type': 'Government' if 'government' in tags.get('operator', '').lower() else 'Private',
-                'phone': tags.get('phone', ''),
-                'website': tags.get('website', ''),
-                'emergency': tags.get('emergency', '') == 'yes'
-            }
-            hospitals.append(hospital)
-
-        # Sort by distance
-        hospitals.sort(key=lambda x: float(x['distance'].split()[0]))
-
-        # Limit to top 10 for analysis
-        top_hospitals = hospitals[:10]
-
         # Enrich with Groq analysis
-        enriched_hospitals = []
-        for hospital in top_hospitals:
-            specialties, rating, reason = analyze_hospital_with_groq(hospital)
-            hospital['specialties'] = specialties
-            hospital['rating'] = rating
-            hospital['recommendation_reason'] = reason
-            enriched_hospitals.append(hospital)
+        enriched_hospitals = hospital_enricher.enrich(top_hospitals)
 
         # Filter for diabetes-related specialties
         diabetes_specialties = ['diabetology', 'endocrinology', 'diabetes', 'general medicine', 'internal medicine']
@@ -1265,6 +1344,55 @@ def get_nearby_diabetes_hospitals(lat, lon):
         logger.error(f"Error fetching diabetes hospitals: {str(e)}", exc_info=True)
         return []
 
+# Prediction endpoints can leave the hospital lookup (store query + Groq enrichment)
+# to a background pool and return a token instead: ?hospitals=deferred per request,
+# or HOSPITAL_RECOMMENDATIONS=deferred as the default.
+hospital_recommendations = HospitalRecommendations(**hospital_recommendation_settings())
+_hospital_recommendation_mode = hospital_recommendation_mode()
+
+def add_hospital_recommendations(response, lookup, lat, lon, *args):
+    """Put lookup(lat, lon, *args) in a prediction response, or a token for it in deferred mode."""
+    if request.args.get('hospitals', _hospital_recommendation_mode).lower() != DEFERRED:
+        response['hospitals'] = lookup(lat, lon, *args)
+        return
+    token = hospital_recommendations.submit(lookup, lat, lon, *args)
+    response.update({
+        'hospitals_status': 'pending',
+        'hospital_token': token,
+        'hospitals_url': f'/api/hospitals/recommendations/{token}',
+        'hospitals_events_url': f'/api/hospitals/recommendations/{token}/events'
+    })
+
+@app.route('/api/hospitals/recommendations/<token>', methods=['GET'])
+def get_hospital_recommendations(token):
+    """Poll a deferred hospital lookup; 'hospitals' is set once the status is 'ready'"""
+    recommendation = hospital_recommendations.get(token)
+    if recommendation is None:
+        return jsonify({'error': 'Recommendation not found'}), 404
+    return jsonify(recommendation)
+
+@app.route('/api/hospitals/recommendations/<token>/events', methods=['GET'])
+def stream_hospital_recommendations(token):
+    """Server-sent events: a single 'hospitals' event once the lookup finishes"""
+    if hospital_recommendations.get(token) is None:
+        return jsonify({'error': 'Recommendation not found'}), 404
+
+    def events():
+        while True:
+            recommendation = hospital_recommendations.get(token)
+            if recommendation is None:
+                yield 'event: error\ndata: {"error": "Recommendation not found"}\n\n'
+                return
+            if recommendation['status'] in RECOMMENDATION_FINISHED_STATES:
+                yield f"event: hospitals\ndata: {json.dumps(recommendation)}\n\n"
+                return
+            # Comment line keeps proxies from closing an idle stream
+            yield ': pending\n\n'
+            time.sleep(0.5)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two points using Haversine formula"""
     import math
@@ -1284,37 +1412,7 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     
     return R * c
 
-# Medical Report Analyzer with AI
-_ner_pipeline = None
-_summarizer_pipeline = None
-_table_qa_pipeline = None
-
-try:
-    logger.info("Loading biomedical NER model...")
-    _ner_pipeline = pipeline("ner", model="d4data/biomedical-ner-all", aggregation_strategy="simple", device=-1)
-    logger.info("Biomedical NER model loaded successfully")
-except Exception as e:
-    logger.warning(f"NER model not available: {str(e)}")
-    _ner_pipeline = None
-
-try:
-    logger.info("Loading clinical summarizer model...")
-    _summarizer_pipeline = pipeline("text2text-generation", model="google/flan-t5-large", device=-1, max_length=512)
-    logger.info("Clinical summarizer model loaded successfully")
-except Exception as e:
-    logger.warning(f"Summarizer model not available: {str(e)}")
-    _summarizer_pipeline = None
-
-# Try to load table extraction model for structured reports
-try:
-    logger.info("Loading table QA model for structured extraction...")
-    from transformers import TapasTokenizer, TapasForQuestionAnswering
-    _table_qa_pipeline = pipeline("table-question-answering", model="google/tapas-base-finetuned-wtq", device=-1)
-    logger.info("Table QA model loaded successfully")
-except Exception as e:
-    logger.warning(f"Table QA model not available: {str(e)}")
-    _table_qa_pipeline = None
-
+# Medical Report Analyzer with AI (NER, summarizer and table QA models are in model_registry)
 MEDICAL_PARAMETERS = {
     'glucose': {'pattern': r'(?:blood\s+)?(?:glucose|sugar|fasting\s+blood\s+sugar|fbs|random\s+blood\s+sugar|rbs)[:\s=-]*([0-9.]+)', 'unit': 'mg/dL', 'normal': (70, 100), 'name': 'Blood Glucose', 'borderline': (100, 125), 'aliases': ['glucose', 'sugar', 'fbs', 'rbs', 'blood sugar']},
     'hemoglobin': {'pattern': r'(?:h[ae]?moglobin|hb|haemoglobin)[:\s=-]*([0-9.]+)', 'unit': 'g/dL', 'normal': (12, 16), 'name': 'Hemoglobin', 'borderline': (11, 12), 'aliases': ['hemoglobin', 'hb', 'haemoglobin']},
@@ -1341,49 +1439,24 @@ MEDICAL_PARAMETERS = {
     'potassium': {'pattern': r'(?:serum\s+)?(?:potassium|k)[:\s=-]*([0-9.]+)', 'unit': 'mEq/L', 'normal': (3.5, 5.0), 'name': 'Potassium', 'borderline': (3.3, 3.5), 'aliases': ['potassium', 'k', 'serum potassium']},
 }
 
-def extract_text_from_pdf(file_bytes):
-    """Enhanced PDF text extraction with layout preservation"""
+# PDF pages are read in a process pool for long documents (PDF_WORKERS, PDF_MAX_PAGES,
+# PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES). PDF_OCR_MODE picks which pages are
+# OCR'd: 'off' (default) none, 'missing' pages without a text layer, 'all' every page;
+# either way only among the first PDF_OCR_MAX_PAGES pages.
+_pdf_settings = pdf_settings()
+
+def extract_text_from_pdf(file_bytes, on_page=None):
+    """Enhanced PDF text extraction with layout preservation.
+
+    on_page, if given, is called with each page's text as soon as it is read,
+    so the caller can start analyzing early pages while later ones are read.
+    """
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ''
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + '\n'
-        return text.strip() if text.strip() else None
+        return pdf_text(file_bytes, ocr=extract_text_from_image, on_page=on_page, **_pdf_settings)
     except Exception as e:
         logger.error(f"PDF extraction error: {str(e)}", exc_info=True)
         return None
 
-def preprocess_image_for_ocr(img):
-    """Enhance image quality for better OCR results"""
-    try:
-        import cv2
-        
-        # Convert PIL to OpenCV format
-        img_array = np.array(img)
-        
-        # Convert to grayscale
-        if len(img_array.shape) == 3:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img_array
-        
-        # Apply thresholding to get better contrast
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
-        
-        # Increase contrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(denoised)
-        
-        return enhanced
-    except Exception as e:
-        logger.warning(f"Image preprocessing failed: {e}, using original")
-        return np.array(img)
-
 def clean_ocr_text(text):
     """Clean OCR output to remove gibberish and fix common errors"""
     if not text:
@@ -1419,13 +1492,19 @@ def clean_ocr_text(text):
     
     return '\n'.join(cleaned_lines)
 
+# OCR_MODE=tiled reads large photos (OCR_TILED_MIN_MEGAPIXELS and up) as overlapping
+# strips in parallel worker processes; see ocr_tiling.py for the other OCR_* settings.
+_ocr_settings = ocr_settings()
+tiled_ocr = TiledOCR(
+    workers=_ocr_settings['workers'],
+    target_dpi=_ocr_settings['target_dpi'],
+    strip_height=_ocr_settings['strip_height'],
+    overlap=_ocr_settings['overlap']
+)
+
 def extract_text_from_image(file_bytes):
     """Enhanced OCR with preprocessing, fallback, and text cleaning"""
     try:
-        if _ocr_reader is None:
-            logger.error("EasyOCR reader not initialized")
-            return None
-        
         img = Image.open(io.BytesIO(file_bytes))
         
         # Check image size
@@ -1435,43 +1514,27 @@ def extract_text_from_image(file_bytes):
         if width < 800 or height < 600:
             logger.warning(f"Image resolution is low ({width}x{height}). Recommend >1200x1600 for best results.")
         
+        use_tiled = _ocr_settings['mode'] == 'tiled' and width * height >= _ocr_settings['min_pixels']
+        _ocr_reader = None
+        if not use_tiled:
+            _ocr_reader = model_registry.get('ocr')
+            if _ocr_reader is None:
+                logger.error("EasyOCR reader not initialized")
+                return None
+        
         # Try with preprocessing first
         text = None
         try:
-            img_enhanced = preprocess_image_for_ocr(img)
-            results = _ocr_reader.readtext(img_enhanced, detail=1, paragraph=False, batch_size=4)
-            logger.info(f"OCR extracted {len(results)} text blocks with preprocessing")
+            if use_tiled:
+                results, timings = tiled_ocr.readtext(img)
+                logger.info(f"Tiled OCR extracted {len(results)} text blocks in {timings['strips']} strips")
+            else:
+                img_enhanced = preprocess_image_for_ocr(img)
+                results = _ocr_reader.readtext(img_enhanced, detail=1, paragraph=False, batch_size=4)
+                logger.info(f"OCR extracted {len(results)} text blocks with preprocessing")
             
             if results:
-                # Sort by position and group into lines
-                sorted_results = sorted(results, key=lambda x: (x[0][0][1], x[0][0][0]))
-                
-                lines = []
-                current_line = []
-                current_y = None
-                y_threshold = 30
-                
-                for bbox, text_block, conf in sorted_results:
-                    if conf < 0.2:  # Lower threshold
-                        continue
-                    
-                    y_pos = bbox[0][1]
-                    
-                    if current_y is None:
-                        current_y = y_pos
-                        current_line.append(text_block)
-                    elif abs(y_pos - current_y) < y_threshold:
-                        current_line.append(text_block)
-                    else:
-                        if current_line:
-                            lines.append(' '.join(current_line))
-                        current_line = [text_block]
-                        current_y = y_pos
-                
-                if current_line:
-                    lines.append(' '.join(current_line))
-                
-                text = '\n'.join(lines) if lines else None
+                text = group_ocr_lines(results)
         except Exception as e:
             logger.warning(f"Preprocessing failed: {e}")
         
@@ -1582,6 +1645,7 @@ def get_health_recommendations(param_key, status, value):
 
 def extract_parameters_with_ai(text):
     """Enhanced AI-based parameter extraction using NER + contextual matching"""
+    _ner_pipeline = model_registry.get('ner')
     if not _ner_pipeline:
         return []
     
@@ -1607,6 +1671,7 @@ def extract_parameters_with_ai(text):
 
 def extract_with_ai_context(text):
     """Use AI to extract parameter-value pairs from unstructured text"""
+    _summarizer_pipeline = model_registry.get('summarizer')
     if not _summarizer_pipeline:
         return {}
     
@@ -1686,6 +1751,7 @@ def generate_clinical_summary(abnormal_params):
         return "All parameters are within normal range. Continue maintaining a healthy lifestyle."
     
     # Enhanced AI summary with structured input
+    _summarizer_pipeline = model_registry.get('summarizer')
     if _summarizer_pipeline:
         try:
             # Build structured prompt for better AI reasoning
@@ -1892,8 +1958,13 @@ def extract_from_table_row(row_data, param_info):
     
     return None
 
-def analyze_parameters(text):
-    """Multi-parameter extraction with table detection and line-by-line processing"""
+def analyze_parameters_by_scan(text):
+    """Multi-parameter extraction with table detection and line-by-line processing.
+
+    This is the original per-parameter scan. analyze_parameters() uses the
+    single-pass ParameterExtractor instead; this version is kept as the
+    reference that test_parameter_extractor.py checks it against.
+    """
     results = []
     
     if not text:
@@ -2060,47 +2131,69 @@ def analyze_parameters(text):
     logger.info(f"Final extraction: {len(unique_results)} unique parameters")
     return unique_results
 
-@app.route('/api/analyze-report', methods=['POST'])
-def analyze_medical_report():
-    """Enhanced multi-parameter medical report analyzer with AI"""
+_parameter_extractor = ParameterExtractor(
+    MEDICAL_PARAMETERS, classify_value_status, parse_reference_range, get_health_recommendations
+)
+
+def analyze_parameters(text):
+    """Multi-parameter extraction: table rows first, then matching lines, then values near a parameter name.
+
+    Scans the text once for all parameters (see parameter_extractor.py).
+    """
+    return _parameter_extractor.extract(text)
+
+REPORT_ALLOWED_EXT = {'.pdf', '.jpg', '.jpeg', '.png'}
+
+def run_report_analysis(filename, file_bytes, progress=None):
+    """Run the report analysis pipeline on an uploaded file.
+
+    Returns (payload, status_code). progress, if given, is called as
+    progress(stage, percent) as the pipeline moves through its stages.
+    """
+    def report(stage, percent):
+        if progress:
+            progress(stage, percent)
+
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file uploaded'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        ext = os.path.splitext(file.filename)[1].lower()
-        file_bytes = file.read()
+        ext = os.path.splitext(filename)[1].lower()
         text = None
         
         # Stage 1: Document Processing - Extract full text
-        logger.info(f"Processing {ext} file: {file.filename}")
+        logger.info(f"Processing {ext} file: {filename}")
+        report('extracting_text', 10)
+        scan = None
         if ext == '.pdf':
-            text = extract_text_from_pdf(file_bytes)
+            # Pages are scanned for parameters as they are read
+            scan = _parameter_extractor.scan()
+            text = cached_result('pdf_text', file_bytes, lambda: extract_text_from_pdf(file_bytes, on_page=scan.feed))
         elif ext in ['.jpg', '.jpeg', '.png']:
-            text = extract_text_from_image(file_bytes)
+            # Short reads are not cached so a retry gets a fresh OCR attempt
+            text = cached_result('ocr_text', file_bytes, lambda: extract_text_from_image(file_bytes),
+                                 should_cache=lambda t: len(t.strip()) >= 10)
         else:
-            return jsonify({'error': 'Unsupported format. Upload PDF, JPG, or PNG.'}), 400
+            return {'error': 'Unsupported format. Upload PDF, JPG, or PNG.'}, 400
         
         if not text or len(text.strip()) < 10:
-            return jsonify({
+            return {
                 'error': 'Could not extract readable text from image.',
                 'suggestion': 'Please ensure: 1) Image is clear and high resolution, 2) Text is not too small, 3) Good lighting/contrast, 4) Try uploading a PDF instead if available.',
                 'debug_info': f'Extracted only {len(text) if text else 0} characters. OCR may have failed due to poor image quality.'
-            }), 400
+            }, 400
         
         logger.info(f"Extracted {len(text)} characters from document")
         
         # Stage 2: Multi-parameter extraction (AI + Regex)
-        parameters = analyze_parameters(text)
+        report('analyzing_parameters', 40)
+        if scan is not None and scan.pieces:
+            parameters = cached_result('report_parameters', text, lambda: scan.finish(text))
+        else:
+            parameters = cached_result('report_parameters', text, lambda: analyze_parameters(text))
         
         if not parameters:
             # Log extracted text for debugging
             logger.warning(f"No parameters found. Text preview: {text[:500]}")
             
-            return jsonify({
+            return {
                 'success': True,
                 'parameters': [],
                 'total_found': 0,
@@ -2119,7 +2212,7 @@ def analyze_medical_report():
                     'text_preview': text[:200] if len(text) > 200 else text
                 },
                 'disclaimer': 'AI-generated analysis for preliminary screening only. Not a substitute for professional medical consultation.'
-            })
+            }, 200
         
         logger.info(f"Detected {len(parameters)} parameters")
         
@@ -2132,9 +2225,11 @@ def analyze_medical_report():
         }
         
         # Stage 4: AI Clinical Summary Generation
+        report('generating_summary', 60)
         clinical_summary = generate_clinical_summary(abnormal_params)
         
         # Stage 5: Intelligent Model Routing
+        report('building_recommendations', 90)
         suggested_models = suggest_diagnostic_model(parameters)
         
         # Stage 6: Generate comprehensive recommendations
@@ -2179,7 +2274,7 @@ def analyze_medical_report():
             'general_recommendations': general_recommendations,
             'suggested_models': suggested_models,
             'ai_analysis': {
-                'model_used': 'Flan-T5-Large + Biomedical-NER' if _summarizer_pipeline and _ner_pipeline else 'Rule-based analysis',
+                'model_used': 'Flan-T5-Large + Biomedical-NER' if model_registry.is_loaded('summarizer') and model_registry.is_loaded('ner') else 'Rule-based analysis',
                 'confidence': 'High' if len(parameters) >= 5 else 'Medium',
                 'parameters_analyzed': len(parameters),
                 'abnormalities_found': len(abnormal_params)
@@ -2193,15 +2288,121 @@ def analyze_medical_report():
         }
         
         logger.info(f"Analysis complete: {len(parameters)} params, {len(abnormal_params)} abnormal")
-        return jsonify(response)
+        return response, 200
         
     except Exception as e:
         logger.error(f"Report analysis error: {str(e)}", exc_info=True)
-        return jsonify({
+        return {
             'error': 'Failed to analyze report',
             'details': str(e),
             'suggestion': 'Try again with different file or contact support.'
-        }), 500
+        }, 500
+
+def _read_report_upload():
+    """Validate the uploaded report. Returns (filename, file_bytes, error_response)."""
+    if 'file' not in request.files:
+        return None, None, (jsonify({'error': 'No file uploaded'}), 400)
+    
+    file = request.files['file']
+    if file.filename == '':
+        return None, None, (jsonify({'error': 'No file selected'}), 400)
+    
+    ext = os.path.splitext(file.filename)[1].lower()
+    if ext not in REPORT_ALLOWED_EXT:
+        return None, None, (jsonify({'error': 'Unsupported format. Upload PDF, JPG, or PNG.'}), 400)
+    
+    return file.filename, file.read(), None
+
+@app.route('/api/analyze-report', methods=['POST'])
+def analyze_medical_report():
+    """Enhanced multi-parameter medical report analyzer with AI.
+
+    Pass ?async=true to queue the analysis as a background job instead (see /api/analyze-report/jobs).
+    """
+    if request.args.get('async', 'false').lower() == 'true':
+        return submit_report_job()
+
+    filename, file_bytes, error = _read_report_upload()
+    if error:
+        return error
+    
+    payload, status_code = run_report_analysis(filename, file_bytes)
+    return jsonify(payload), status_code
+
+
+# Report analysis can take tens of seconds (OCR + flan-t5), so it can also run as a
+# background job. Job state and results are kept in SQLite under REPORT_JOB_DIR and
+# survive a worker restart; interrupted jobs are requeued when the next process starts.
+report_jobs = ReportJobQueue(run_report_analysis, **report_job_settings())
+
+def _job_response(job):
+    body = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'filename': job['filename'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+    if job['status'] in FINISHED_STATES:
+        body['status_code'] = job['status_code']
+        body['result'] = job['result']
+        body['error'] = job['error']
+    return body
+
+@app.route('/api/analyze-report/jobs', methods=['POST'])
+def submit_report_job():
+    """Queue a report for analysis and return a job id straight away"""
+    filename, file_bytes, error = _read_report_upload()
+    if error:
+        return error
+    
+    try:
+        job_id = report_jobs.submit(filename, file_bytes)
+    except QueueFullError as e:
+        logger.warning(f"Report job rejected: {str(e)}")
+        return jsonify({'error': 'Too many reports are being analyzed. Please try again shortly.'}), 429
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/analyze-report/jobs/{job_id}',
+        'events_url': f'/api/analyze-report/jobs/{job_id}/events'
+    }), 202
+
+@app.route('/api/analyze-report/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """Poll a report job. Finished jobs include the same result /api/analyze-report returns"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_response(job))
+
+@app.route('/api/analyze-report/jobs/<job_id>/events', methods=['GET'])
+def stream_report_job(job_id):
+    """Server-sent events with the job's progress; the last event carries the result"""
+    if report_jobs.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        last = None
+        while True:
+            job = report_jobs.get(job_id)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Job not found"}\n\n'
+                return
+            state = (job['status'], job['stage'], job['progress'])
+            if state != last:
+                last = state
+                event = 'result' if job['status'] in FINISHED_STATES else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(_job_response(job))}\n\n"
+            if job['status'] in FINISHED_STATES:
+                return
+            time.sleep(0.5)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/doctors', methods=['GET'])
 def get_doctors():
@@ -2453,6 +2654,8 @@ def cardiovascular_analysis():
                     return jsonify({'error': 'Invalid image format. Use JPG or PNG'}), 400
                 
                 image_bytes = image_file.read()
+                # Imported here so torch/SigLIP are only loaded when multimodal analysis is used
+                from cardiovascular_multimodal import predict_cardiovascular, generate_report as generate_cardio_report
                 result = predict_cardiovascular(image_bytes, numeric_data)
                 formatted_report = generate_cardio_report(result, numeric_data)
                 result['formatted_report'] = formatted_report
@@ -2461,7 +2664,7 @@ def cardiovascular_analysis():
                 from flask import session
                 if 'user_id' in session:
                     try:
-                        pred = Prediction(
+                        prediction_writer.save(
                             user_id=session['user_id'],
                             disease_type='cardiovascular_multimodal',
                             prediction_result=result['risk_level'],
@@ -2469,8 +2672,6 @@ def cardiovascular_analysis():
                             risk_level=result['risk_level'],
                             input_data=numeric_data
                         )
-                        db.session.add(pred)
-                        db.session.commit()
                     except Exception as e:
                         logger.error(f"Failed to save prediction: {str(e)}")
                         db.session.rollback()
@@ -2480,6 +2681,7 @@ def cardiovascular_analysis():
                 logger.warning(f"Multimodal analysis failed: {str(e)}, falling back to numeric-only")
         
         # Numeric-only analysis
+        heart_model, _ = get_tabular_model('heart')
         if heart_model is None:
             return jsonify({'error': 'Heart disease model not available'}), 503
         
@@ -2515,7 +2717,7 @@ def cardiovascular_analysis():
         from flask import session
         if 'user_id' in session:
             try:
-                pred = Prediction(
+                prediction_writer.save(
                     user_id=session['user_id'],
                     disease_type='cardiovascular',
                     prediction_result=result['risk_level'],
@@ -2523,8 +2725,6 @@ def cardiovascular_analysis():
                     risk_level=result['risk_level'],
                     input_data=numeric_data
                 )
-                db.session.add(pred)
-                db.session.commit()
             except Exception as e:
                 logger.error(f"Failed to save prediction: {str(e)}")
                 db.session.rollback()
@@ -2535,54 +2735,39 @@ def cardiovascular_analysis():
         logger.error(f"Cardiovascular analysis error: {str(e)}", exc_info=True)
         return jsonify({'error': 'Analysis failed', 'details': str(e)}), 500
 
-@app.route('/api/symptom-checker', methods=['POST'])
-def symptom_checker():
-    from flask import session
+def _past_symptom_assessments(user_id):
+    """The user's last 5 symptom checks, for comparing with the present symptoms"""
+    past_assessments = []
+    if user_id is None:
+        return past_assessments
     try:
-        data = request.get_json()
-        symptoms = data.get('symptoms', '').strip()
-        duration = data.get('duration', '')
-        severity = data.get('severity', '')
-
-        if len(symptoms) < 10:
-            return jsonify({'error': 'Please provide more detailed symptoms (at least 10 characters)'}), 400
-
-        # Fetch past assessments if user is logged in
-        past_assessments = []
-        if 'user_id' in session:
-            try:
-                past_preds = Prediction.query.filter_by(
-                    user_id=session['user_id'],
-                    disease_type='symptom_check'
-                ).order_by(Prediction.created_at.desc()).limit(5).all()
-                
-                for pred in past_preds:
-                    past_assessments.append({
-                        'date': pred.created_at.strftime('%Y-%m-%d'),
-                        'symptoms': pred.input_data.get('symptoms', ''),
-                        'condition': pred.prediction_result,
-                        'risk': pred.risk_level,
-                        'severity': pred.input_data.get('severity', '')
-                    })
-            except Exception as e:
-                logger.warning(f"Could not fetch past assessments: {str(e)}")
-
-        # Use Groq API for symptom analysis
-        GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-        
-        if not GROQ_API_KEY or not GROQ_AVAILABLE:
-            return jsonify({'error': 'AI service temporarily unavailable'}), 503
-        
-        client = Groq(api_key=GROQ_API_KEY)
-        
-        # Enhanced prompt with past history comparison
-        past_context = ""
-        if past_assessments:
-            past_context = "\n\nPAST ASSESSMENT HISTORY:\n"
-            for i, past in enumerate(past_assessments[:3], 1):
-                past_context += f"{i}. {past['date']}: {past['symptoms'][:100]} → {past['condition']} ({past['risk']} risk)\n"
-        
-        prompt = f"""You are a medical AI assistant. Analyze present symptoms and compare with past history.
+        past_preds = Prediction.query.filter_by(
+            user_id=user_id,
+            disease_type='symptom_check'
+        ).order_by(Prediction.created_at.desc()).limit(5).all()
+        
+        for pred in past_preds:
+            past_assessments.append({
+                'date': pred.created_at.strftime('%Y-%m-%d'),
+                'symptoms': pred.input_data.get('symptoms', ''),
+                'condition': pred.prediction_result,
+                'risk': pred.risk_level,
+                'severity': pred.input_data.get('severity', '')
+            })
+    except Exception as e:
+        logger.warning(f"Could not fetch past assessments: {str(e)}")
+    return past_assessments
+
+def _symptom_checker_request(symptoms, duration, severity, past_assessments):
+    """chat.completions kwargs for a symptom analysis"""
+    # Enhanced prompt with past history comparison
+    past_context = ""
+    if past_assessments:
+        past_context = "\n\nPAST ASSESSMENT HISTORY:\n"
+        for i, past in enumerate(past_assessments[:3], 1):
+            past_context += f"{i}. {past['date']}: {past['symptoms'][:100]} → {past['condition']} ({past['risk']} risk)\n"
+    
+    prompt = f"""You are a medical AI assistant. Analyze present symptoms and compare with past history.
 
 PRESENT SYMPTOMS:
 Symptoms: {symptoms}
@@ -2612,79 +2797,181 @@ Respond ONLY with valid JSON:
 
 Diseases: Heart Disease, Diabetes, Liver Disease, Kidney Disease, Pneumonia, Asthma, Influenza, Migraine, Hypertension, Gastritis.
 Risk: High (>70%), Moderate (50-70%), Low (<50%)."""
-        
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=800,
-            timeout=15.0
+    
+    return {
+        'model': "llama-3.1-8b-instant",
+        'messages': [{"role": "user", "content": prompt}],
+        'temperature': 0.3,
+        'max_tokens': 800,
+        'timeout': 15.0
+    }
+
+def _symptom_checker_result(response_text, past_assessments):
+    """(response, parsed LLM result) from the LLM's answer, or (None, None) if it has no predictions"""
+    json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+    if not json_match:
+        return None, None
+    result = json.loads(json_match.group(0))
+    predictions = result.get('predictions', [])
+    if not predictions:
+        return None, None
+
+    response = {
+        'symptom_comparison': result.get('symptom_comparison', {
+            'overlap_percentage': 0,
+            'relation_status': 'Not Related',
+            'comparison_summary': 'No past history available'
+        }),
+        'top_prediction': predictions[0],
+        'other_conditions': predictions[1:3] if len(predictions) > 1 else [],
+        'severity_change': result.get('severity_change', 'New Condition'),
+        'recommended_steps': result.get('recommended_steps', [
+            'Consult healthcare provider',
+            'Monitor symptoms closely'
+        ]),
+        'has_past_history': len(past_assessments) > 0
+    }
+    return response, result
+
+def _save_symptom_check(user_id, symptoms, duration, severity, result):
+    """Store a symptom analysis as a Prediction for doctor review"""
+    predictions = result['predictions']
+    try:
+        prediction_writer.save(
+            user_id=user_id,
+            disease_type=predictions[0]['disease'],
+            prediction_result=predictions[0]['risk'],
+            probability=predictions[0]['confidence'] / 100,
+            risk_level=predictions[0]['risk'],
+            input_data={
+                'symptoms': symptoms,
+                'duration': duration,
+                'severity': severity
+            },
+            original_prediction={
+                'symptom_comparison': result.get('symptom_comparison', {}),
+                'severity_change': result.get('severity_change', 'New Condition'),
+                'chief_complaint': symptoms,
+                'top_prediction': {
+                    'disease': predictions[0]['disease'],
+                    'risk': predictions[0]['risk'],
+                    'confidence': predictions[0]['confidence'],
+                    'next_step': 'Schedule a clinical consultation and share this report with your doctor for confirmation.',
+                    'explanation': predictions[0].get('explanation', '')
+                },
+                'other_conditions': predictions[1:3] if len(predictions) > 1 else [],
+                'recommended_steps': result.get('recommended_steps', [])
+            },
+            status='pending_review'
         )
+    except Exception as e:
+        logger.error(f"Failed to save symptom check: {str(e)}")
+        db.session.rollback()
+
+def _is_llm_outage(e):
+    """Timed out, or skipped by the circuit breaker/concurrency limit: worth the rule-based fallback"""
+    return isinstance(e, LLMUnavailable) or 'timeout' in str(e).lower() or 'timed out' in str(e).lower()
+
+def _symptom_checker_fallback(symptoms, past_assessments):
+    """Rule-based analysis for when the AI service is unavailable"""
+    symptoms_lower = symptoms.lower()
+    
+    # Simple keyword matching for common conditions
+    fallback_prediction = None
+    if any(word in symptoms_lower for word in ['fever', 'cold', 'cough', 'flu']):
+        fallback_prediction = {
+            'disease': 'Influenza',
+            'confidence': 70.0,
+            'risk': 'Moderate',
+            'explanation': 'Based on reported symptoms of cold, cough, and fever'
+        }
+    elif any(word in symptoms_lower for word in ['chest pain', 'heart', 'breathless']):
+        fallback_prediction = {
+            'disease': 'Heart Disease',
+            'confidence': 65.0,
+            'risk': 'High',
+            'explanation': 'Cardiovascular symptoms detected - immediate consultation recommended'
+        }
+    elif any(word in symptoms_lower for word in ['sugar', 'thirst', 'urination', 'diabetes']):
+        fallback_prediction = {
+            'disease': 'Diabetes',
+            'confidence': 68.0,
+            'risk': 'Moderate',
+            'explanation': 'Symptoms suggest blood sugar irregularities'
+        }
+    else:
+        fallback_prediction = {
+            'disease': 'General Health Concern',
+            'confidence': 50.0,
+            'risk': 'Low',
+            'explanation': 'Symptoms require professional medical evaluation'
+        }
+    
+    # Check for past history
+    has_history = len(past_assessments) > 0
+    comparison = {
+        'overlap_percentage': 0,
+        'relation_status': 'Not Related',
+        'comparison_summary': 'AI service temporarily unavailable - comparison not performed'
+    }
+    
+    if has_history:
+        # Simple overlap check
+        past_symptoms = ' '.join([p['symptoms'].lower() for p in past_assessments[:2]])
+        common_words = set(symptoms_lower.split()) & set(past_symptoms.split())
+        overlap = min(len(common_words) * 20, 80)
+        
+        comparison = {
+            'overlap_percentage': overlap,
+            'relation_status': 'Related' if overlap > 50 else 'Not Related',
+            'comparison_summary': f'Detected {overlap}% symptom overlap with past assessments. AI analysis unavailable due to network timeout.'
+        }
+    
+    return {
+        'symptom_comparison': comparison,
+        'top_prediction': fallback_prediction,
+        'other_conditions': [],
+        'severity_change': 'Unable to determine',
+        'recommended_steps': [
+            'Consult healthcare provider for accurate diagnosis',
+            'Monitor symptoms and seek immediate care if worsening',
+            'Keep a symptom diary for your doctor'
+        ],
+        'has_past_history': has_history,
+        'fallback_mode': True,
+        'message': 'AI service temporarily unavailable. Basic analysis provided.'
+    }
+
+@app.route('/api/symptom-checker', methods=['POST'])
+def symptom_checker():
+    from flask import session
+    try:
+        data = request.get_json()
+        symptoms = data.get('symptoms', '').strip()
+        duration = data.get('duration', '')
+        severity = data.get('severity', '')
+
+        if len(symptoms) < 10:
+            return jsonify({'error': 'Please provide more detailed symptoms (at least 10 characters)'}), 400
+
+        # Fetch past assessments if user is logged in
+        past_assessments = _past_symptom_assessments(session.get('user_id'))
+
+        # Use Groq API for symptom analysis
+        if not llm.available:
+            return jsonify({'error': 'AI service temporarily unavailable'}), 503
+        
+        completion = llm.chat('symptom_checker', **_symptom_checker_request(symptoms, duration, severity, past_assessments))
         
         response_text = completion.choices[0].message.content.strip()
         
         # Parse JSON response
-        import json
-        import re
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group(0))
-            predictions = result.get('predictions', [])
-            
-            if predictions:
-                response = {
-                    'symptom_comparison': result.get('symptom_comparison', {
-                        'overlap_percentage': 0,
-                        'relation_status': 'Not Related',
-                        'comparison_summary': 'No past history available'
-                    }),
-                    'top_prediction': predictions[0],
-                    'other_conditions': predictions[1:3] if len(predictions) > 1 else [],
-                    'severity_change': result.get('severity_change', 'New Condition'),
-                    'recommended_steps': result.get('recommended_steps', [
-                        'Consult healthcare provider',
-                        'Monitor symptoms closely'
-                    ]),
-                    'has_past_history': len(past_assessments) > 0
-                }
-                
-                # Save to database if user is logged in
-                if 'user_id' in session:
-                    try:
-                        pred = Prediction(
-                            user_id=session['user_id'],
-                            disease_type=predictions[0]['disease'],
-                            prediction_result=predictions[0]['risk'],
-                            probability=predictions[0]['confidence'] / 100,
-                            risk_level=predictions[0]['risk'],
-                            input_data={
-                                'symptoms': symptoms,
-                                'duration': duration,
-                                'severity': severity
-                            },
-                            original_prediction={
-                                'symptom_comparison': result.get('symptom_comparison', {}),
-                                'severity_change': result.get('severity_change', 'New Condition'),
-                                'chief_complaint': symptoms,
-                                'top_prediction': {
-                                    'disease': predictions[0]['disease'],
-                                    'risk': predictions[0]['risk'],
-                                    'confidence': predictions[0]['confidence'],
-                                    'next_step': 'Schedule a clinical consultation and share this report with your doctor for confirmation.',
-                                    'explanation': predictions[0].get('explanation', '')
-                                },
-                                'other_conditions': predictions[1:3] if len(predictions) > 1 else [],
-                                'recommended_steps': result.get('recommended_steps', [])
-                            },
-                            status='pending_review'
-                        )
-                        db.session.add(pred)
-                        db.session.commit()
-                    except Exception as e:
-                        logger.error(f"Failed to save symptom check: {str(e)}")
-                        db.session.rollback()
-                
-                return jsonify(response)
+        response, result = _symptom_checker_result(response_text, past_assessments)
+        if response is not None:
+            # Save to database if user is logged in
+            if 'user_id' in session:
+                _save_symptom_check(session['user_id'], symptoms, duration, severity, result)
+            return jsonify(response)
         
         return jsonify({'error': 'Unable to analyze symptoms'}), 500
 
@@ -2692,78 +2979,79 @@ Risk: High (>70%), Moderate (50-70%), Low (<50%)."""
         logger.error(f"Symptom checker error: {str(e)}", exc_info=True)
         
         # Fallback response when API fails
-        if 'timeout' in str(e).lower() or 'timed out' in str(e).lower():
+        if _is_llm_outage(e):
             # Provide rule-based analysis as fallback
-            symptoms_lower = symptoms.lower()
-            
-            # Simple keyword matching for common conditions
-            fallback_prediction = None
-            if any(word in symptoms_lower for word in ['fever', 'cold', 'cough', 'flu']):
-                fallback_prediction = {
-                    'disease': 'Influenza',
-                    'confidence': 70.0,
-                    'risk': 'Moderate',
-                    'explanation': 'Based on reported symptoms of cold, cough, and fever'
-                }
-            elif any(word in symptoms_lower for word in ['chest pain', 'heart', 'breathless']):
-                fallback_prediction = {
-                    'disease': 'Heart Disease',
-                    'confidence': 65.0,
-                    'risk': 'High',
-                    'explanation': 'Cardiovascular symptoms detected - immediate consultation recommended'
-                }
-            elif any(word in symptoms_lower for word in ['sugar', 'thirst', 'urination', 'diabetes']):
-                fallback_prediction = {
-                    'disease': 'Diabetes',
-                    'confidence': 68.0,
-                    'risk': 'Moderate',
-                    'explanation': 'Symptoms suggest blood sugar irregularities'
-                }
-            else:
-                fallback_prediction = {
-                    'disease': 'General Health Concern',
-                    'confidence': 50.0,
-                    'risk': 'Low',
-                    'explanation': 'Symptoms require professional medical evaluation'
-                }
-            
-            # Check for past history
-            has_history = len(past_assessments) > 0
-            comparison = {
-                'overlap_percentage': 0,
-                'relation_status': 'Not Related',
-                'comparison_summary': 'AI service temporarily unavailable - comparison not performed'
-            }
-            
-            if has_history:
-                # Simple overlap check
-                past_symptoms = ' '.join([p['symptoms'].lower() for p in past_assessments[:2]])
-                common_words = set(symptoms_lower.split()) & set(past_symptoms.split())
-                overlap = min(len(common_words) * 20, 80)
-                
-                comparison = {
-                    'overlap_percentage': overlap,
-                    'relation_status': 'Related' if overlap > 50 else 'Not Related',
-                    'comparison_summary': f'Detected {overlap}% symptom overlap with past assessments. AI analysis unavailable due to network timeout.'
-                }
-            
-            return jsonify({
-                'symptom_comparison': comparison,
-                'top_prediction': fallback_prediction,
-                'other_conditions': [],
-                'severity_change': 'Unable to determine',
-                'recommended_steps': [
-                    'Consult healthcare provider for accurate diagnosis',
-                    'Monitor symptoms and seek immediate care if worsening',
-                    'Keep a symptom diary for your doctor'
-                ],
-                'has_past_history': has_history,
-                'fallback_mode': True,
-                'message': 'AI service temporarily unavailable. Basic analysis provided.'
-            })
+            return jsonify(_symptom_checker_fallback(symptoms, past_assessments))
         
         return jsonify({'error': 'Failed to analyze symptoms', 'details': str(e)}), 500
 
+def _symptom_partial(path, value, partial):
+    """Map a completed field of the streamed LLM JSON onto the response shape; returns the changed fields"""
+    if path[0] == 'predictions' and len(path) == 2 and isinstance(value, dict) and 'disease' in value:
+        if path[1] == 0:
+            return {'top_prediction': value}
+        if path[1] <= 2:
+            partial.setdefault('other_conditions', []).append(value)
+            return {'other_conditions': list(partial['other_conditions'])}
+    elif path[0] == 'recommended_steps' and len(path) == 2 and isinstance(value, str):
+        partial.setdefault('recommended_steps', []).append(value)
+        return {'recommended_steps': list(partial['recommended_steps'])}
+    elif path in (('symptom_comparison',), ('severity_change',)):
+        return {path[0]: value}
+    return None
+
+@app.route('/api/symptom-checker/stream', methods=['POST'])
+def symptom_checker_stream():
+    """Server-sent events: 'partial' events with each result field as soon as the LLM has written it,
+    then 'result' with the same body /api/symptom-checker returns (or 'error')"""
+    from flask import session
+    data = request.get_json(silent=True) or {}
+    symptoms = data.get('symptoms', '').strip()
+    duration = data.get('duration', '')
+    severity = data.get('severity', '')
+
+    if len(symptoms) < 10:
+        return jsonify({'error': 'Please provide more detailed symptoms (at least 10 characters)'}), 400
+
+    user_id = session.get('user_id')
+    past_assessments = _past_symptom_assessments(user_id)
+
+    if not llm.available:
+        return jsonify({'error': 'AI service temporarily unavailable'}), 503
+
+    def events():
+        yield sse_event('partial', {'has_past_history': len(past_assessments) > 0})
+        parser = JSONStreamParser()
+        partial = {}
+        parts = []
+        try:
+            for token in llm.stream('symptom_checker', **_symptom_checker_request(symptoms, duration, severity,
+                                                                                  past_assessments)):
+                parts.append(token)
+                for path, value in parser.feed(token):
+                    changed = _symptom_partial(path, value, partial)
+                    if changed:
+                        yield sse_event('partial', changed)
+
+            response, result = _symptom_checker_result(''.join(parts).strip(), past_assessments)
+        except Exception as e:
+            logger.error(f"Symptom checker stream error: {str(e)}", exc_info=True)
+            if _is_llm_outage(e):
+                yield sse_event('result', _symptom_checker_fallback(symptoms, past_assessments))
+            else:
+                yield sse_event('error', {'error': 'Failed to analyze symptoms', 'details': str(e)})
+            return
+
+        if response is None:
+            yield sse_event('error', {'error': 'Unable to analyze symptoms'})
+            return
+        if user_id is not None:
+            _save_symptom_check(user_id, symptoms, duration, severity, result)
+        yield sse_event('result', response)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
     from flask import session
@@ -2794,7 +3082,7 @@ def get_notifications():
             unread = len([p for p in recent_preds if p.status != 'pending_review'])
         else:
             # For doctors - show pending reviews
-            pending = Prediction.query.filter_by(status='pending_review').count()
+            pending = pending_review_count()
             notifications = [{
                 'id': 'pending',
                 'type': 'pending_reviews',
@@ -2803,11 +3091,45 @@ def get_notifications():
             }] if pending > 0 else []
             unread = pending
         
-        return jsonify({'notifications': notifications, 'unread_count': unread})
+        # Polled by every open page: answer 304 when nothing changed since the browser's copy
+        etag = list_etag('notifications', user_id, notifications, unread)
+        return not_modified(etag) or with_etag(jsonify({'notifications': notifications, 'unread_count': unread}), etag)
     except Exception as e:
         logger.error(f"Notification error: {str(e)}")
         return jsonify({'notifications': [], 'unread_count': 0}), 200
 
+_background_started = False
+
+def start_background_work():
+    """Start this process's background threads and requeue interrupted report jobs.
+
+    Threads started in the gunicorn master do not survive the fork into the
+    workers, and the master's pooled connections must not be shared with them,
+    so under gunicorn this runs in each worker, from the post_worker_init hook
+    in gunicorn.conf.py. Run any other way (python app.py, flask run), it runs
+    on import.
+    """
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+    if app.config.get('SQLALCHEMY_DATABASE_URI'):
+        with app.app_context():
+            # Connections inherited from a preloading master are left for it to close
+            db.engine.dispose(close=False)
+        if _appointment_sweeper_settings['enabled']:
+            appointment_sweeper.start()
+        if _risk_forecast_settings['enabled']:
+            risk_forecaster.start()
+    if _hospital_refresh_settings['enabled']:
+        hospital_store.start_refresher(_hospital_refresh_settings['interval_seconds'],
+                                       _hospital_refresh_settings['max_tiles'])
+    report_jobs.recover()
+
+# Process pool workers import this module as __mp_main__ (see process_pool.py)
+if os.getenv('BACKGROUND_WORK_ON_IMPORT', 'true').lower() == 'true' and __name__ != '__mp_main__':
+    start_background_work()
+
 if __name__ == '__main__':
     logger.info("Starting Flask application")
     app.run(debug=True)
@@ -1,12 +1,34 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 from models import db, Appointment, Prescription, ChatMessage, User
+from chat_broker import ChatBroker, chat_broker_settings
+from list_cursors import list_etag, not_modified, with_etag, parse_since, cursor_value, page_limit, keyset_page
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date, time
+import os
+import json
 import uuid
 import logging
+import time as clock
 
 logger = logging.getLogger(__name__)
 appointment_bp = Blueprint('appointments', __name__)
 
+chat_broker = ChatBroker(**chat_broker_settings())
+
+# Every open chat stream holds its worker for its whole life, which a server with
+# a few threads per worker (gunicorn gthread) cannot afford for more than a handful
+# of rooms. Streams are only served where CHAT_STREAMS_ENABLED=true: a separate
+# process with async workers (gevent); elsewhere clients poll /messages?after=.
+CHAT_STREAMS_ENABLED = os.getenv('CHAT_STREAMS_ENABLED', 'false').lower() == 'true'
+# An event stream ends after this long and the browser's EventSource reconnects
+# with Last-Event-ID, so idle consultations do not hold a worker forever
+CHAT_STREAM_MAX_SECONDS = float(os.getenv('CHAT_STREAM_MAX_SECONDS', '300'))
+CHAT_HEARTBEAT_SECONDS = 15
+
+APPOINTMENT_PAGE_SIZE = int(os.getenv('APPOINTMENT_PAGE_SIZE', '100'))
+APPOINTMENT_MAX_PAGE_SIZE = 500
+
 @appointment_bp.route('/create', methods=['POST'])
 def create_appointment():
     try:
@@ -53,28 +75,57 @@ def create_appointment():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _appointment_list(owner_column, owner_id, serialize, other_party):
+    """Appointments of one patient or doctor, newest first, a page at a time.
+
+    Pages hold ?limit= appointments (APPOINTMENT_PAGE_SIZE by default); while
+    there are more, 'next_page' is the cursor to pass as ?before= for the next.
+    Responses carry an ETag (304 while nothing changed) and a 'cursor'; with
+    ?since=<cursor> only the appointments changed since then are returned
+    ('incremental': true), for the client to merge by id.
+
+    This is a pure read: past appointments are marked completed by the
+    appointment sweeper, not here. other_party (Appointment.doctor or
+    Appointment.patient) is loaded in the same query, so serialize can use it
+    without a query per appointment.
+    """
+    try:
+        since = parse_since(request.args.get('since'))
+        limit = page_limit(request.args.get('limit'), APPOINTMENT_PAGE_SIZE, APPOINTMENT_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'Invalid since or limit parameter'}), 400
+
+    count, latest = db.session.query(func.count(Appointment.id), func.max(Appointment.updated_at))\
+        .filter(owner_column == owner_id).one()
+    etag = list_etag('appointments', owner_column.key, owner_id, count, latest, sorted(request.args.items()))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    query = Appointment.query.options(joinedload(other_party)).filter(owner_column == owner_id)
+    if since is not None:
+        query = query.filter(Appointment.updated_at >= since)
+    try:
+        appointments, next_page = keyset_page(query, Appointment.created_at, Appointment.id,
+                                              request.args.get('before'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid before cursor'}), 400
+
+    result = [serialize(apt) for apt in appointments]
+    response = jsonify({'appointments': result, 'incremental': since is not None,
+                        'cursor': cursor_value(latest), 'next_page': next_page})
+    return with_etag(response, etag)
+
 @appointment_bp.route('/patient', methods=['GET'])
 def get_patient_appointments():
     try:
         patient_id = session.get('user_id')
         if not patient_id:
             return jsonify({'error': 'Unauthorized'}), 401
-        
-        appointments = Appointment.query.filter_by(patient_id=patient_id).order_by(Appointment.created_at.desc()).all()
-        
-        # Auto-update status for past appointments
-        now = datetime.now()
-        for apt in appointments:
-            if apt.status == 'accepted':
-                apt_datetime = datetime.combine(apt.appointment_date, apt.appointment_time)
-                if apt_datetime < now:
-                    apt.status = 'completed'
-        db.session.commit()
-        
-        result = []
-        for apt in appointments:
-            doctor = User.query.get(apt.doctor_id)
-            result.append({
+
+        def serialize(apt):
+            doctor = apt.doctor
+            return {
                 'id': apt.id,
                 'appointment_id': apt.appointment_id,
                 'doctor_name': doctor.name if doctor else 'Unknown',
@@ -87,9 +138,9 @@ def get_patient_appointments():
                 'is_emergency': apt.is_emergency,
                 'video_room_id': apt.video_room_id,
                 'created_at': apt.created_at.isoformat()
-            })
+            }
         
-        return jsonify({'appointments': result})
+        return _appointment_list(Appointment.patient_id, patient_id, serialize, Appointment.doctor)
         
     except Exception as e:
         logger.error(f"Error fetching patient appointments: {str(e)}")
@@ -101,22 +152,10 @@ def get_doctor_appointments():
         doctor_id = session.get('user_id')
         if not doctor_id:
             return jsonify({'error': 'Unauthorized'}), 401
-        
-        appointments = Appointment.query.filter_by(doctor_id=doctor_id).order_by(Appointment.created_at.desc()).all()
-        
-        # Auto-update status for past appointments
-        now = datetime.now()
-        for apt in appointments:
-            if apt.status == 'accepted':
-                apt_datetime = datetime.combine(apt.appointment_date, apt.appointment_time)
-                if apt_datetime < now:
-                    apt.status = 'completed'
-        db.session.commit()
-        
-        result = []
-        for apt in appointments:
-            patient = User.query.get(apt.patient_id)
-            result.append({
+
+        def serialize(apt):
+            patient = apt.patient
+            return {
                 'id': apt.id,
                 'appointment_id': apt.appointment_id,
                 'patient_name': apt.patient_name,
@@ -129,9 +168,9 @@ def get_doctor_appointments():
                 'is_emergency': apt.is_emergency,
                 'video_room_id': apt.video_room_id,
                 'created_at': apt.created_at.isoformat()
-            })
+            }
         
-        return jsonify({'appointments': result})
+        return _appointment_list(Appointment.doctor_id, doctor_id, serialize, Appointment.patient)
         
     except Exception as e:
         logger.error(f"Error fetching doctor appointments: {str(e)}")
@@ -262,46 +301,131 @@ def get_prescription(appointment_id):
         logger.error(f"Error fetching prescription: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _message_dict(msg, sender_name, sender_role):
+    return {
+        'id': msg.id,
+        'sender_name': sender_name or 'Unknown',
+        'sender_role': sender_role or 'unknown',
+        'message': msg.message,
+        'created_at': msg.created_at.isoformat()
+    }
+
+def _messages_after(appointment_id, after_id=None):
+    """Chat messages of an appointment with id > after_id, oldest first, senders joined in the same query"""
+    query = db.session.query(ChatMessage, User.name, User.role)\
+        .outerjoin(User, User.id == ChatMessage.sender_id)\
+        .filter(ChatMessage.appointment_id == appointment_id)
+    if after_id is not None:
+        query = query.filter(ChatMessage.id > after_id)
+    return [_message_dict(msg, name, role) for msg, name, role in query.order_by(ChatMessage.id).all()]
+
+def _message_cursor(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _check_chat_access(appointment_id, user_id):
+    """Error response if the user may not read or write this appointment's chat, else None"""
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    appointment = Appointment.query.get(appointment_id)
+    if not appointment or (appointment.patient_id != user_id and appointment.doctor_id != user_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+    return None
+
 @appointment_bp.route('/<int:appointment_id>/messages', methods=['GET'])
 def get_messages(appointment_id):
+    """Chat history; with ?after=<message id>, only the newer messages"""
     try:
-        user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        appointment = Appointment.query.get(appointment_id)
-        if not appointment or (appointment.patient_id != user_id and appointment.doctor_id != user_id):
-            return jsonify({'error': 'Unauthorized'}), 403
+        error = _check_chat_access(appointment_id, session.get('user_id'))
+        if error:
+            return error
         
-        messages = ChatMessage.query.filter_by(appointment_id=appointment_id).order_by(ChatMessage.created_at).all()
-        
-        result = []
-        for msg in messages:
-            sender = User.query.get(msg.sender_id)
-            result.append({
-                'id': msg.id,
-                'sender_name': sender.name if sender else 'Unknown',
-                'sender_role': sender.role if sender else 'unknown',
-                'message': msg.message,
-                'created_at': msg.created_at.isoformat()
-            })
-        
-        return jsonify({'messages': result})
+        return jsonify({'messages': _messages_after(appointment_id, _message_cursor(request.args.get('after')))})
         
     except Exception as e:
         logger.error(f"Error fetching messages: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@appointment_bp.route('/<int:appointment_id>/messages/events', methods=['GET'])
+def stream_messages(appointment_id):
+    """Server-sent 'message' events: the history after the client's cursor, then new messages as they are sent.
+
+    Each event's id is the highest message id sent so far, so a reconnecting
+    EventSource resumes from there (Last-Event-ID); ?after=<message id> does
+    the same for a fresh connection. Answers 503 unless CHAT_STREAMS_ENABLED.
+    """
+    if not CHAT_STREAMS_ENABLED:
+        return jsonify({'error': 'Chat streams are not served here; poll /messages?after=<message id>'}), 503
+    try:
+        error = _check_chat_access(appointment_id, session.get('user_id'))
+        if error:
+            return error
+        after_id = _message_cursor(request.headers.get('Last-Event-ID') or request.args.get('after'))
+
+        # Subscribe before reading the backlog, so a message sent in between is not missed
+        subscription = chat_broker.subscribe(appointment_id)
+        try:
+            backlog = _messages_after(appointment_id, after_id)
+        except Exception:
+            subscription.close()
+            raise
+        # Give the connection back to the pool while the stream idles
+        db.session.close()
+    except Exception as e:
+        logger.error(f"Error opening message stream: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    def events():
+        sent = set()
+        last_id = after_id or 0
+        start = clock.monotonic()
+        next_catchup = start + chat_broker.catchup_seconds
+        last_write = start
+        try:
+            yield 'retry: 2000\n\n'
+            pending = backlog
+            while True:
+                for message in pending:
+                    # Pushed messages can arrive out of id order, so skip by id rather than by cursor
+                    if message['id'] in sent or (after_id is not None and message['id'] <= after_id):
+                        continue
+                    sent.add(message['id'])
+                    last_id = max(last_id, message['id'])
+                    last_write = clock.monotonic()
+                    yield f"id: {last_id}\nevent: message\ndata: {json.dumps(message)}\n\n"
+
+                now = clock.monotonic()
+                if now - start >= CHAT_STREAM_MAX_SECONDS:
+                    return
+                if subscription.overflowed or now >= next_catchup:
+                    # Messages sent through other workers (no Redis) or dropped for a slow client
+                    subscription.overflowed = False
+                    pending = _messages_after(appointment_id, last_id)
+                    db.session.close()
+                    next_catchup = now + chat_broker.catchup_seconds
+                    continue
+
+                wait = min(CHAT_HEARTBEAT_SECONDS, next_catchup - now, start + CHAT_STREAM_MAX_SECONDS - now)
+                message = subscription.get(timeout=max(0.05, wait))
+                pending = [message] if message is not None else []
+                if message is None and clock.monotonic() - last_write >= CHAT_HEARTBEAT_SECONDS:
+                    last_write = clock.monotonic()
+                    yield ': keepalive\n\n'
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @appointment_bp.route('/<int:appointment_id>/messages', methods=['POST'])
 def send_message(appointment_id):
     try:
         user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        appointment = Appointment.query.get(appointment_id)
-        if not appointment or (appointment.patient_id != user_id and appointment.doctor_id != user_id):
-            return jsonify({'error': 'Unauthorized'}), 403
+        error = _check_chat_access(appointment_id, user_id)
+        if error:
+            return error
         
         data = request.get_json()
         
@@ -313,8 +437,12 @@ def send_message(appointment_id):
         
         db.session.add(message)
         db.session.commit()
+
+        sender = User.query.get(user_id)
+        payload = _message_dict(message, sender.name if sender else None, sender.role if sender else None)
+        chat_broker.publish(appointment_id, payload)
         
-        return jsonify({'success': True, 'message': 'Message sent'})
+        return jsonify({'success': True, 'message': 'Message sent', 'data': payload})
         
     except Exception as e:
         logger.error(f"Error sending message: {str(e)}")
@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import or_, and_
+
+from models import db, Appointment
+
+logger = logging.getLogger(__name__)
+
+
+def complete_past_appointments(now=None):
+    """Mark accepted appointments whose time has passed as completed, in one UPDATE. Returns the row count."""
+    now = now or datetime.now()
+    count = Appointment.query.filter(
+        Appointment.status == 'accepted',
+        or_(Appointment.appointment_date < now.date(),
+            and_(Appointment.appointment_date == now.date(), Appointment.appointment_time < now.time()))
+    ).update({'status': 'completed', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+class AppointmentSweeper:
+    """Completes past appointments every interval_seconds on a daemon thread.
+
+    Reads of the appointment lists never write; an appointment shows as
+    completed within one interval of its time. Each worker process runs its
+    own sweeper, started after the fork (app.start_background_work); the
+    UPDATE is idempotent, so running it in several is harmless.
+    """
+
+    def __init__(self, app, interval_seconds=60):
+        self.app = app
+        self.interval_seconds = float(interval_seconds)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'completed': 0, 'errors': 0, 'last_run': None}
+
+    def sweep(self):
+        with self.app.app_context():
+            try:
+                count = complete_past_appointments()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._stats['errors'] += 1
+                raise
+            finally:
+                db.session.remove()
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['completed'] += count
+            self._stats['last_run'] = datetime.utcnow().isoformat()
+        if count:
+            logger.info(f"Appointment sweeper completed {count} past appointments")
+        return count
+
+    def start(self):
+        """Sweep once now, then every interval_seconds on a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Appointment sweep failed: {e}", exc_info=True)
+                time.sleep(self.interval_seconds)
+
+        self._thread = threading.Thread(target=loop, name='appointment-sweeper', daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({'interval_seconds': self.interval_seconds, 'running': self._thread is not None})
+        return stats
+
+
+def appointment_sweeper_settings():
+    """Read appointment sweeper settings from the environment."""
+    return {
+        'enabled': os.getenv('APPOINTMENT_SWEEP_ENABLED', 'true').lower() == 'true',
+        'interval_seconds': float(os.getenv('APPOINTMENT_SWEEP_INTERVAL_SECONDS', '60'))
+    }
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CHANNEL_PREFIX = 'chat:appointment:'
+
+
+class Subscription:
+    """Messages published to one appointment's channel, for one listener.
+
+    The queue is bounded; if the listener falls behind, further messages are
+    dropped and overflowed is set, so the listener knows to catch up from
+    the database instead.
+    """
+
+    def __init__(self, broker, channel, max_queue):
+        self.broker = broker
+        self.channel = channel
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def _put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next message, or None if nothing arrived within timeout seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ChatBroker:
+    """Fans out new chat messages to the listeners of an appointment's channel.
+
+    Without redis_url, messages reach only listeners in this process, so with
+    several workers a listener must also catch up from the database now and
+    then (catchup_seconds). With redis_url, publish() goes through Redis
+    pub/sub and one listener thread per process delivers to the local
+    subscribers, so every worker sees every message; if Redis is
+    unreachable, publish() falls back to local delivery.
+    """
+
+    def __init__(self, redis_url=None, max_queue=100, catchup_seconds=None):
+        self.max_queue = max(1, int(max_queue))
+        self._subscribers = {}      # channel -> set of Subscription
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener = None
+        self._stats = {'published': 0, 'delivered': 0, 'overflows': 0, 'redis_errors': 0}
+
+        if redis_url and not REDIS_AVAILABLE:
+            logger.warning("CHAT_PUBSUB_URL is set but the redis package is not installed; "
+                           "chat messages are only pushed within each worker. Run: pip install redis")
+        elif redis_url:
+            self._redis = redis.Redis.from_url(redis_url)
+
+        if catchup_seconds is None:
+            catchup_seconds = 30 if self._redis is not None else 5
+        self.catchup_seconds = float(catchup_seconds)
+
+    @property
+    def backend(self):
+        return 'redis' if self._redis is not None else 'local'
+
+    def _ensure_listener(self):
+        # Started lazily, so a preloading gunicorn master never owns the thread
+        if self._redis is None or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='chat-broker', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                for item in pubsub.listen():
+                    channel = item['channel']
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+                    self._deliver(channel[len(CHANNEL_PREFIX):], json.loads(item['data']))
+            except Exception as e:
+                with self._lock:
+                    self._stats['redis_errors'] += 1
+                logger.error(f"Chat pub/sub listener error, reconnecting: {e}")
+                time.sleep(2.0)
+
+    def subscribe(self, appointment_id):
+        """Start receiving an appointment's new messages. Use as a context manager, or close() it."""
+        self._ensure_listener()
+        subscription = Subscription(self, str(appointment_id), self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, appointment_id, message):
+        """Send a message dict (JSON-serializable, with an 'id') to the appointment's listeners."""
+        channel = str(appointment_id)
+        with self._lock:
+            self._stats['published'] += 1
+        if self._redis is not None:
+            try:
+                self._redis.publish(f'{CHANNEL_PREFIX}{channel}', json.dumps(message))
+                return
+            except Exception as e:
+                with self._lock:
+                    self._stats['redis_errors'] += 1
+                logger.error(f"Chat publish to Redis failed, delivering locally: {e}")
+        self._deliver(channel, message)
+
+    def _deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            was_overflowed = subscription.overflowed
+            subscription._put(message)
+            with self._lock:
+                if subscription.overflowed and not was_overflowed:
+                    self._stats['overflows'] += 1
+                else:
+                    self._stats['delivered'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'backend': self.backend,
+                'channels': len(self._subscribers),
+                'subscribers': sum(len(s) for s in self._subscribers.values()),
+                'catchup_seconds': self.catchup_seconds
+            })
+        return stats
+
+
+def chat_broker_settings():
+    """Read chat push channel settings from the environment."""
+    catchup = os.getenv('CHAT_CATCHUP_SECONDS')
+    return {
+        'redis_url': os.getenv('CHAT_PUBSUB_URL') or None,
+        'max_queue': int(os.getenv('CHAT_SUBSCRIBER_QUEUE', '100')),
+        'catchup_seconds': float(catchup) if catchup else None
+    }
@@ -1,11 +1,24 @@
 from flask import Blueprint, request, jsonify, session
 from models import User, Prediction, Consultation, MedicalNote, DoctorAvailability, Appointment
 from config import db
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, defer
+from list_cursors import page_limit, keyset_page
+from prediction_writer import PredictionWriter, prediction_writer_settings
 from datetime import datetime
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 data_bp = Blueprint('data', __name__)
+prediction_writer = PredictionWriter(**prediction_writer_settings())
+
+PREDICTION_PAGE_SIZE = int(os.getenv('PREDICTION_PAGE_SIZE', '50'))
+PREDICTION_MAX_PAGE_SIZE = 500
+PREDICTION_FIELDS = ('id', 'disease_type', 'prediction_result', 'probability', 'risk_level', 'created_at',
+                     'status', 'doctor_remarks', 'reviewed_by', 'reviewed_at', 'approval_action')
+# Fields left out of the prediction history unless requested with ?fields=
+PREDICTION_OPTIONAL_FIELDS = ('input_data', 'modified_prediction')
 
 def require_auth(f):
     def wrapper(*args, **kwargs):
@@ -25,7 +38,7 @@ def save_prediction():
         data = request.get_json()
         user_id = session.get('user_id')
         
-        prediction = Prediction(
+        prediction_id = prediction_writer.save(
             user_id=user_id,
             disease_type=data['disease_type'],
             prediction_result=data['prediction_result'],
@@ -34,40 +47,91 @@ def save_prediction():
             input_data=data.get('input_data')
         )
         
-        db.session.add(prediction)
-        db.session.commit()
-        
-        return jsonify({'message': 'Prediction saved', 'id': prediction.id}), 201
+        return jsonify({'message': 'Prediction saved', 'id': prediction_id}), 201
         
     except Exception as e:
         db.session.rollback()
         logger.error(f"Save prediction error: {str(e)}", exc_info=True)
         return jsonify({'message': 'Prediction not saved'}), 200
 
+def _prediction_totals(user_id):
+    """The user's prediction count, overall and per review status, in one grouped query"""
+    by_status = {}
+    for status, count in db.session.query(Prediction.status, func.count(Prediction.id))\
+            .filter(Prediction.user_id == user_id).group_by(Prediction.status):
+        status = status or 'pending_review'
+        by_status[status] = by_status.get(status, 0) + count
+    return {'total': sum(by_status.values()), 'by_status': by_status}
+
+def _prediction_fields(p):
+    return {
+        'id': str(p.id),
+        'disease_type': p.disease_type,
+        'prediction_result': p.prediction_result,
+        'probability': p.probability,
+        'risk_level': p.risk_level,
+        'created_at': p.created_at.isoformat(),
+        'status': getattr(p, 'status', 'pending_review'),
+        'doctor_remarks': getattr(p, 'doctor_remarks', None),
+        'reviewed_by': getattr(p, 'reviewed_by', None),
+        'reviewed_at': p.reviewed_at.isoformat() if hasattr(p, 'reviewed_at') and p.reviewed_at else None,
+        'approval_action': getattr(p, 'approval_action', None)
+    }
+
 @data_bp.route('/predictions', methods=['GET'])
 @require_auth
 def get_predictions():
+    """The user's predictions, newest first, a page at a time.
+
+    ?limit= sets the page size (PREDICTION_PAGE_SIZE by default); while there
+    are more, 'next_page' is the cursor to pass as ?before= for the next page.
+    The large JSON fields are only included when named in ?fields= (any of
+    input_data, modified_prediction). ?format=columnar returns one array per
+    field under 'columns' instead of one object per prediction, for charts.
+    The first page also carries 'totals' for the whole history (count and
+    count per status), since a page alone cannot give them.
+    """
     try:
         user_id = session.get('user_id')
-        predictions = Prediction.query.filter_by(user_id=user_id).order_by(Prediction.created_at.desc()).all()
-        
-        return jsonify({
-            'predictions': [{
-                'id': str(p.id),
-                'disease_type': p.disease_type,
-                'prediction_result': p.prediction_result,
-                'probability': p.probability,
-                'risk_level': p.risk_level,
-                'input_data': p.input_data,
-                'created_at': p.created_at.isoformat(),
-                'status': getattr(p, 'status', 'pending_review'),
-                'doctor_remarks': getattr(p, 'doctor_remarks', None),
-                'reviewed_by': getattr(p, 'reviewed_by', None),
-                'reviewed_at': p.reviewed_at.isoformat() if hasattr(p, 'reviewed_at') and p.reviewed_at else None,
-                'approval_action': getattr(p, 'approval_action', None),
-                'modified_prediction': getattr(p, 'modified_prediction', None)
-            } for p in predictions]
-        }), 200
+        try:
+            limit = page_limit(request.args.get('limit'), PREDICTION_PAGE_SIZE, PREDICTION_MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+        fields = [f for f in request.args.get('fields', '').split(',') if f]
+        unknown = [f for f in fields if f not in PREDICTION_OPTIONAL_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        columnar = request.args.get('format') == 'columnar'
+
+        # Large JSON columns are only read from the database when asked for
+        deferred = [defer(getattr(Prediction, f)) for f in PREDICTION_OPTIONAL_FIELDS + ('original_prediction',)
+                    if f not in fields]
+        query = Prediction.query.options(*deferred).filter_by(user_id=user_id)
+        try:
+            predictions, next_page = keyset_page(query, Prediction.created_at, Prediction.id,
+                                                 request.args.get('before'), limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid before cursor'}), 400
+
+        rows = []
+        for p in predictions:
+            row = _prediction_fields(p)
+            for f in fields:
+                row[f] = getattr(p, f)
+            rows.append(row)
+
+        if columnar:
+            names = list(PREDICTION_FIELDS) + fields
+            body = {
+                'columns': {name: [row[name] for row in rows] for name in names},
+                'count': len(rows),
+                'next_page': next_page
+            }
+        else:
+            body = {'predictions': rows, 'next_page': next_page}
+        if not request.args.get('before'):
+            body['totals'] = _prediction_totals(user_id)
+        return jsonify(body), 200
         
     except Exception as e:
         logger.error(f"Get predictions error: {str(e)}", exc_info=True)
@@ -104,10 +168,11 @@ def get_consultations():
         user_id = session.get('user_id')
         user = User.query.get(user_id)
         
+        query = Consultation.query.options(joinedload(Consultation.patient), joinedload(Consultation.doctor))
         if user.role == 'patient':
-            consultations = Consultation.query.filter_by(patient_id=user_id).order_by(Consultation.created_at.desc()).all()
+            consultations = query.filter_by(patient_id=user_id).order_by(Consultation.created_at.desc()).all()
         else:
-            consultations = Consultation.query.filter_by(doctor_id=user_id).order_by(Consultation.created_at.desc()).all()
+            consultations = query.filter_by(doctor_id=user_id).order_by(Consultation.created_at.desc()).all()
         
         return jsonify({
             'consultations': [{
@@ -218,11 +283,11 @@ def get_patient_summary(appointment_id):
 @data_bp.route('/registered-doctors', methods=['GET'])
 def get_registered_doctors():
     try:
-        doctors = User.query.filter_by(role='doctor').all()
+        doctors = User.query.options(joinedload(User.availability)).filter_by(role='doctor').all()
         
         result = []
         for doctor in doctors:
-            availability = DoctorAvailability.query.filter_by(doctor_id=doctor.id).first()
+            availability = doctor.availability
             
             result.append({
                 'id': doctor.id,
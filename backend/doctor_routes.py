@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify, session
 from flask_cors import cross_origin
 from models import db, User, Appointment, Prescription, PatientRecord, TreatmentHistory, Prediction
+from risk_summary import user_summaries
+from risk_forecast import user_forecasts, forecast_dict
+from list_cursors import list_etag, not_modified, with_etag, parse_since, cursor_value
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 import logging
 
@@ -136,7 +141,18 @@ def get_patient_analytics(patient_id):
             'total_predictions': len(predictions),
             'risk_distribution': {},
             'disease_history': [],
-            'recent_tests': []
+            'recent_tests': [],
+            # Latest and previous risk per disease over the whole history
+            'risk_summary': [{
+                'disease': s.disease,
+                'latest_risk': s.latest_risk,
+                'previous_risk': s.previous_risk,
+                'risk_level': s.latest_risk_level,
+                'trend': s.trend,
+                'count': s.count,
+                'latest_at': s.latest_at.isoformat() if s.latest_at else None
+            } for s in user_summaries(patient_id)],
+            'forecasts': {disease: forecast_dict(f) for disease, f in user_forecasts(patient_id).items()}
         }
         
         for pred in predictions:
@@ -204,9 +220,19 @@ def add_treatment_history(patient_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+PENDING_APPROVALS_LIMIT = 20
+
 @doctor_bp.route('/pending-approvals', methods=['GET'])
 def get_pending_approvals():
-    """Get all predictions pending doctor approval"""
+    """Get all predictions pending doctor approval.
+
+    Responses carry an ETag (304 while nothing changed) and a 'cursor'; with
+    ?since=<cursor> only the predictions changed since then are returned
+    ('incremental': true), for the client to merge by id. Either way the
+    list is the newest PENDING_APPROVALS_LIMIT predictions: a client that
+    merges and then keeps the newest PENDING_APPROVALS_LIMIT by created_at
+    holds the same list as a full reload.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
@@ -215,11 +241,32 @@ def get_pending_approvals():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        predictions = Prediction.query.order_by(Prediction.created_at.desc()).limit(20).all()
+        try:
+            since = parse_since(request.args.get('since'))
+        except ValueError:
+            return jsonify({'error': 'Invalid since timestamp'}), 400
+
+        # Any insert, update or delete changes the count or the latest updated_at
+        count, latest = db.session.query(func.count(Prediction.id), func.max(Prediction.updated_at)).one()
+        etag = list_etag('pending-approvals', count, latest, request.args.get('since'))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        # The changes are looked for within the newest predictions only, so
+        # since never reaches rows the full list would not show
+        newest = db.session.query(Prediction.id)\
+            .order_by(Prediction.created_at.desc(), Prediction.id.desc())\
+            .limit(PENDING_APPROVALS_LIMIT).subquery()
+        query = Prediction.query.options(joinedload(Prediction.user)).join(newest, Prediction.id == newest.c.id)
+        incremental = since is not None
+        if incremental:
+            query = query.filter(Prediction.updated_at >= since)
+        predictions = query.order_by(Prediction.created_at.desc(), Prediction.id.desc()).all()
         result = []
         for p in predictions:
             try:
-                patient = User.query.get(p.user_id)
+                patient = p.user
                 result.append({
                     'id': p.id,
                     'patient_id': p.user_id,
@@ -229,6 +276,7 @@ def get_pending_approvals():
                     'probability': p.probability,
                     'input_data': p.input_data or {},
                     'created_at': p.created_at.isoformat() if p.created_at else None,
+                    'updated_at': p.updated_at.isoformat() if p.updated_at else None,
                     'status': getattr(p, 'status', 'pending_review'),
                     'doctor_remarks': getattr(p, 'doctor_remarks', None),
                     'reviewed_by': getattr(p, 'reviewed_by', None),
@@ -237,7 +285,8 @@ def get_pending_approvals():
             except Exception as e:
                 logger.error(f"Error processing prediction {p.id}: {str(e)}")
                 continue
-        return jsonify({'predictions': result})
+        response = jsonify({'predictions': result, 'incremental': incremental, 'cursor': cursor_value(latest)})
+        return with_etag(response, etag)
     except Exception as e:
         logger.error(f"Error fetching pending approvals: {str(e)}", exc_info=True)
         return jsonify({'predictions': []})
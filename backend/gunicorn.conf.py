@@ -0,0 +1,64 @@
+"""
+Gunicorn configuration for the backend.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With GUNICORN_PRELOAD=true (the default) the app is imported once in the master
+process and the models in GUNICORN_PRELOAD_MODELS are loaded there before the
+workers are forked. Workers then share those pages copy-on-write instead of each
+loading its own copy. Combined with MODEL_MMAP=true and compiled models
+(python model_compiler.py), the tabular model arrays are also shared through
+the page cache across restarts and non-forked processes.
+
+Nothing that starts threads or holds connections runs in the master: each worker
+resets the database pool it inherited and starts its own background threads
+(app.start_background_work) once it has booted.
+"""
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+# gthread for the API. The consultation chat streams are served by a second
+# instance with GUNICORN_WORKER_CLASS=gevent (see the README).
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Models to load in the master before forking. GPU-backed models (EasyOCR) should
+# not be listed here: CUDA state does not survive fork.
+preload_models = os.getenv('GUNICORN_PRELOAD_MODELS', 'diabetes,liver,kidney,heart')
+
+os.environ.setdefault('MODEL_MMAP', 'true')
+
+# Background threads and job recovery start in each worker (post_worker_init),
+# not in the master where a preloaded app would otherwise start them
+os.environ['BACKGROUND_WORK_ON_IMPORT'] = 'false'
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from app import model_registry
+    from model_registry import parse_warmup_list
+
+    names = parse_warmup_list(preload_models)
+    if names == []:
+        return
+    server.log.info(f"Preloading models in master: {preload_models}")
+    model_registry.warmup(names)
+    for name, info in model_registry.status().items():
+        if info['state'] != 'not_loaded':
+            server.log.info(f"  {name}: {info['state']} ({info['load_time_ms']} ms)")
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not touch (and un-share) these pages.
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # The app is imported by now, in the master (preload) or in this worker
+    from app import start_background_work
+    start_background_work()
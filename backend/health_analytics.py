@@ -1,12 +1,18 @@
-from flask import Blueprint, jsonify, session
-from models import Prediction, HealthData
+from flask import Blueprint, request, jsonify, session
+from models import Prediction, HealthData, DISEASE_CATEGORIES
+from risk_summary import user_summaries, trend_for
+from risk_forecast import user_forecasts, forecast_dict
 from config import db
+from sqlalchemy import func
+from sqlalchemy.orm import load_only
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 analytics_bp = Blueprint('analytics', __name__)
 
+TREND_BUCKETS = ('day', 'week', 'month')
+
 def require_auth(f):
     def wrapper(*args, **kwargs):
         if 'user_id' not in session:
@@ -15,44 +21,73 @@ def require_auth(f):
     wrapper.__name__ = f.__name__
     return wrapper
 
+def _bucket_start(bucket):
+    """SQL expression for the first day of the day/week/month a prediction falls in"""
+    if db.engine.dialect.name == 'sqlite':
+        if bucket == 'week':
+            # The Monday on or before the date, as date_trunc('week') gives on PostgreSQL
+            return func.date(Prediction.created_at, 'weekday 0', '-6 days')
+        if bucket == 'month':
+            return func.date(Prediction.created_at, 'start of month')
+        return func.date(Prediction.created_at)
+    return func.date_trunc(bucket, Prediction.created_at)
+
+def _bucketed_trends(user_id, bucket):
+    """Per disease, one point per bucket with the count and min/avg/max risk, computed in SQL"""
+    start = _bucket_start(bucket).label('bucket')
+    rows = db.session.query(
+        Prediction.disease_category, start, func.count(Prediction.id),
+        func.min(Prediction.probability), func.avg(Prediction.probability), func.max(Prediction.probability)
+    ).filter(
+        Prediction.user_id == user_id,
+        Prediction.disease_category.isnot(None)
+    ).group_by(Prediction.disease_category, start).order_by(start).all()
+
+    trends = {category: [] for category, _ in DISEASE_CATEGORIES}
+    for category, bucket_start, count, min_p, avg_p, max_p in rows:
+        trends[category].append({
+            'date': str(bucket_start)[:10],
+            'risk': round((avg_p or 0) * 100, 2),
+            'min_risk': round((min_p or 0) * 100, 2),
+            'max_risk': round((max_p or 0) * 100, 2),
+            'count': count
+        })
+    return trends
+
 @analytics_bp.route('/health-trends', methods=['GET'])
 @require_auth
 def get_health_trends():
+    """Risk over time per disease.
+
+    With ?bucket=day|week|month, one point per period with the count and the
+    min/avg/max risk ('risk' is the average), aggregated in the database.
+    Without it, one point per prediction.
+    """
     try:
         user_id = session.get('user_id')
-        logger.info(f"Fetching health trends for user_id: {user_id}")
-        
-        predictions = Prediction.query.filter_by(user_id=user_id).order_by(Prediction.created_at.asc()).all()
-        logger.info(f"Found {len(predictions)} predictions for user {user_id}")
-        
-        trends = {
-            'diabetes': [],
-            'heart': [],
-            'liver': [],
-            'kidney': [],
-            'bone': []
-        }
+        bucket = request.args.get('bucket')
+        if bucket:
+            if bucket not in TREND_BUCKETS:
+                return jsonify({'error': f"bucket must be one of: {', '.join(TREND_BUCKETS)}"}), 400
+            return jsonify({'trends': _bucketed_trends(user_id, bucket), 'bucket': bucket}), 200
+
+        # Only the charted columns; input_data and the review fields are not needed here
+        predictions = Prediction.query.options(
+            load_only(Prediction.disease_category, Prediction.probability, Prediction.risk_level, Prediction.created_at)
+        ).filter(
+            Prediction.user_id == user_id,
+            Prediction.disease_category.isnot(None)
+        ).order_by(Prediction.created_at.asc()).all()
         
+        trends = {category: [] for category, _ in DISEASE_CATEGORIES}
         for pred in predictions:
-            disease = pred.disease_type.lower()
-            data_point = {
+            trends[pred.disease_category].append({
                 'date': pred.created_at.strftime('%Y-%m-%d'),
                 'risk': pred.probability * 100 if pred.probability else 0,
                 'risk_level': pred.risk_level
-            }
-            
-            if 'diabetes' in disease:
-                trends['diabetes'].append(data_point)
-            elif 'heart' in disease or 'cardio' in disease:
-                trends['heart'].append(data_point)
-            elif 'liver' in disease:
-                trends['liver'].append(data_point)
-            elif 'kidney' in disease:
-                trends['kidney'].append(data_point)
-            elif 'bone' in disease or 'fracture' in disease:
-                trends['bone'].append(data_point)
+            })
         
-        logger.info(f"Trends data: {trends}")
+        logger.debug(f"Health trends for user {user_id}: {len(predictions)} points")
         return jsonify({'trends': trends}), 200
         
     except Exception as e:
@@ -66,43 +101,38 @@ def get_risk_forecast():
         user_id = session.get('user_id')
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
-        recent_predictions = Prediction.query.filter(
-            Prediction.user_id == user_id,
-            Prediction.created_at >= thirty_days_ago
-        ).order_by(Prediction.created_at.desc()).all()
-        
         forecasts = []
-        
-        disease_groups = {}
-        for pred in recent_predictions:
-            disease = pred.disease_type
-            if disease not in disease_groups:
-                disease_groups[disease] = []
-            disease_groups[disease].append(pred)
-        
-        for disease, preds in disease_groups.items():
-            if len(preds) >= 2:
-                latest = preds[0]
-                previous = preds[-1]
-                
-                latest_risk = latest.probability * 100 if latest.probability else 0
-                prev_risk = previous.probability * 100 if previous.probability else 0
-                
-                change = latest_risk - prev_risk
-                change_pct = (change / prev_risk * 100) if prev_risk > 0 else 0
-                
-                trend = 'increasing' if change > 5 else ('decreasing' if change < -5 else 'stable')
-                
-                forecast = {
-                    'disease': disease,
-                    'current_risk': round(latest_risk, 2),
-                    'previous_risk': round(prev_risk, 2),
-                    'change': round(change, 2),
-                    'change_percentage': round(change_pct, 2),
-                    'trend': trend,
-                    'warning': generate_warning(disease, trend, latest_risk, change_pct)
-                }
-                forecasts.append(forecast)
+        trajectories = user_forecasts(user_id)
+        window_start = _window_start_risks(user_id, thirty_days_ago)
+        
+        # The change over the last 30 days: the latest risk (from the maintained summaries)
+        # against the oldest prediction in the window, for diseases predicted at least twice
+        # in it. The trajectory over the whole history comes from the forecast batch job.
+        for summary in user_summaries(user_id):
+            if summary.disease not in window_start:
+                continue
+            latest_risk = summary.latest_risk
+            prev_risk = window_start[summary.disease]
+            
+            change = latest_risk - prev_risk
+            change_pct = (change / prev_risk * 100) if prev_risk > 0 else 0
+            
+            # A forecast computed before the latest prediction is shown, but its trend is not used
+            trajectory = trajectories.get(summary.disease)
+            current = trajectory is not None and trajectory.latest_at == summary.latest_at
+            trend = trajectory.trend if current else trend_for(change)
+            
+            forecast = {
+                'disease': summary.disease,
+                'current_risk': round(latest_risk, 2),
+                'previous_risk': round(prev_risk, 2),
+                'change': round(change, 2),
+                'change_percentage': round(change_pct, 2),
+                'trend': trend,
+                'warning': generate_warning(summary.disease, trend, latest_risk, change_pct),
+                'trajectory': dict(forecast_dict(trajectory), up_to_date=current) if trajectory else None
+            }
+            forecasts.append(forecast)
         
         return jsonify({'forecasts': forecasts}), 200
         
@@ -110,6 +140,16 @@ def get_risk_forecast():
         logger.error(f"Get risk forecast error: {str(e)}", exc_info=True)
         return jsonify({'error': 'Failed to fetch risk forecast'}), 500
 
+def _window_start_risks(user_id, since):
+    """Risk of the oldest prediction since the given time, per disease predicted at least twice since then"""
+    first = db.session.query(Prediction.disease_type, func.min(Prediction.created_at).label('first_at'))\
+        .filter(Prediction.user_id == user_id, Prediction.created_at >= since)\
+        .group_by(Prediction.disease_type).having(func.count(Prediction.id) >= 2).subquery()
+    rows = db.session.query(Prediction.disease_type, Prediction.probability)\
+        .join(first, (Prediction.disease_type == first.c.disease_type) & (Prediction.created_at == first.c.first_at))\
+        .filter(Prediction.user_id == user_id).all()
+    return {disease: probability * 100 if probability else 0 for disease, probability in rows}
+
 def generate_warning(disease, trend, current_risk, change_pct):
     if trend == 'increasing' and current_risk > 60:
         return f"Your {disease} risk has increased by {abs(change_pct):.1f}% in the last 30 days. Consider consulting a specialist."
@@ -126,29 +166,27 @@ def get_ai_copilot_insights():
     try:
         user_id = session.get('user_id')
         
-        latest_predictions = Prediction.query.filter_by(user_id=user_id).order_by(
-            Prediction.created_at.desc()
-        ).limit(5).all()
+        latest_summaries = user_summaries(user_id)[:5]
         
         health_data = HealthData.query.filter_by(user_id=user_id).first()
         
         insights = []
         
-        for pred in latest_predictions:
-            risk = pred.probability * 100 if pred.probability else 0
+        for summary in latest_summaries:
+            risk = summary.latest_risk or 0
             
             if risk > 70:
                 insights.append({
                     'type': 'critical',
-                    'disease': pred.disease_type,
-                    'message': f"High {pred.disease_type} risk detected ({risk:.1f}%). Immediate medical consultation recommended.",
+                    'disease': summary.disease,
+                    'message': f"High {summary.disease} risk detected ({risk:.1f}%). Immediate medical consultation recommended.",
                     'action': 'Schedule appointment with specialist'
                 })
             elif risk > 50:
                 insights.append({
                     'type': 'warning',
-                    'disease': pred.disease_type,
-                    'message': f"Moderate {pred.disease_type} risk ({risk:.1f}%). Lifestyle modifications advised.",
+                    'disease': summary.disease,
+                    'message': f"Moderate {summary.disease} risk ({risk:.1f}%). Lifestyle modifications advised.",
                     'action': 'Review diet and exercise routine'
                 })
         
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from result_cache import ResultCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hospital_store', 'enrichment')
+CACHE_NAMESPACE = 'hospital_enrichment'
+
+# What a hospital gets when its analysis is not ready (or failed): the same
+# defaults analyze_hospital_with_groq falls back to
+DEFAULT_ANALYSIS = (['General Medicine', 'Emergency'], 3.5, 'Basic healthcare services available')
+
+
+class HospitalEnricher:
+    """Adds LLM-derived specialties, rating and reason to hospital dicts, with caching.
+
+    analyze(hospital) returns (specialties, rating, reason), or None
+    if the analysis failed. Successful results are cached by the hospital's
+    OSM id and name in a ResultCache, which is shared by all workers and
+    expires them after its TTL. Cache misses are analyzed concurrently in a
+    thread pool.
+
+    enrich() waits at most deadline_seconds in total. Hospitals whose analysis
+    is not done by then get DEFAULT_ANALYSIS; their analyses keep running and
+    are cached when they finish, so the next lookup has them.
+    """
+
+    def __init__(self, analyze, cache=None, version='1', max_workers=8, deadline_seconds=4.0):
+        self.analyze = analyze
+        self.cache = cache if cache is not None else ResultCache(DEFAULT_CACHE_DIR, disk=True)
+        self.version = version
+        self.max_workers = max(1, int(max_workers))
+        self.deadline_seconds = float(deadline_seconds)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hospital-enrich')
+        self._lock = threading.Lock()
+        self._inflight = {}    # cache key -> future, so concurrent lookups share one analysis
+        self._stats = {'lookups': 0, 'cached': 0, 'analyzed': 0, 'failed': 0, 'timed_out': 0}
+
+    def _key(self, hospital):
+        ident = hospital.get('osm_id') or f"{hospital.get('latitude')},{hospital.get('longitude')}"
+        return cache_key(f"{ident}\0{hospital.get('name', '')}", self.version)
+
+    def _analyze(self, key, hospital):
+        try:
+            result = self.analyze(hospital)
+        except Exception as e:
+            logger.error(f"Error analyzing hospital {hospital.get('name')}: {e}")
+            result = None
+        if result:
+            specialties, rating, reason = result
+            self.cache.put(CACHE_NAMESPACE, key, {'specialties': specialties, 'rating': rating, 'reason': reason})
+        # Only once it is cached, or a lookup arriving in between would start the analysis again
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._stats['analyzed' if result else 'failed'] += 1
+        return result
+
+    def enrich(self, hospitals):
+        """Set 'specialties', 'rating' and 'recommendation_reason' on each hospital dict. Returns the list."""
+        start = time.monotonic()
+        pending = {}
+        for hospital in hospitals:
+            key = self._key(hospital)
+            cached = self.cache.get(CACHE_NAMESPACE, key)
+            if cached is not None:
+                self._apply(hospital, (cached['specialties'], cached['rating'], cached['reason']))
+                continue
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = self._executor.submit(self._analyze, key, hospital)
+            pending[id(hospital)] = (hospital, future)
+
+        if pending:
+            wait([future for _, future in pending.values()], timeout=self.deadline_seconds)
+        timed_out = 0
+        for hospital, future in pending.values():
+            if future.done():
+                result = future.result()
+            else:
+                result = None
+                timed_out += 1
+            self._apply(hospital, result or DEFAULT_ANALYSIS)
+
+        with self._lock:
+            self._stats['lookups'] += len(hospitals)
+            self._stats['cached'] += len(hospitals) - len(pending)
+            self._stats['timed_out'] += timed_out
+        if pending:
+            logger.info(f"Enriched {len(hospitals)} hospitals ({len(hospitals) - len(pending)} cached, "
+                        f"{timed_out} past the deadline) in {(time.monotonic() - start) * 1000:.0f} ms")
+        return hospitals
+
+    def _apply(self, hospital, analysis):
+        specialties, rating, reason = analysis
+        hospital['specialties'] = list(specialties)
+        hospital['rating'] = rating
+        hospital['recommendation_reason'] = reason
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, in_flight=len(self._inflight))
+        stats['cache_hit_ratio'] = round(stats['cached'] / stats['lookups'], 4) if stats['lookups'] else 0
+        stats.update(max_workers=self.max_workers, deadline_seconds=self.deadline_seconds)
+        return stats
+
+
+def hospital_enrichment_settings():
+    """Read hospital enrichment settings from the environment."""
+    return {
+        'max_workers': int(os.getenv('HOSPITAL_ENRICH_WORKERS', '8')),
+        'deadline_seconds': float(os.getenv('HOSPITAL_ENRICH_DEADLINE_SECONDS', '4'))
+    }
+
+
+def hospital_enrichment_cache_settings():
+    """Settings for the enrichment cache's ResultCache.
+
+    It holds public facts about hospitals, not patient data, so it is kept on
+    disk for all workers to share.
+    """
+    return {
+        'cache_dir': os.getenv('HOSPITAL_ENRICH_CACHE_DIR', DEFAULT_CACHE_DIR),
+        'disk': True,
+        'ttl_seconds': float(os.getenv('HOSPITAL_ENRICH_TTL_HOURS', '720')) * 3600,
+        'enabled': os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    }
@@ -0,0 +1,141 @@
+import os
+import json
+import uuid
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+FINISHED_STATES = (READY, FAILED)
+
+INLINE = 'inline'
+DEFERRED = 'deferred'
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hospital_store', 'recommendations.sqlite3')
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS hospital_recommendations (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        result TEXT,
+        error TEXT
+    )
+    ''',
+)
+
+
+class HospitalRecommendations:
+    """Computes hospital recommendations in the background, behind a token.
+
+    A prediction endpoint calls submit() with the lookup to run and returns
+    the token right away; the lookup (store query plus Groq enrichment) runs
+    in a thread pool, and its result is written to SQLite so any worker can
+    serve it. Lookups are not retried: a token still pending after
+    max_seconds (e.g. its worker died) is reported as failed.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_workers=4, max_seconds=120, ttl_hours=1):
+        self.db_path = db_path
+        self.max_workers = max(1, int(max_workers))
+        self.max_seconds = float(max_seconds)
+        self.ttl_seconds = float(ttl_hours) * 3600
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+        self._db = SQLiteStore(db_path, SCHEMA)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='hospital-recommend')
+        return self._executor
+
+    def submit(self, lookup, *args):
+        """Run lookup(*args) in the background and return a token for its result (a list of hospitals)."""
+        self.cleanup_expired()
+        token = uuid.uuid4().hex
+        now = time.time()
+        self._db.execute(
+            'INSERT INTO hospital_recommendations (id, status, created_at, updated_at) VALUES (?, ?, ?, ?)',
+            (token, PENDING, now, now)
+        )
+        self._pool().submit(self._run, token, lookup, args)
+        return token
+
+    def _run(self, token, lookup, args):
+        start = time.perf_counter()
+        try:
+            hospitals = lookup(*args)
+            status, result, error = READY, json.dumps(hospitals), None
+        except Exception as e:
+            logger.error(f"Hospital recommendation {token} failed: {str(e)}", exc_info=True)
+            status, result, error = FAILED, None, 'Unable to fetch nearby hospitals'
+        self._db.execute(
+            'UPDATE hospital_recommendations SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?',
+            (status, result, error, time.time(), token)
+        )
+        logger.info(f"Hospital recommendation {token} {status} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def get(self, token):
+        """Return {'token', 'status', 'hospitals', 'error'}, or None if the token is unknown or expired."""
+        row = self._db.query_one('SELECT * FROM hospital_recommendations WHERE id = ?', (token,))
+        if row is None:
+            return None
+        status, error = row['status'], row['error']
+        if status == PENDING and time.time() - row['created_at'] > self.max_seconds:
+            status, error = FAILED, 'Hospital lookup timed out'
+        return {
+            'token': row['id'],
+            'status': status,
+            'hospitals': json.loads(row['result']) if row['result'] else None,
+            'error': error
+        }
+
+    def cleanup_expired(self):
+        """Delete recommendations older than the TTL. Runs at most once a minute."""
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return 0
+        self._last_cleanup = now
+        return self._db.execute('DELETE FROM hospital_recommendations WHERE created_at < ?',
+                                (now - self.ttl_seconds,))
+
+    def stats(self):
+        counts = self._db.count_by('hospital_recommendations', 'status')
+        return {
+            'max_workers': self.max_workers,
+            'recommendations': {state: counts.get(state, 0) for state in (PENDING, READY, FAILED)}
+        }
+
+
+def hospital_recommendation_settings():
+    """Read background hospital recommendation settings from the environment."""
+    return {
+        'db_path': os.getenv('HOSPITAL_RECOMMENDATION_DB', DEFAULT_DB_PATH),
+        'max_workers': int(os.getenv('HOSPITAL_RECOMMENDATION_WORKERS', '4')),
+        'max_seconds': float(os.getenv('HOSPITAL_RECOMMENDATION_MAX_SECONDS', '120')),
+        'ttl_hours': float(os.getenv('HOSPITAL_RECOMMENDATION_TTL_HOURS', '1'))
+    }
+
+
+def hospital_recommendation_mode():
+    """Default for prediction endpoints: 'inline' (hospitals in the response) or 'deferred' (a token)."""
+    mode = os.getenv('HOSPITAL_RECOMMENDATIONS', INLINE).lower()
+    if mode not in (INLINE, DEFERRED):
+        logger.warning(f"Unknown HOSPITAL_RECOMMENDATIONS '{mode}', using '{INLINE}'")
+        mode = INLINE
+    return mode
@@ -0,0 +1,477 @@
+import os
+import sys
+import json
+import math
+import time
+import logging
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development servers only
+    fcntl = None
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hospital_store', 'hospitals.json')
+OVERPASS_URL = 'https://overpass-api.de/api/interpreter'
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+INDEX_CELL_DEG = 0.25
+STORE_FORMAT = 1
+
+# Only the tags the hospital lookups read are kept in the store
+KEPT_TAGS = ('name', 'operator', 'phone', 'website', 'emergency', 'addr:full', 'addr:housenumber',
+             'addr:street', 'addr:city', 'addr:state', 'addr:postcode', 'addr:country')
+
+
+def tile_of(lat, lon, tile_deg):
+    """Key of the tile_deg x tile_deg tile containing a point, as 'row,col'."""
+    return f'{math.floor(lat / tile_deg)},{math.floor(lon / tile_deg)}'
+
+
+def tile_bbox(key, tile_deg):
+    """(south, west, north, east) of a tile key."""
+    row, col = (int(part) for part in key.split(','))
+    return row * tile_deg, col * tile_deg, (row + 1) * tile_deg, (col + 1) * tile_deg
+
+
+def _cells_around(lat, lon, radius_km, cell_deg):
+    """Keys 'row,col' of all cell_deg cells that intersect the box around a circle."""
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    dlon = 180 if cos_lat < 1e-6 else min(180, radius_km / (KM_PER_DEGREE * cos_lat))
+    rows = range(math.floor(max(lat - dlat, -90) / cell_deg), math.floor(min(lat + dlat, 90) / cell_deg) + 1)
+    n_cols = round(360 / cell_deg)
+    first = math.floor((lon - dlon) / cell_deg)
+    last = math.floor((lon + dlon) / cell_deg)
+    cols = set()
+    for col in range(first, min(last, first + n_cols - 1) + 1):
+        # Wrap across the antimeridian into the [-180, 180) columns
+        cols.add((col + n_cols // 2) % n_cols - n_cols // 2)
+    return [f'{row},{col}' for row in rows for col in sorted(cols)]
+
+
+def element_record(element):
+    """Store record for an Overpass element, or None if it has no coordinates."""
+    if element.get('type') == 'node' and 'lat' in element:
+        lat, lon = element['lat'], element['lon']
+    elif 'center' in element:
+        lat, lon = element['center']['lat'], element['center']['lon']
+    else:
+        return None
+    tags = element.get('tags', {})
+    return {
+        'id': f"{element['type']}/{element['id']}",
+        'lat': float(lat),
+        'lon': float(lon),
+        'tags': {k: tags[k] for k in KEPT_TAGS if k in tags}
+    }
+
+
+def overpass_fetch(bboxes, url=OVERPASS_URL, timeout=30):
+    """Fetch hospitals in one or more (south, west, north, east) boxes with a single Overpass query."""
+    clauses = []
+    for south, west, north, east in bboxes:
+        box = f'({south},{west},{north},{east})'
+        clauses.extend(f'  {kind}["amenity"="hospital"]{box};' for kind in ('node', 'way', 'relation'))
+    query = f'[out:json][timeout:{int(timeout)}];\n(\n' + '\n'.join(clauses) + '\n);\nout center tags;'
+    response = requests.post(url, data=query, headers={'Content-Type': 'text/plain'}, timeout=timeout)
+    response.raise_for_status()
+    return response.json().get('elements', [])
+
+
+class _Index:
+    """Immutable grid index over a snapshot of the store's records.
+
+    Points are bucketed into INDEX_CELL_DEG cells. A radius query gathers the
+    cells around the circle and computes haversine distances for those points
+    only, in one vectorized step.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.lat = np.radians(np.array([r['lat'] for r in records], dtype=np.float64))
+        self.lon = np.radians(np.array([r['lon'] for r in records], dtype=np.float64))
+        cells = {}
+        for i, r in enumerate(records):
+            cells.setdefault(tile_of(r['lat'], r['lon'], INDEX_CELL_DEG), []).append(i)
+        self.cells = {key: np.array(idx, dtype=np.intp) for key, idx in cells.items()}
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """[(distance_km, record)] within radius_km of a point, nearest first."""
+        found = [self.cells[key] for key in _cells_around(lat, lon, radius_km, INDEX_CELL_DEG) if key in self.cells]
+        if not found:
+            return []
+        idx = np.concatenate(found) if len(found) > 1 else found[0]
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        a = (np.sin((self.lat[idx] - lat1) / 2) ** 2
+             + math.cos(lat1) * np.cos(self.lat[idx]) * np.sin((self.lon[idx] - lon1) / 2) ** 2)
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+        if limit is not None and len(dist) > limit:
+            top = np.argpartition(dist, limit)[:limit]
+            idx, dist = idx[top], dist[top]
+        order = np.argsort(dist, kind='stable')
+        return [(float(dist[i]), self.records[idx[i]]) for i in order]
+
+
+class HospitalStore:
+    """Local copy of OpenStreetMap hospitals with a spatial index, filled tile by tile.
+
+    The world is split into tile_deg x tile_deg tiles. A tile is either known
+    (its hospitals were fetched from Overpass, or loaded from a seed file, at
+    some time) or not. Queries are answered from memory when every tile
+    around the point is known. Otherwise the missing tiles are fetched in one
+    live Overpass query and added to the store, so later queries nearby are
+    local. Tiles older than ttl_seconds are still served, and are refreshed
+    by the background refresher.
+
+    The store is a JSON file shared by all workers. A save merges the file's
+    tiles into memory and writes the result back under a lock file, so the
+    workers' fetches add up instead of overwriting each other; for each tile
+    the most recently fetched copy wins. Each worker merges the file in again
+    when another one has changed it.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, tile_deg=1.0, ttl_seconds=7 * 24 * 3600, fetch=overpass_fetch,
+                 live_fetch=True, retry_seconds=300, reload_check_seconds=30):
+        self.path = path
+        self.tile_deg = float(tile_deg)
+        self.ttl_seconds = float(ttl_seconds)
+        self.fetch = fetch
+        self.live_fetch = live_fetch
+        self.retry_seconds = float(retry_seconds)
+        self.reload_check_seconds = float(reload_check_seconds)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._tile_locks = {}  # tile key -> lock held while the tile is fetched
+        self._tiles = {}       # tile key -> fetched_at
+        self._records = {}     # element id -> record (with its 'tile')
+        self._failed = {}      # tile key -> time of the last failed fetch
+        self._index = _Index([])
+        self._mtime = None
+        self._checked_at = 0.0
+        self._refresher = None
+        self._stats = {'queries': 0, 'local': 0, 'live_fetches': 0, 'fetched_tiles': 0, 'fetch_errors': 0,
+                       'refreshed_tiles': 0}
+        self._load()
+
+    # -- queries --
+
+    def nearby(self, lat, lon, radius_km=60, limit=None):
+        """[(distance_km, record)] of hospitals within radius_km, nearest first.
+
+        Returns None when part of the area is unknown and could not be
+        fetched, so callers can fall back to their own behavior.
+        """
+        self._reload_if_changed()
+        missing = self._missing_tiles(lat, lon, radius_km)
+        with self._lock:
+            self._stats['queries'] += 1
+            if not missing:
+                self._stats['local'] += 1
+        if missing and not self._fill(missing):
+            return None
+        return self._index.within(lat, lon, radius_km, limit)
+
+    def nearest(self, lat, lon, k=10, radius_km=60):
+        """The k nearest hospitals within radius_km, as [(distance_km, record)]."""
+        return self.nearby(lat, lon, radius_km, limit=k)
+
+    def _missing_tiles(self, lat, lon, radius_km):
+        return [key for key in _cells_around(lat, lon, radius_km, self.tile_deg) if key not in self._tiles]
+
+    def _fill(self, missing):
+        """Fetch missing tiles live. Returns True if all of them are known afterwards."""
+        if not self.live_fetch:
+            return False
+        # Concurrent misses on the same tiles share one fetch; misses elsewhere go ahead
+        with self._locked_tiles(missing):
+            now = time.time()
+            with self._lock:
+                missing = [key for key in missing if key not in self._tiles]
+                if not missing:
+                    return True
+                if any(now - self._failed.get(key, 0) < self.retry_seconds for key in missing):
+                    return False
+            return self._fetch_tiles(missing, live=True)
+
+    def _locked_tiles(self, keys):
+        """Context manager holding the fetch locks of the given tiles.
+
+        They are taken in key order, so two fetches of overlapping areas
+        cannot deadlock.
+        """
+        with self._lock:
+            locks = [self._tile_locks.setdefault(key, threading.Lock()) for key in sorted(set(keys))]
+        stack = ExitStack()
+        for lock in locks:
+            stack.enter_context(lock)
+        return stack
+
+    def _fetch_tiles(self, keys, live=False):
+        start = time.perf_counter()
+        try:
+            elements = self.fetch([tile_bbox(key, self.tile_deg) for key in keys])
+        except Exception as e:
+            logger.warning(f"Overpass fetch for {len(keys)} tile(s) failed: {e}")
+            with self._lock:
+                self._stats['fetch_errors'] += 1
+                for key in keys:
+                    self._failed[key] = time.time()
+            return False
+
+        self.add_elements(elements, keys)
+        with self._lock:
+            if live:
+                self._stats['live_fetches'] += 1
+            else:
+                self._stats['refreshed_tiles'] += len(keys)
+            self._stats['fetched_tiles'] += len(keys)
+        logger.info(f"Fetched {len(elements)} hospitals for {len(keys)} tile(s) in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+
+    # -- updates --
+
+    def add_elements(self, elements, tile_keys, fetched_at=None, save=True):
+        """Replace the contents of tile_keys with the given Overpass elements.
+
+        Elements are assigned to the tile containing their point; those that
+        fall outside tile_keys (e.g. ways crossing the box edge) are left to
+        their own tile.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        tile_keys = set(tile_keys)
+        fresh = {}
+        for element in elements:
+            record = element_record(element)
+            if record is None:
+                continue
+            record['tile'] = tile_of(record['lat'], record['lon'], self.tile_deg)
+            if record['tile'] in tile_keys:
+                fresh[record['id']] = record
+
+        with self._lock:
+            records = {rid: r for rid, r in self._records.items() if r['tile'] not in tile_keys}
+            records.update(fresh)
+            self._records = records
+            for key in tile_keys:
+                self._tiles[key] = fetched_at
+                self._failed.pop(key, None)
+            self._index = _Index(list(records.values()))
+        if save:
+            self.save()
+
+    # -- persistence --
+
+    def _read(self):
+        """The saved store as (data, mtime), or None if there is no usable one."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read hospital store {self.path}: {e}")
+            return None
+
+        if data.get('format') != STORE_FORMAT or float(data.get('tile_deg', 0)) != self.tile_deg:
+            logger.warning(f"Hospital store {self.path} has a different format or tile size; ignoring it")
+            return None
+        return data, mtime
+
+    def _merge(self, data):
+        """Take the tiles of saved data fetched more recently than ours. Caller holds self._lock."""
+        saved = {key: float(at) for key, at in data.get('tiles', {}).items()}
+        newer = {key for key, at in saved.items() if key not in self._tiles or at > self._tiles[key]}
+        if not newer:
+            return 0
+        records = {rid: r for rid, r in self._records.items() if r['tile'] not in newer}
+        records.update((r['id'], r) for r in data.get('hospitals', []) if r['tile'] in newer)
+        self._records = records
+        for key in newer:
+            self._tiles[key] = saved[key]
+            self._failed.pop(key, None)
+        self._index = _Index(list(records.values()))
+        return len(newer)
+
+    def _load(self):
+        saved = self._read()
+        if saved is None:
+            return
+        data, mtime = saved
+        with self._lock:
+            merged = self._merge(data)
+            self._mtime = mtime
+        if merged:
+            logger.info(f"Hospital store loaded {merged} tile(s): {len(self._records)} hospitals "
+                        f"in {len(self._tiles)} tiles")
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold an exclusive lock on the store's lock file, across processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _reload_if_changed(self):
+        now = time.time()
+        if now - self._checked_at < self.reload_check_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._load()
+
+    def save(self):
+        # One save at a time, in this process and across workers. Each merges what the
+        # others saved before writing, so no worker's tiles are dropped from the file
+        directory = os.path.dirname(self.path) or '.'
+        with self._save_lock:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                with self._file_lock():
+                    saved = self._read()
+                    with self._lock:
+                        if saved is not None:
+                            self._merge(saved[0])
+                        data = {
+                            'format': STORE_FORMAT,
+                            'tile_deg': self.tile_deg,
+                            'tiles': dict(self._tiles),
+                            'hospitals': list(self._records.values())
+                        }
+                    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(data, f)
+                    os.replace(tmp_path, self.path)
+                    with self._lock:
+                        self._mtime = os.path.getmtime(self.path)
+            except OSError as e:
+                logger.warning(f"Could not write hospital store {self.path}: {e}")
+
+    # -- background refresh --
+
+    def refresh_stale(self, max_tiles=4):
+        """Re-fetch up to max_tiles of the oldest tiles past their TTL. Returns the number refreshed."""
+        self._reload_if_changed()
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            stale = sorted((at, key) for key, at in self._tiles.items() if at <= cutoff)
+        keys = [key for _, key in stale[:max_tiles]]
+        if not keys:
+            return 0
+        with self._locked_tiles(keys):
+            return len(keys) if self._fetch_tiles(keys) else 0
+
+    def start_refresher(self, interval_seconds=600, max_tiles=4):
+        """Start a daemon thread that refreshes stale tiles every interval_seconds."""
+        if self._refresher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.refresh_stale(max_tiles)
+                except Exception as e:
+                    logger.error(f"Hospital store refresh failed: {e}", exc_info=True)
+
+        self._refresher = threading.Thread(target=loop, name='hospital-store-refresh', daemon=True)
+        self._refresher.start()
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            stats = dict(self._stats)
+            stats.update({
+                'hospitals': len(self._records),
+                'tiles': len(self._tiles),
+                'stale_tiles': sum(1 for at in self._tiles.values() if at <= now - self.ttl_seconds),
+                'tile_deg': self.tile_deg,
+                'live_fetch': self.live_fetch,
+                'refresher': self._refresher is not None
+            })
+        stats['local_ratio'] = round(stats['local'] / stats['queries'], 4) if stats['queries'] else 0
+        return stats
+
+
+def hospital_store_settings():
+    """Read hospital store settings from the environment."""
+    return {
+        'path': os.getenv('HOSPITAL_STORE_PATH', DEFAULT_STORE_PATH),
+        'tile_deg': float(os.getenv('HOSPITAL_TILE_DEG', '1.0')),
+        'ttl_seconds': float(os.getenv('HOSPITAL_TILE_TTL_HOURS', '168')) * 3600,
+        'live_fetch': os.getenv('HOSPITAL_LIVE_FETCH', 'true').lower() == 'true'
+    }
+
+
+def hospital_refresh_settings():
+    """Read background refresh settings from the environment."""
+    return {
+        'enabled': os.getenv('HOSPITAL_REFRESH_ENABLED', 'true').lower() == 'true',
+        'interval_seconds': float(os.getenv('HOSPITAL_REFRESH_INTERVAL_MINUTES', '10')) * 60,
+        'max_tiles': int(os.getenv('HOSPITAL_REFRESH_MAX_TILES', '4'))
+    }
+
+
+def _tiles_in_bbox(south, west, north, east, tile_deg):
+    rows = range(math.floor(south / tile_deg), math.ceil(north / tile_deg))
+    cols = range(math.floor(west / tile_deg), math.ceil(east / tile_deg))
+    return [f'{row},{col}' for row in rows for col in cols]
+
+
+def main(argv):
+    """Seed the store for a region ahead of time.
+
+        python hospital_store.py seed SOUTH,WEST,NORTH,EAST
+        python hospital_store.py import EXTRACT.json SOUTH,WEST,NORTH,EAST
+
+    'seed' fetches every tile of the box from Overpass, a few at a time.
+    'import' loads an Overpass JSON extract (queried with 'out center') that
+    covers the whole box, e.g. one produced offline or bundled with a deployment.
+    """
+    logging.basicConfig(level=logging.INFO)
+    if len(argv) < 2 or argv[0] not in ('seed', 'import') or (argv[0] == 'import' and len(argv) < 3):
+        print(main.__doc__)
+        return 2
+
+    store = HospitalStore(**hospital_store_settings())
+    south, west, north, east = (float(v) for v in argv[-1].split(','))
+    keys = _tiles_in_bbox(south, west, north, east, store.tile_deg)
+    if argv[0] == 'import':
+        with open(argv[1], 'r', encoding='utf-8') as f:
+            elements = json.load(f).get('elements', [])
+        store.add_elements(elements, keys)
+        print(f"Imported {len(elements)} elements into {len(keys)} tiles")
+        return 0
+
+    for i in range(0, len(keys), 4):
+        batch = keys[i:i + 4]
+        if not store._fetch_tiles(batch):
+            print(f"Failed to fetch tiles {batch}")
+            return 1
+        print(f"Fetched tiles {i + len(batch)}/{len(keys)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,134 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\r\n'
+
+
+class JSONStreamParser:
+    """Incremental parser for a JSON object arriving in pieces (e.g. streamed LLM output).
+
+    feed() takes the next piece of text and returns the values completed by
+    it, as (path, value) pairs: path is a tuple of object keys and array
+    indexes from the root, so ('severity_change',) is a top-level field and
+    ('predictions', 0) the first item of the top-level 'predictions' array.
+    Only values at most max_depth levels deep are reported; deeper values
+    arrive as part of their parent.
+
+    Text before the first '{' (prose, a ```json fence) and after the root
+    object is ignored. A value that is not valid JSON on its own (say an
+    unquoted word) is skipped rather than raising, as its neighbours can
+    still be used. Once the root object is complete, result holds it.
+    """
+
+    def __init__(self, max_depth=2):
+        self.max_depth = max_depth
+        self.result = None
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._stack = []        # open containers: {'type', 'path', 'key', 'index', 'expect_key', 'start', 'value_start'}
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+
+    @property
+    def done(self):
+        return self._done
+
+    def feed(self, text):
+        """Consume the next piece of text; return the list of (path, value) completed by it."""
+        if self._done or not text:
+            return []
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and not self._done:
+            c = buffer[i]
+            if not self._started:
+                if c == '{':
+                    self._started = True
+                    self._open('{', i, ())
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._close_string(i, completed)
+            elif c in _WHITESPACE:
+                pass
+            else:
+                self._structural(c, i, completed)
+            i += 1
+        self._pos = i
+        return completed
+
+    def _open(self, kind, i, path):
+        self._stack.append({'type': kind, 'path': path, 'key': None, 'index': 0,
+                            'expect_key': kind == '{', 'start': i, 'value_start': None})
+
+    def _child_path(self, frame):
+        return frame['path'] + ((frame['key'],) if frame['type'] == '{' else (frame['index'],))
+
+    def _structural(self, c, i, completed):
+        frame = self._stack[-1]
+        if c == '"':
+            self._in_string = True
+            self._string_start = i
+            self._string_is_key = frame['type'] == '{' and frame['expect_key']
+            if not self._string_is_key:
+                frame['value_start'] = i
+        elif c == ':':
+            frame['expect_key'] = False
+        elif c == ',':
+            self._finish_scalar(frame, i, completed)
+            if frame['type'] == '{':
+                frame['expect_key'] = True
+        elif c in '{[':
+            frame['value_start'] = i
+            self._open(c, i, self._child_path(frame))
+        elif c in '}]':
+            self._finish_scalar(frame, i, completed)
+            self._stack.pop()
+            if not self._stack:
+                self._done = True
+                try:
+                    self.result = json.loads(self._buffer[frame['start']:i + 1])
+                except ValueError as e:
+                    logger.warning(f"Streamed JSON object is not valid: {e}")
+            else:
+                self._value_done(self._stack[-1], i + 1, completed)
+        elif frame['value_start'] is None:
+            # Start of a number, true, false or null; it ends at the next ',' or closing bracket
+            frame['value_start'] = i
+
+    def _close_string(self, i, completed):
+        frame = self._stack[-1]
+        if self._string_is_key:
+            try:
+                frame['key'] = json.loads(self._buffer[self._string_start:i + 1])
+            except ValueError:
+                frame['key'] = self._buffer[self._string_start + 1:i]
+        else:
+            self._value_done(frame, i + 1, completed)
+
+    def _finish_scalar(self, frame, end, completed):
+        if frame['value_start'] is not None:
+            self._value_done(frame, end, completed)
+
+    def _value_done(self, frame, end, completed):
+        path = self._child_path(frame)
+        if len(path) <= self.max_depth:
+            try:
+                completed.append((path, json.loads(self._buffer[frame['value_start']:end])))
+            except ValueError:
+                logger.debug(f"Skipping invalid streamed JSON value at {path}")
+        frame['value_start'] = None
+        if frame['type'] == '[':
+            frame['index'] += 1
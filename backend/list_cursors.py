@@ -0,0 +1,79 @@
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from flask import request, Response
+
+# A "since" cursor also returns rows changed this long before it, so a row
+# whose transaction committed just after the previous response was built is
+# not missed. Clients merge rows by id, so the repeats are harmless.
+CURSOR_OVERLAP = timedelta(seconds=2)
+
+
+def list_etag(*version):
+    """Weak ETag value for a list whose content is determined by version (e.g. row count and max updated_at)."""
+    return hashlib.sha1(json.dumps(version, default=str).encode('utf-8')).hexdigest()[:20]
+
+
+def not_modified(etag):
+    """Empty 304 response if the client already has this version (If-None-Match), else None."""
+    if request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag:
+        return with_etag(Response(status=304), etag)
+    return None
+
+
+def with_etag(response, etag):
+    """Attach the ETag to a response; browsers then revalidate it with If-None-Match on their own."""
+    response.set_etag(etag, weak=True)
+    # Private: the lists depend on the session. no-cache: always revalidate, never reuse unasked.
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Cookie'
+    return response
+
+
+def parse_since(value):
+    """The 'since' query parameter as a naive UTC datetime, or None. Raises ValueError if malformed."""
+    if not value:
+        return None
+    since = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since - CURSOR_OVERLAP
+
+
+def cursor_value(updated_at):
+    """What a client passes back as ?since= to get the rows changed after this response."""
+    return updated_at.isoformat() if updated_at else None
+
+
+def page_limit(value, default, maximum):
+    """The 'limit' query parameter clamped to 1..maximum, or default. Raises ValueError if malformed."""
+    if value in (None, ''):
+        return default
+    return max(1, min(int(value), maximum))
+
+
+def page_cursor(created_at, row_id):
+    """What a client passes back as ?before= to get the page after the row with this (created_at, id)."""
+    return f'{created_at.isoformat()},{row_id}'
+
+
+def keyset_page(query, created_column, id_column, before, limit):
+    """One page of query, newest first by (created_at, id), starting after the cursor 'before'.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Unlike an offset, the cursor stays correct while new rows are inserted.
+    Raises ValueError if before is malformed.
+    """
+    if before:
+        created_value, id_value = before.split(',', 1)
+        created_at = datetime.fromisoformat(created_value)
+        row_id = id_column.type.python_type(id_value)
+        query = query.filter((created_column < created_at) |
+                             ((created_column == created_at) & (id_column < row_id)))
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, page_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
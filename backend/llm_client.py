@@ -0,0 +1,368 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    import groq
+    GROQ_AVAILABLE = True
+except ImportError:
+    GROQ_AVAILABLE = False
+    logging.warning("Groq package not installed. Run: pip install groq")
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+LATENCY_WINDOW = 512
+
+
+class LLMUnavailable(Exception):
+    """The LLM call was not made or did not succeed; callers should use their fallback."""
+
+
+class CircuitOpenError(LLMUnavailable):
+    pass
+
+
+class EndpointBusyError(LLMUnavailable):
+    pass
+
+
+def _is_retryable(exc):
+    """Connection errors, timeouts, rate limits and 5xx are worth retrying (and count against the breaker)."""
+    if not GROQ_AVAILABLE:
+        return False
+    if isinstance(exc, (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)):
+        return True
+    return isinstance(exc, groq.APIStatusError) and exc.status_code >= 500
+
+
+class RetryBudget:
+    """Caps retries at a fraction of traffic.
+
+    Every first attempt deposits ratio tokens (up to max_tokens) and every
+    retry spends one, so when the upstream is failing the retries add at most
+    about ratio extra load instead of multiplying it.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=10.0):
+        self.ratio = float(ratio)
+        self.max_tokens = float(max_tokens)
+        self.tokens = self.max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive upstream failures.
+
+    While open, calls are rejected at once. After reset_seconds one trial call
+    is let through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = float(reset_seconds)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("LLM circuit breaker closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                if self.state == CLOSED:
+                    logger.warning(f"LLM circuit breaker opened after {self.failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+
+    def release(self):
+        """End a trial call that neither succeeded nor failed upstream (e.g. a 400)."""
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'open_for_seconds': round(time.monotonic() - self.opened_at, 1) if self.state != CLOSED else 0
+            }
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected_open = 0
+        self.rejected_busy = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.first_token = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self):
+        def percentiles(values):
+            values = sorted(values)
+
+            def pct(p):
+                return round(values[min(len(values) - 1, int(p * len(values)))], 1) if values else None
+
+            return {'p50': pct(0.5), 'p95': pct(0.95), 'p99': pct(0.99)}
+
+        stats = {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'rejected_open': self.rejected_open,
+            'rejected_busy': self.rejected_busy,
+            'in_flight': self.in_flight,
+            'latency_ms': percentiles(self.latencies)
+        }
+        if self.first_token:
+            # Streamed calls only: time until the first token reached the caller
+            stats['first_token_ms'] = percentiles(self.first_token)
+        return stats
+
+
+class LLMClient:
+    """Shared Groq client for all endpoints.
+
+    One Groq SDK client with a pooled keep-alive HTTP connection pool is
+    created lazily and reused by every request. Each call names its endpoint
+    ('groq_chat', 'symptom_checker', ...) which gets its own concurrency
+    limit (endpoint_limits, else default_limit); a call that cannot get a
+    slot within queue_timeout seconds raises EndpointBusyError. Retryable
+    failures are retried up to max_retries times while the shared
+    RetryBudget allows it, and a CircuitBreaker shared by all endpoints makes
+    calls fail fast with CircuitOpenError while Groq is down. All of these
+    are LLMUnavailable, so callers catch one exception and use their fallback.
+    """
+
+    def __init__(self, api_key=None, base_url=None, timeout=15.0, max_connections=20, default_limit=8,
+                 endpoint_limits=None, queue_timeout=2.0, max_retries=2, retry_budget=None, breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = float(timeout)
+        self.max_connections = int(max_connections)
+        self.default_limit = max(1, int(default_limit))
+        self.endpoint_limits = dict(endpoint_limits or {})
+        self.queue_timeout = float(queue_timeout)
+        self.max_retries = max(0, int(max_retries))
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._stats = {}
+
+    @property
+    def available(self):
+        return GROQ_AVAILABLE and bool(self.api_key)
+
+    def _groq(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    http_client = httpx.Client(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_connections)
+                    )
+                    # Retries are done here, under the retry budget, not by the SDK
+                    self._client = groq.Groq(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout,
+                                             max_retries=0, http_client=http_client)
+        return self._client
+
+    def _endpoint(self, endpoint):
+        with self._lock:
+            if endpoint not in self._semaphores:
+                limit = self.endpoint_limits.get(endpoint, self.default_limit)
+                self._semaphores[endpoint] = threading.BoundedSemaphore(limit)
+                self._stats[endpoint] = _EndpointStats()
+            return self._semaphores[endpoint], self._stats[endpoint]
+
+    def _acquire(self, endpoint):
+        """Pass the breaker and take a slot of the endpoint's limit; returns (semaphore, stats)."""
+        if not self.available:
+            raise LLMUnavailable('Groq is not configured')
+        semaphore, stats = self._endpoint(endpoint)
+
+        if not self.breaker.allow():
+            with self._lock:
+                stats.rejected_open += 1
+            raise CircuitOpenError('Groq circuit breaker is open')
+        if not semaphore.acquire(timeout=self.queue_timeout):
+            self.breaker.release()
+            with self._lock:
+                stats.rejected_busy += 1
+            raise EndpointBusyError(f'Too many concurrent {endpoint} calls')
+
+        with self._lock:
+            stats.calls += 1
+            stats.in_flight += 1
+        self.retry_budget.deposit()
+        return semaphore, stats
+
+    def _release(self, semaphore, stats, start):
+        semaphore.release()
+        with self._lock:
+            stats.in_flight -= 1
+            stats.latencies.append((time.perf_counter() - start) * 1000)
+
+    def _attempt(self, stats, fn):
+        """fn(groq_client) with retries; failures are recorded on the breaker before raising."""
+        attempt = 0
+        while True:
+            try:
+                return fn(self._groq())
+            except Exception as e:
+                if not _is_retryable(e):
+                    self.breaker.release()
+                    with self._lock:
+                        stats.errors += 1
+                    raise
+                if attempt >= self.max_retries or not self.retry_budget.withdraw():
+                    self.breaker.record_failure()
+                    with self._lock:
+                        stats.errors += 1
+                    raise LLMUnavailable(f'Groq call failed: {e}') from e
+                attempt += 1
+                with self._lock:
+                    stats.retries += 1
+                # Short jittered backoff; callers are waiting on a user request
+                time.sleep(min(2.0, 0.2 * 2 ** (attempt - 1)) * (0.5 + random.random()))
+
+    def call(self, endpoint, fn):
+        """Run fn(groq_client) under the endpoint's limit, the retry budget and the circuit breaker."""
+        semaphore, stats = self._acquire(endpoint)
+        start = time.perf_counter()
+        try:
+            result = self._attempt(stats, fn)
+            self.breaker.record_success()
+            return result
+        finally:
+            self._release(semaphore, stats, start)
+
+    def stream(self, endpoint, **kwargs):
+        """Streamed chat.completions.create(**kwargs): yields the text deltas as they arrive.
+
+        The endpoint slot is held until the stream ends. Opening the stream is
+        retried like chat(); once tokens have been yielded nothing is retried,
+        and a failure mid-stream raises LLMUnavailable (and counts against the
+        breaker), so callers must be ready for a partial answer. Closing the
+        generator early closes the upstream response.
+        """
+        semaphore, stats = self._acquire(endpoint)
+        start = time.perf_counter()
+        try:
+            chunks = self._attempt(stats, lambda client: client.chat.completions.create(stream=True, **kwargs))
+            try:
+                first = True
+                for chunk in chunks:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first:
+                            first = False
+                            with self._lock:
+                                stats.first_token.append((time.perf_counter() - start) * 1000)
+                        yield delta
+            except GeneratorExit:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                with self._lock:
+                    stats.errors += 1
+                raise LLMUnavailable(f'Groq stream failed: {e}') from e
+            finally:
+                chunks.close()
+            self.breaker.record_success()
+        finally:
+            self._release(semaphore, stats, start)
+
+    def chat(self, endpoint, **kwargs):
+        """chat.completions.create(**kwargs) through call(); returns the SDK completion."""
+        return self.call(endpoint, lambda client: client.chat.completions.create(**kwargs))
+
+    def transcribe(self, endpoint, **kwargs):
+        """audio.transcriptions.create(**kwargs) through call()."""
+        return self.call(endpoint, lambda client: client.audio.transcriptions.create(**kwargs))
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return {
+            'available': self.available,
+            'breaker': self.breaker.stats(),
+            'retry_budget_tokens': round(self.retry_budget.tokens, 2),
+            'endpoints': endpoints
+        }
+
+
+def llm_settings():
+    """Read LLM client settings from the environment.
+
+    LLM_ENDPOINT_LIMITS sets per-endpoint concurrency, e.g. "groq_chat=8,symptom_checker=4".
+    """
+    limits = {}
+    for item in os.getenv('LLM_ENDPOINT_LIMITS', '').split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return {
+        'api_key': os.getenv('GROQ_API_KEY'),
+        'base_url': os.getenv('GROQ_BASE_URL') or None,
+        'timeout': float(os.getenv('LLM_TIMEOUT_SECONDS', '15')),
+        'max_connections': int(os.getenv('LLM_MAX_CONNECTIONS', '20')),
+        'default_limit': int(os.getenv('LLM_CONCURRENCY', '8')),
+        'endpoint_limits': limits,
+        'queue_timeout': float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '2')),
+        'max_retries': int(os.getenv('LLM_MAX_RETRIES', '2')),
+        'retry_budget': RetryBudget(float(os.getenv('LLM_RETRY_RATIO', '0.2'))),
+        'breaker': CircuitBreaker(int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+                                  float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30')))
+    }
@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future, TimeoutError
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds for batch sizes (the last bucket is open-ended)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class MicroBatcher:
+    """Collects single-row requests that arrive close together and scores them as one matrix.
+
+    score_fn takes an (n, n_features) matrix and returns (labels, probabilities),
+    each of length n. Callers block in submit() until their own row is scored.
+    """
+
+    def __init__(self, name, score_fn, max_batch_size=32, max_wait_ms=5.0):
+        self.name = name
+        self.score_fn = score_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._histogram = {str(b): 0 for b in BATCH_SIZE_BUCKETS}
+        self._histogram[f'>{BATCH_SIZE_BUCKETS[-1]}'] = 0
+        self._batches = 0
+        self._requests = 0
+        self._max_seen = 0
+        self._total_score_ms = 0.0
+
+    def submit(self, features, timeout=None):
+        """Score one feature row. Returns (label, probability) for that row.
+
+        Raises TimeoutError if the row is not scored within timeout seconds;
+        a row still waiting for its batch is then dropped from it.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(features, dtype=np.float64), future))
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f'microbatch-{self.name}', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Rows whose caller gave up are dropped; the rest can no longer be cancelled
+            batch = [(row, future) for row, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            futures = [future for _, future in batch]
+            start = time.perf_counter()
+            try:
+                matrix = np.vstack([row for row, _ in batch])
+                labels, probabilities = self.score_fn(matrix)
+                for i, future in enumerate(futures):
+                    future.set_result((labels[i], probabilities[i]))
+            except Exception as e:
+                logger.error(f"Micro-batch scoring failed for '{self.name}': {str(e)}", exc_info=True)
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            self._record(len(batch), (time.perf_counter() - start) * 1000)
+
+    def _record(self, size, score_ms):
+        bucket = next((str(b) for b in BATCH_SIZE_BUCKETS if size <= b), f'>{BATCH_SIZE_BUCKETS[-1]}')
+        with self._stats_lock:
+            self._histogram[bucket] += 1
+            self._batches += 1
+            self._requests += size
+            self._max_seen = max(self._max_seen, size)
+            self._total_score_ms += score_ms
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self._batches,
+                'requests': self._requests,
+                'mean_batch_size': round(self._requests / self._batches, 2) if self._batches else 0,
+                'largest_batch': self._max_seen,
+                'mean_score_ms': round(self._total_score_ms / self._batches, 3) if self._batches else 0,
+                'queue_depth': self._queue.qsize(),
+                'batch_size_histogram': dict(self._histogram)
+            }
+
+
+def microbatch_settings():
+    """Read micro-batching settings from the environment."""
+    return {
+        'enabled': os.getenv('MICROBATCH_ENABLED', 'false').lower() == 'true',
+        'max_batch_size': int(os.getenv('MICROBATCH_MAX_SIZE', '32')),
+        'max_wait_ms': float(os.getenv('MICROBATCH_MAX_WAIT_MS', '5'))
+    }
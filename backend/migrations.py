@@ -1,14 +1,68 @@
 import logging
-from sqlalchemy import text
+from sqlalchemy import text, inspect
+from models import Prediction, RiskSummary, DISEASE_CATEGORY_NAMES
+from risk_summary import rebuild as rebuild_risk_summaries
 
 logger = logging.getLogger(__name__)
 
+# Columns added to existing tables after their first release: (table, column, DDL type, backfill SQL)
+ADDED_COLUMNS = [
+    ('predictions', 'updated_at', 'TIMESTAMP',
+     'UPDATE predictions SET updated_at = COALESCE(reviewed_at, created_at) WHERE updated_at IS NULL'),
+    ('predictions', 'disease_category',
+     'VARCHAR(20) CONSTRAINT ck_predictions_disease_category CHECK (disease_category IN ({}))'.format(
+         ', '.join(f"'{name}'" for name in DISEASE_CATEGORY_NAMES)), """
+        UPDATE predictions SET disease_category = CASE
+            WHEN LOWER(disease_type) LIKE '%diabetes%' THEN 'diabetes'
+            WHEN LOWER(disease_type) LIKE '%heart%' OR LOWER(disease_type) LIKE '%cardio%' THEN 'heart'
+            WHEN LOWER(disease_type) LIKE '%liver%' THEN 'liver'
+            WHEN LOWER(disease_type) LIKE '%kidney%' THEN 'kidney'
+            WHEN LOWER(disease_type) LIKE '%bone%' OR LOWER(disease_type) LIKE '%fracture%' THEN 'bone'
+        END
+        WHERE disease_category IS NULL"""),
+]
+
+# Indexes backing the "since" cursors of the polled list endpoints and the paged
+# prediction history (named as in models.py, so fresh databases do not get a duplicate)
+INDEXES = [
+    ('ix_predictions_updated_at', 'predictions', 'updated_at'),
+    ('ix_appointments_updated_at', 'appointments', 'updated_at'),
+    ('ix_predictions_user_id_created_at', 'predictions', 'user_id, created_at'),
+]
+
+def _add_missing_columns(db):
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    for table, column, ddl_type, backfill in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+            if backfill:
+                conn.execute(text(backfill))
+        logger.info(f"✅ Added column {table}.{column}")
+
+    for name, table, column in INDEXES:
+        if table in tables:
+            with db.engine.begin() as conn:
+                conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})'))
+
+def _backfill_risk_summaries():
+    # Predictions saved before the summaries existed; later writes keep them current
+    if RiskSummary.query.first() is None and Prediction.query.first() is not None:
+        written = rebuild_risk_summaries()
+        logger.info(f"✅ Built {written} risk summaries")
+
 def run_migrations(app, db):
     """Auto-run database migrations on startup"""
     try:
         with app.app_context():
             # For SQLite, just create all tables
             db.create_all()
+            _add_missing_columns(db)
+            _backfill_risk_summaries()
             logger.info("✅ Database tables created/verified successfully")
                 
     except Exception as e:
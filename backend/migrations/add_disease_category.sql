@@ -0,0 +1,13 @@
+-- Normalized disease of each prediction (models.DISEASE_CATEGORIES), grouped on by the
+-- bucketed health trends (the backend also applies this on startup; see migrations.py)
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS disease_category VARCHAR(20)
+    CONSTRAINT ck_predictions_disease_category
+    CHECK (disease_category IN ('diabetes', 'heart', 'liver', 'kidney', 'bone'));
+UPDATE predictions SET disease_category = CASE
+    WHEN LOWER(disease_type) LIKE '%diabetes%' THEN 'diabetes'
+    WHEN LOWER(disease_type) LIKE '%heart%' OR LOWER(disease_type) LIKE '%cardio%' THEN 'heart'
+    WHEN LOWER(disease_type) LIKE '%liver%' THEN 'liver'
+    WHEN LOWER(disease_type) LIKE '%kidney%' THEN 'kidney'
+    WHEN LOWER(disease_type) LIKE '%bone%' OR LOWER(disease_type) LIKE '%fracture%' THEN 'bone'
+END
+WHERE disease_category IS NULL;
@@ -0,0 +1,3 @@
+-- Composite index for a user's prediction history, read newest first a page at a time
+-- (the backend also applies this on startup; see migrations.py)
+CREATE INDEX IF NOT EXISTS ix_predictions_user_id_created_at ON predictions(user_id, created_at);
@@ -0,0 +1,24 @@
+-- Risk trajectories per user and disease, written by the risk_forecast.py batch job and read by
+-- /api/analytics/risk-forecast (the backend also creates this on startup; see migrations.py)
+CREATE TABLE IF NOT EXISTS risk_forecasts (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    disease VARCHAR(50) NOT NULL,
+    points INTEGER NOT NULL,
+    current_risk DOUBLE PRECISION,
+    ewma_risk DOUBLE PRECISION,
+    slope_per_day DOUBLE PRECISION,
+    horizon_days INTEGER,
+    forecast_risk DOUBLE PRECISION,
+    forecast_lower DOUBLE PRECISION,
+    forecast_upper DOUBLE PRECISION,
+    trend VARCHAR(20),
+    change_point_at TIMESTAMP,
+    risk_before_change DOUBLE PRECISION,
+    risk_after_change DOUBLE PRECISION,
+    latest_at TIMESTAMP,
+    computed_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_risk_forecasts_user_disease UNIQUE (user_id, disease)
+);
+
+CREATE INDEX IF NOT EXISTS ix_risk_forecasts_user_id ON risk_forecasts(user_id);
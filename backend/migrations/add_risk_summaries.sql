@@ -0,0 +1,20 @@
+-- Latest and previous risk per user and disease, read by the analytics endpoints and kept
+-- current on every prediction write (the backend also creates and fills this on startup;
+-- see migrations.py). Fill it by hand with: python risk_summary.py rebuild
+CREATE TABLE IF NOT EXISTS risk_summaries (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    disease VARCHAR(50) NOT NULL,
+    latest_risk DOUBLE PRECISION,
+    previous_risk DOUBLE PRECISION,
+    latest_risk_level VARCHAR(50),
+    trend VARCHAR(20) DEFAULT 'stable',
+    count INTEGER NOT NULL DEFAULT 0,
+    pending_count INTEGER NOT NULL DEFAULT 0,
+    latest_prediction_id VARCHAR(36),
+    latest_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_risk_summaries_user_disease UNIQUE (user_id, disease)
+);
+
+CREATE INDEX IF NOT EXISTS ix_risk_summaries_user_id ON risk_summaries(user_id);
@@ -0,0 +1,8 @@
+-- Track row changes on predictions, for the "since" cursors and ETags of the polled list endpoints
+-- (the backend also applies this on startup; see migrations.py)
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE predictions SET updated_at = COALESCE(reviewed_at, created_at) WHERE updated_at IS NULL;
+ALTER TABLE predictions ALTER COLUMN updated_at SET DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS ix_predictions_updated_at ON predictions(updated_at);
+CREATE INDEX IF NOT EXISTS ix_appointments_updated_at ON appointments(updated_at);
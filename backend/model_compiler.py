@@ -0,0 +1,366 @@
+"""
+Export the tabular sklearn models to a compact, NumPy-only format and evaluate them.
+
+Compiled models are stored as a directory per model:
+
+    compiled_models/<name>/manifest.json   format version, kind, classes, provenance
+    compiled_models/<name>/*.npy           flat arrays (tree nodes or linear weights)
+
+Loading a compiled model needs only NumPy, so inference no longer depends on the
+exact scikit-learn version the pickle was written with. Run the export once, in an
+environment where the pickles load:
+
+    python model_compiler.py            # compile all tabular models
+    python model_compiler.py --bench    # compile, then compare latency with sklearn
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Batch size at which tree ensembles switch from all-trees-at-once to per-tree traversal
+PER_TREE_MIN_BATCH = 4096
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_DIR = os.path.join(BACKEND_DIR, 'compiled_models')
+
+# Source pickles for each tabular model: (model file, scaler file or None)
+TABULAR_MODEL_FILES = {
+    'diabetes': ('diabetes.pkl', 'd_scaler.pkl'),
+    'liver': ('liver_model.pkl', None),
+    'kidney': ('kidney_model.pkl', 'k_scaler.pkl'),
+    'heart': ('cardio_random_forest.pkl', None),
+}
+
+
+class CompiledModel:
+    """NumPy evaluator for an exported classifier. Mirrors the sklearn predict/predict_proba API."""
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.kind = manifest['kind']
+        self.classes_ = np.asarray(manifest['classes'])
+        self.n_features_in_ = manifest['n_features']
+        self.arrays = arrays
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.kind == 'tree_ensemble':
+            return self._tree_proba(X)
+        return self._linear_proba(X)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def _tree_proba(self, X):
+        a = self.arrays
+        # sklearn evaluates trees on float32 inputs against float64 thresholds
+        Xf = np.ascontiguousarray(X, dtype=np.float32).ravel()
+        n_samples = X.shape[0]
+        row_offsets = np.arange(n_samples, dtype=np.int64) * X.shape[1]
+        n_trees = a['roots'].shape[0]
+
+        if n_samples < PER_TREE_MIN_BATCH:
+            # Small batches: walk every tree at once to keep the number of NumPy calls low
+            nodes = self._walk(Xf, np.repeat(a['roots'], n_samples), np.tile(row_offsets, n_trees))
+            return a['value'][nodes].reshape(n_trees, n_samples, -1).sum(axis=0) / n_trees
+
+        # Large batches: one tree at a time keeps the working set in cache
+        proba = np.zeros((n_samples, a['value'].shape[1]))
+        for root in a['roots']:
+            proba += a['value'][self._walk(Xf, np.full(n_samples, root, dtype=np.int64), row_offsets)]
+        return proba / n_trees
+
+    def _walk(self, Xf, nodes, row_offsets):
+        """Step each cursor down its tree until it reaches a leaf. Returns the leaf node ids."""
+        a = self.arrays
+        children, feature, threshold, is_leaf = a['children'], a['feature'], a['threshold'], a['is_leaf']
+        active = np.flatnonzero(~is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = Xf[row_offsets[active] + feature[current]] <= threshold[current]
+            # children holds [right, left] pairs, so the comparison result picks the branch
+            current = children[2 * current + go_left]
+            nodes[active] = current
+            active = active[~is_leaf[current]]
+        return nodes
+
+    def _linear_proba(self, X):
+        a = self.arrays
+        scores = X @ a['coef'].T + a['intercept']
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        if self.manifest.get('multiclass') == 'ovr':
+            proba = 1.0 / (1.0 + np.exp(-scores))
+            return proba / proba.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        exp_scores = np.exp(scores)
+        return exp_scores / exp_scores.sum(axis=1, keepdims=True)
+
+
+class CompiledScaler:
+    """NumPy evaluator for an exported StandardScaler or MinMaxScaler."""
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.kind = manifest['kind']
+        self.arrays = arrays
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        a = self.arrays
+        if self.kind == 'standard_scaler':
+            if 'mean' in a:
+                X = X - a['mean']
+            if 'scale' in a:
+                X = X / a['scale']
+            return X
+        return X * a['scale'] + a['min']
+
+
+def _export_trees(estimators):
+    """Flatten fitted decision trees into concatenated node arrays."""
+    children, features, thresholds, values, roots, leaves = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in estimators:
+        tree = est.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes, dtype=np.int64)
+        is_leaf = tree.children_left == -1
+
+        # Leaves point to themselves; children are stored as [right, left] pairs
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+        children.append(np.column_stack([right, left]).ravel())
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        leaves.append(is_leaf)
+
+        value = tree.value[:, 0, :].astype(np.float64)
+        values.append(value / value.sum(axis=1, keepdims=True))
+
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    index_dtype = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+    arrays = {
+        'children': np.concatenate(children).astype(index_dtype),
+        'feature': np.concatenate(features).astype(index_dtype),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'value': np.concatenate(values),
+        'is_leaf': np.concatenate(leaves),
+        'roots': np.asarray(roots, dtype=index_dtype),
+    }
+    return arrays, max_depth
+
+
+def export_model(model):
+    """Convert a fitted sklearn classifier to (manifest, arrays). Raises ValueError if unsupported."""
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    manifest = {
+        'classes': np.asarray(model.classes_).tolist(),
+        'n_features': int(model.n_features_in_),
+        'estimator': type(model).__name__,
+    }
+
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+        arrays, max_depth = _export_trees(model.estimators_)
+        manifest.update({'kind': 'tree_ensemble', 'n_trees': len(model.estimators_), 'max_depth': max_depth})
+    elif isinstance(model, DecisionTreeClassifier):
+        arrays, max_depth = _export_trees([model])
+        manifest.update({'kind': 'tree_ensemble', 'n_trees': 1, 'max_depth': max_depth})
+    elif isinstance(model, LogisticRegression):
+        arrays = {
+            'coef': np.asarray(model.coef_, dtype=np.float64),
+            'intercept': np.asarray(model.intercept_, dtype=np.float64),
+        }
+        multi_class = getattr(model, 'multi_class', 'auto')
+        manifest.update({
+            'kind': 'linear',
+            'multiclass': 'ovr' if multi_class == 'ovr' or model.solver == 'liblinear' else 'multinomial'
+        })
+    else:
+        raise ValueError(f"Unsupported model type for compilation: {type(model).__name__}")
+
+    return manifest, arrays
+
+
+def export_scaler(scaler):
+    """Convert a fitted StandardScaler/MinMaxScaler to (manifest, arrays)."""
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler
+
+    if isinstance(scaler, StandardScaler):
+        arrays = {}
+        if scaler.mean_ is not None and scaler.with_mean:
+            arrays['mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        if scaler.scale_ is not None and scaler.with_std:
+            arrays['scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+        return {'kind': 'standard_scaler', 'estimator': 'StandardScaler'}, arrays
+    if isinstance(scaler, MinMaxScaler):
+        arrays = {
+            'scale': np.asarray(scaler.scale_, dtype=np.float64),
+            'min': np.asarray(scaler.min_, dtype=np.float64),
+        }
+        return {'kind': 'minmax_scaler', 'estimator': 'MinMaxScaler'}, arrays
+    raise ValueError(f"Unsupported scaler type for compilation: {type(scaler).__name__}")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_arrays(directory, prefix, arrays):
+    names = {}
+    for key, array in arrays.items():
+        filename = f"{prefix}{key}.npy"
+        np.save(os.path.join(directory, filename), np.ascontiguousarray(array))
+        names[key] = filename
+    return names
+
+
+def save_compiled(directory, model, scaler=None, source_files=None):
+    """Write a compiled model (and optional scaler) to directory."""
+    import sklearn
+
+    os.makedirs(directory, exist_ok=True)
+    model_manifest, model_arrays = export_model(model)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.utcnow().isoformat(),
+        'sklearn_version': sklearn.__version__,
+        'sources': {os.path.basename(p): _file_sha256(p) for p in (source_files or []) if p and os.path.exists(p)},
+        'model': model_manifest,
+        'scaler': None,
+    }
+    model_manifest['arrays'] = _write_arrays(directory, 'model_', model_arrays)
+
+    if scaler is not None:
+        scaler_manifest, scaler_arrays = export_scaler(scaler)
+        scaler_manifest['arrays'] = _write_arrays(directory, 'scaler_', scaler_arrays)
+        manifest['scaler'] = scaler_manifest
+
+    # Manifest goes last so a partially written directory is never picked up
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def compiled_model_exists(directory):
+    return os.path.exists(os.path.join(directory, 'manifest.json'))
+
+
+def load_compiled(directory, mmap=False):
+    """Load a compiled model directory. Returns (CompiledModel, CompiledScaler or None).
+
+    With mmap=True the arrays are memory-mapped read-only instead of read into
+    memory, so every process serving the same files shares one copy in the page cache.
+    """
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    version = manifest.get('format_version')
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format version {version} in {directory} (expected {FORMAT_VERSION})")
+
+    def read_arrays(section):
+        return {key: np.load(os.path.join(directory, filename), mmap_mode='r' if mmap else None)
+                for key, filename in section['arrays'].items()}
+
+    model = CompiledModel(manifest['model'], read_arrays(manifest['model']))
+    scaler = None
+    if manifest.get('scaler'):
+        scaler = CompiledScaler(manifest['scaler'], read_arrays(manifest['scaler']))
+    return model, scaler
+
+
+def compile_tabular_models(source_dir=BACKEND_DIR, output_dir=COMPILED_DIR, names=None):
+    """Compile the tabular model pickles in source_dir. Returns {name: error or None}."""
+    import joblib
+
+    results = {}
+    for name, (model_file, scaler_file) in TABULAR_MODEL_FILES.items():
+        if names and name not in names:
+            continue
+        model_path = os.path.join(source_dir, model_file)
+        scaler_path = os.path.join(source_dir, scaler_file) if scaler_file else None
+        try:
+            model = joblib.load(model_path)
+            scaler = joblib.load(scaler_path) if scaler_path else None
+            save_compiled(os.path.join(output_dir, name), model, scaler, [model_path, scaler_path])
+            results[name] = None
+            logger.info(f"Compiled {name} model to {os.path.join(output_dir, name)}")
+        except Exception as e:
+            results[name] = str(e)
+            logger.error(f"Failed to compile {name} model: {str(e)}")
+    return results
+
+
+def compare_latency(model, scaler, compiled_model, compiled_scaler, n_features, batch_sizes=(1, 32, 1000, 10000), repeats=50):
+    """Time sklearn vs compiled predict_proba. Returns {batch_size: {'sklearn_ms', 'compiled_ms', 'max_abs_diff'}}."""
+    rng = np.random.default_rng(0)
+    results = {}
+    for batch_size in batch_sizes:
+        X = rng.normal(size=(batch_size, n_features)) * 10 + 50
+        runs = max(1, repeats if batch_size <= 100 else repeats // 10)
+
+        def timed(fn):
+            fn()
+            start = time.perf_counter()
+            for _ in range(runs):
+                out = fn()
+            return (time.perf_counter() - start) * 1000 / runs, out
+
+        sk_ms, sk_proba = timed(lambda: model.predict_proba(scaler.transform(X) if scaler is not None else X))
+        c_ms, c_proba = timed(lambda: compiled_model.predict_proba(compiled_scaler.transform(X) if compiled_scaler is not None else X))
+        results[batch_size] = {
+            'sklearn_ms': round(sk_ms, 3),
+            'compiled_ms': round(c_ms, 3),
+            'max_abs_diff': float(np.max(np.abs(sk_proba - c_proba)))
+        }
+    return results
+
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO)
+    results = compile_tabular_models()
+    for name, error in results.items():
+        print(f"{name}: {'compiled' if error is None else 'FAILED - ' + error}")
+
+    if '--bench' in argv:
+        import joblib
+        for name, error in results.items():
+            if error is not None:
+                continue
+            model_file, scaler_file = TABULAR_MODEL_FILES[name]
+            model = joblib.load(os.path.join(BACKEND_DIR, model_file))
+            scaler = joblib.load(os.path.join(BACKEND_DIR, scaler_file)) if scaler_file else None
+            compiled_model, compiled_scaler = load_compiled(os.path.join(COMPILED_DIR, name))
+            print(f"\n{name}:")
+            timings = compare_latency(model, scaler, compiled_model, compiled_scaler, compiled_model.n_features_in_)
+            for batch_size, t in timings.items():
+                print(f"  batch={batch_size:>6}  sklearn={t['sklearn_ms']:>9.3f} ms  compiled={t['compiled_ms']:>9.3f} ms  max|diff|={t['max_abs_diff']:.2e}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
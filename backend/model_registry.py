@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = 'not_loaded'
+LOADING = 'loading'
+LOADED = 'loaded'
+FAILED = 'failed'
+
+
+class _ModelEntry:
+    def __init__(self, name, loader, description=''):
+        self.name = name
+        self.loader = loader
+        self.description = description
+        self.lock = threading.Lock()
+        self.state = NOT_LOADED
+        self.value = None
+        self.error = None
+        self.load_time_ms = None
+        self.loaded_at = None
+        self.attempts = 0
+
+
+class ModelRegistry:
+    """Loads each registered model on first use and shares one copy across threads.
+
+    A loader is any zero-argument callable returning the loaded object. A loader
+    that raises marks the model as failed; the error is kept for /api/health.
+    Failures are often transient (a model download timing out), so the first
+    get() more than retry_seconds after a failure tries the load again; until
+    then get() returns None at once. retry_seconds=None never retries, short
+    of reset().
+    """
+
+    def __init__(self, retry_seconds=60):
+        self.retry_seconds = None if retry_seconds is None else float(retry_seconds)
+        self._entries = {}
+        self._entries_lock = threading.Lock()
+
+    def register(self, name, loader, description=''):
+        with self._entries_lock:
+            self._entries[name] = _ModelEntry(name, loader, description)
+
+    def names(self):
+        return list(self._entries.keys())
+
+    def get(self, name):
+        """Return the loaded model, loading it now if needed. Returns None on failure."""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model '{name}'")
+
+        # Fast path: no locking once the model has settled
+        if entry.state == LOADED or (entry.state == FAILED and not self._retry_due(entry)):
+            return entry.value
+
+        with entry.lock:
+            if entry.state == LOADED or (entry.state == FAILED and not self._retry_due(entry)):
+                return entry.value
+
+            entry.state = LOADING
+            entry.attempts += 1
+            logger.info(f"Loading model '{name}'...")
+            start = time.perf_counter()
+            try:
+                value = entry.loader()
+                entry.load_time_ms = round((time.perf_counter() - start) * 1000, 1)
+                entry.value = value
+                entry.error = None
+                entry.state = LOADED
+                logger.info(f"Model '{name}' loaded in {entry.load_time_ms} ms")
+            except Exception as e:
+                entry.load_time_ms = round((time.perf_counter() - start) * 1000, 1)
+                entry.value = None
+                entry.error = str(e)
+                entry.state = FAILED
+                logger.error(f"Failed to load model '{name}': {entry.error}", exc_info=True)
+            entry.loaded_at = time.time()
+            return entry.value
+
+    def _retry_due(self, entry):
+        return self.retry_seconds is not None and time.time() - entry.loaded_at >= self.retry_seconds
+
+    def is_loaded(self, name):
+        entry = self._entries.get(name)
+        return entry is not None and entry.state == LOADED
+
+    def error(self, name):
+        entry = self._entries.get(name)
+        return entry.error if entry else None
+
+    def reset(self, name):
+        """Drop a loaded or failed model so the next get() loads it again."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.state = NOT_LOADED
+            entry.value = None
+            entry.error = None
+            entry.load_time_ms = None
+            entry.loaded_at = None
+            entry.attempts = 0
+
+    def warmup(self, names=None):
+        """Load the given models (all registered models if names is None)."""
+        names = self.names() if names is None else names
+        for name in names:
+            if name not in self._entries:
+                logger.warning(f"Warmup skipped unknown model '{name}'")
+                continue
+            self.get(name)
+
+    def warmup_in_background(self, names=None):
+        thread = threading.Thread(target=self.warmup, args=(names,), name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {
+            name: {
+                'state': entry.state,
+                'load_time_ms': entry.load_time_ms,
+                'loaded_at': entry.loaded_at,
+                'error': entry.error,
+                'attempts': entry.attempts,
+                'description': entry.description
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+def parse_warmup_list(value):
+    """Parse a MODEL_WARMUP style value: comma-separated names, 'all' or empty."""
+    if not value:
+        return []
+    value = value.strip()
+    if value.lower() == 'all':
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def warmup_from_env(registry, env_var='MODEL_WARMUP'):
+    """Preload models listed in the environment.
+
+    MODEL_WARMUP=diabetes,heart preloads those models, MODEL_WARMUP=all preloads
+    everything. Set MODEL_WARMUP_BACKGROUND=true to warm up without blocking startup.
+    """
+    raw = os.getenv(env_var, '')
+    if not raw.strip():
+        return None
+    names = parse_warmup_list(raw)
+    if os.getenv('MODEL_WARMUP_BACKGROUND', 'false').lower() == 'true':
+        return registry.warmup_in_background(names)
+    registry.warmup(names)
+    return None
@@ -20,12 +20,41 @@ class User(db.Model):
     last_login = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Normalized disease of a prediction, for grouping: (category, substrings of
+# disease_type that map to it), checked in order
+DISEASE_CATEGORIES = (
+    ('diabetes', ('diabetes',)),
+    ('heart', ('heart', 'cardio')),
+    ('liver', ('liver',)),
+    ('kidney', ('kidney',)),
+    ('bone', ('bone', 'fracture')),
+)
+
+# The column only takes these names (or NULL for other predictions, e.g. symptom checks)
+DISEASE_CATEGORY_NAMES = tuple(category for category, _ in DISEASE_CATEGORIES)
+
+def disease_category(disease_type):
+    """The DISEASE_CATEGORIES name for a disease_type, or None if it is none of them"""
+    disease = (disease_type or '').lower()
+    for category, keywords in DISEASE_CATEGORIES:
+        if any(keyword in disease for keyword in keywords):
+            return category
+    return None
+
+def _default_disease_category(context):
+    return disease_category(context.get_current_parameters().get('disease_type'))
+
 class Prediction(db.Model):
     __tablename__ = 'predictions'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     disease_type = db.Column(db.String(50), nullable=False)
+    # A VARCHAR with a CHECK constraint rather than a PostgreSQL ENUM type, so the
+    # list can grow without ALTER TYPE and the same DDL works on SQLite
+    disease_category = db.Column(db.Enum(*DISEASE_CATEGORY_NAMES, name='ck_predictions_disease_category',
+                                         native_enum=False, create_constraint=True, length=20),
+                                 default=_default_disease_category)
     prediction_result = db.Column(db.String(50), nullable=False)
     probability = db.Column(db.Float)
     risk_level = db.Column(db.String(50))
@@ -38,6 +67,12 @@ class Prediction(db.Model):
     approval_action = db.Column(db.String(50))
     modified_prediction = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    user = db.relationship('User', foreign_keys=[user_id], backref=db.backref('predictions', lazy=True))
+    
+    # A user's history, newest first, is read a page at a time by (created_at, id)
+    __table_args__ = (db.Index('ix_predictions_user_id_created_at', 'user_id', 'created_at'),)
 
 class DoctorAvailability(db.Model):
     __tablename__ = 'doctor_availability'
@@ -47,6 +82,8 @@ class DoctorAvailability(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     consultation_fee = db.Column(db.Float)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    doctor = db.relationship('User', backref=db.backref('availability', uselist=False))
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
@@ -64,8 +101,10 @@ class Appointment(db.Model):
     is_emergency = db.Column(db.Boolean, default=False)
     video_room_id = db.Column(db.String(100), unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
+    doctor = db.relationship('User', foreign_keys=[doctor_id])
+    patient = db.relationship('User', foreign_keys=[patient_id])
     prescription = db.relationship('Prescription', backref='appointment', uselist=False, cascade='all, delete-orphan')
     messages = db.relationship('ChatMessage', backref='appointment', lazy=True, cascade='all, delete-orphan')
 
@@ -101,6 +140,8 @@ class Consultation(db.Model):
     scheduled_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    patient = db.relationship('User', foreign_keys=[patient_id])
+    doctor = db.relationship('User', foreign_keys=[doctor_id])
     notes = db.relationship('MedicalNote', backref='consultation', lazy=True, cascade='all, delete-orphan')
 
 class MedicalNote(db.Model):
@@ -172,3 +213,46 @@ class TreatmentHistory(db.Model):
     medications = db.Column(db.JSON)
     outcome = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class RiskSummary(db.Model):
+    """Latest and previous risk per user and disease, kept current by risk_summary.py as predictions are written"""
+    __tablename__ = 'risk_summaries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    disease = db.Column(db.String(50), nullable=False)
+    latest_risk = db.Column(db.Float)
+    previous_risk = db.Column(db.Float)
+    latest_risk_level = db.Column(db.String(50))
+    trend = db.Column(db.String(20), default='stable')
+    count = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    latest_prediction_id = db.Column(db.String(36))
+    latest_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'disease', name='uq_risk_summaries_user_disease'),)
+
+class RiskForecast(db.Model):
+    """Forecast of one user's risk for one disease, written by the risk_forecast.py batch job"""
+    __tablename__ = 'risk_forecasts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    disease = db.Column(db.String(50), nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    current_risk = db.Column(db.Float)
+    ewma_risk = db.Column(db.Float)
+    slope_per_day = db.Column(db.Float)
+    horizon_days = db.Column(db.Integer)
+    forecast_risk = db.Column(db.Float)
+    forecast_lower = db.Column(db.Float)
+    forecast_upper = db.Column(db.Float)
+    trend = db.Column(db.String(20))
+    change_point_at = db.Column(db.DateTime)
+    risk_before_change = db.Column(db.Float)
+    risk_after_change = db.Column(db.Float)
+    latest_at = db.Column(db.DateTime)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('user_id', 'disease', name='uq_risk_forecasts_user_disease'),)
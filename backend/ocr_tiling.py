@@ -0,0 +1,261 @@
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+from process_pool import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+TILED_STAGES = ('downscale', 'split', 'preprocess', 'recognize', 'ocr_wall', 'merge')
+
+_worker_readers = {}
+
+
+def preprocess_image_for_ocr(img):
+    """Enhance image quality for better OCR results"""
+    try:
+        import cv2
+
+        # Convert PIL to OpenCV format
+        img_array = np.array(img)
+
+        # Convert to grayscale
+        if len(img_array.shape) == 3:
+            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        else:
+            gray = img_array
+
+        # Apply thresholding to get better contrast
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        # Denoise
+        denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
+
+        # Increase contrast
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        enhanced = clahe.apply(denoised)
+
+        return enhanced
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed: {e}, using original")
+        return np.array(img)
+
+
+def cpu_reader():
+    """EasyOCR reader for a worker process. Workers split the CPU between them, so no GPU."""
+    import easyocr
+    return easyocr.Reader(['en'], gpu=False)
+
+
+def strip_bounds(height, strip_height, overlap):
+    """Split [0, height) into overlapping strips. Returns [(top, bottom, core_top, core_bottom)].
+
+    The core of a strip is the part it owns: half of each overlap goes to the
+    strips on either side, so every row of the image is in exactly one core.
+    """
+    strip_height = max(int(strip_height), 1)
+    overlap = min(max(int(overlap), 0), strip_height - 1)
+    step = strip_height - overlap
+    strips = []
+    top = 0
+    while True:
+        bottom = min(top + strip_height, height)
+        strips.append([top, bottom])
+        if bottom >= height:
+            break
+        top += step
+
+    bounds = []
+    for i, (top, bottom) in enumerate(strips):
+        core_top = 0 if i == 0 else (top + strips[i - 1][1]) // 2
+        core_bottom = height if i == len(strips) - 1 else (strips[i + 1][0] + bottom) // 2
+        bounds.append((top, bottom, core_top, core_bottom))
+    return bounds
+
+
+def load_worker_reader(reader_factory=cpu_reader):
+    """Pool initializer: build the worker's OCR reader before its first strip arrives."""
+    try:
+        _worker_readers[reader_factory] = reader_factory()
+    except Exception as e:
+        # Left for ocr_strip to retry, so the error reaches the caller instead of breaking the pool
+        logger.warning(f"OCR worker could not load its reader: {e}")
+
+
+def ocr_strip(strip, top, core_top, core_bottom, scale, reader_factory=cpu_reader, batch_size=4):
+    """Denoise and recognize one strip. Runs in a worker process.
+
+    Returns (results, timings). results are EasyOCR-style (bbox, text, conf)
+    tuples in the coordinates of the original, full-size image, keeping only
+    boxes whose vertical center falls in this strip's core.
+    """
+    reader = _worker_readers.get(reader_factory)
+    if reader is None:
+        reader = _worker_readers[reader_factory] = reader_factory()
+
+    start = time.perf_counter()
+    enhanced = preprocess_image_for_ocr(strip)
+    preprocessed = time.perf_counter()
+    raw = reader.readtext(enhanced, detail=1, paragraph=False, batch_size=batch_size)
+    recognized = time.perf_counter()
+
+    results = []
+    for bbox, text, conf in raw:
+        center_y = top + sum(point[1] for point in bbox) / len(bbox)
+        if not core_top <= center_y < core_bottom:
+            continue
+        full_bbox = [[float(x) / scale, (float(y) + top) / scale] for x, y in bbox]
+        results.append((full_bbox, text, float(conf)))
+
+    return results, {
+        'preprocess': (preprocessed - start) * 1000,
+        'recognize': (recognized - preprocessed) * 1000
+    }
+
+
+def group_ocr_lines(results, y_threshold=30):
+    """Sort EasyOCR (bbox, text, conf) results by position and join boxes on the same line"""
+    sorted_results = sorted(results, key=lambda x: (x[0][0][1], x[0][0][0]))
+
+    lines = []
+    current_line = []
+    current_y = None
+
+    for bbox, text_block, conf in sorted_results:
+        if conf < 0.2:  # Lower threshold
+            continue
+
+        y_pos = bbox[0][1]
+
+        if current_y is None:
+            current_y = y_pos
+            current_line.append(text_block)
+        elif abs(y_pos - current_y) < y_threshold:
+            current_line.append(text_block)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+            current_line = [text_block]
+            current_y = y_pos
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    return '\n'.join(lines) if lines else None
+
+
+class TiledOCR:
+    """OCR for large page photos: downscale, split into overlapping strips, recognize strips in parallel.
+
+    The page is scaled down to about target_dpi (assuming it spans
+    page_width_in inches), cut into horizontal strips of strip_height pixels
+    that overlap by overlap pixels, and each strip is denoised and recognized
+    in a worker process with its own EasyOCR reader. Boxes are mapped back to
+    the original image's coordinates, so the caller's line grouping works as
+    it does for a single readtext() call.
+    """
+
+    def __init__(self, workers=2, target_dpi=300, page_width_in=8.5, strip_height=800, overlap=80,
+                 reader_factory=cpu_reader):
+        self.workers = max(1, int(workers))
+        self.target_dpi = float(target_dpi)
+        self.page_width_in = float(page_width_in)
+        self.strip_height = int(strip_height)
+        self.overlap = int(overlap)
+        self.reader_factory = reader_factory
+        self._stats_lock = threading.Lock()
+        self._runs = 0
+        self._strips = 0
+        self._totals = {stage: 0.0 for stage in TILED_STAGES}
+        self._last = None
+
+    def readtext(self, img):
+        """Recognize a PIL image. Returns (results, timings) with per-stage times in ms.
+
+        Note that an unloaded JPEG is put in draft mode, so img itself is
+        reduced to roughly the target resolution afterwards.
+        """
+        timings = {}
+        start = time.perf_counter()
+        width, height = img.size
+        source_dpi = width / self.page_width_in
+        scale = min(1.0, self.target_dpi / source_dpi) if source_dpi > 0 else 1.0
+        if scale < 1.0:
+            from PIL import Image
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            # JPEGs not yet loaded are decoded at a reduced size directly
+            img.draft('RGB', size)
+            img = img.convert('RGB').resize(size, Image.LANCZOS, reducing_gap=3.0)
+            scale = size[0] / width
+        else:
+            img = img.convert('RGB')
+        page = np.asarray(img)
+        timings['downscale'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        bounds = strip_bounds(page.shape[0], self.strip_height, self.overlap)
+        tasks = [(page[top:bottom], top, core_top, core_bottom) for top, bottom, core_top, core_bottom in bounds]
+        timings['split'] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        if self.workers == 1 or len(tasks) == 1:
+            outputs = [ocr_strip(*task, scale, self.reader_factory) for task in tasks]
+        else:
+            pool = get_process_pool('ocr', self.workers, initializer=load_worker_reader,
+                                    initargs=(self.reader_factory,))
+            futures = [pool.submit(ocr_strip, *task, scale, self.reader_factory) for task in tasks]
+            outputs = [future.result() for future in futures]
+        timings['ocr_wall'] = (time.perf_counter() - start) * 1000
+        # Worker-side stage times are summed over strips (CPU time spent, not wall time)
+        timings['preprocess'] = sum(t['preprocess'] for _, t in outputs)
+        timings['recognize'] = sum(t['recognize'] for _, t in outputs)
+
+        start = time.perf_counter()
+        results = [result for strip_results, _ in outputs for result in strip_results]
+        timings['merge'] = (time.perf_counter() - start) * 1000
+
+        timings = {stage: round(ms, 2) for stage, ms in timings.items()}
+        timings['strips'] = len(tasks)
+        timings['scale'] = round(scale, 4)
+        self._record(timings)
+        logger.info(f"Tiled OCR: {len(results)} boxes from {len(tasks)} strips, timings {timings}")
+        return results, timings
+
+    def _record(self, timings):
+        with self._stats_lock:
+            self._runs += 1
+            self._strips += timings['strips']
+            for stage in TILED_STAGES:
+                self._totals[stage] += timings[stage]
+            self._last = timings
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'target_dpi': self.target_dpi,
+                'strip_height': self.strip_height,
+                'overlap': self.overlap,
+                'runs': self._runs,
+                'mean_strips': round(self._strips / self._runs, 2) if self._runs else 0,
+                'mean_stage_ms': {
+                    stage: round(total / self._runs, 2) if self._runs else 0
+                    for stage, total in self._totals.items()
+                },
+                'last': self._last
+            }
+
+
+def ocr_settings():
+    """Read OCR settings from the environment."""
+    return {
+        'mode': os.getenv('OCR_MODE', 'single').lower(),
+        'min_pixels': int(float(os.getenv('OCR_TILED_MIN_MEGAPIXELS', '4')) * 1_000_000),
+        'workers': int(os.getenv('OCR_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        'target_dpi': float(os.getenv('OCR_TARGET_DPI', '300')),
+        'strip_height': int(os.getenv('OCR_STRIP_HEIGHT', '800')),
+        'overlap': int(os.getenv('OCR_STRIP_OVERLAP', '80'))
+    }
@@ -0,0 +1,321 @@
+import re
+import logging
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+TABLE_HEADER_KEYWORDS = ['test', 'investigation', 'parameter', 'result', 'value', 'reference', 'range', 'unit', 'normal']
+TABLE_UNIT_HINTS = ['g/dl', 'mg/dl', 'iu/l', 'mmol', 'cells', '%']
+NEAR_VALUE_WINDOW = 100
+
+_COLUMN_SPLIT = re.compile(r'\s{2,}|\t')
+_LEADING_NUMBER = re.compile(r'([0-9.]+)')
+_VALUE_AFTER_SEPARATOR = re.compile(r'[:\s=-]+([0-9.]+)')
+_REFERENCE_RANGE = re.compile(r'([0-9.]+)\s*[-to]+\s*([0-9.]+)', re.IGNORECASE)
+
+
+def trie_pattern(words):
+    """Build a regex that matches the longest of words at a position.
+
+    The words are folded into a trie and emitted as nested groups, so the
+    engine follows one branch per character instead of trying every word.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class ParameterExtractor:
+    """Single-pass lab parameter extractor, equivalent to the per-parameter scan in app.py.
+
+    All aliases are compiled into one trie regex that is run once over the
+    lowercased report. Each hit is mapped to its line, which gives every
+    parameter the ordered list of lines mentioning it. The per-line work
+    (table columns, first value, reference range) does not depend on the
+    parameter, so it is done at most once per line and shared. Parameters
+    are then resolved in the original priority order: table row, matching
+    line, then the first value near an alias anywhere in the text.
+
+    classify_status, parse_range and recommend are the app's
+    classify_value_status, parse_reference_range and get_health_recommendations.
+    """
+
+    def __init__(self, parameters, classify_status, parse_range, recommend):
+        self.parameters = parameters
+        self.classify_status = classify_status
+        self.parse_range = parse_range
+        self.recommend = recommend
+
+        self._line_aliases = {}
+        self._near_aliases = {}
+        self._patterns = {}
+        alias_params = {}
+        for key, info in parameters.items():
+            line_aliases = [a.lower() for a in info.get('aliases', [info['name']]) if a]
+            self._line_aliases[key] = line_aliases
+            self._near_aliases[key] = [a.lower() for a in info.get('aliases', []) if a]
+            self._patterns[key] = re.compile(info['pattern'])
+            for alias in line_aliases:
+                alias_params.setdefault(alias, [])
+                if key not in alias_params[alias]:
+                    alias_params[alias].append(key)
+            for alias in self._near_aliases[key]:
+                alias_params.setdefault(alias, [])
+
+        # A hit on alias L at some position is also a hit for every alias that is a prefix of L
+        aliases = list(alias_params)
+        self._hits_for = {
+            longest: [(alias, alias_params[alias]) for alias in aliases if longest.startswith(alias)]
+            for longest in aliases
+        }
+        self._alias_regex = re.compile(f'(?=({trie_pattern(aliases)}))')
+        self._header_regex = re.compile('|'.join(re.escape(k) for k in TABLE_HEADER_KEYWORDS))
+
+    def extract(self, text):
+        """Return the same list of parameter dicts as the scan-based analyze_parameters."""
+        if not text:
+            return []
+        scan = self.scan()
+        scan.feed(text)
+        return scan.finish(text)
+
+    def scan(self):
+        """Start an incremental scan; feed() it text as it arrives (e.g. page by page) and call finish()."""
+        return ParameterScan(self)
+
+    def resolve(self, text, param_lines, first_seen, header_line):
+        """Resolve every parameter from the alias hits of a finished scan over text."""
+        lines = text.split('\n')
+        lower_lines = text.lower().split('\n')
+        state = _ReportState(lines)
+        results = []
+        for key, info in self.parameters.items():
+            result = (self._from_table(key, info, param_lines[key], header_line, state)
+                      or self._from_lines(key, info, param_lines[key], lower_lines, state)
+                      or self._from_nearby_text(key, info, text, first_seen))
+            if result:
+                results.append(result)
+
+        logger.info(f"Final extraction: {len(results)} unique parameters")
+        return results
+
+    def _result(self, key, info, value, unit, status, normal_range, recommend_value=None):
+        return {
+            'key': key,
+            'parameter': info['name'],
+            'value': value,
+            'unit': unit,
+            'status': status,
+            'normal_range': normal_range,
+            'recommendations': self.recommend(
+                key, status.lower().replace('_', ' '), value if recommend_value is None else recommend_value
+            )
+        }
+
+    def _from_table(self, key, info, hit_lines, header_line, state):
+        for line_no in hit_lines:
+            if line_no <= header_line:
+                continue
+            reading = state.table_reading(line_no)
+            if reading is None:
+                continue
+            value, ref_range, unit = reading
+
+            normal_range = info['normal']
+            if ref_range:
+                ref_min, ref_max = self.parse_range(ref_range)
+                if ref_min is not None and ref_max is not None:
+                    normal_range = (ref_min, ref_max)
+
+            # Blood pressure is never read from table rows
+            if key == 'blood_pressure':
+                continue
+
+            status = self.classify_status(value, normal_range, info.get('borderline'))
+            return self._result(key, info, str(value), unit if unit is not None else info.get('unit', ''),
+                                status, f"{normal_range[0]}-{normal_range[1]}", value)
+        return None
+
+    def _from_lines(self, key, info, hit_lines, lower_lines, state):
+        if key == 'blood_pressure':
+            pattern = self._patterns[key]
+            for line_no in hit_lines:
+                match = pattern.search(lower_lines[line_no])
+                if match and match.group(1) and match.group(2):
+                    systolic = float(match.group(1))
+                    diastolic = float(match.group(2))
+                    value_str = f"{systolic}/{diastolic}"
+                    status = 'HIGH' if systolic >= 130 or diastolic >= 85 else ('BORDERLINE_HIGH' if systolic >= 120 or diastolic >= 80 else 'NORMAL')
+                    return self._result(key, info, value_str, info['unit'], status, '<120/<80')
+            return None
+
+        for line_no in hit_lines:
+            reading = state.line_reading(line_no)
+            if reading is None:
+                continue
+            value, ref_range = reading
+            try:
+                normal_min, normal_max = ref_range or info['normal']
+                status = self.classify_status(value, (normal_min, normal_max), info.get('borderline'))
+                return self._result(key, info, str(value), info['unit'], status, f"{normal_min}-{normal_max}", value)
+            except ValueError:
+                continue
+        return None
+
+    def _from_nearby_text(self, key, info, text, first_seen):
+        for alias in self._near_aliases[key]:
+            pos = first_seen.get(alias)
+            if pos is None:
+                continue
+            match = _VALUE_AFTER_SEPARATOR.search(text[pos:pos + NEAR_VALUE_WINDOW])
+            if not match:
+                continue
+            try:
+                value = float(match.group(1))
+                normal_min, normal_max = info['normal']
+                status = self.classify_status(value, (normal_min, normal_max), info.get('borderline'))
+                return self._result(key, info, str(value), info['unit'], status, f"{normal_min}-{normal_max}", value)
+            except ValueError:
+                continue
+        return None
+
+
+class ParameterScan:
+    """Alias hits collected so far for a report that arrives in pieces.
+
+    Each feed() takes one or more complete lines; pieces are treated as if
+    joined with newlines. Scanning happens as the text arrives, so only the
+    cheap resolve step is left for finish().
+    """
+
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.pieces = []
+        self.param_lines = {key: [] for key in extractor.parameters}
+        self.first_seen = {}
+        self.header_line = None
+        self._offset = 0
+        self._line_count = 0
+
+    def feed(self, text):
+        text_lower = text.lower()
+        line_starts = [0]
+        line_starts.extend(m.end() for m in re.finditer('\n', text_lower))
+
+        for match in self.extractor._alias_regex.finditer(text_lower):
+            pos = match.start()
+            line_no = self._line_count + bisect_right(line_starts, pos) - 1
+            for alias, keys in self.extractor._hits_for[match.group(1)]:
+                if alias not in self.first_seen:
+                    self.first_seen[alias] = self._offset + pos
+                for key in keys:
+                    hits = self.param_lines[key]
+                    if not hits or hits[-1] != line_no:
+                        hits.append(line_no)
+
+        if self.header_line is None:
+            header = self.extractor._header_regex.search(text_lower)
+            if header:
+                self.header_line = self._line_count + bisect_right(line_starts, header.start()) - 1
+
+        self.pieces.append(text)
+        self._offset += len(text_lower) + 1
+        self._line_count += len(line_starts)
+
+    def text(self):
+        return '\n'.join(self.pieces)
+
+    def finish(self, text=None):
+        """Resolve parameters for text (by default, everything fed so far).
+
+        text may drop trailing whitespace from what was fed; any other
+        difference means the hits do not apply, and text is scanned afresh.
+        """
+        fed = self.text()
+        if text is None:
+            text = fed
+        elif text != fed and text != fed.rstrip():
+            return self.extractor.extract(text)
+        if not text:
+            return []
+        header_line = self.header_line if self.header_line is not None else self._line_count
+        return self.extractor.resolve(text, self.param_lines, self.first_seen, header_line)
+
+
+class _ReportState:
+    """Per-line readings for one report, computed on first use and shared by all parameters."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._table = {}
+        self._line = {}
+
+    def table_reading(self, line_no):
+        """(value, reference_range, unit) from a table row, or None if the line has no value column.
+
+        A malformed value such as '1.2.3' raises ValueError, as the scan-based
+        extractor does, so it is deliberately not caught here.
+        """
+        if line_no in self._table:
+            return self._table[line_no]
+
+        reading = None
+        data_line = self.lines[line_no].strip()
+        if data_line and len(data_line) >= 5:
+            parts = _COLUMN_SPLIT.split(data_line)
+            if len(parts) >= 2:
+                for part in parts[1:]:
+                    value_match = _LEADING_NUMBER.match(part.strip())
+                    if value_match:
+                        value = float(value_match.group(1))
+                        ref_range = next(
+                            (p.strip() for p in parts[2:] if '-' in p or 'to' in p.lower() or '<' in p or '>' in p),
+                            None
+                        )
+                        unit = next(
+                            (p.strip() for p in parts[1:] if any(u in p.lower() for u in TABLE_UNIT_HINTS)),
+                            None
+                        )
+                        reading = (value, ref_range, unit)
+                        break
+
+        self._table[line_no] = reading
+        return reading
+
+    def line_reading(self, line_no):
+        """(value, reference_range or None) for a free-text line, or None if it has no usable value."""
+        if line_no in self._line:
+            return self._line[line_no]
+
+        reading = None
+        line = self.lines[line_no]
+        value_match = _VALUE_AFTER_SEPARATOR.search(line)
+        if value_match:
+            try:
+                value = float(value_match.group(1))
+                ref_range = None
+                ref_match = _REFERENCE_RANGE.search(line)
+                if ref_match:
+                    ref_min = float(ref_match.group(1))
+                    ref_max = float(ref_match.group(2))
+                    # Use the printed range only if it is plausible for this value
+                    if ref_min < value < ref_max * 2:
+                        ref_range = (ref_min, ref_max)
+                reading = (value, ref_range)
+            except ValueError:
+                reading = None
+
+        self._line[line_no] = reading
+        return reading
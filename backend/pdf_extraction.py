@@ -0,0 +1,150 @@
+import io
+import os
+import logging
+import tempfile
+from collections import namedtuple
+
+import PyPDF2
+
+from process_pool import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+OCR_OFF = 'off'          # text layer only
+OCR_MISSING = 'missing'  # OCR only pages without a text layer
+OCR_ALL = 'all'          # OCR every page that has an embedded image
+OCR_MODES = (OCR_OFF, OCR_MISSING, OCR_ALL)
+
+# One page of a PDF. image holds the bytes of the page's largest embedded
+# image when the OCR mode asks for it, otherwise None.
+PdfPage = namedtuple('PdfPage', ['number', 'text', 'image'])
+
+
+def _largest_image(page):
+    try:
+        images = page.images
+    except Exception as e:
+        logger.warning(f"Could not read images from PDF page: {e}")
+        return None
+    best = None
+    for image in images:
+        if best is None or len(image.data) > len(best):
+            best = image.data
+    return best
+
+
+def _read_pages(reader, start, stop, ocr_mode, ocr_max_pages):
+    for number in range(start, stop):
+        page = reader.pages[number]
+        try:
+            text = page.extract_text() or ''
+        except Exception as e:
+            logger.warning(f"PDF page {number + 1} text extraction failed: {e}")
+            text = ''
+        image = None
+        if number < ocr_max_pages and (ocr_mode == OCR_ALL or (ocr_mode == OCR_MISSING and not text.strip())):
+            image = _largest_image(page)
+        yield PdfPage(number, text, image)
+
+
+def extract_page_range(path, start, stop, ocr_mode=OCR_OFF, ocr_max_pages=10):
+    """Extract pages [start, stop) of the PDF at path. Returns a list of PdfPage.
+
+    Runs in worker processes, so it only uses PyPDF2 and returns plain data.
+    A page that fails to parse comes back with empty text.
+    """
+    with open(path, 'rb') as f:
+        return list(_read_pages(PyPDF2.PdfReader(f), start, stop, ocr_mode, ocr_max_pages))
+
+
+def iter_pdf_pages(file_bytes, max_pages=200, workers=1, pages_per_task=8, parallel_min_pages=16,
+                   ocr_mode=OCR_OFF, ocr_max_pages=10):
+    """Yield PdfPage objects in page order as soon as each one is read.
+
+    At most max_pages pages are read, and page images for OCR are only taken
+    from the first ocr_max_pages of them: OCR runs in the request and costs
+    seconds per page. Documents with at least
+    parallel_min_pages pages are split into ranges of pages_per_task pages
+    that are read in a process pool. Pages are still yielded in order, so the
+    caller can start on the first range while later ranges are being read.
+    Smaller documents, or workers <= 1, are read in this process.
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+    total = len(reader.pages)
+    count = min(total, max_pages) if max_pages else total
+    if count < total:
+        logger.warning(f"PDF has {total} pages; only the first {count} will be read")
+
+    if workers <= 1 or count < parallel_min_pages:
+        yield from _read_pages(reader, 0, count, ocr_mode, ocr_max_pages)
+        return
+
+    # Workers read the PDF from a temp file instead of each getting a copy of the bytes
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    futures = []
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(file_bytes)
+        ranges = [(start, min(start + pages_per_task, count)) for start in range(0, count, pages_per_task)]
+        pool = get_process_pool('pdf', workers)
+        futures = [pool.submit(extract_page_range, path, start, stop, ocr_mode, ocr_max_pages) for start, stop in ranges]
+        for (start, stop), future in zip(ranges, futures):
+            try:
+                pages = future.result()
+            except Exception as e:
+                logger.warning(f"PDF pages {start + 1}-{stop} failed in worker ({e}); reading them here")
+                pages = extract_page_range(path, start, stop, ocr_mode, ocr_max_pages)
+            yield from pages
+    finally:
+        # Stop queued ranges if the caller gave up early
+        for future in futures:
+            future.cancel()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def pdf_text(file_bytes, ocr=None, on_page=None, **settings):
+    """The text of a PDF, pages joined by newlines, or None if it has none.
+
+    Pages come from iter_pdf_pages(file_bytes, **settings). A page read with
+    an image is passed to ocr(image_bytes), whose text (if any) replaces the
+    page's text layer. on_page, if given, is called with each non-empty
+    page's text as soon as it is read, so the caller can start analyzing
+    early pages while later ones are read.
+    """
+    pages = []
+    for page in iter_pdf_pages(file_bytes, **settings):
+        page_text = page.text
+        if page.image is not None and ocr is not None:
+            ocr_text = ocr(page.image)
+            if ocr_text:
+                logger.info(f"OCR read {len(ocr_text)} characters from PDF page {page.number + 1}")
+                page_text = ocr_text
+        if not pages:
+            # Leading whitespace is dropped, as strip() on the joined text would
+            page_text = page_text.lstrip()
+        if not page_text:
+            continue
+        pages.append(page_text)
+        if on_page:
+            on_page(page_text)
+    text = '\n'.join(pages).strip()
+    return text if text else None
+
+
+def pdf_settings():
+    """Read PDF extraction settings from the environment."""
+    ocr_mode = os.getenv('PDF_OCR_MODE', OCR_OFF).lower()
+    if ocr_mode not in OCR_MODES:
+        logger.warning(f"Unknown PDF_OCR_MODE '{ocr_mode}', using '{OCR_OFF}'")
+        ocr_mode = OCR_OFF
+    return {
+        'max_pages': int(os.getenv('PDF_MAX_PAGES', '200')),
+        'workers': int(os.getenv('PDF_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        'pages_per_task': int(os.getenv('PDF_PAGES_PER_TASK', '8')),
+        'parallel_min_pages': int(os.getenv('PDF_PARALLEL_MIN_PAGES', '16')),
+        'ocr_mode': ocr_mode,
+        'ocr_max_pages': int(os.getenv('PDF_OCR_MAX_PAGES', '10'))
+    }
@@ -0,0 +1,171 @@
+import os
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+
+from flask import current_app
+
+from models import db, Prediction
+from risk_summary import add_predictions
+
+logger = logging.getLogger(__name__)
+
+MODES = ('sync', 'write_behind')
+
+_predictions = Prediction.__table__
+
+
+class PredictionWriter:
+    """Saves predictions, either in the request's own transaction or write-behind.
+
+    In 'sync' mode save() inserts and commits before returning, as a plain
+    db.session.add/commit would. In 'write_behind' mode save() queues the row
+    and returns at once; a background thread inserts the queue in batches,
+    every flush_seconds or as soon as batch_size rows are waiting, in one
+    transaction with one executemany per set of columns (and the risk summary
+    updates).
+
+    Either way save() returns the prediction id, which is generated here, so
+    callers can hand it out before the row is written. Durability in
+    write-behind mode: a prediction is on disk within about flush_seconds;
+    queued rows are flushed on a normal exit, but lost if the process is
+    killed. Until then it is not visible to queries, so callers that read it
+    back straight away (or must not lose it) pass sync=True. If the queue is
+    full, save() writes synchronously instead of dropping the prediction.
+    """
+
+    def __init__(self, mode='sync', flush_seconds=0.5, batch_size=200, max_queue=10000):
+        if mode not in MODES:
+            raise ValueError(f"PREDICTION_WRITE_MODE must be one of: {', '.join(MODES)}")
+        self.mode = mode
+        self.flush_seconds = float(flush_seconds)
+        self.batch_size = max(1, int(batch_size))
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread = None
+        self._stats = {'saved_sync': 0, 'queued': 0, 'queue_full': 0, 'flushes': 0, 'written': 0,
+                       'failed': 0, 'last_batch': 0}
+
+    def save(self, sync=False, **fields):
+        """Save a prediction from Prediction column values; returns its id."""
+        if sync or self.mode == 'sync':
+            return self._save_now(fields)
+
+        now = datetime.utcnow()
+        row = {'id': str(uuid.uuid4()), 'status': 'pending_review', 'created_at': now, 'updated_at': now}
+        row.update(fields)
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._stats['queue_full'] += 1
+            return self._save_now(fields, row['id'])
+        with self._lock:
+            self._stats['queued'] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return row['id']
+
+    def _save_now(self, fields, prediction_id=None):
+        pred = Prediction(**fields)
+        if prediction_id:
+            pred.id = prediction_id
+        db.session.add(pred)
+        db.session.commit()
+        with self._lock:
+            self._stats['saved_sync'] += 1
+        return str(pred.id)
+
+    def _ensure_thread(self):
+        # Started on the first queued save, inside a request, so the app is at hand
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._app = current_app._get_current_object()
+                self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Prediction flush failed: {e}", exc_info=True)
+
+    def flush(self):
+        """Write every queued prediction now; returns the number written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = []
+                while len(rows) < self.batch_size:
+                    try:
+                        rows.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not rows:
+                    return written
+                written += self._write(rows)
+
+    def _write(self, rows):
+        with self._app.app_context():
+            try:
+                self._insert(rows)
+                written = len(rows)
+            except Exception as e:
+                # One bad row (e.g. a deleted user) must not lose the rest of the batch
+                logger.error(f"Batch insert of {len(rows)} predictions failed, retrying one by one: {e}")
+                written = 0
+                for row in rows:
+                    try:
+                        self._insert([row])
+                        written += 1
+                    except Exception as e:
+                        logger.error(f"Dropped prediction {row['id']} of user {row.get('user_id')}: {e}")
+        with self._lock:
+            self._stats['flushes'] += 1
+            self._stats['written'] += written
+            self._stats['failed'] += len(rows) - written
+            self._stats['last_batch'] = len(rows)
+        return written
+
+    def _insert(self, rows):
+        # An executemany takes its columns from the first row, so rows are grouped by the
+        # columns they set (callers differ, e.g. symptom checks add original_prediction);
+        # columns a row leaves out get NULL or their default, as with an ORM insert
+        shapes = {}
+        for row in rows:
+            shapes.setdefault(frozenset(row), []).append(row)
+        with db.engine.begin() as conn:
+            for shape in shapes.values():
+                conn.execute(_predictions.insert(), shape)
+            add_predictions(conn, [SimpleNamespace(**row) for row in rows])
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({'mode': self.mode, 'queue_depth': self._queue.qsize(), 'flush_seconds': self.flush_seconds,
+                      'batch_size': self.batch_size})
+        return stats
+
+
+def prediction_writer_settings():
+    """Read prediction persistence settings from the environment."""
+    return {
+        'mode': os.getenv('PREDICTION_WRITE_MODE', 'sync'),
+        'flush_seconds': float(os.getenv('PREDICTION_FLUSH_MS', '500')) / 1000,
+        'batch_size': int(os.getenv('PREDICTION_FLUSH_BATCH', '200')),
+        'max_queue': int(os.getenv('PREDICTION_QUEUE_SIZE', '10000'))
+    }
@@ -0,0 +1,40 @@
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Imported once by the fork server, so each worker starts with the pool task code loaded
+WORKER_MODULES = ['pdf_extraction', 'ocr_tiling']
+
+
+def _context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(WORKER_MODULES)
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def get_process_pool(name, workers, initializer=None, initargs=()):
+    """Shared process pool for CPU-bound work, created on first use in each app process.
+
+    Workers are not forked from the app: by the time a pool is needed the app
+    process runs request, writer and sweeper threads and may have imported
+    torch, whose locks and thread pools do not survive a fork. They come from
+    a fork server (a fresh interpreter that has imported only WORKER_MODULES)
+    or, where there is none, are spawned. initializer(*initargs) runs once in
+    each worker, e.g. to load a model, and is taken from the first caller for
+    a given name.
+
+    Like spawned workers, these import the app's main module as __mp_main__,
+    so anything app.py starts on import is guarded against that name.
+    """
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=_context(), initializer=initializer,
+                                       initargs=initargs)
+            _pools[name] = pool
+        return pool
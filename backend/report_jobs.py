@@ -0,0 +1,230 @@
+import os
+import json
+import uuid
+import time
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+DEFAULT_JOB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_jobs')
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS report_jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        stage TEXT,
+        progress INTEGER NOT NULL DEFAULT 0,
+        filename TEXT NOT NULL,
+        owner TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        status_code INTEGER,
+        result TEXT,
+        error TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, created_at)'
+)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ReportJobQueue:
+    """Runs report analyses in a bounded thread pool and keeps job state in SQLite.
+
+    The job row and the uploaded bytes live on disk, so a job queued or running
+    in a worker that dies is picked up again by the next process that starts a
+    queue on the same directory. runner(filename, file_bytes, progress) must
+    return (payload, status_code); progress(stage, percent) updates the row.
+    """
+
+    def __init__(self, runner, job_dir=DEFAULT_JOB_DIR, max_workers=2, max_pending=50, ttl_hours=24):
+        self.runner = runner
+        self.job_dir = job_dir
+        self.input_dir = os.path.join(job_dir, 'inputs')
+        self.db_path = os.path.join(job_dir, 'jobs.sqlite3')
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl_seconds = float(ttl_hours) * 3600
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+        os.makedirs(self.input_dir, exist_ok=True)
+        self._db = SQLiteStore(self.db_path, SCHEMA)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='report-job')
+        return self._executor
+
+    def _input_path(self, job_id):
+        return os.path.join(self.input_dir, job_id)
+
+    def submit(self, filename, file_bytes):
+        """Queue an analysis and return the new job id. Raises QueueFullError when backed up."""
+        self.cleanup_expired()
+        with self._db.connect() as conn:
+            pending = conn.execute(
+                'SELECT COUNT(*) FROM report_jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} report jobs already pending")
+
+            job_id = uuid.uuid4().hex
+            with open(self._input_path(job_id), 'wb') as f:
+                f.write(file_bytes)
+            now = time.time()
+            conn.execute(
+                'INSERT INTO report_jobs (id, status, stage, progress, filename, created_at, updated_at) '
+                'VALUES (?, ?, ?, 0, ?, ?, ?)',
+                (job_id, QUEUED, QUEUED, filename, now, now)
+            )
+
+        self._pool().submit(self._run, job_id)
+        logger.info(f"Queued report job {job_id} for {filename}")
+        return job_id
+
+    def _claim(self, job_id):
+        """Mark a queued job as running by this process. Returns False if someone else has it."""
+        return self._db.execute(
+            'UPDATE report_jobs SET status = ?, stage = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?',
+            (RUNNING, 'starting', self.owner, time.time(), job_id, QUEUED)
+        ) == 1
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        self._db.execute(f'UPDATE report_jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def _run(self, job_id):
+        if not self._claim(job_id):
+            return
+        row = self.get(job_id)
+        input_path = self._input_path(job_id)
+        try:
+            with open(input_path, 'rb') as f:
+                file_bytes = f.read()
+
+            def progress(stage, percent):
+                self._update(job_id, stage=stage, progress=int(percent))
+
+            payload, status_code = self.runner(row['filename'], file_bytes, progress)
+            status = SUCCEEDED if status_code < 400 else FAILED
+            self._update(
+                job_id, status=status, stage='done', progress=100, status_code=status_code,
+                result=json.dumps(payload), error=payload.get('error') if status == FAILED else None
+            )
+            logger.info(f"Report job {job_id} finished with status {status_code}")
+        except Exception as e:
+            logger.error(f"Report job {job_id} crashed: {str(e)}", exc_info=True)
+            self._update(job_id, status=FAILED, stage='done', progress=100, status_code=500, error=str(e))
+        finally:
+            if os.path.exists(input_path):
+                os.remove(input_path)
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it does not exist."""
+        row = self._db.query_one('SELECT * FROM report_jobs WHERE id = ?', (job_id,))
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def recover(self):
+        """Requeue jobs left queued, or running under a process that no longer exists."""
+        hostname = socket.gethostname()
+        rows = self._db.query('SELECT id, status, owner FROM report_jobs WHERE status IN (?, ?)', (QUEUED, RUNNING))
+
+        requeued = 0
+        for row in rows:
+            if row['status'] == RUNNING and not _owner_is_dead(row['owner'], hostname):
+                continue
+            if not os.path.exists(self._input_path(row['id'])):
+                self._update(row['id'], status=FAILED, stage='done', progress=100, status_code=500,
+                             error='Uploaded file was lost before the job could run')
+                continue
+            changed = self._db.execute(
+                'UPDATE report_jobs SET status = ?, stage = ?, progress = 0, owner = NULL, updated_at = ? '
+                'WHERE id = ? AND status = ? AND owner IS ?',
+                (QUEUED, QUEUED, time.time(), row['id'], row['status'], row['owner'])
+            )
+            if changed == 1:
+                self._pool().submit(self._run, row['id'])
+                requeued += 1
+
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted report job(s)")
+        return requeued
+
+    def cleanup_expired(self):
+        """Delete finished jobs older than the TTL. Runs at most once a minute."""
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return 0
+        self._last_cleanup = now
+        return self._db.execute(
+            'DELETE FROM report_jobs WHERE status IN (?, ?) AND updated_at < ?',
+            (*FINISHED_STATES, now - self.ttl_seconds)
+        )
+
+    def stats(self):
+        counts = self._db.count_by('report_jobs', 'status')
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'jobs': {state: counts.get(state, 0) for state in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        }
+
+
+def _owner_is_dead(owner, hostname):
+    """True if owner (host:pid) names a process on this host that has exited.
+
+    Our own pid counts as dead: recover() runs before this process claims any
+    job, so a running row with our pid was left by an earlier process (pid reuse
+    is common in containers).
+    """
+    if not owner:
+        return True
+    host, _, pid = owner.rpartition(':')
+    if host != hostname:
+        return False
+    try:
+        pid = int(pid)
+        if pid == os.getpid():
+            return True
+        os.kill(pid, 0)
+    except (ValueError, ProcessLookupError):
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def report_job_settings():
+    """Read report job queue settings from the environment."""
+    return {
+        'job_dir': os.getenv('REPORT_JOB_DIR', DEFAULT_JOB_DIR),
+        'max_workers': int(os.getenv('REPORT_JOB_WORKERS', '2')),
+        'max_pending': int(os.getenv('REPORT_JOB_MAX_PENDING', '50')),
+        'ttl_hours': float(os.getenv('REPORT_JOB_TTL_HOURS', '24'))
+    }
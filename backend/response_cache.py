@@ -0,0 +1,198 @@
+import os
+import copy
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Kept between two digits, for decimals, ratios and times
+_NUMBER_SEPARATORS = '.,/:'
+
+
+def normalize_prompt(text):
+    """Casefold, drop punctuation and collapse whitespace, so trivially different prompts share a key.
+
+    Letters (with their combining marks) and digits of any script are kept,
+    so prompts in Hindi do not all normalize to ''; so are the separators
+    inside numbers, so '5.5' and '55' differ. A prompt with no letters or
+    digits normalizes to '' and is never cached.
+    """
+    text = text.casefold()
+    chars = []
+    for i, ch in enumerate(text):
+        if unicodedata.category(ch)[0] in 'LMN':
+            chars.append(ch)
+        elif (ch in _NUMBER_SEPARATORS and 0 < i < len(text) - 1
+              and text[i - 1].isdigit() and text[i + 1].isdigit()):
+            chars.append(ch)
+        else:
+            chars.append(' ')
+    return ' '.join(''.join(chars).split())
+
+
+def prompt_variant(name, system_prompt):
+    """Name plus a short hash of the system prompt, so editing the prompt retires its cached answers."""
+    return f"{name}:{hashlib.sha1(system_prompt.encode('utf-8')).hexdigest()[:8]}"
+
+
+class _VariantIndex:
+    """Unit embeddings of the cached prompts of one variant, for cosine-similarity lookups."""
+
+    def __init__(self):
+        self.keys = []
+        self.vectors = []
+        self._matrix = None
+
+    def add(self, key, vector):
+        self.keys.append(key)
+        self.vectors.append(vector)
+        self._matrix = None
+
+    def remove(self, key):
+        if key in self.keys:
+            i = self.keys.index(key)
+            del self.keys[i]
+            del self.vectors[i]
+            self._matrix = None
+
+    def best(self, vector):
+        if not self.keys:
+            return None, 0.0
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors)
+        scores = self._matrix @ vector
+        i = int(np.argmax(scores))
+        return self.keys[i], float(scores[i])
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM answers, keyed by prompt variant and normalized prompt.
+
+    A lookup first tries the exact normalized prompt. If encode is given
+    (text -> embedding vector, or None when no encoder is available), a miss
+    then falls back to the most similar cached prompt of the same variant,
+    when its cosine similarity is at least similarity_threshold. Entries live
+    in this process only.
+    """
+
+    def __init__(self, max_items=1000, ttl_seconds=24 * 3600, encode=None, similarity_threshold=0.95,
+                 enabled=True):
+        self.max_items = max(1, int(max_items))
+        self.ttl_seconds = float(ttl_seconds)
+        self.encode = encode
+        self.similarity_threshold = float(similarity_threshold)
+        self.enabled = enabled
+        self._entries = OrderedDict()   # (variant, normalized) -> (value, expires_at)
+        self._indexes = {}              # variant -> _VariantIndex
+        self._lock = threading.Lock()
+        self._stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0,
+                       'expired': 0}
+        self._mean_compute_ms = 0.0
+
+    def _embed(self, normalized):
+        if self.encode is None:
+            return None
+        try:
+            vector = self.encode(normalized)
+        except Exception as e:
+            logger.warning(f"Prompt encoding failed, using exact matches only: {e}")
+            return None
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def _drop(self, key):
+        del self._entries[key]
+        index = self._indexes.get(key[0])
+        if index is not None:
+            index.remove(key)
+
+    def get(self, variant, prompt):
+        """Return (value, match) with match 'exact' or 'similar', or (None, None) on a miss."""
+        normalized = normalize_prompt(prompt)
+        if not self.enabled or not normalized:
+            return None, None
+        key = (variant, normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['exact_hits'] += 1
+                    return copy.deepcopy(entry[0]), 'exact'
+                self._drop(key)
+                self._stats['expired'] += 1
+            has_index = bool(self._indexes.get(variant) and self._indexes[variant].keys)
+
+        vector = self._embed(normalized) if has_index else None
+        with self._lock:
+            if vector is not None and variant in self._indexes:
+                best_key, score = self._indexes[variant].best(vector)
+                entry = self._entries.get(best_key) if best_key is not None else None
+                if entry is not None and score >= self.similarity_threshold and entry[1] > now:
+                    self._entries.move_to_end(best_key)
+                    self._stats['similar_hits'] += 1
+                    return copy.deepcopy(entry[0]), 'similar'
+            self._stats['misses'] += 1
+        return None, None
+
+    def put(self, variant, prompt, value, compute_ms=None):
+        """Store an answer. compute_ms, the time the LLM call took, feeds the 'saved_seconds' stat."""
+        normalized = normalize_prompt(prompt)
+        if not self.enabled or not normalized:
+            return
+        key = (variant, normalized)
+        vector = self._embed(normalized)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (copy.deepcopy(value), time.time() + self.ttl_seconds)
+            if vector is not None:
+                self._indexes.setdefault(variant, _VariantIndex()).add(key, vector)
+            self._stats['stores'] += 1
+            if compute_ms is not None:
+                self._mean_compute_ms = (compute_ms if self._mean_compute_ms == 0
+                                         else 0.9 * self._mean_compute_ms + 0.1 * compute_ms)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            hits = stats['exact_hits'] + stats['similar_hits']
+            lookups = hits + stats['misses']
+            stats.update({
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_items': self.max_items,
+                'ttl_seconds': self.ttl_seconds,
+                'semantic': self.encode is not None,
+                'similarity_threshold': self.similarity_threshold,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0,
+                # Rough LLM time avoided: hits times the (moving) average LLM call time
+                'saved_seconds': round(hits * self._mean_compute_ms / 1000, 1),
+                'variants': {}
+            })
+            for variant, _ in self._entries:
+                stats['variants'][variant] = stats['variants'].get(variant, 0) + 1
+        return stats
+
+
+def response_cache_settings():
+    """Read chatbot response cache settings from the environment."""
+    return {
+        'enabled': os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true',
+        'max_items': int(os.getenv('RESPONSE_CACHE_MAX_ITEMS', '1000')),
+        'ttl_seconds': float(os.getenv('RESPONSE_CACHE_TTL_HOURS', '24')) * 3600,
+        'similarity_threshold': float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.95'))
+    }
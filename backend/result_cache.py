@@ -0,0 +1,263 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_cache')
+
+
+def cache_key(data, version):
+    """Content address for data (bytes or str) as processed by a given model/pipeline version."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    digest = hashlib.sha256()
+    digest.update(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class _NamespaceStats:
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def as_dict(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_ratio': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0
+        }
+
+
+class ResultCache:
+    """Two-tier cache for expensive results of uploaded files (OCR text, parsed values, classifier output).
+
+    Entries are grouped by namespace (e.g. 'report_text', 'bone_fracture') and
+    keyed with cache_key(). A small in-memory LRU sits in front of an optional
+    JSON file store on disk that is shared by all workers. Both tiers expire
+    entries after ttl_seconds; the disk tier drops least recently used files
+    once it grows past max_disk_bytes. Values must be JSON serializable.
+
+    The cached values are patient data (report text, lab values), so the disk
+    tier is off unless disk=True, and then cache_dir is readable by this
+    user only: the directory is 0700 and the files 0600.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_items=256, max_disk_bytes=512 * 1024 * 1024,
+                 ttl_seconds=7 * 24 * 3600, enabled=True, disk=False):
+        self.cache_dir = cache_dir
+        self.memory_items = max(0, int(memory_items))
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+        self.ttl_seconds = float(ttl_seconds)
+        self.enabled = enabled
+        self.disk = disk and self.max_disk_bytes > 0
+        self._dir_ready = False
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._disk_bytes = None
+
+    def _namespace_stats(self, namespace):
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = _NamespaceStats()
+        return stats
+
+    def _path(self, namespace, key):
+        return os.path.join(self.cache_dir, namespace, key[:2], f'{key}.json')
+
+    def get(self, namespace, key):
+        """Return the cached value, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            stats = self._namespace_stats(namespace)
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end((namespace, key))
+                    stats.memory_hits += 1
+                    # Callers get their own copy so they can't alter what later hits see
+                    return copy.deepcopy(value)
+                del self._memory[(namespace, key)]
+
+        value = self._read_disk(namespace, key, now)
+        with self._lock:
+            if value is None:
+                stats.misses += 1
+                return None
+            stats.disk_hits += 1
+        self._remember(namespace, key, value, now)
+        return value
+
+    def put(self, namespace, key, value):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._remember(namespace, key, value, now)
+        with self._lock:
+            self._namespace_stats(namespace).stores += 1
+        self._write_disk(namespace, key, value, now)
+
+    def get_or_compute(self, namespace, key, compute, should_cache=None):
+        """Return the cached value or compute and store it.
+
+        should_cache(value) can veto storing a result, e.g. an empty OCR read.
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None and (should_cache is None or should_cache(value)):
+            self.put(namespace, key, value)
+        return value
+
+    def _remember(self, namespace, key, value, now):
+        if self.memory_items == 0:
+            return
+        with self._lock:
+            self._memory[(namespace, key)] = (copy.deepcopy(value), now + self.ttl_seconds)
+            self._memory.move_to_end((namespace, key))
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, namespace, key, now):
+        if not self.disk:
+            return None
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if entry.get('created_at', 0) + self.ttl_seconds <= now:
+            self._remove(path)
+            return None
+        try:
+            # Bump mtime so disk eviction is least-recently-used rather than oldest-first
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get('value')
+
+    def _ensure_dir(self):
+        if not self._dir_ready:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            # An existing directory keeps its mode otherwise
+            os.chmod(self.cache_dir, 0o700)
+            self._dir_ready = True
+
+    def _write_disk(self, namespace, key, value, now):
+        if not self.disk:
+            return
+        path = self._path(namespace, key)
+        try:
+            self._ensure_dir()
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            # mkstemp creates the file 0600, and os.replace keeps that mode
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'created_at': now, 'namespace': namespace, 'value': value}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk()[1]
+            else:
+                self._disk_bytes += size
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _scan_disk(self):
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        return files, total
+
+    def _evict_disk(self):
+        """Remove expired files, then least recently used ones until under 90% of the cap."""
+        files, total = self._scan_disk()
+        cutoff = time.time() - self.ttl_seconds
+        target = self.max_disk_bytes * 0.9
+        removed = 0
+        for mtime, size, path in sorted(files):
+            if total <= target and mtime > cutoff:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        with self._lock:
+            self._disk_bytes = total
+        if removed:
+            logger.info(f"Result cache evicted {removed} file(s), {total} bytes on disk")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self):
+        with self._lock:
+            namespaces = {name: stats.as_dict() for name, stats in self._stats.items()}
+            hits = sum(s.memory_hits + s.disk_hits for s in self._stats.values())
+            lookups = hits + sum(s.misses for s in self._stats.values())
+            return {
+                'enabled': self.enabled,
+                'memory_entries': len(self._memory),
+                'memory_items': self.memory_items,
+                'disk': self.disk,
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0,
+                'namespaces': namespaces
+            }
+
+
+def result_cache_settings():
+    """Read result cache settings from the environment."""
+    return {
+        'enabled': os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true',
+        'disk': os.getenv('RESULT_CACHE_DISK_ENABLED', 'false').lower() == 'true',
+        'cache_dir': os.getenv('RESULT_CACHE_DIR', DEFAULT_CACHE_DIR),
+        'memory_items': int(os.getenv('RESULT_CACHE_MEMORY_ITEMS', '256')),
+        'max_disk_bytes': int(float(os.getenv('RESULT_CACHE_DISK_MB', '512')) * 1024 * 1024),
+        'ttl_seconds': float(os.getenv('RESULT_CACHE_TTL_HOURS', '168')) * 3600
+    }
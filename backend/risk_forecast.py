@@ -0,0 +1,313 @@
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func
+
+from models import db, Prediction, RiskSummary, RiskForecast
+from risk_summary import trend_for, TREND_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+KEYS = ['user_id', 'disease']
+# Weight of the newest point in the exponentially weighted moving average
+EWMA_ALPHA = 0.3
+# z for the 95% band around the linear trend (normal approximation)
+BAND_Z = 1.96
+# Points needed to project the trend; with fewer, only the direction is reported
+MIN_TREND_POINTS = 3
+# A change point must leave at most this share of the linear trend's squared
+# error, and shift the mean by more than the trend threshold, to be reported
+CHANGE_POINT_MAX_RESIDUAL = 0.5
+# Points needed on each side of a change point
+CHANGE_POINT_MIN_SEGMENT = 2
+
+# PostgreSQL advisory lock held by the transaction that writes a batch of forecasts
+FORECAST_LOCK_KEY = 0x5249534b
+
+_predictions = Prediction.__table__
+_forecasts = RiskForecast.__table__
+
+
+def forecast_frame(df, horizon_days=30):
+    """Forecast every (user_id, disease) series in df at once.
+
+    df has one row per prediction: user_id, disease, created_at and risk
+    (0-100). Per series, returns the EWMA of the risk, a least-squares
+    linear trend projected horizon_days past the last point with a 95%
+    prediction band (3+ points), and the single split into two segments
+    with different mean risk that fits the series clearly better than the
+    trend line does (4+ points).
+    Everything is computed with grouped sums and cumulative sums, without
+    a Python loop over series.
+    """
+    df = df.sort_values(KEYS + ['created_at'], kind='mergesort').reset_index(drop=True)
+    origin = df['created_at'].min()
+    df['x'] = (df['created_at'] - origin).dt.total_seconds() / 86400.0
+    df['y'] = df['risk'].astype(float)
+    df['xx'] = df['x'] ** 2
+    df['xy'] = df['x'] * df['y']
+    df['yy'] = df['y'] ** 2
+    groups = df.groupby(KEYS, sort=False)
+
+    out = groups.agg(points=('y', 'size'), sx=('x', 'sum'), sy=('y', 'sum'), sxx=('xx', 'sum'),
+                     sxy=('xy', 'sum'), syy=('yy', 'sum'), x_last=('x', 'last'),
+                     first_risk=('y', 'first'), current_risk=('y', 'last'), latest_at=('created_at', 'last'))
+    out['ewma_risk'] = groups['y'].ewm(alpha=EWMA_ALPHA).mean().groupby(level=[0, 1]).last()
+
+    # Linear trend: y = intercept + slope * x
+    n = out['points']
+    sxx_c = out['sxx'] - out['sx'] ** 2 / n
+    sxy_c = out['sxy'] - out['sx'] * out['sy'] / n
+    syy_c = (out['syy'] - out['sy'] ** 2 / n).clip(lower=0)
+    has_spread = sxx_c > 1e-9
+    slope = (sxy_c / sxx_c.where(has_spread)).fillna(0.0)
+    intercept = (out['sy'] - slope * out['sx']) / n
+    x_future = out['x_last'] + horizon_days
+    forecast = intercept + slope * x_future
+    linear_sse = (syy_c - slope * sxy_c).clip(lower=0)
+    residual_var = (linear_sse / (n - 2)).where(n >= MIN_TREND_POINTS)
+    band = BAND_Z * np.sqrt(residual_var * (1 + 1 / n + (x_future - out['sx'] / n) ** 2 / sxx_c.where(has_spread)))
+    projected = n >= MIN_TREND_POINTS
+    out['slope_per_day'] = slope
+    out['horizon_days'] = horizon_days
+    out['forecast_risk'] = forecast.clip(0, 100).where(projected)
+    out['forecast_lower'] = (forecast - band).clip(0, 100)
+    out['forecast_upper'] = (forecast + band).clip(0, 100)
+    change = (slope * horizon_days).where(projected, out['current_risk'] - out['first_risk'])
+    out['trend'] = [trend_for(c) for c in change]
+
+    # Change point: for every split, the squared error of two segment means
+    left_n = groups.cumcount() + 1
+    left_sum = groups['y'].cumsum()
+    left_sq = groups['yy'].cumsum()
+    total_n = groups['y'].transform('size')
+    right_n = total_n - left_n
+    right_sum = groups['y'].transform('sum') - left_sum
+    right_sq = groups['yy'].transform('sum') - left_sq
+    valid = (left_n >= CHANGE_POINT_MIN_SEGMENT) & (right_n >= CHANGE_POINT_MIN_SEGMENT)
+    cost = (left_sq - left_sum ** 2 / left_n) + (right_sq - right_sum ** 2 / right_n.where(right_n > 0))
+    splits = pd.DataFrame({
+        'user_id': df['user_id'], 'disease': df['disease'], 'cost': cost.where(valid),
+        'before': left_sum / left_n, 'after': right_sum / right_n.where(right_n > 0),
+        'at': groups['created_at'].shift(-1)
+    }).dropna(subset=['cost'])
+    best = splits.loc[splits.groupby(KEYS, sort=False)['cost'].idxmin()].set_index(KEYS)
+    # A steady ramp also splits well into two means; only a step the line cannot follow counts
+    best = best.join(linear_sse.rename('linear_cost'))
+    best = best[(best['cost'] <= CHANGE_POINT_MAX_RESIDUAL * best['linear_cost']) &
+                ((best['after'] - best['before']).abs() > TREND_THRESHOLD)]
+    out['change_point_at'] = best['at']
+    out['risk_before_change'] = best['before']
+    out['risk_after_change'] = best['after']
+
+    columns = ['points', 'current_risk', 'ewma_risk', 'slope_per_day', 'horizon_days', 'forecast_risk',
+               'forecast_lower', 'forecast_upper', 'trend', 'change_point_at', 'risk_before_change',
+               'risk_after_change', 'latest_at']
+    return out[columns].reset_index()
+
+
+def _load_series(conn, user_ids):
+    rows = conn.execute(
+        select(_predictions.c.user_id, _predictions.c.disease_type, _predictions.c.created_at,
+               _predictions.c.probability)
+        .where(_predictions.c.user_id.in_(user_ids), _predictions.c.created_at.isnot(None))
+    ).all()
+    df = pd.DataFrame(rows, columns=['user_id', 'disease', 'created_at', 'probability'])
+    df['created_at'] = pd.to_datetime(df['created_at'])
+    df['risk'] = df['probability'].fillna(0).astype(float) * 100
+    return df
+
+
+def _records(frame, computed_at):
+    records = []
+    for row in frame.to_dict('records'):
+        record = {k: (None if v is None or v is pd.NaT or (isinstance(v, float) and np.isnan(v)) else v)
+                  for k, v in row.items()}
+        for k in ('change_point_at', 'latest_at'):
+            if record[k] is not None:
+                record[k] = pd.Timestamp(record[k]).to_pydatetime()
+        for k, v in record.items():
+            if isinstance(v, np.generic):
+                record[k] = v.item()
+        record['computed_at'] = computed_at
+        records.append(record)
+    return records
+
+
+def user_forecasts(user_id):
+    """A user's stored forecasts by disease"""
+    return {f.disease: f for f in RiskForecast.query.filter_by(user_id=user_id).all()}
+
+
+def forecast_dict(forecast):
+    """JSON form of a stored forecast"""
+    def rounded(value):
+        return round(value, 2) if value is not None else None
+
+    return {
+        'points': forecast.points,
+        'ewma_risk': rounded(forecast.ewma_risk),
+        'slope_per_week': rounded(forecast.slope_per_day * 7 if forecast.slope_per_day is not None else None),
+        'horizon_days': forecast.horizon_days,
+        'forecast_risk': rounded(forecast.forecast_risk),
+        'forecast_lower': rounded(forecast.forecast_lower),
+        'forecast_upper': rounded(forecast.forecast_upper),
+        'trend': forecast.trend,
+        'change_point': {
+            'at': forecast.change_point_at.isoformat(),
+            'risk_before': rounded(forecast.risk_before_change),
+            'risk_after': rounded(forecast.risk_after_change)
+        } if forecast.change_point_at else None,
+        'computed_at': forecast.computed_at.isoformat() if forecast.computed_at else None
+    }
+
+
+def stale_user_ids():
+    """Users whose risk summary changed since their forecasts were computed (or who have none)"""
+    computed = select(RiskForecast.user_id, func.min(RiskForecast.computed_at).label('computed_at'))\
+        .group_by(RiskForecast.user_id).subquery()
+    rows = db.session.query(RiskSummary.user_id).outerjoin(computed, computed.c.user_id == RiskSummary.user_id)\
+        .filter((computed.c.computed_at.is_(None)) | (RiskSummary.updated_at > computed.c.computed_at))\
+        .distinct().all()
+    return [user_id for user_id, in rows]
+
+
+def _claim_run(conn):
+    """True if this transaction may write forecasts, False if another process is writing them.
+
+    Every worker (and the CLI, e.g. from cron) may start a run. On PostgreSQL
+    a transaction-level advisory lock lets one of them write at a time; the
+    others give up until their next interval. SQLite has one writer anyway:
+    the batch deletes before it reads, so a second run waits for the first.
+    """
+    if conn.dialect.name != 'postgresql':
+        return True
+    return bool(conn.execute(select(func.pg_try_advisory_xact_lock(FORECAST_LOCK_KEY))).scalar())
+
+
+def run_forecasts(user_ids=None, horizon_days=30, batch_users=500):
+    """Recompute and store the forecasts of user_ids (default: the stale ones). Returns the number of rows written."""
+    if user_ids is None:
+        user_ids = stale_user_ids()
+    written = 0
+    for i in range(0, len(user_ids), batch_users):
+        batch = user_ids[i:i + batch_users]
+        computed_at = datetime.utcnow()
+        with db.engine.begin() as conn:
+            if not _claim_run(conn):
+                logger.info("Risk forecasts are being computed by another process, skipping this run")
+                break
+            conn.execute(_forecasts.delete().where(_forecasts.c.user_id.in_(batch)))
+            df = _load_series(conn, batch)
+            if df.empty:
+                continue
+            records = _records(forecast_frame(df, horizon_days), computed_at)
+            conn.execute(_forecasts.insert(), records)
+            written += len(records)
+    return written
+
+
+class RiskForecaster:
+    """Recomputes stale forecasts every interval_seconds on a daemon thread.
+
+    Each worker runs one; concurrent runs are serialized by _claim_run.
+    """
+
+    def __init__(self, app, interval_seconds=3600, horizon_days=30):
+        self.app = app
+        self.interval_seconds = float(interval_seconds)
+        self.horizon_days = int(horizon_days)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'forecasts': 0, 'errors': 0, 'last_run': None, 'last_run_ms': None}
+
+    def run(self):
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                written = run_forecasts(horizon_days=self.horizon_days)
+            except Exception:
+                with self._lock:
+                    self._stats['errors'] += 1
+                raise
+            finally:
+                db.session.remove()
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['forecasts'] += written
+            self._stats['last_run'] = datetime.utcnow().isoformat()
+            self._stats['last_run_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        if written:
+            logger.info(f"Risk forecaster wrote {written} forecasts")
+        return written
+
+    def start(self):
+        """Run now, then every interval_seconds on a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.run()
+                except Exception as e:
+                    logger.error(f"Risk forecast run failed: {e}", exc_info=True)
+                time.sleep(self.interval_seconds)
+
+        self._thread = threading.Thread(target=loop, name='risk-forecaster', daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({'interval_seconds': self.interval_seconds, 'horizon_days': self.horizon_days,
+                      'running': self._thread is not None})
+        return stats
+
+
+def risk_forecast_settings():
+    """Read risk forecast job settings from the environment."""
+    return {
+        'enabled': os.getenv('RISK_FORECAST_ENABLED', 'true').lower() == 'true',
+        'interval_seconds': float(os.getenv('RISK_FORECAST_INTERVAL_MINUTES', '60')) * 60,
+        'horizon_days': int(os.getenv('RISK_FORECAST_HORIZON_DAYS', '30'))
+    }
+
+
+def main(argv):
+    """Compute risk forecasts from the predictions table.
+
+        python risk_forecast.py run [USER_ID ...]
+
+    Without user ids, recomputes the users whose predictions changed since
+    their last forecast; 'run all' recomputes every user.
+    """
+    logging.basicConfig(level=logging.INFO)
+    if not argv or argv[0] != 'run':
+        print(main.__doc__)
+        return 2
+
+    from flask import Flask
+    from config import init_db
+    app = Flask(__name__)
+    init_db(app)
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        return 1
+    with app.app_context():
+        if argv[1:] == ['all']:
+            user_ids = [user_id for user_id, in db.session.query(RiskSummary.user_id).distinct()]
+        else:
+            user_ids = [int(v) for v in argv[1:]] or None
+        written = run_forecasts(user_ids, horizon_days=risk_forecast_settings()['horizon_days'])
+    print(f"Wrote {written} risk forecasts")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
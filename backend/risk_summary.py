@@ -0,0 +1,231 @@
+import sys
+import logging
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select, func, case
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Prediction, RiskSummary
+
+logger = logging.getLogger(__name__)
+
+# A change of more than this many risk points between two predictions is a trend
+TREND_THRESHOLD = 5
+
+_summaries = RiskSummary.__table__
+_predictions = Prediction.__table__
+
+
+def _risk(probability):
+    return probability * 100 if probability else 0
+
+
+def trend_for(change):
+    if change > TREND_THRESHOLD:
+        return 'increasing'
+    if change < -TREND_THRESHOLD:
+        return 'decreasing'
+    return 'stable'
+
+
+def _key(user_id, disease):
+    return (_summaries.c.user_id == user_id) & (_summaries.c.disease == disease)
+
+
+def _add_to_summary(conn, newest, previous, count, pending):
+    """Fold count new predictions of one user and disease into their summary row, with one atomic
+    UPDATE (or the first INSERT). newest and previous are the two newest of them (previous may be None)."""
+    risk = _risk(newest.probability)
+    now = datetime.utcnow()
+    # Predictions older than the latest one (a backfill) only count; a rebuild places them
+    newer = _summaries.c.latest_at.is_(None) | (_summaries.c.latest_at <= newest.created_at)
+    before = _risk(previous.probability) if previous is not None else _summaries.c.latest_risk
+    change = risk - func.coalesce(before, risk)
+    update = _summaries.update().where(_key(newest.user_id, newest.disease_type)).values(
+        count=_summaries.c.count + count,
+        pending_count=_summaries.c.pending_count + pending,
+        previous_risk=case((newer, before), else_=_summaries.c.previous_risk),
+        latest_risk=case((newer, risk), else_=_summaries.c.latest_risk),
+        latest_risk_level=case((newer, newest.risk_level), else_=_summaries.c.latest_risk_level),
+        trend=case((newer, case((change > TREND_THRESHOLD, 'increasing'),
+                                (change < -TREND_THRESHOLD, 'decreasing'), else_='stable')),
+                   else_=_summaries.c.trend),
+        latest_prediction_id=case((newer, newest.id), else_=_summaries.c.latest_prediction_id),
+        latest_at=case((newer, newest.created_at), else_=_summaries.c.latest_at),
+        updated_at=now
+    )
+    if conn.execute(update).rowcount:
+        return
+    previous_risk = _risk(previous.probability) if previous is not None else None
+    try:
+        with conn.begin_nested():
+            conn.execute(_summaries.insert().values(
+                user_id=newest.user_id, disease=newest.disease_type, latest_risk=risk, previous_risk=previous_risk,
+                latest_risk_level=newest.risk_level,
+                trend=trend_for(risk - previous_risk) if previous_risk is not None else 'stable',
+                count=count, pending_count=pending,
+                latest_prediction_id=newest.id, latest_at=newest.created_at, updated_at=now
+            ))
+    except IntegrityError:
+        # Another transaction inserted the row first
+        conn.execute(update)
+
+
+def add_predictions(conn, preds):
+    """Apply newly inserted predictions (objects with the Prediction attributes) to their summaries, one statement per user and disease."""
+    groups = {}
+    for pred in sorted(preds, key=lambda p: p.created_at):
+        groups.setdefault((pred.user_id, pred.disease_type), []).append(pred)
+    for group in groups.values():
+        pending = sum(1 for p in group if p.status == 'pending_review')
+        _add_to_summary(conn, group[-1], group[-2] if len(group) > 1 else None, len(group), pending)
+
+
+def _recompute(conn, user_id, disease):
+    """Rebuild one summary row from its predictions (after an update that moves risk, or a delete)."""
+    match = (_predictions.c.user_id == user_id) & (_predictions.c.disease_type == disease)
+    count, pending = conn.execute(
+        select(func.count(), func.coalesce(func.sum(case((_predictions.c.status == 'pending_review', 1), else_=0)), 0))
+        .where(match)
+    ).one()
+    latest = conn.execute(
+        select(_predictions.c.id, _predictions.c.probability, _predictions.c.risk_level, _predictions.c.created_at)
+        .where(match).order_by(_predictions.c.created_at.desc(), _predictions.c.id.desc()).limit(2)
+    ).all()
+    conn.execute(_summaries.delete().where(_key(user_id, disease)))
+    if count:
+        conn.execute(_summaries.insert().values(_summary_row(user_id, disease, count, pending, latest)))
+
+
+def _summary_row(user_id, disease, count, pending, latest):
+    """Summary row from the counts and the newest two predictions (newest first)"""
+    latest_risk = _risk(latest[0].probability)
+    previous_risk = _risk(latest[1].probability) if len(latest) > 1 else None
+    return {
+        'user_id': user_id, 'disease': disease, 'count': count, 'pending_count': pending,
+        'latest_risk': latest_risk, 'previous_risk': previous_risk,
+        'latest_risk_level': latest[0].risk_level,
+        'trend': trend_for(latest_risk - previous_risk) if previous_risk is not None else 'stable',
+        'latest_prediction_id': latest[0].id, 'latest_at': latest[0].created_at,
+        'updated_at': datetime.utcnow()
+    }
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_summaries(session, flush_context):
+    """Apply the flushed prediction inserts, reviews and deletes to risk_summaries, in the same transaction.
+
+    Only the app's db.session is hooked; other sessions (scripts, other
+    databases) are not touched.
+    """
+    added = [o for o in session.new if isinstance(o, Prediction)]
+    changed = [o for o in session.dirty if isinstance(o, Prediction) and session.is_modified(o)]
+    deleted = [o for o in session.deleted if isinstance(o, Prediction)]
+    if not (added or changed or deleted):
+        return
+
+    conn = session.connection()
+    stale = set()
+    add_predictions(conn, added)
+    for pred in changed:
+        attrs = inspect(pred).attrs
+        moved = attrs.disease_type.history.deleted or attrs.user_id.history.deleted
+        if moved or attrs.probability.history.has_changes() or attrs.created_at.history.has_changes():
+            stale.add((pred.user_id, pred.disease_type))
+            if moved:
+                stale.add(((attrs.user_id.history.deleted or [pred.user_id])[0],
+                           (attrs.disease_type.history.deleted or [pred.disease_type])[0]))
+            continue
+        status = attrs.status.history
+        if status.has_changes() and not status.deleted:
+            # Set on an expired instance, so the old status is unknown
+            stale.add((pred.user_id, pred.disease_type))
+        elif status.has_changes():
+            old = status.deleted[0]
+            delta = (pred.status == 'pending_review') - (old == 'pending_review')
+            if delta:
+                conn.execute(_summaries.update().where(_key(pred.user_id, pred.disease_type))
+                             .values(pending_count=_summaries.c.pending_count + delta))
+    for pred in deleted:
+        stale.add((pred.user_id, pred.disease_type))
+    for user_id, disease in stale:
+        _recompute(conn, user_id, disease)
+
+
+def rebuild(user_id=None, batch_size=1000):
+    """Recompute risk_summaries from all predictions (or one user's). Returns the number of rows written."""
+    query = select(_predictions.c.user_id, _predictions.c.disease_type, _predictions.c.id,
+                   _predictions.c.probability, _predictions.c.risk_level, _predictions.c.status,
+                   _predictions.c.created_at)
+    if user_id is not None:
+        query = query.where(_predictions.c.user_id == user_id)
+    query = query.order_by(_predictions.c.user_id, _predictions.c.disease_type,
+                           _predictions.c.created_at.desc(), _predictions.c.id.desc())
+
+    rows = []
+    written = 0
+    with db.engine.begin() as conn:
+        delete = _summaries.delete()
+        if user_id is not None:
+            delete = delete.where(_summaries.c.user_id == user_id)
+        conn.execute(delete)
+
+        key, count, pending, latest = None, 0, 0, []
+        for pred in conn.execution_options(yield_per=batch_size).execute(query):
+            if (pred.user_id, pred.disease_type) != key:
+                if key is not None:
+                    rows.append(_summary_row(*key, count, pending, latest))
+                key, count, pending, latest = (pred.user_id, pred.disease_type), 0, 0, []
+            count += 1
+            pending += pred.status == 'pending_review'
+            if len(latest) < 2:
+                latest.append(pred)
+            if len(rows) >= batch_size:
+                conn.execute(_summaries.insert(), rows)
+                written += len(rows)
+                rows = []
+        if key is not None:
+            rows.append(_summary_row(*key, count, pending, latest))
+        if rows:
+            conn.execute(_summaries.insert(), rows)
+            written += len(rows)
+    return written
+
+
+def user_summaries(user_id):
+    """A user's summaries, most recently predicted disease first"""
+    return RiskSummary.query.filter_by(user_id=user_id).order_by(RiskSummary.latest_at.desc()).all()
+
+
+def pending_review_count():
+    """Predictions awaiting a doctor's review, across all users"""
+    return db.session.query(func.coalesce(func.sum(RiskSummary.pending_count), 0)).scalar()
+
+
+def main(argv):
+    """Rebuild the risk summaries from the predictions table.
+
+        python risk_summary.py rebuild [USER_ID]
+
+    Needed once for predictions written before the summaries existed, if
+    the startup backfill did not run; safe to repeat at any time.
+    """
+    logging.basicConfig(level=logging.INFO)
+    if not argv or argv[0] != 'rebuild' or len(argv) > 2:
+        print(main.__doc__)
+        return 2
+
+    from flask import Flask
+    from config import init_db
+    app = Flask(__name__)
+    init_db(app)
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        return 1
+    with app.app_context():
+        written = rebuild(int(argv[1]) if len(argv) > 1 else None)
+    print(f"Wrote {written} risk summaries")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+from contextlib import closing
+
+
+class SQLiteStore:
+    """A small SQLite database on local disk, shared by the app's worker processes.
+
+    Used for state that background threads write and any worker may read
+    (report jobs, deferred hospital recommendations). The database runs in
+    WAL mode, so readers do not block the writer, and in autocommit mode:
+    each statement is its own transaction. A connection is opened per call
+    and closed again, which keeps the store safe to use from any thread.
+    """
+
+    def __init__(self, db_path, schema=()):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self.connect() as conn:
+            for statement in schema:
+                conn.execute(statement)
+
+    def connect(self):
+        """An open connection, closed when the with block exits. Rows can be read by column name."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return closing(conn)
+
+    def execute(self, sql, params=()):
+        """Run one statement; returns the number of rows it changed."""
+        with self.connect() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def query(self, sql, params=()):
+        """All rows of a query, as sqlite3.Row."""
+        with self.connect() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """The first row of a query, or None."""
+        with self.connect() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def count_by(self, table, column):
+        """{value: row count} for each value of column in table."""
+        return dict(self.query(f'SELECT {column}, COUNT(*) FROM {table} GROUP BY {column}'))
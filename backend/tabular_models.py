@@ -0,0 +1,135 @@
+import numpy as np
+
+# Feature order for each tabular model, as used by the /api/predict/<disease> endpoints.
+# A default of None means the feature is required.
+TABULAR_FEATURES = {
+    'diabetes': [
+        ('glucose', None),
+        ('bmi', None),
+        ('blood_pressure', None),
+        ('age', None),
+    ],
+    'liver': [
+        ('Age', 0),
+        ('Gender', 0),
+        ('Total_Bilirubin', 0),
+        ('Direct_Bilirubin', 0),
+        ('Alkaline_Phosphotase', 0),
+        ('Alamine_Aminotransferase', 0),
+        ('Aspartate_Aminotransferase', 0),
+        ('Total_Proteins', 0),
+        ('Albumin', 0),
+        ('Albumin_and_Globulin_Ratio', 0),
+    ],
+    'kidney': [
+        ('age', 0),
+        ('blood_pressure', 0),
+        ('specific_gravity', 0),
+        ('albumin', 0),
+        ('sugar', 0),
+        ('red_blood_cells', 0),
+        ('pus_cell', 0),
+        ('pus_cell_clumps', 0),
+        ('bacteria', 0),
+        ('blood_glucose_random', 0),
+        ('blood_urea', 0),
+        ('serum_creatinine', 0),
+        ('sodium', 0),
+        ('potassium', 0),
+        ('hemoglobin', 0),
+        ('packed_cell_volume', 0),
+        ('white_blood_cell_count', 0),
+        ('red_blood_cell_count', 0),
+        ('hypertension', 0),
+        ('diabetes_mellitus', 0),
+        ('coronary_artery_disease', 0),
+        ('appetite', 0),
+        ('peda_edema', 0),
+        ('anemia', 0),
+    ],
+    'heart': [
+        ('age', 0),
+        ('height', 0),
+        ('weight', 0),
+        ('gender', 0),
+        ('ap_hi', 0),
+        ('ap_lo', 0),
+        ('cholesterol', 0),
+        ('gluc', 0),
+        ('smoke', 0),
+        ('alco', 0),
+        ('active', 0),
+    ],
+}
+
+
+def risk_level_for(disease, probability):
+    """Map a positive-class probability to the risk label used by the single-row endpoint."""
+    if disease == 'diabetes':
+        if probability < 0.33:
+            return "Low Risk"
+        elif probability < 0.66:
+            return "Moderate Risk"
+        return "High Risk"
+
+    if probability >= 0.8:
+        return "Very High"
+    elif probability >= 0.6:
+        return "High"
+    elif probability >= 0.4:
+        return "Moderate"
+    return "Low"
+
+
+def row_to_features(disease, row):
+    """Convert one input dict to a feature list. Raises KeyError/ValueError on bad input."""
+    features = []
+    for name, default in TABULAR_FEATURES[disease]:
+        value = row.get(name, default)
+        if value is None or value == '':
+            if default is None:
+                raise KeyError(name)
+            value = default
+        features.append(float(value))
+    return features
+
+
+def build_feature_matrix(disease, rows):
+    """Build an (n_valid, n_features) matrix from input dicts.
+
+    Returns (matrix, valid_indices, errors) where errors maps the index of each
+    rejected row to a message.
+    """
+    n_features = len(TABULAR_FEATURES[disease])
+    matrix = np.empty((len(rows), n_features), dtype=np.float64)
+    valid_indices = []
+    errors = {}
+
+    for idx, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[idx] = 'Row must be an object'
+            continue
+        try:
+            matrix[len(valid_indices)] = row_to_features(disease, row)
+            valid_indices.append(idx)
+        except KeyError as e:
+            errors[idx] = f"Missing required field: {e.args[0]}"
+        except (TypeError, ValueError) as e:
+            errors[idx] = f"Invalid value: {str(e)}"
+
+    return matrix[:len(valid_indices)], valid_indices, errors
+
+
+def score_matrix(model, scaler, matrix):
+    """Score a feature matrix with one scaler pass and one predict_proba call.
+
+    Returns (labels, positive_probabilities). Labels are derived from the
+    probabilities, so no separate predict() forward pass is needed.
+    """
+    if matrix.shape[0] == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    if scaler is not None:
+        matrix = scaler.transform(matrix)
+    proba = model.predict_proba(matrix)
+    labels = np.asarray(model.classes_).take(np.argmax(proba, axis=1))
+    return labels, proba[:, 1]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the appointment sweeper (appointment_sweeper.py) and the paginated,
+read-only appointment lists, against an in-memory SQLite database.
+
+Run with pytest, or directly:
+    python test_appointment_sweeper.py
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Appointment
+from appointment_routes import appointment_bp
+from appointment_sweeper import AppointmentSweeper, complete_past_appointments
+from query_counter import count_queries
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(appointment_bp, url_prefix='/api/appointments')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'),
+            User(id=2, name='Doctor', email='d@example.com', password_hash='x', role='doctor', doctor_id='DOC1'),
+        ])
+        db.session.commit()
+    return app
+
+
+def _appointment(when, status='accepted', created_at=None):
+    return Appointment(appointment_id=str(uuid.uuid4()), doctor_id=2, patient_id=1, patient_name='Patient',
+                       symptoms='cough', appointment_date=when.date(), appointment_time=when.time(),
+                       status=status, video_room_id=str(uuid.uuid4()), created_at=created_at or datetime.utcnow())
+
+
+def test_only_past_accepted_appointments_are_completed():
+    app = _make_app()
+    with app.app_context():
+        cases = {
+            'yesterday': _appointment(NOW - timedelta(days=1)),
+            'earlier_today': _appointment(NOW - timedelta(minutes=30)),
+            'later_today': _appointment(NOW + timedelta(minutes=30)),
+            'tomorrow': _appointment(NOW + timedelta(days=1)),
+            'pending_yesterday': _appointment(NOW - timedelta(days=1), status='pending'),
+        }
+        db.session.add_all(cases.values())
+        db.session.commit()
+        before = {name: apt.updated_at for name, apt in cases.items()}
+
+        assert complete_past_appointments(NOW) == 2
+        statuses = {name: db.session.get(Appointment, apt.id).status for name, apt in cases.items()}
+        assert statuses == {'yesterday': 'completed', 'earlier_today': 'completed', 'later_today': 'accepted',
+                            'tomorrow': 'accepted', 'pending_yesterday': 'pending'}
+        # updated_at moves, so the lists' ETags and since cursors see the change
+        assert cases['yesterday'].updated_at > before['yesterday']
+        assert complete_past_appointments(NOW) == 0
+
+
+def test_sweeper_counts_runs():
+    app = _make_app()
+    with app.app_context():
+        db.session.add(_appointment(datetime.now() - timedelta(days=2)))
+        db.session.commit()
+    sweeper = AppointmentSweeper(app, interval_seconds=60)
+    assert sweeper.sweep() == 1 and sweeper.sweep() == 0
+    stats = sweeper.stats()
+    assert stats['runs'] == 2 and stats['completed'] == 1 and not stats['running']
+
+
+def test_list_pages_are_read_only_and_complete():
+    app = _make_app()
+    created = datetime(2026, 1, 1)
+    with app.app_context():
+        # Pairs share created_at, so the id tie-breaker matters
+        db.session.add_all([_appointment(datetime.now() - timedelta(days=3), created_at=created + timedelta(hours=i // 2))
+                            for i in range(7)])
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = 1
+
+        ids, before = [], None
+        with count_queries(db.engine) as queries:
+            while True:
+                url = '/api/appointments/patient?limit=3' + (f'&before={before}' if before else '')
+                data = client.get(url).get_json()
+                ids.extend(apt['id'] for apt in data['appointments'])
+                before = data['next_page']
+                if before is None:
+                    break
+        assert ids == [7, 6, 5, 4, 3, 2, 1]
+        assert not any(s.lstrip().upper().startswith('UPDATE') for s in queries.statements)
+        # Past but still accepted: only the sweeper completes it
+        assert {apt['status'] for apt in data['appointments']} == {'accepted'}
+
+        assert client.get('/api/appointments/patient?limit=x').status_code == 400
+        assert client.get('/api/appointments/patient?before=junk').status_code == 400
+
+
+def main():
+    print("=" * 60)
+    print("APPOINTMENT SWEEPER TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
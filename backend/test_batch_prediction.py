@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for batch scoring of the tabular models: the feature matrix and scoring
+helpers (tabular_models.py) and the /api/predict/<disease>/batch endpoint,
+with JSON and CSV input, bad rows, and the MAX_BATCH_ROWS limit. A small
+model fitted here stands in for the pickled ones.
+
+Run with pytest, or directly:
+    python test_batch_prediction.py
+"""
+import io
+import os
+import sys
+import logging
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import app as backend
+from tabular_models import TABULAR_FEATURES, build_feature_matrix, score_matrix, risk_level_for
+
+logging.getLogger('app').setLevel(logging.WARNING)
+
+
+def _fitted(disease):
+    """A model and scaler for disease whose risk rises with its first feature."""
+    rng = np.random.default_rng(0)
+    n_features = len(TABULAR_FEATURES[disease])
+    X = rng.uniform(0, 200, size=(200, n_features))
+    y = (X[:, 0] > 120).astype(int)
+    scaler = StandardScaler().fit(X)
+    return LogisticRegression().fit(scaler.transform(X), y), scaler
+
+
+@contextmanager
+def _models(max_rows=None, loaded=True):
+    models = {disease: _fitted(disease) for disease in TABULAR_FEATURES}
+    original = backend.get_tabular_model, backend.MAX_BATCH_ROWS
+    backend.get_tabular_model = lambda name: models[name] if loaded else (None, None)
+    if max_rows is not None:
+        backend.MAX_BATCH_ROWS = max_rows
+    try:
+        yield models, backend.app.test_client()
+    finally:
+        backend.get_tabular_model, backend.MAX_BATCH_ROWS = original
+
+
+def _csv(header, rows):
+    return '\ufeff' + ','.join(header) + '\n' + ''.join(','.join(map(str, row)) + '\n' for row in rows)
+
+
+def _upload(client, disease, text, filename='patients.csv'):
+    data = text.encode('utf-8') if isinstance(text, str) else text
+    return client.post(f'/api/predict/{disease}/batch', data={'file': (io.BytesIO(data), filename)},
+                       content_type='multipart/form-data')
+
+
+def test_feature_matrix_keeps_valid_rows_and_reports_bad_ones():
+    rows = [{'glucose': 150, 'bmi': 30, 'blood_pressure': 80, 'age': 50},
+            {'bmi': 30, 'blood_pressure': 80, 'age': 50},
+            'not a row',
+            {'glucose': 'high', 'bmi': 30, 'blood_pressure': 80, 'age': 50},
+            {'glucose': '90', 'bmi': '22.5', 'blood_pressure': '70', 'age': '31'}]
+    matrix, valid, errors = build_feature_matrix('diabetes', rows)
+    assert valid == [0, 4]
+    assert matrix.tolist() == [[150, 30, 80, 50], [90, 22.5, 70, 31]]
+    assert errors == {1: 'Missing required field: glucose', 2: 'Row must be an object',
+                      3: "Invalid value: could not convert string to float: 'high'"}
+    # Optional features fall back to their defaults, also when empty
+    matrix, _, errors = build_feature_matrix('liver', [{'Age': 40, 'Total_Bilirubin': ''}])
+    assert not errors and matrix[0].tolist() == [40] + [0] * 9
+
+
+def test_score_matrix_matches_row_by_row_scoring():
+    model, scaler = _fitted('heart')
+    X = np.random.default_rng(1).uniform(0, 200, size=(50, 11))
+    labels, probabilities = score_matrix(model, scaler, X)
+    for row, label, probability in zip(X, labels, probabilities):
+        scaled = scaler.transform(row.reshape(1, -1))
+        assert label == model.predict(scaled)[0]
+        assert np.isclose(probability, model.predict_proba(scaled)[0, 1])
+    labels, probabilities = score_matrix(model, scaler, np.empty((0, 11)))
+    assert labels.shape == probabilities.shape == (0,)
+
+
+def test_json_rows_are_scored_in_order():
+    rows = [{'glucose': 180, 'bmi': 30, 'blood_pressure': 80, 'age': 60},
+            {'glucose': 70, 'bmi': 21, 'blood_pressure': 70, 'age': 25},
+            {'bmi': 21}]
+    with _models() as (models, client):
+        response = client.post('/api/predict/diabetes/batch', json=rows)
+        assert response.status_code == 200
+        body = response.get_json()
+        assert (body['disease'], body['total'], body['scored'], body['failed']) == ('diabetes', 3, 2, 1)
+        high, low, bad = body['results']
+        assert [r['index'] for r in body['results']] == [0, 1, 2]
+        assert high['prediction'] == 1 and low['prediction'] == 0
+        assert high['risk_level'] == risk_level_for('diabetes', high['probability'])
+        assert bad == {'index': 2, 'error': 'Missing required field: glucose'}
+
+        # The {"rows": [...]} form gives the same answer
+        wrapped = client.post('/api/predict/diabetes/batch', json={'rows': rows}).get_json()
+        assert wrapped == body
+
+
+def test_csv_upload_is_scored_like_json():
+    header = [name for name, _ in TABULAR_FEATURES['heart']]
+    rows = [[150] + [1] * 10, [20] + [1] * 10]
+    with _models() as (models, client):
+        from_csv = _upload(client, 'heart', _csv(header, rows)).get_json()
+        from_json = client.post('/api/predict/heart/batch',
+                                json=[dict(zip(header, row)) for row in rows]).get_json()
+        assert from_csv == from_json and from_csv['scored'] == 2
+
+        # Missing optional columns take their defaults; a bad cell fails only its row
+        body = _upload(client, 'heart', 'age,ap_hi\n150,120\nold,120\n').get_json()
+        assert body['scored'] == 1 and body['results'][1]['error'].startswith('Invalid value')
+
+
+def test_bad_requests():
+    with _models() as (models, client):
+        assert client.post('/api/predict/cancer/batch', json=[{}]).status_code == 404
+        assert client.post('/api/predict/diabetes/batch', json=[]).status_code == 400
+        assert client.post('/api/predict/diabetes/batch', json={'row': {}}).status_code == 400
+        response = _upload(client, 'diabetes', 'glucose\n100\n', filename='patients.xlsx')
+        assert response.status_code == 400 and 'CSV' in response.get_json()['error']
+        assert _upload(client, 'diabetes', b'glucose\n\xff\xfe\n').status_code == 400
+    with _models(loaded=False) as (models, client):
+        assert client.post('/api/predict/diabetes/batch', json=[{'glucose': 100}]).status_code == 503
+
+
+def test_max_batch_rows():
+    row = {'glucose': 100, 'bmi': 25, 'blood_pressure': 80, 'age': 40}
+    header = list(row)
+    with _models(max_rows=3) as (models, client):
+        assert client.post('/api/predict/diabetes/batch', json=[row] * 3).status_code == 200
+        response = client.post('/api/predict/diabetes/batch', json=[row] * 4)
+        assert response.status_code == 413 and '3' in response.get_json()['error']
+
+        assert _upload(client, 'diabetes', _csv(header, [row.values()] * 3)).status_code == 200
+        assert _upload(client, 'diabetes', _csv(header, [row.values()] * 4)).status_code == 413
+        # The rest of a long CSV is never read: a bad byte far past the limit does not matter
+        long_csv = _csv(header, [row.values()] * 5000).encode('utf-8') + b'\xff\n'
+        assert _upload(client, 'diabetes', long_csv).status_code == 413
+
+
+def main():
+    print("=" * 60)
+    print("BATCH PREDICTION TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
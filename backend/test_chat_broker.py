@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the consultation chat pub/sub (chat_broker.py), in-process backend,
+and the gate on the chat stream endpoint.
+
+Run with pytest, or directly:
+    python test_chat_broker.py
+"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from chat_broker import ChatBroker
+import appointment_routes
+
+
+def test_fan_out_per_appointment():
+    broker = ChatBroker()
+    with broker.subscribe(1) as doctor, broker.subscribe(1) as patient, broker.subscribe(2) as other:
+        broker.publish(1, {'id': 10, 'message': 'hello'})
+        assert doctor.get(0.1)['id'] == 10
+        assert patient.get(0.1)['id'] == 10
+        assert other.get(0.05) is None
+    stats = broker.stats()
+    assert stats['published'] == 1 and stats['delivered'] == 2
+    assert stats['subscribers'] == 0 and stats['channels'] == 0
+
+
+def test_waiting_listener_wakes_on_publish():
+    broker = ChatBroker()
+    received = []
+    with broker.subscribe(5) as subscription:
+        listener = threading.Thread(target=lambda: received.append(subscription.get(2.0)))
+        listener.start()
+        broker.publish(5, {'id': 1})
+        listener.join(1.0)
+    assert received == [{'id': 1}]
+
+
+def test_slow_listener_overflows_instead_of_blocking():
+    broker = ChatBroker(max_queue=2)
+    with broker.subscribe(1) as subscription:
+        for i in range(5):
+            broker.publish(1, {'id': i})
+        assert subscription.overflowed
+        assert [subscription.get(0.01)['id'] for _ in range(2)] == [0, 1]
+        assert subscription.get(0.01) is None
+    assert broker.stats()['overflows'] == 1
+
+
+def test_catchup_interval_defaults():
+    assert ChatBroker().catchup_seconds == 5
+    assert ChatBroker(catchup_seconds=1).catchup_seconds == 1
+    assert ChatBroker().backend == 'local'
+
+
+def test_streams_are_refused_unless_enabled():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test'
+    app.register_blueprint(appointment_routes.appointment_bp, url_prefix='/api/appointments')
+    response = app.test_client().get('/api/appointments/1/messages/events')
+    assert response.status_code == 503
+    assert 'after' in response.get_json()['error']
+
+
+def main():
+    print("=" * 60)
+    print("CHAT BROKER TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
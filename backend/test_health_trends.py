@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the health trends endpoint (GET /api/analytics/health-trends): the
+normalized disease category and the SQL-bucketed mode, against an in-memory
+SQLite database.
+
+Run with pytest, or directly:
+    python test_health_trends.py
+"""
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Prediction, disease_category
+from health_analytics import analytics_bp
+from query_counter import count_queries
+from migrations import _add_missing_columns
+
+URL = '/api/analytics/health-trends'
+
+# (disease_type, created_at, probability); 2026-03-02 is a Monday
+PREDICTIONS = [
+    ('diabetes', datetime(2026, 3, 2, 9), 0.2),
+    ('diabetes', datetime(2026, 3, 2, 18), 0.4),
+    ('diabetes', datetime(2026, 3, 8, 23), 0.6),     # Sunday, same week
+    ('diabetes', datetime(2026, 3, 9, 1), 0.9),      # next Monday
+    ('cardiovascular_multimodal', datetime(2026, 4, 15), 0.5),
+    ('bone_fracture', datetime(2026, 3, 31), 0.7),
+    ('symptom_check', datetime(2026, 3, 3), 0.1),
+]
+
+
+def _client():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'))
+        for disease_type, created_at, probability in PREDICTIONS:
+            db.session.add(Prediction(user_id=1, disease_type=disease_type, prediction_result='-',
+                                      probability=probability, risk_level='Low', created_at=created_at))
+        db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 1
+    return app, client
+
+
+def test_disease_category():
+    assert disease_category('Diabetes') == 'diabetes'
+    assert disease_category('cardiovascular_multimodal') == 'heart'
+    assert disease_category('bone_fracture') == 'bone'
+    assert disease_category('symptom_check') is None and disease_category(None) is None
+
+
+def test_weekly_and_monthly_buckets():
+    app, client = _client()
+    with app.app_context(), count_queries(db.engine) as queries:
+        weekly = client.get(URL + '?bucket=week').get_json()
+    assert queries.count == 1
+    assert weekly['bucket'] == 'week'
+    assert weekly['trends']['diabetes'] == [
+        {'date': '2026-03-02', 'count': 3, 'min_risk': 20.0, 'risk': 40.0, 'max_risk': 60.0},
+        {'date': '2026-03-09', 'count': 1, 'min_risk': 90.0, 'risk': 90.0, 'max_risk': 90.0},
+    ]
+    assert weekly['trends']['heart'][0]['date'] == '2026-04-13'
+    assert weekly['trends']['liver'] == []
+
+    monthly = client.get(URL + '?bucket=month').get_json()['trends']
+    assert [(p['date'], p['count']) for p in monthly['diabetes']] == [('2026-03-01', 4)]
+    assert monthly['bone'][0]['date'] == '2026-03-01'
+
+    daily = client.get(URL + '?bucket=day').get_json()['trends']
+    assert [p['date'] for p in daily['diabetes']] == ['2026-03-02', '2026-03-08', '2026-03-09']
+    assert client.get(URL + '?bucket=year').status_code == 400
+
+
+def test_points_without_bucket():
+    app, client = _client()
+    trends = client.get(URL).get_json()['trends']
+    assert [p['risk'] for p in trends['diabetes']] == [20.0, 40.0, 60.0, 90.0]
+    assert len(trends['heart']) == 1 and len(trends['bone']) == 1
+    assert sum(len(points) for points in trends.values()) == 6
+
+
+def test_disease_category_only_takes_known_names():
+    app, client = _client()
+    with app.app_context():
+        categories = {p.disease_type: p.disease_category for p in Prediction.query}
+        assert categories['symptom_check'] is None and categories['bone_fracture'] == 'bone'
+        try:
+            db.session.execute(text("UPDATE predictions SET disease_category = 'cancer'"))
+            db.session.commit()
+            assert False, 'expected the CHECK constraint to fail'
+        except IntegrityError:
+            db.session.rollback()
+
+
+def test_migration_adds_the_constrained_column():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        # A predictions table from before the column existed
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE predictions (id VARCHAR(36) PRIMARY KEY, user_id INTEGER, disease_type VARCHAR(50), '
+                              'reviewed_at TIMESTAMP, created_at TIMESTAMP, updated_at TIMESTAMP)'))
+            conn.execute(text("INSERT INTO predictions (id, disease_type) VALUES ('a', 'Heart Disease'), "
+                              "('b', 'symptom_check')"))
+        _add_missing_columns(db)
+        with db.engine.begin() as conn:
+            rows = dict(conn.execute(text('SELECT id, disease_category FROM predictions')).all())
+        assert rows == {'a': 'heart', 'b': None}
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("UPDATE predictions SET disease_category = 'Heart' WHERE id = 'a'"))
+            assert False, 'expected the CHECK constraint to fail'
+        except IntegrityError:
+            pass
+
+
+def main():
+    print("=" * 60)
+    print("HEALTH TRENDS TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for hospital enrichment (hospital_enrichment.py) with a stand-in
+analysis: cache hits, concurrent lookups sharing one in-flight analysis,
+the deadline, and failed analyses.
+
+Run with pytest, or directly:
+    python test_hospital_enrichment.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from result_cache import ResultCache
+from hospital_enrichment import HospitalEnricher, DEFAULT_ANALYSIS
+
+
+class Analyzer:
+    """Stand-in for the Groq analysis; waits for release() when slow, fails for names in fail."""
+
+    def __init__(self, slow=False, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.released = threading.Event()
+        if not slow:
+            self.released.set()
+
+    def release(self):
+        self.released.set()
+
+    def __call__(self, hospital):
+        self.calls.append(hospital['name'])
+        self.released.wait(5)
+        if hospital['name'] in self.fail:
+            raise TimeoutError('groq timed out')
+        return ['Cardiology'], 4.5, f"{hospital['name']} has a cardiac unit"
+
+
+def _hospitals(*names):
+    return [{'osm_id': f'node/{i}', 'name': name} for i, name in enumerate(names)]
+
+
+def _enricher(analyze, **kwargs):
+    cache = ResultCache(cache_dir=tempfile.mkdtemp(), disk=False)
+    return HospitalEnricher(analyze, cache=cache, **kwargs)
+
+
+def test_results_are_cached():
+    analyzer = Analyzer()
+    enricher = _enricher(analyzer)
+    first = enricher.enrich(_hospitals('City', 'General'))
+    assert first[0]['specialties'] == ['Cardiology'] and first[0]['rating'] == 4.5
+    assert first[1]['recommendation_reason'] == 'General has a cardiac unit'
+    again = enricher.enrich(_hospitals('City', 'General'))
+    assert again == first
+    assert sorted(analyzer.calls) == ['City', 'General']
+    stats = enricher.stats()
+    assert (stats['lookups'], stats['cached'], stats['analyzed'], stats['cache_hit_ratio']) == (4, 2, 2, 0.5)
+
+
+def test_concurrent_lookups_share_one_analysis():
+    analyzer = Analyzer(slow=True)
+    enricher = _enricher(analyzer, deadline_seconds=5)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(enricher.enrich(_hospitals('City'))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    assert enricher.stats()['in_flight'] == 1
+    analyzer.release()
+    for thread in threads:
+        thread.join(5)
+    assert analyzer.calls == ['City']
+    assert [r[0]['rating'] for r in results] == [4.5] * 4
+    assert enricher.stats()['in_flight'] == 0
+
+
+def test_deadline_returns_defaults_and_caches_the_late_result():
+    analyzer = Analyzer(slow=True)
+    enricher = _enricher(analyzer, deadline_seconds=0.1)
+    start = time.monotonic()
+    (hospital,) = enricher.enrich(_hospitals('City'))
+    assert time.monotonic() - start < 1
+    assert (hospital['specialties'], hospital['rating'], hospital['recommendation_reason']) == \
+        (list(DEFAULT_ANALYSIS[0]), DEFAULT_ANALYSIS[1], DEFAULT_ANALYSIS[2])
+    assert enricher.stats()['timed_out'] == 1
+
+    # The analysis keeps running and the next lookup gets it from the cache
+    analyzer.release()
+    deadline = time.time() + 5
+    while enricher.stats()['in_flight'] and time.time() < deadline:
+        time.sleep(0.02)
+    (hospital,) = enricher.enrich(_hospitals('City'))
+    assert hospital['rating'] == 4.5 and analyzer.calls == ['City']
+
+
+def test_failed_analysis_gets_defaults_and_is_retried():
+    analyzer = Analyzer(fail={'General'})
+    enricher = _enricher(analyzer)
+    city, general = enricher.enrich(_hospitals('City', 'General'))
+    assert city['rating'] == 4.5 and general['rating'] == DEFAULT_ANALYSIS[1]
+    assert enricher.stats()['failed'] == 1
+    # Failures are not cached
+    enricher.enrich(_hospitals('General'))
+    assert analyzer.calls.count('General') == 2
+
+
+def test_key_falls_back_to_coordinates():
+    analyzer = Analyzer()
+    enricher = _enricher(analyzer)
+    near = {'name': 'Clinic', 'latitude': 12.9, 'longitude': 77.6}
+    far = {'name': 'Clinic', 'latitude': 19.0, 'longitude': 72.8}
+    enricher.enrich([near, far])
+    assert analyzer.calls == ['Clinic', 'Clinic']
+
+
+def main():
+    print("=" * 60)
+    print("HOSPITAL ENRICHMENT TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for deferred hospital recommendations (hospital_recommendations.py) in
+a temporary database: a token going from pending to ready or failed, tokens
+read from another worker, lookups that overrun max_seconds, and expiry.
+
+Run with pytest, or directly:
+    python test_hospital_recommendations.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hospital_recommendations import HospitalRecommendations, PENDING, READY, FAILED
+
+HOSPITALS = [{'name': 'City Hospital', 'distance_km': 1.2}]
+
+
+def _recommendations(**kwargs):
+    return HospitalRecommendations(db_path=os.path.join(tempfile.mkdtemp(), 'recommendations.sqlite3'), **kwargs)
+
+
+def _wait_for(recommendations, token, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = recommendations.get(token)
+        if result['status'] != PENDING:
+            return result
+        time.sleep(0.02)
+    raise AssertionError(f"token {token} still pending")
+
+
+def test_token_is_pending_until_the_lookup_finishes():
+    release = threading.Event()
+
+    def lookup(lat, lon):
+        release.wait(5)
+        return HOSPITALS
+
+    recommendations = _recommendations()
+    token = recommendations.submit(lookup, 12.97, 77.59)
+    assert recommendations.get(token) == {'token': token, 'status': PENDING, 'hospitals': None, 'error': None}
+    release.set()
+    assert _wait_for(recommendations, token) == {'token': token, 'status': READY, 'hospitals': HOSPITALS,
+                                                 'error': None}
+    # Any worker can serve the token
+    other = HospitalRecommendations(db_path=recommendations.db_path)
+    assert other.get(token)['hospitals'] == HOSPITALS
+    assert recommendations.stats()['recommendations'] == {PENDING: 0, READY: 1, FAILED: 0}
+
+
+def test_failed_lookup_hides_the_exception():
+    def lookup(lat, lon):
+        raise ConnectionError('overpass.example: connection refused')
+
+    recommendations = _recommendations()
+    result = _wait_for(recommendations, recommendations.submit(lookup, 12.97, 77.59))
+    assert (result['status'], result['hospitals'], result['error']) == \
+        (FAILED, None, 'Unable to fetch nearby hospitals')
+
+
+def test_token_pending_past_max_seconds_reads_as_failed():
+    release = threading.Event()
+    recommendations = _recommendations(max_seconds=0.1)
+    token = recommendations.submit(lambda: release.wait(5) and HOSPITALS)
+    assert recommendations.get(token)['status'] == PENDING
+    time.sleep(0.2)
+    # E.g. the worker running it died: the caller stops polling
+    result = recommendations.get(token)
+    assert (result['status'], result['error']) == (FAILED, 'Hospital lookup timed out')
+    # A lookup that does finish late still delivers its result
+    release.set()
+    deadline = time.time() + 5
+    while recommendations.get(token)['status'] != READY and time.time() < deadline:
+        time.sleep(0.02)
+    assert recommendations.get(token)['hospitals'] == HOSPITALS
+
+
+def test_unknown_and_expired_tokens():
+    recommendations = _recommendations(ttl_hours=0)
+    assert recommendations.get('no-such-token') is None
+    token = recommendations.submit(lambda: HOSPITALS)
+    _wait_for(recommendations, token)
+    recommendations._last_cleanup = 0
+    assert recommendations.cleanup_expired() == 1
+    assert recommendations.get(token) is None
+    # At most once a minute
+    recommendations.submit(lambda: HOSPITALS)
+    assert recommendations.cleanup_expired() == 0
+
+
+def main():
+    print("=" * 60)
+    print("HOSPITAL RECOMMENDATION TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
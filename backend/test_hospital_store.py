@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Tests for the hospital store (hospital_store.py) with a stand-in Overpass
+fetch: the grid index, nearby/nearest, filling missing tiles, fetch failures,
+concurrent misses on the same and on different areas, and workers sharing
+one store file.
+
+Run with pytest, or directly:
+    python test_hospital_store.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hospital_store import HospitalStore, _Index, tile_of
+
+# (id, lat, lon): two in Bengaluru, one 40 km out, one in Mumbai, and a pair across the antimeridian
+HOSPITALS = [(1, 12.97, 77.59), (2, 12.93, 77.62), (3, 13.30, 77.45), (4, 19.07, 72.88),
+             (5, -17.0, 179.95), (6, -17.0, -179.95)]
+
+
+def _element(hid, lat, lon):
+    return {'type': 'node', 'id': hid, 'lat': lat, 'lon': lon, 'tags': {'name': f'Hospital {hid}', 'x': '-'}}
+
+
+def _record(hid, lat, lon):
+    return {'id': f'node/{hid}', 'lat': lat, 'lon': lon, 'tags': {'name': f'Hospital {hid}'}}
+
+
+class FakeOverpass:
+    """Returns the HOSPITALS inside the boxes asked for; can be made to fail or to block."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, bboxes):
+        self.calls.append(list(bboxes))
+        self.release.wait(5)
+        if self.fail:
+            raise IOError('overpass down')
+        return [_element(*h) for h in HOSPITALS
+                if any(s <= h[1] < n and w <= h[2] < e for s, w, n, e in bboxes)]
+
+
+def _store(fetch, **kwargs):
+    path = os.path.join(tempfile.mkdtemp(), 'hospitals.json')
+    return HospitalStore(path=path, tile_deg=1.0, fetch=fetch, reload_check_seconds=3600, **kwargs)
+
+
+def test_index_finds_points_within_radius_nearest_first():
+    index = _Index([_record(*h) for h in HOSPITALS])
+    found = index.within(12.97, 77.59, 10)
+    assert [r['id'] for _, r in found] == ['node/1', 'node/2']
+    assert found[0][0] < 0.01 and 4 < found[1][0] < 6
+    assert [r['id'] for _, r in index.within(12.97, 77.59, 60)] == ['node/1', 'node/2', 'node/3']
+    assert [r['id'] for _, r in index.within(12.97, 77.59, 60, limit=2)] == ['node/1', 'node/2']
+    assert index.within(0.0, 0.0, 50) == []
+    assert _Index([]).within(12.97, 77.59, 60) == []
+
+
+def test_index_wraps_across_the_antimeridian():
+    index = _Index([_record(*h) for h in HOSPITALS])
+    found = index.within(-17.0, 179.99, 20)
+    assert [r['id'] for _, r in found] == ['node/5', 'node/6']
+    assert found[1][0] < 10
+
+
+def test_missing_tiles_are_fetched_once_then_served_locally():
+    fetch = FakeOverpass()
+    store = _store(fetch)
+    found = store.nearby(12.97, 77.59, radius_km=60)
+    assert [r['id'] for _, r in found] == ['node/1', 'node/2', 'node/3']
+    assert found[0][1]['tags'] == {'name': 'Hospital 1'}
+    # The four tiles the circle touches, in one query
+    assert len(fetch.calls) == 1 and len(fetch.calls[0]) == 4
+
+    assert [r['id'] for _, r in store.nearest(12.95, 77.6, k=1, radius_km=30)] == ['node/1']
+    assert len(fetch.calls) == 1
+    stats = store.stats()
+    assert (stats['queries'], stats['local'], stats['live_fetches'], stats['hospitals']) == (2, 1, 1, 3)
+
+    # Another worker's copy of the store starts from the saved file
+    reloaded = HospitalStore(path=store.path, tile_deg=1.0, fetch=fetch, live_fetch=False)
+    assert [r['id'] for _, r in reloaded.nearby(12.97, 77.59, radius_km=60)] == ['node/1', 'node/2', 'node/3']
+
+
+def test_failed_fetch_returns_none_and_waits_before_retrying():
+    fetch = FakeOverpass(fail=True)
+    store = _store(fetch, retry_seconds=300)
+    assert store.nearby(12.97, 77.59) is None
+    assert store.nearby(12.97, 77.59) is None
+    assert len(fetch.calls) == 1 and store.stats()['fetch_errors'] == 1
+
+    assert _store(FakeOverpass(), live_fetch=False).nearby(12.97, 77.59) is None
+
+
+def test_add_elements_replaces_only_the_given_tiles():
+    store = _store(FakeOverpass())
+    store.add_elements([_element(*h) for h in HOSPITALS], [tile_of(12.97, 77.59, 1.0)])
+    # Hospital 3 is in another tile, so it is left out
+    assert {r['id'] for r in store._records.values()} == {'node/1', 'node/2'}
+    store.add_elements([_element(1, 12.5, 77.5)], [tile_of(12.97, 77.59, 1.0)])
+    assert [r['id'] for r in store._records.values()] == ['node/1']
+    assert store._records['node/1']['lat'] == 12.5
+
+
+def test_concurrent_misses_on_one_area_share_a_fetch():
+    fetch = FakeOverpass()
+    fetch.release.clear()
+    store = _store(fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.nearby(12.97, 77.59))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    fetch.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(fetch.calls) == 1
+    assert len(results) == 4 and all(len(found) == 3 for found in results)
+
+
+def test_a_slow_fetch_does_not_hold_up_other_areas():
+    overpass = FakeOverpass()
+    bengaluru = threading.Event()
+
+    def fetch(bboxes):
+        # Only the fetch around Bengaluru hangs
+        if any(s <= 12.97 < n for s, _, n, _ in bboxes):
+            bengaluru.wait(5)
+        return overpass(bboxes)
+
+    store = _store(fetch)
+    slow = threading.Thread(target=store.nearby, args=(12.97, 77.59))
+    slow.start()
+    time.sleep(0.1)
+
+    # Mumbai shares no tile with Bengaluru, so its fetch runs while Bengaluru's waits
+    start = time.perf_counter()
+    found = store.nearby(19.07, 72.88, radius_km=20)
+    assert time.perf_counter() - start < 1
+    assert [r['id'] for _, r in found] == ['node/4']
+
+    bengaluru.set()
+    slow.join(5)
+    assert {r['id'] for r in store._records.values()} == {'node/1', 'node/2', 'node/3', 'node/4'}
+    # Both fetches made it into the saved file
+    reloaded = HospitalStore(path=store.path, tile_deg=1.0, live_fetch=False)
+    assert reloaded.stats()['hospitals'] == 4
+
+
+def test_workers_sharing_a_file_keep_each_others_tiles():
+    fetch = FakeOverpass()
+    first = _store(fetch)
+    second = HospitalStore(path=first.path, tile_deg=1.0, fetch=fetch, reload_check_seconds=3600)
+    first._checked_at = second._checked_at = time.time()
+    # Each worker fills a different area, from a snapshot without the other's tiles
+    assert [r['id'] for _, r in first.nearby(12.97, 77.59, radius_km=60)] == ['node/1', 'node/2', 'node/3']
+    assert [r['id'] for _, r in second.nearby(19.07, 72.88, radius_km=20)] == ['node/4']
+    calls = len(fetch.calls)
+
+    reloaded = HospitalStore(path=first.path, tile_deg=1.0, live_fetch=False)
+    assert reloaded.stats()['hospitals'] == 4
+    # The first worker picks up the second one's tiles without losing its own
+    first._checked_at = 0
+    first.live_fetch = False
+    assert [r['id'] for _, r in first.nearby(19.07, 72.88, radius_km=20)] == ['node/4']
+    assert len(first.nearby(12.97, 77.59, radius_km=60)) == 3
+    assert len(fetch.calls) == calls
+
+
+def test_most_recently_fetched_tile_wins():
+    first = _store(FakeOverpass(), live_fetch=False)
+    key = tile_of(12.97, 77.59, 1.0)
+    first.add_elements([_element(1, 12.97, 77.59)], [key], fetched_at=100)
+    second = HospitalStore(path=first.path, tile_deg=1.0, live_fetch=False, reload_check_seconds=3600)
+    # The second worker refreshes the tile, then the first saves its older copy
+    second.add_elements([_element(1, 12.97, 77.59), _element(2, 12.93, 77.62)], [key], fetched_at=200)
+    first.save()
+    assert {r['id'] for r in first._records.values()} == {'node/1', 'node/2'}
+    reloaded = HospitalStore(path=first.path, tile_deg=1.0, live_fetch=False)
+    assert reloaded._tiles[key] == 200 and reloaded.stats()['hospitals'] == 2
+
+
+def main():
+    print("=" * 60)
+    print("HOSPITAL STORE TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental JSON parser used by the streaming endpoints (json_stream.py).
+
+Feeds LLM-style answers in pieces of every size and checks that each field
+is reported once, as soon as it is complete, and that the final object
+matches json.loads of the whole text.
+
+Run with pytest, or directly:
+    python test_json_stream.py
+"""
+import os
+import sys
+import json
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from json_stream import JSONStreamParser
+
+ANSWER = {
+    'symptom_comparison': {'overlap_percentage': 40, 'relation_status': 'Not Related',
+                           'comparison_summary': 'Braces } ] and "quotes", commas and \\ escapes'},
+    'predictions': [
+        {'disease': 'Influenza', 'confidence': 85.5, 'risk': 'High', 'explanation': 'Fever, cough'},
+        {'disease': 'Migraine', 'confidence': 30, 'risk': 'Low', 'explanation': 'Headache → light'},
+    ],
+    'severity_change': 'New Condition',
+    'recommended_steps': ['Rest', 'Drink fluids'],
+    'empty': [],
+    'flags': [True, False, None, -1.5e3],
+}
+
+
+def _feed_in_pieces(text, sizes):
+    parser = JSONStreamParser()
+    completed = []
+    i = 0
+    while i < len(text):
+        size = next(sizes)
+        completed.extend(parser.feed(text[i:i + size]))
+        i += size
+    return parser, completed
+
+
+def test_fields_complete_in_order_for_any_chunking():
+    text = 'Here is the analysis:\n```json\n' + json.dumps(ANSWER, indent=2) + '\n```\nStay safe.'
+    expected = None
+    rng = random.Random(7)
+    for sizes in ([1], [2, 5], [len(text)], None):
+        chunks = iter(sizes * len(text)) if sizes else iter(lambda: rng.randint(1, 12), None)
+        parser, completed = _feed_in_pieces(text, chunks)
+        assert parser.done and parser.result == ANSWER
+        if expected is None:
+            expected = completed
+        assert completed == expected
+
+    paths = [path for path, _ in expected]
+    assert paths.index(('predictions', 0)) < paths.index(('predictions', 1)) < paths.index(('predictions',))
+    assert ('flags', 3) in paths and ('symptom_comparison', 'overlap_percentage') in paths
+    values = dict(expected)
+    assert values[('predictions', 1)] == ANSWER['predictions'][1]
+    assert values[('empty',)] == [] and values[('flags', 2)] is None
+
+
+def test_prediction_is_reported_when_its_object_closes():
+    parser = JSONStreamParser()
+    # Fields inside a prediction are deeper than max_depth, so nothing is reported yet
+    assert parser.feed('{"predictions": [{"disease": "Asthma", "risk": "Low"') == []
+    completed = parser.feed('}')
+    assert completed == [(('predictions', 0), {'disease': 'Asthma', 'risk': 'Low'})]
+    assert not parser.done
+
+
+def test_invalid_values_are_skipped():
+    parser = JSONStreamParser()
+    completed = parser.feed('{"risk": High, "confidence": 50}')
+    assert completed == [(('confidence',), 50)]
+    assert parser.done and parser.result is None
+    assert parser.feed('{"more": 1}') == []
+
+
+def main():
+    print("=" * 60)
+    print("INCREMENTAL JSON PARSER TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Tests for the ETags and since cursors of the polled lists (list_cursors.py)
+on the appointment lists and the doctor's pending approvals, against an
+in-memory SQLite database: 304s, ETags changing on inserts and updates,
+incremental responses, the cursor overlap and malformed cursors.
+
+Run with pytest, or directly:
+    python test_list_cursors.py
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Appointment, Prediction
+from appointment_routes import appointment_bp
+from doctor_routes import doctor_bp, PENDING_APPROVALS_LIMIT
+from list_cursors import parse_since, cursor_value, CURSOR_OVERLAP
+
+T0 = datetime(2026, 3, 10, 12, 0)
+
+
+def _make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(appointment_bp, url_prefix='/api/appointments')
+    app.register_blueprint(doctor_bp, url_prefix='/api/doctor')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'),
+            User(id=2, name='Doctor', email='d@example.com', password_hash='x', role='doctor', doctor_id='DOC1'),
+        ])
+        db.session.commit()
+    return app
+
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = user_id
+    return client
+
+
+def _appointment(minutes, symptoms='cough'):
+    when = T0 + timedelta(minutes=minutes)
+    return Appointment(appointment_id=str(uuid.uuid4()), doctor_id=2, patient_id=1, patient_name='Patient',
+                       symptoms=symptoms, appointment_date=when.date(), appointment_time=when.time(),
+                       status='pending', video_room_id=str(uuid.uuid4()), created_at=when, updated_at=when)
+
+
+def _prediction(minutes):
+    when = T0 + timedelta(minutes=minutes)
+    return Prediction(user_id=1, disease_type='diabetes', prediction_result='Low Risk', probability=0.2,
+                      risk_level='Low', created_at=when, updated_at=when)
+
+
+def _touch(model, row_id, when):
+    row = db.session.get(model, row_id)
+    row.status = 'accepted' if model is Appointment else 'clinically_verified'
+    row.updated_at = when
+    db.session.commit()
+
+
+def test_parse_since():
+    assert parse_since(None) is None and parse_since('') is None
+    assert parse_since('2026-03-10T12:00:00') == T0 - CURSOR_OVERLAP
+    # Offsets are converted to naive UTC, as the columns are stored
+    assert parse_since('2026-03-10T17:30:00+05:30') == T0 - CURSOR_OVERLAP
+    assert parse_since('2026-03-10T12:00:00Z') == T0 - CURSOR_OVERLAP
+    assert cursor_value(T0) == '2026-03-10T12:00:00' and cursor_value(None) is None
+    try:
+        parse_since('yesterday')
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+
+def test_matching_etag_gets_a_304_until_the_list_changes():
+    app = _make_app()
+    with app.app_context():
+        db.session.add_all([_appointment(0), _appointment(10)])
+        db.session.commit()
+        first_id = Appointment.query.order_by(Appointment.created_at).first().id
+    client = _client(app, 1)
+
+    response = client.get('/api/appointments/patient')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and len(response.get_json()['appointments']) == 2
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    cached = client.get('/api/appointments/patient', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.data == b'' and cached.headers['ETag'] == etag
+
+    # An update changes the ETag
+    with app.app_context():
+        _touch(Appointment, first_id, T0 + timedelta(minutes=20))
+    response = client.get('/api/appointments/patient', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    etag = response.headers['ETag']
+
+    # So does an insert
+    with app.app_context():
+        db.session.add(_appointment(30))
+        db.session.commit()
+    response = client.get('/api/appointments/patient', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and len(response.get_json()['appointments']) == 3
+
+    # Another user's list has its own ETag
+    other = _client(app, 2).get('/api/appointments/doctor', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+
+
+def test_since_returns_only_changed_appointments():
+    app = _make_app()
+    with app.app_context():
+        db.session.add_all([_appointment(0, 'first'), _appointment(5, 'second'), _appointment(10, 'latest')])
+        db.session.commit()
+        first_id = Appointment.query.filter_by(symptoms='first').one().id
+    client = _client(app, 1)
+
+    body = client.get('/api/appointments/patient').get_json()
+    assert body['incremental'] is False and body['cursor'] == (T0 + timedelta(minutes=10)).isoformat()
+    cursor = body['cursor']
+
+    with app.app_context():
+        _touch(Appointment, first_id, T0 + timedelta(minutes=20))
+        db.session.add(_appointment(30, 'third'))
+        db.session.commit()
+    body = client.get('/api/appointments/patient', query_string={'since': cursor}).get_json()
+    assert body['incremental'] is True
+    # The row at the cursor comes again, within the overlap; the unchanged one does not
+    assert sorted(a['symptoms'] for a in body['appointments']) == ['first', 'latest', 'third']
+    assert body['cursor'] == (T0 + timedelta(minutes=30)).isoformat()
+
+    # Nothing changed since: only the row at the cursor itself
+    body = client.get('/api/appointments/patient', query_string={'since': body['cursor']}).get_json()
+    assert [a['symptoms'] for a in body['appointments']] == ['third']
+
+
+def test_since_overlaps_by_cursor_overlap():
+    app = _make_app()
+    with app.app_context():
+        db.session.add_all([_appointment(0, 'old'), _appointment(10, 'latest')])
+        db.session.commit()
+        ids = {a.symptoms: a.id for a in Appointment.query}
+        cursor = cursor_value(T0 + timedelta(minutes=10))
+        # A change committed just before the cursor, e.g. by a transaction that was
+        # still open when the previous response was built, is still returned
+        _touch(Appointment, ids['old'], T0 + timedelta(minutes=10) - CURSOR_OVERLAP + timedelta(milliseconds=500))
+    client = _client(app, 1)
+    body = client.get('/api/appointments/patient', query_string={'since': cursor}).get_json()
+    assert sorted(a['symptoms'] for a in body['appointments']) == ['latest', 'old']
+
+    with app.app_context():
+        _touch(Appointment, ids['old'], T0 + timedelta(minutes=10) - CURSOR_OVERLAP - timedelta(seconds=1))
+    body = client.get('/api/appointments/patient', query_string={'since': cursor}).get_json()
+    assert [a['symptoms'] for a in body['appointments']] == ['latest']
+
+
+def test_malformed_since_is_a_400():
+    app = _make_app()
+    patient, doctor = _client(app, 1), _client(app, 2)
+    for client, url in ((patient, '/api/appointments/patient'), (doctor, '/api/appointments/doctor'),
+                        (doctor, '/api/doctor/pending-approvals')):
+        response = client.get(url, query_string={'since': 'last-tuesday'})
+        assert response.status_code == 400, url
+        assert 'since' in response.get_json()['error']
+    assert patient.get('/api/appointments/patient', query_string={'before': 'nope'}).status_code == 400
+
+
+def test_pending_approvals_etag_and_since():
+    app = _make_app()
+    with app.app_context():
+        db.session.add_all([_prediction(0), _prediction(5), _prediction(10)])
+        db.session.commit()
+        first_id, _, latest_id = [p.id for p in Prediction.query.order_by(Prediction.created_at)]
+    client = _client(app, 2)
+
+    response = client.get('/api/doctor/pending-approvals')
+    body, etag = response.get_json(), response.headers['ETag']
+    assert len(body['predictions']) == 3 and body['incremental'] is False
+    assert client.get('/api/doctor/pending-approvals', headers={'If-None-Match': etag}).status_code == 304
+
+    with app.app_context():
+        _touch(Prediction, first_id, T0 + timedelta(minutes=20))
+    response = client.get('/api/doctor/pending-approvals', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    body = client.get('/api/doctor/pending-approvals', query_string={'since': body['cursor']}).get_json()
+    assert body['incremental'] is True
+    assert [(p['id'], p['status']) for p in body['predictions']] == \
+        [(latest_id, 'pending_review'), (first_id, 'clinically_verified')]
+
+
+def test_pending_approvals_since_stays_within_the_newest_predictions():
+    app = _make_app()
+    with app.app_context():
+        db.session.add_all([_prediction(i) for i in range(PENDING_APPROVALS_LIMIT + 5)])
+        db.session.commit()
+        by_age = [p.id for p in Prediction.query.order_by(Prediction.created_at)]
+    client = _client(app, 2)
+    full = client.get('/api/doctor/pending-approvals').get_json()
+    assert [p['id'] for p in full['predictions']] == by_age[::-1][:PENDING_APPROVALS_LIMIT]
+
+    # The oldest prediction changes, but it is not in the list
+    with app.app_context():
+        _touch(Prediction, by_age[0], T0 + timedelta(hours=1))
+        _touch(Prediction, by_age[-1], T0 + timedelta(hours=1))
+    body = client.get('/api/doctor/pending-approvals', query_string={'since': full['cursor']}).get_json()
+    assert [p['id'] for p in body['predictions']] == [by_age[-1]]
+
+    # Merging the changes gives the same list as a full reload
+    merged = {p['id']: p for p in full['predictions']}
+    merged.update((p['id'], p) for p in body['predictions'])
+    newest = sorted(merged.values(), key=lambda p: p['created_at'], reverse=True)[:PENDING_APPROVALS_LIMIT]
+    assert newest == client.get('/api/doctor/pending-approvals').get_json()['predictions']
+
+
+def main():
+    print("=" * 60)
+    print("LIST CURSOR TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared Groq client (llm_client.py).
+
+Runs the real Groq SDK against a local stub of the chat completions API, so
+no API key or network access is needed. Covers connection reuse, retries
+and the retry budget, the circuit breaker, per-endpoint concurrency limits
+and streamed completions.
+
+Run with pytest, or directly:
+    python test_llm_client.py
+"""
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import (LLMClient, LLMUnavailable, CircuitOpenError, EndpointBusyError, RetryBudget,
+                        CircuitBreaker, CLOSED, OPEN)
+
+
+class StubGroq:
+    """Chat completions stub. Each request takes the next (status, delay) from script, else (200, 0).
+
+    Streamed requests get the answer as server-sent event chunks; status 'stall'
+    sends the first chunk and then stalls for a second.
+    """
+
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub.lock:
+                    stub.requests += 1
+                    stub.connections.add(self.client_address)
+                    status, delay = stub.script.pop(0) if stub.script else (200, 0)
+                time.sleep(delay)
+                if payload.get('stream') and status in (200, 'stall'):
+                    self.send_stream(status == 'stall')
+                    return
+                if status == 200:
+                    body = {
+                        'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': 0,
+                        'model': 'llama-3.1-8b-instant',
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': 'stub answer'}}]
+                    }
+                else:
+                    body = {'error': {'message': f'stub error {status}', 'type': 'stub'}}
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_stream(self, stall):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for i, piece in enumerate(['stub', ' answer']):
+                    chunk = {'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': 0,
+                             'model': 'llama-3.1-8b-instant',
+                             'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(1.0 if stall else 0.05)
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _client(stub, **kwargs):
+    kwargs.setdefault('timeout', 5)
+    return LLMClient(api_key='test-key', base_url=stub.url, **kwargs)
+
+
+def _ask(client, endpoint='groq_chat'):
+    completion = client.chat(endpoint, model='llama-3.1-8b-instant',
+                             messages=[{'role': 'user', 'content': 'hi'}], max_tokens=5)
+    return completion.choices[0].message.content
+
+
+def test_connections_are_reused():
+    stub = StubGroq()
+    try:
+        client = _client(stub)
+        for _ in range(5):
+            assert _ask(client) == 'stub answer'
+        assert stub.requests == 5
+        assert len(stub.connections) == 1
+    finally:
+        stub.close()
+
+
+def test_retries_transient_errors():
+    stub = StubGroq()
+    try:
+        client = _client(stub, max_retries=2)
+        stub.script = [(503, 0), (429, 0)]
+        assert _ask(client) == 'stub answer'
+        assert stub.requests == 3
+        stats = client.stats()['endpoints']['groq_chat']
+        assert stats['retries'] == 2 and stats['errors'] == 0
+    finally:
+        stub.close()
+
+
+def test_client_errors_are_not_retried():
+    stub = StubGroq()
+    try:
+        client = _client(stub)
+        stub.script = [(400, 0)]
+        try:
+            _ask(client)
+            assert False, 'expected the 400 to be raised'
+        except LLMUnavailable:
+            assert False, 'a 400 is a caller error, not an outage'
+        except Exception:
+            pass
+        assert stub.requests == 1
+        assert client.breaker.state == CLOSED and client.breaker.failures == 0
+    finally:
+        stub.close()
+
+
+def test_retry_budget_limits_retries():
+    stub = StubGroq()
+    try:
+        client = _client(stub, max_retries=5, retry_budget=RetryBudget(ratio=0.0, max_tokens=1),
+                         breaker=CircuitBreaker(failure_threshold=100))
+        stub.script = [(500, 0)] * 10
+        try:
+            _ask(client)
+            assert False, 'expected LLMUnavailable'
+        except LLMUnavailable:
+            pass
+        # One retry from the single budget token, not five
+        assert stub.requests == 2
+    finally:
+        stub.close()
+
+
+def test_breaker_opens_and_recovers():
+    stub = StubGroq()
+    try:
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.3)
+        client = _client(stub, max_retries=0, breaker=breaker)
+        stub.script = [(503, 0), (503, 0)]
+        for _ in range(2):
+            try:
+                _ask(client)
+            except LLMUnavailable:
+                pass
+        assert breaker.state == OPEN
+
+        # While open, calls fail at once without reaching Groq
+        start = time.perf_counter()
+        try:
+            _ask(client)
+            assert False, 'expected CircuitOpenError'
+        except CircuitOpenError:
+            pass
+        assert time.perf_counter() - start < 0.05
+        assert stub.requests == 2
+        assert client.stats()['endpoints']['groq_chat']['rejected_open'] == 1
+
+        # After the reset period a trial call goes through and closes it
+        time.sleep(0.35)
+        assert _ask(client) == 'stub answer'
+        assert breaker.state == CLOSED
+    finally:
+        stub.close()
+
+
+def test_slow_upstream_times_out_into_breaker():
+    stub = StubGroq()
+    try:
+        client = _client(stub, timeout=0.2, max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+        stub.script = [(200, 1.0)]
+        try:
+            _ask(client)
+            assert False, 'expected a timeout'
+        except LLMUnavailable:
+            pass
+        assert client.breaker.state == OPEN
+    finally:
+        stub.close()
+
+
+def test_endpoint_concurrency_limit():
+    stub = StubGroq()
+    try:
+        client = _client(stub, endpoint_limits={'symptom_checker': 1}, queue_timeout=0.05)
+        stub.script = [(200, 0.5)]
+        results = []
+        slow = threading.Thread(target=lambda: results.append(_ask(client, 'symptom_checker')))
+        slow.start()
+        time.sleep(0.1)
+        try:
+            _ask(client, 'symptom_checker')
+            assert False, 'expected EndpointBusyError'
+        except EndpointBusyError:
+            pass
+        # Other endpoints have their own limit
+        assert _ask(client, 'groq_chat') == 'stub answer'
+        slow.join()
+        assert results == ['stub answer']
+        stats = client.stats()['endpoints']['symptom_checker']
+        assert stats['rejected_busy'] == 1 and stats['latency_ms']['p50'] >= 400
+    finally:
+        stub.close()
+
+
+def _stream(client, endpoint='groq_chat'):
+    return client.stream(endpoint, model='llama-3.1-8b-instant',
+                         messages=[{'role': 'user', 'content': 'hi'}], max_tokens=5)
+
+
+def test_stream_yields_tokens():
+    stub = StubGroq()
+    try:
+        client = _client(stub)
+        assert list(_stream(client)) == ['stub', ' answer']
+        stats = client.stats()['endpoints']['groq_chat']
+        assert stats['calls'] == 1 and stats['in_flight'] == 0
+        assert stats['first_token_ms']['p50'] < stats['latency_ms']['p50']
+    finally:
+        stub.close()
+
+
+def test_stream_opening_is_retried():
+    stub = StubGroq()
+    try:
+        client = _client(stub, max_retries=1)
+        stub.script = [(503, 0)]
+        assert ''.join(_stream(client)) == 'stub answer'
+        assert stub.requests == 2
+    finally:
+        stub.close()
+
+
+def test_broken_stream_raises_unavailable():
+    stub = StubGroq()
+    try:
+        client = _client(stub, timeout=0.3, max_retries=3, breaker=CircuitBreaker(failure_threshold=1))
+        stub.script = [('stall', 0)]
+        received = []
+        try:
+            for token in _stream(client):
+                received.append(token)
+            assert False, 'expected LLMUnavailable'
+        except LLMUnavailable:
+            pass
+        # Not retried once tokens were sent, and counted against the breaker
+        assert received == ['stub'] and stub.requests == 1
+        assert client.breaker.state == OPEN
+    finally:
+        stub.close()
+
+
+def test_closed_stream_frees_its_slot():
+    stub = StubGroq()
+    try:
+        client = _client(stub, endpoint_limits={'groq_chat': 1}, queue_timeout=0.05)
+        tokens = _stream(client)
+        assert next(tokens) == 'stub'
+        tokens.close()
+        assert client.stats()['endpoints']['groq_chat']['in_flight'] == 0
+        assert client.breaker.state == CLOSED
+        assert _ask(client) == 'stub answer'
+    finally:
+        stub.close()
+
+
+def test_unconfigured_client_is_unavailable():
+    client = LLMClient(api_key=None)
+    assert not client.available
+    try:
+        client.chat('groq_chat', model='x', messages=[])
+        assert False, 'expected LLMUnavailable'
+    except LLMUnavailable:
+        pass
+
+
+def main():
+    print("=" * 60)
+    print("LLM CLIENT TESTS (local stub server)")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batcher (micro_batcher.py) with a stand-in scoring
+function: concurrent rows scored as one matrix, the batch size cap, callers
+that time out, and scoring errors reaching every caller in the batch.
+
+Run with pytest, or directly:
+    python test_micro_batcher.py
+"""
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from micro_batcher import MicroBatcher, microbatch_settings
+
+
+class Scorer:
+    """Labels each row with its first feature and scores it as the row's sum; records batch sizes."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, matrix):
+        self.batches.append(matrix.shape[0])
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError('model exploded')
+        return matrix[:, 0].astype(int), matrix.sum(axis=1)
+
+
+def _submit_all(batcher, rows, **kwargs):
+    with ThreadPoolExecutor(max_workers=len(rows)) as pool:
+        return list(pool.map(lambda row: batcher.submit(row, **kwargs), rows))
+
+
+def test_concurrent_rows_are_scored_together():
+    scorer = Scorer()
+    batcher = MicroBatcher('test', scorer, max_batch_size=32, max_wait_ms=200)
+    rows = [[i, 1.0, 2.0] for i in range(8)]
+    results = _submit_all(batcher, rows)
+    # Each caller gets its own row's result back
+    assert [(int(label), float(prob)) for label, prob in results] == [(i, i + 3.0) for i in range(8)]
+    assert sum(scorer.batches) == 8 and len(scorer.batches) < 8
+    stats = batcher.stats()
+    assert stats['requests'] == 8 and stats['batches'] == len(scorer.batches)
+    assert sum(stats['batch_size_histogram'].values()) == stats['batches']
+
+
+def test_batches_are_capped_at_max_batch_size():
+    scorer = Scorer()
+    batcher = MicroBatcher('test', scorer, max_batch_size=3, max_wait_ms=200)
+    _submit_all(batcher, [[i, 0.0] for i in range(10)])
+    assert max(scorer.batches) <= 3 and sum(scorer.batches) == 10
+    assert batcher.stats()['largest_batch'] <= 3
+
+
+def test_a_lone_row_waits_at_most_max_wait():
+    batcher = MicroBatcher('test', Scorer(), max_batch_size=32, max_wait_ms=20)
+    start = time.perf_counter()
+    label, prob = batcher.submit([5, 1.0])
+    assert (label, prob) == (5, 6.0)
+    assert time.perf_counter() - start < 1
+
+
+def test_scoring_error_reaches_every_caller_in_the_batch():
+    batcher = MicroBatcher('test', Scorer(fail=True), max_batch_size=32, max_wait_ms=100)
+    errors = []
+
+    def call(row):
+        try:
+            batcher.submit(row)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call, args=([i, 0.0],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ['model exploded'] * 4
+
+    # The worker survives the error
+    batcher.score_fn = Scorer()
+    assert batcher.submit([2, 0.0]) == (2, 2.0)
+
+
+def test_timed_out_caller_is_dropped_from_its_batch():
+    scorer = Scorer(delay=0.3)
+    batcher = MicroBatcher('test', scorer, max_batch_size=1, max_wait_ms=0)
+    # The first row keeps the worker busy, so the second is still queued when its caller gives up
+    slow = threading.Thread(target=batcher.submit, args=([1, 0.0],))
+    slow.start()
+    time.sleep(0.05)
+    try:
+        batcher.submit([2, 0.0], timeout=0.05)
+        assert False, 'expected a timeout'
+    except TimeoutError:
+        pass
+    slow.join(5)
+    assert batcher.submit([3, 0.0], timeout=5) == (3, 3.0)
+    # Only the rows of callers still waiting were scored
+    assert scorer.batches == [1, 1] and batcher.stats()['requests'] == 2
+
+
+def test_settings_default_to_off():
+    os.environ.pop('MICROBATCH_ENABLED', None)
+    assert microbatch_settings()['enabled'] is False
+    os.environ['MICROBATCH_ENABLED'] = 'true'
+    try:
+        assert microbatch_settings()['enabled'] is True
+    finally:
+        del os.environ['MICROBATCH_ENABLED']
+
+
+def main():
+    print("=" * 60)
+    print("MICRO-BATCHER TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Parity tests for compiled tabular models (model_compiler.py).
+
+Checks that the NumPy evaluator returns the same probabilities and labels as
+sklearn, for synthetic models and for the real pickles when they are present.
+
+Run with pytest, or directly for a latency comparison:
+    python test_model_compiler.py
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_compiler import (
+    BACKEND_DIR, TABULAR_MODEL_FILES, save_compiled, load_compiled, compare_latency
+)
+
+ATOL = 1e-12
+
+
+def _synthetic_data(n_features, n_classes=2, n_samples=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, n_features)) * 10 + 50
+    y = np.digitize(X[:, 0] + rng.normal(size=n_samples) * 5, np.linspace(40, 60, n_classes - 1))
+    return X, y
+
+
+def _assert_parity(model, scaler, X):
+    with tempfile.TemporaryDirectory() as tmp:
+        save_compiled(tmp, model, scaler)
+        compiled_model, compiled_scaler = load_compiled(tmp)
+
+    X_in = scaler.transform(X) if scaler is not None else X
+    X_c = compiled_scaler.transform(X) if compiled_scaler is not None else X
+
+    np.testing.assert_allclose(compiled_model.predict_proba(X_c), model.predict_proba(X_in), rtol=0, atol=ATOL)
+    np.testing.assert_array_equal(compiled_model.predict(X_c), model.predict(X_in))
+
+
+def test_random_forest_parity():
+    from sklearn.ensemble import RandomForestClassifier
+    X, y = _synthetic_data(11)
+    model = RandomForestClassifier(n_estimators=40, random_state=0).fit(X, y)
+    _assert_parity(model, None, X)
+
+
+def test_extra_trees_and_decision_tree_parity():
+    from sklearn.ensemble import ExtraTreesClassifier
+    from sklearn.tree import DecisionTreeClassifier
+    X, y = _synthetic_data(10, n_classes=3)
+    _assert_parity(ExtraTreesClassifier(n_estimators=15, random_state=0).fit(X, y), None, X)
+    _assert_parity(DecisionTreeClassifier(random_state=0).fit(X, y), None, X)
+
+
+def test_scaled_logistic_regression_parity():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler
+    X, y = _synthetic_data(4)
+    scaler = StandardScaler().fit(X)
+    _assert_parity(LogisticRegression().fit(scaler.transform(X), y), scaler, X)
+
+    X3, y3 = _synthetic_data(6, n_classes=3)
+    scaler3 = MinMaxScaler().fit(X3)
+    _assert_parity(LogisticRegression(max_iter=500).fit(scaler3.transform(X3), y3), scaler3, X3)
+
+
+def test_scaled_random_forest_parity():
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    X, y = _synthetic_data(24)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=1).fit(scaler.transform(X), y)
+    _assert_parity(model, scaler, X)
+
+
+def test_real_pickles_parity():
+    import joblib
+    checked = 0
+    for name, (model_file, scaler_file) in TABULAR_MODEL_FILES.items():
+        model_path = os.path.join(BACKEND_DIR, model_file)
+        if not os.path.exists(model_path):
+            continue
+        try:
+            model = joblib.load(model_path)
+            scaler = joblib.load(os.path.join(BACKEND_DIR, scaler_file)) if scaler_file else None
+        except Exception as e:
+            print(f"Skipping {name}: pickle does not load here ({e})")
+            continue
+        X, _ = _synthetic_data(int(model.n_features_in_), n_samples=1000, seed=1)
+        _assert_parity(model, scaler, X)
+        checked += 1
+    print(f"Checked {checked} real model(s)")
+
+
+def main():
+    from sklearn.ensemble import RandomForestClassifier
+    print("=" * 60)
+    print("COMPILED MODEL PARITY AND LATENCY")
+    print("=" * 60)
+    for test in (test_random_forest_parity, test_extra_trees_and_decision_tree_parity,
+                 test_scaled_logistic_regression_parity, test_scaled_random_forest_parity,
+                 test_real_pickles_parity):
+        test()
+        print(f"✓ {test.__name__}")
+
+    X, y = _synthetic_data(11, n_samples=5000)
+    model = RandomForestClassifier(n_estimators=100, random_state=0).fit(X, y)
+    with tempfile.TemporaryDirectory() as tmp:
+        save_compiled(tmp, model)
+        compiled_model, _ = load_compiled(tmp)
+    print("\nRandomForest (100 trees, 11 features) predict_proba latency:")
+    for batch_size, t in compare_latency(model, None, compiled_model, None, 11).items():
+        print(f"  batch={batch_size:>6}  sklearn={t['sklearn_ms']:>9.3f} ms  compiled={t['compiled_ms']:>9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tests for the lazy model registry (model_registry.py) with stand-in loaders:
+a model's way from not loaded through loading to loaded or failed, one load
+shared by concurrent callers, retrying a failed load after the backoff,
+reset() and warmup.
+
+Run with pytest, or directly:
+    python test_model_registry.py
+"""
+import os
+import sys
+import time
+import logging
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_registry import (ModelRegistry, parse_warmup_list, warmup_from_env,
+                            NOT_LOADED, LOADING, LOADED, FAILED)
+
+logging.getLogger('model_registry').setLevel(logging.CRITICAL)
+
+
+class Loader:
+    """Stand-in model loader: fails its first `failures` calls, waits for release() when slow."""
+
+    def __init__(self, failures=0, slow=False):
+        self.failures = failures
+        self.calls = 0
+        self.started = threading.Event()
+        self.released = threading.Event()
+        if not slow:
+            self.released.set()
+
+    def release(self):
+        self.released.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.released.wait(5)
+        if self.calls <= self.failures:
+            raise OSError('model download timed out')
+        return {'model': self.calls}
+
+
+def test_model_goes_from_not_loaded_to_loading_to_loaded():
+    loader = Loader(slow=True)
+    registry = ModelRegistry()
+    registry.register('diabetes', loader, 'Diabetes classifier')
+    assert registry.status()['diabetes']['state'] == NOT_LOADED
+    assert not registry.is_loaded('diabetes')
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(registry.get('diabetes')))
+    thread.start()
+    loader.started.wait(5)
+    assert registry.status()['diabetes']['state'] == LOADING
+    loader.release()
+    thread.join(5)
+
+    assert results == [{'model': 1}] and registry.is_loaded('diabetes')
+    status = registry.status()['diabetes']
+    assert (status['state'], status['error'], status['attempts']) == (LOADED, None, 1)
+    assert status['load_time_ms'] is not None and status['description'] == 'Diabetes classifier'
+    # Loaded models are not loaded again
+    assert registry.get('diabetes') is results[0] and loader.calls == 1
+
+
+def test_concurrent_callers_share_one_load():
+    loader = Loader(slow=True)
+    registry = ModelRegistry()
+    registry.register('heart', loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('heart'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    loader.started.wait(5)
+    time.sleep(0.1)
+    loader.release()
+    for thread in threads:
+        thread.join(5)
+    assert loader.calls == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_failed_load_keeps_its_error():
+    registry = ModelRegistry(retry_seconds=None)
+    registry.register('liver', Loader(failures=1))
+    assert registry.get('liver') is None
+    status = registry.status()['liver']
+    assert (status['state'], status['error'], status['attempts']) == (FAILED, 'model download timed out', 1)
+    assert registry.error('liver') == 'model download timed out' and not registry.is_loaded('liver')
+    # Without a retry interval the failure sticks
+    assert registry.get('liver') is None and registry.status()['liver']['attempts'] == 1
+
+
+def test_failed_load_is_retried_after_the_backoff():
+    loader = Loader(failures=2)
+    registry = ModelRegistry(retry_seconds=0.2)
+    registry.register('kidney', loader)
+    assert registry.get('kidney') is None
+    # Inside the backoff callers fail fast, without calling the loader
+    assert registry.get('kidney') is None and loader.calls == 1
+
+    time.sleep(0.25)
+    assert registry.get('kidney') is None and loader.calls == 2
+    assert registry.status()['kidney']['state'] == FAILED
+
+    time.sleep(0.25)
+    assert registry.get('kidney') == {'model': 3}
+    status = registry.status()['kidney']
+    assert (status['state'], status['error'], status['attempts']) == (LOADED, None, 3)
+
+
+def test_concurrent_callers_share_one_retry():
+    loader = Loader(failures=1)
+    registry = ModelRegistry(retry_seconds=0.1)
+    registry.register('heart', loader)
+    registry.get('heart')
+    time.sleep(0.15)
+    loader.released.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('heart'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    loader.release()
+    for thread in threads:
+        thread.join(5)
+    assert loader.calls == 2 and results == [{'model': 2}] * 8
+
+
+def test_reset_loads_again():
+    loader = Loader(failures=1)
+    registry = ModelRegistry(retry_seconds=None)
+    registry.register('diabetes', loader)
+    assert registry.get('diabetes') is None
+    registry.reset('diabetes')
+    status = registry.status()['diabetes']
+    assert (status['state'], status['error'], status['loaded_at'], status['attempts']) == (NOT_LOADED, None, None, 0)
+    assert registry.get('diabetes') == {'model': 2}
+    registry.reset('no-such-model')
+
+
+def test_unknown_model():
+    registry = ModelRegistry()
+    try:
+        registry.get('cancer')
+        assert False, 'expected KeyError'
+    except KeyError:
+        pass
+    assert not registry.is_loaded('cancer') and registry.error('cancer') is None
+
+
+def test_warmup_loads_listed_models_and_skips_unknown_ones():
+    loaders = {name: Loader() for name in ('diabetes', 'heart', 'liver')}
+    registry = ModelRegistry()
+    for name, loader in loaders.items():
+        registry.register(name, loader)
+    registry.warmup(['heart', 'cancer'])
+    assert [name for name in loaders if registry.is_loaded(name)] == ['heart']
+    registry.warmup_in_background().join(5)
+    assert all(registry.is_loaded(name) for name in loaders)
+    assert [loader.calls for loader in loaders.values()] == [1, 1, 1]
+
+
+def test_parse_warmup_list():
+    assert parse_warmup_list('') == [] and parse_warmup_list(None) == []
+    assert parse_warmup_list(' ALL ') is None
+    assert parse_warmup_list('diabetes, heart,,') == ['diabetes', 'heart']
+
+
+def test_warmup_from_env():
+    registry = ModelRegistry()
+    registry.register('diabetes', Loader())
+    registry.register('heart', Loader())
+    original = os.environ.get('MODEL_WARMUP')
+    try:
+        os.environ['MODEL_WARMUP'] = 'heart'
+        assert warmup_from_env(registry) is None
+        assert registry.is_loaded('heart') and not registry.is_loaded('diabetes')
+    finally:
+        if original is None:
+            os.environ.pop('MODEL_WARMUP', None)
+        else:
+            os.environ['MODEL_WARMUP'] = original
+
+
+def main():
+    print("=" * 60)
+    print("MODEL REGISTRY TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,16 +4,13 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from app import bone_model, hf_model, hf_processor
+    from app import model_registry
     print("=== Model Loading Status ===")
-    print(f"Bone model loaded: {bone_model is not None}")
-    print(f"Bone model type: {type(bone_model) if bone_model else 'None'}")
-    print(f"HF model loaded: {hf_model is not None}")
-    print(f"HF processor loaded: {hf_processor is not None}")
-
-    if hf_model:
-        print(f"HF model config: {hf_model.config}")
-        print(f"HF model device: {hf_model.device}")
+    model_registry.warmup()
+    for name, info in model_registry.status().items():
+        print(f"{name}: {info['state']} ({info['load_time_ms']} ms)")
+        if info['error']:
+            print(f"  error: {info['error']}")
 
     print("\n=== Test Complete ===")
 except Exception as e:
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for tiled OCR (ocr_tiling.py) with a stand-in reader: strip bounds,
+boxes in the overlap kept by exactly one strip, the mapping back to page
+coordinates (also through the worker pool), and line grouping.
+
+Run with pytest, or directly:
+    python test_ocr_tiling.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from PIL import Image
+
+from ocr_tiling import TiledOCR, strip_bounds, ocr_strip, group_ocr_lines
+
+
+class BlockReader:
+    """Reads 'b<i>' for each dark block found in column band i (x in [20i, 20i + 16))."""
+
+    def readtext(self, image, **kwargs):
+        gray = np.asarray(image)
+        if gray.ndim == 3:
+            gray = gray.mean(axis=2)
+        results = []
+        for i in range(gray.shape[1] // 20):
+            rows = np.nonzero((gray[:, 20 * i:20 * i + 16] < 128).any(axis=1))[0]
+            if len(rows):
+                top, bottom = int(rows[0]), int(rows[-1]) + 1
+                x0, x1 = 20 * i, 20 * i + 16
+                results.append(([[x0, top], [x1, top], [x1, bottom], [x0, bottom]], f'b{i}', 0.9))
+        return results
+
+
+def block_reader():
+    return BlockReader()
+
+
+def _page(blocks, height=1000, width=400):
+    """A white page with a black 16 x 10 block at each (column band, top) in blocks."""
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    for band, top in blocks:
+        page[top:top + 10, 20 * band:20 * band + 16] = 0
+    return page
+
+
+def test_strip_cores_cover_every_row_once():
+    for height, strip_height, overlap in [(1000, 300, 40), (1000, 1000, 80), (999, 250, 0), (50, 300, 80)]:
+        bounds = strip_bounds(height, strip_height, overlap)
+        assert bounds[0][0] == 0 and bounds[-1][1] == height
+        assert bounds[0][2] == 0 and bounds[-1][3] == height
+        for (top, bottom, core_top, core_bottom), following in zip(bounds, bounds[1:] + [None]):
+            assert top <= core_top < core_bottom <= bottom
+            assert bottom - top <= strip_height
+            if following:
+                assert core_bottom == following[2]
+                assert bottom - following[0] == overlap
+    assert strip_bounds(100, 10, 50)[1][0] == 1  # overlap is capped below the strip height
+
+
+def test_box_in_the_overlap_is_kept_by_one_strip():
+    # Strips of 300 overlapping by 40: the first two share rows 260-299, with the core edge at 280
+    page = _page([(0, 100), (1, 262), (2, 283), (3, 900)])
+    bounds = strip_bounds(page.shape[0], 300, 40)
+    assert bounds[0][:2] == (0, 300) and bounds[1][:2] == (260, 560)
+
+    found = []
+    for top, bottom, core_top, core_bottom in bounds:
+        results, timings = ocr_strip(page[top:bottom], top, core_top, core_bottom, 1.0, block_reader)
+        found.append(sorted(text for _, text, _ in results))
+        assert set(timings) == {'preprocess', 'recognize'}
+    # b1 is centred at 267 and b2 at 288: both are read by strips 0 and 1, kept once
+    assert found[0] == ['b0', 'b1'] and found[1] == ['b2']
+    assert sorted(sum(found, [])) == ['b0', 'b1', 'b2', 'b3']
+
+
+def test_boxes_map_back_to_page_coordinates():
+    page = _page([(2, 420)])
+    results, _ = ocr_strip(page[400:700], 400, 400, 700, 0.5, block_reader)
+    (bbox, text, conf), = results
+    assert text == 'b2' and conf == 0.9
+    # Strip offset added, then the downscale undone
+    assert bbox[0] == [80.0, 840.0] and bbox[2] == [112.0, 860.0]
+
+
+def test_tiled_readtext_reads_each_block_once():
+    blocks = [(0, 5), (1, 255), (2, 262), (3, 283), (4, 520), (5, 795), (6, 990)]
+    img = Image.fromarray(_page(blocks))
+    # A high target dpi keeps the page at full size; two workers go through the pool
+    for workers in (1, 2):
+        ocr = TiledOCR(workers=workers, target_dpi=10000, strip_height=300, overlap=40,
+                       reader_factory=block_reader)
+        results, timings = ocr.readtext(img)
+        assert sorted(text for _, text, _ in results) == [f'b{i}' for i in range(7)]
+        tops = {text: bbox[0][1] for bbox, text, _ in results}
+        assert tops == {f'b{band}': float(top) for band, top in blocks}
+        assert timings['strips'] == 4 and timings['scale'] == 1.0
+        assert ocr.stats()['runs'] == 1
+
+
+def test_group_ocr_lines_joins_boxes_on_a_line():
+    def box(x, y, text, conf=0.9):
+        return ([[x, y], [x + 50, y], [x + 50, y + 20], [x, y + 20]], text, conf)
+
+    results = [box(200, 102, 'mg/dL'), box(0, 100, 'Glucose'), box(100, 100, '110'),
+               box(0, 200, 'HbA1c'), box(100, 210, '6.1%'), box(0, 300, 'smudge', conf=0.1)]
+    assert group_ocr_lines(results) == 'Glucose 110 mg/dL\nHbA1c 6.1%'
+    assert group_ocr_lines([box(0, 0, 'noise', conf=0.05)]) is None
+    assert group_ocr_lines([]) is None
+
+
+def test_group_ocr_lines_after_tiling_has_no_duplicates():
+    # A line straddling a strip edge comes out once, as it would from one readtext() call
+    img = Image.fromarray(_page([(0, 270), (1, 272), (2, 275)]))
+    results, _ = TiledOCR(workers=1, target_dpi=10000, strip_height=300, overlap=40,
+                          reader_factory=block_reader).readtext(img)
+    assert group_ocr_lines(results) == 'b0 b1 b2'
+
+
+def main():
+    print("=" * 60)
+    print("TILED OCR TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass lab parameter extractor (parameter_extractor.py).
+
+Checks that analyze_parameters returns exactly what the original
+per-parameter scan (analyze_parameters_by_scan) returns, on hand-written
+reports and on randomly generated ones.
+
+Run with pytest, or directly for a benchmark on large multi-page reports:
+    python test_parameter_extractor.py
+"""
+import os
+import sys
+import time
+import random
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import MEDICAL_PARAMETERS, analyze_parameters, analyze_parameters_by_scan, _parameter_extractor
+
+logging.getLogger('app').setLevel(logging.WARNING)
+logging.getLogger('parameter_extractor').setLevel(logging.WARNING)
+
+SAMPLE_REPORTS = [
+    "",
+    "No lab values in this document.",
+    "Hemoglobin: 10.2 g/dL\nFasting Blood Sugar: 132 mg/dL\nBlood Pressure: 142/91 mmHg\nBMI = 27.4",
+    "COMPLETE BLOOD COUNT\nTest  Result  Reference Range  Unit\n"
+    "Hemoglobin  13.5  13.0-17.0  g/dL\nWBC  12500  4000-11000  cells/cumm\n"
+    "Platelets  90000  150000 - 450000  cells/cumm\nRBC\t4.1\t4.5 to 5.5\tmillion/cumm",
+    "LIPID PROFILE\nInvestigation   Value   Normal\nTotal Cholesterol   245   <200   mg/dL\n"
+    "HDL Cholesterol   38   >40   mg/dL\nLDL   160   <100\nTriglycerides   210   <150   mg/dL",
+    "Serum Creatinine 1.8 mg/dl (0.6 - 1.2)\nBlood urea - 32\nSodium: 131 mEq/L\nPotassium: 5.6\n"
+    "SGPT 80 IU/L\nSGOT: 55\nTotal bilirubin 2.1\nSerum albumin 2.9",
+    "Thyroid panel\nTSH 6.2 mIU/L\nT3: 75\nT4 - 4.5\nHbA1c: 7.1 %",
+    "Result  1.2.3  0.5-1.0\nCreatinine  1..2  0.6-1.2",
+    "Remarks: patient reports fatigue.\nGlucose was measured twice; latest\n reading 145 after fasting.",
+]
+
+_SEPARATORS = [': ', ' ', ' - ', '=', ':', '  ', '\t', ' : ']
+_FILLER = ['Patient name: J. Doe', 'Page 2 of 5', 'Sample collected at 08:30', 'Dr. K. Rao, MD',
+           'Lab ID 88231', 'Remarks: fasting sample', 'Method: enzymatic', 'Last updated 12-03-2024',
+           '***', '', 'Reference ranges vary with age and sex', 'Interpretation: see below']
+
+
+def _random_value(rng, clean):
+    # Malformed values ('.', '1.2.3') make both extractors raise, so keep them rare
+    if not clean and rng.random() < 0.02:
+        return rng.choice(['.', '1.2.3'])
+    return rng.choice([
+        str(rng.randint(0, 500)),
+        f"{rng.uniform(0, 20):.1f}",
+        f"{rng.uniform(0, 2):.2f}",
+        str(rng.randint(1000, 500000)),
+        '', 'NIL',
+    ])
+
+
+def _random_line(rng, clean):
+    kind = rng.random()
+    if kind < 0.2:
+        return rng.choice(_FILLER)
+    info = MEDICAL_PARAMETERS[rng.choice(list(MEDICAL_PARAMETERS))]
+    name = rng.choice(info['aliases'] + [info['name']])
+    if rng.random() < 0.3:
+        name = name.upper() if rng.random() < 0.5 else name.title()
+    if rng.random() < 0.1:
+        return f"{name}{rng.choice(_SEPARATORS)}{rng.randint(90, 180)}/{rng.randint(60, 110)}"
+    parts = [name, _random_value(rng, clean)]
+    if rng.random() < 0.5:
+        parts.append(rng.choice([f"{rng.randint(0, 50)}-{rng.randint(50, 300)}", f"<{rng.randint(1, 300)}",
+                                 f">{rng.randint(1, 60)}", f"{rng.uniform(0, 5):.1f} to {rng.uniform(5, 20):.1f}"]))
+    if rng.random() < 0.5:
+        parts.append(rng.choice(['mg/dL', 'g/dl', 'IU/L', 'mmol/L', 'cells/cumm', '%', 'mEq/L']))
+    separator = rng.choice(['  ', '\t', ' ', ': ']) if rng.random() < 0.6 else rng.choice(_SEPARATORS)
+    return separator.join(parts)
+
+
+def random_report(rng, n_lines, clean=False):
+    lines = [_random_line(rng, clean) for _ in range(n_lines)]
+    if rng.random() < 0.5:
+        lines.insert(rng.randint(0, len(lines)), rng.choice(['Test  Result  Reference  Unit', 'Investigation\tValue\tNormal Range']))
+    return '\n'.join(lines)
+
+
+def _outcome(fn, text):
+    try:
+        return fn(text)
+    except Exception as e:
+        return ('raised', type(e).__name__, str(e))
+
+
+def test_sample_reports_match_scan():
+    for text in SAMPLE_REPORTS:
+        assert _outcome(analyze_parameters, text) == _outcome(analyze_parameters_by_scan, text), text
+
+
+def test_random_reports_match_scan():
+    rng = random.Random(8)
+    for _ in range(400):
+        text = random_report(rng, rng.randint(1, 40))
+        assert _outcome(analyze_parameters, text) == _outcome(analyze_parameters_by_scan, text), text
+
+
+def test_page_by_page_scan_matches_scan():
+    # PDF pages are fed to the scan as they are read; the result must not depend on the split
+    rng = random.Random(9)
+    for _ in range(100):
+        pages = [random_report(rng, rng.randint(1, 15)) for _ in range(rng.randint(1, 6))]
+        text = '\n'.join(pages)
+        scan = _parameter_extractor.scan()
+        for page in pages:
+            scan.feed(page)
+        assert _outcome(scan.finish, text) == _outcome(analyze_parameters_by_scan, text), text
+
+
+def _best_time(fn, text, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    print("=" * 60)
+    print("PARAMETER EXTRACTOR PARITY AND BENCHMARK")
+    print("=" * 60)
+    test_sample_reports_match_scan()
+    print("✓ test_sample_reports_match_scan")
+    test_random_reports_match_scan()
+    print("✓ test_random_reports_match_scan")
+    test_page_by_page_scan_matches_scan()
+    print("✓ test_page_by_page_scan_matches_scan")
+
+    rng = random.Random(1)
+    print("\nMulti-page reports (60 lines per page):")
+    for pages in (1, 10, 50, 200):
+        text = '\n'.join(random_report(rng, 60, clean=True) for _ in range(pages))
+        scan_ms = _best_time(analyze_parameters_by_scan, text)
+        single_ms = _best_time(analyze_parameters, text)
+        print(f"  pages={pages:>4}  chars={len(text):>8}  scan={scan_ms:>9.2f} ms  "
+              f"single-pass={single_ms:>8.2f} ms  speedup={scan_ms / single_ms:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for PDF page extraction (pdf_extraction.py) on small PDFs built here:
+page order from the serial and process-pool paths, the page caps, which
+pages are handed to OCR in each mode, and the on_page callback.
+
+Run with pytest, or directly:
+    python test_pdf_extraction.py
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import PyPDF2
+from PIL import Image
+
+from pdf_extraction import iter_pdf_pages, pdf_text, OCR_OFF, OCR_MISSING, OCR_ALL
+
+
+def _pdf(pages):
+    """A PDF with one page per item: a string is a text page, None a scanned (image-only) page."""
+    writer = PyPDF2.PdfWriter()
+    # The readers stay alive until written: the writer tells their objects apart by id(reader)
+    readers = [PyPDF2.PdfReader(io.BytesIO(_scanned_page() if page is None else _text_page(page))) for page in pages]
+    for reader in readers:
+        writer.add_page(reader.pages[0])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _text_page(text):
+    stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>',
+               '<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+               '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+               '/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+               f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream']
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{obj}\nendobj\n'.encode()
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    out += b''.join(f'{offset:010d} 00000 n \n'.encode() for offset in offsets)
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return out
+
+
+def _scanned_page():
+    out = io.BytesIO()
+    Image.new('RGB', (40, 40), 'white').save(out, 'PDF')
+    return out.getvalue()
+
+
+def test_serial_pages_come_in_order():
+    data = _pdf([f'Page {n}' for n in range(1, 6)])
+    pages = list(iter_pdf_pages(data, workers=1))
+    assert [p.number for p in pages] == [0, 1, 2, 3, 4]
+    assert [p.text.strip() for p in pages] == [f'Page {n}' for n in range(1, 6)]
+    assert all(p.image is None for p in pages)
+
+
+def test_parallel_pages_come_in_order():
+    data = _pdf([f'Page {n}' for n in range(1, 21)])
+    pages = list(iter_pdf_pages(data, workers=2, pages_per_task=3, parallel_min_pages=4))
+    assert [p.number for p in pages] == list(range(20))
+    assert [p.text.strip() for p in pages] == [f'Page {n}' for n in range(1, 21)]
+
+
+def test_max_pages_caps_the_read():
+    data = _pdf([f'Page {n}' for n in range(1, 11)])
+    assert [p.number for p in iter_pdf_pages(data, max_pages=4)] == [0, 1, 2, 3]
+    assert [p.number for p in iter_pdf_pages(data, max_pages=4, workers=2, pages_per_task=1,
+                                             parallel_min_pages=2)] == [0, 1, 2, 3]
+
+
+def test_ocr_modes_pick_pages():
+    data = _pdf(['Intro', None, 'Results', None])
+
+    def with_images(**settings):
+        return [p.number for p in iter_pdf_pages(data, **settings) if p.image is not None]
+
+    # Off by default: a scanned upload must not run OCR on every page
+    assert with_images() == []
+    assert with_images(ocr_mode=OCR_OFF) == []
+    assert with_images(ocr_mode=OCR_MISSING) == [1, 3]
+    # Text-only pages have no image to read, even in 'all'
+    assert with_images(ocr_mode=OCR_ALL) == [1, 3]
+    assert with_images(ocr_mode=OCR_MISSING, ocr_max_pages=2) == [1]
+
+
+def test_on_page_sees_each_page_as_it_is_read():
+    data = _pdf(['  Intro', None, 'Results'])
+    seen = []
+    ocr_calls = []
+
+    def ocr(image):
+        ocr_calls.append(len(seen))
+        return 'Scanned text'
+
+    text = pdf_text(data, ocr=ocr, on_page=seen.append, ocr_mode=OCR_MISSING)
+    assert [s.strip() for s in seen] == ['Intro', 'Scanned text', 'Results']
+    # The scanned page is OCR'd after the first page was handed over, not up front
+    assert ocr_calls == [1]
+    assert text == '\n'.join(seen)
+    assert not seen[0].startswith(' ')
+
+
+def test_pages_without_text_are_skipped():
+    data = _pdf([None, 'Results', None])
+    seen = []
+    assert pdf_text(data, on_page=seen.append).strip() == 'Results'
+    assert len(seen) == 1
+    assert pdf_text(_pdf([None])) is None
+
+
+def main():
+    print("=" * 60)
+    print("PDF EXTRACTION TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the paged prediction history (GET /api/data/predictions): keyset
+pages, sparse fieldsets and the columnar format, against an in-memory
+SQLite database.
+
+Run with pytest, or directly:
+    python test_prediction_history.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Prediction
+from data_routes import data_bp
+from query_counter import count_queries
+
+URL = '/api/data/predictions'
+
+
+def _client(predictions=7):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(data_bp, url_prefix='/api/data')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'),
+                            User(id=2, name='Other', email='o@example.com', password_hash='x', role='patient')])
+        start = datetime(2026, 1, 1)
+        for i in range(predictions):
+            # Pairs share created_at, so the id tie-breaker matters
+            db.session.add(Prediction(id=f'p{i:02d}', user_id=1, disease_type='diabetes', prediction_result='Low Risk',
+                                      probability=i / 10, risk_level='Low', input_data={'glucose': 90 + i},
+                                      created_at=start + timedelta(days=i // 2)))
+        db.session.add(Prediction(user_id=2, disease_type='heart', prediction_result='High Risk', probability=0.9,
+                                  risk_level='High', created_at=start))
+        db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['user_id'] = 1
+    return app, client
+
+
+def test_pages_cover_history_newest_first():
+    app, client = _client()
+    ids, before = [], None
+    while True:
+        data = client.get(URL + '?limit=3' + (f'&before={before}' if before else '')).get_json()
+        assert len(data['predictions']) <= 3
+        ids.extend(p['id'] for p in data['predictions'])
+        before = data['next_page']
+        if before is None:
+            break
+    assert ids == ['p06', 'p05', 'p04', 'p03', 'p02', 'p01', 'p00']
+    # Totals come with the first page only
+    assert 'totals' not in data
+    assert client.get(URL + '?before=nonsense').status_code == 400
+
+
+def test_first_page_carries_totals_for_the_whole_history():
+    app, client = _client()
+    with app.app_context():
+        for p in Prediction.query.filter(Prediction.id.in_(['p00', 'p01'])):
+            p.status = 'clinically_verified'
+        db.session.commit()
+    totals = client.get(URL + '?limit=3').get_json()['totals']
+    assert totals == {'total': 7, 'by_status': {'pending_review': 5, 'clinically_verified': 2}}
+    assert client.get(URL + '?limit=3&format=columnar').get_json()['totals']['total'] == 7
+
+
+def test_large_fields_only_when_requested():
+    app, client = _client()
+    with app.app_context(), count_queries(db.engine) as queries:
+        plain = client.get(URL).get_json()['predictions']
+    assert 'input_data' not in plain[0] and 'modified_prediction' not in plain[0]
+    assert not any('input_data' in s for s in queries.statements)
+
+    full = client.get(URL + '?fields=input_data').get_json()['predictions']
+    assert full[0]['input_data'] == {'glucose': 96} and 'modified_prediction' not in full[0]
+    assert client.get(URL + '?fields=password_hash').status_code == 400
+
+
+def test_columnar_format():
+    app, client = _client()
+    data = client.get(URL + '?format=columnar&limit=4').get_json()
+    columns = data['columns']
+    assert data['count'] == 4 and data['next_page']
+    assert columns['id'] == ['p06', 'p05', 'p04', 'p03']
+    assert columns['probability'] == [0.6, 0.5, 0.4, 0.3]
+    assert 'input_data' not in columns
+
+    app, client = _client(predictions=0)
+    empty = client.get(URL + '?format=columnar').get_json()
+    assert empty['count'] == 0 and empty['columns']['risk_level'] == []
+
+
+def main():
+    print("=" * 60)
+    print("PREDICTION HISTORY TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
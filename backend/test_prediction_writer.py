@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for the prediction writer (prediction_writer.py), against a temporary
+SQLite database: sync saves, batched write-behind flushes with the risk
+summaries kept in step, the size-triggered flush, and a batch with a bad row.
+
+Run with pytest, or directly:
+    python test_prediction_writer.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Prediction, RiskSummary
+from prediction_writer import PredictionWriter
+from query_counter import count_queries
+
+
+def _app():
+    # A file, not :memory:, so the writer thread sees the same database
+    path = os.path.join(tempfile.mkdtemp(), 'predictions.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'),
+                            User(id=2, name='Other', email='o@example.com', password_hash='x', role='patient')])
+        db.session.commit()
+    return app
+
+
+def _fields(user_id, disease, probability, **extra):
+    fields = {'user_id': user_id, 'disease_type': disease, 'prediction_result': '-', 'probability': probability,
+              'risk_level': 'High' if probability > 0.5 else 'Low', 'input_data': {'age': 50}}
+    fields.update(extra)
+    return fields
+
+
+def test_sync_mode_commits_before_returning():
+    app = _app()
+    writer = PredictionWriter(mode='sync')
+    with app.app_context():
+        prediction_id = writer.save(**_fields(1, 'diabetes', 0.3))
+        db.session.remove()
+        pred = db.session.get(Prediction, prediction_id)
+        assert pred.disease_category == 'diabetes' and pred.input_data == {'age': 50}
+        assert RiskSummary.query.filter_by(user_id=1).one().count == 1
+        assert writer.stats()['saved_sync'] == 1
+
+
+def test_write_behind_inserts_the_queue_in_one_batch():
+    app = _app()
+    writer = PredictionWriter(mode='write_behind', flush_seconds=60, batch_size=100)
+    with app.app_context():
+        ids = [writer.save(**_fields(1, 'diabetes', p)) for p in (0.2, 0.3, 0.7)]
+        ids.append(writer.save(**_fields(2, 'heart', 0.4, status='clinically_verified')))
+        # Queued, not yet written
+        assert Prediction.query.count() == 0
+
+        with count_queries(db.engine) as queries:
+            assert writer.flush() == 4
+        # One INSERT for the batch; per user and disease an UPDATE of the summary
+        # (and, as these are the first, its INSERT)
+        inserts = [s for s in queries.statements if s.startswith('INSERT INTO predictions')]
+        updates = [s for s in queries.statements if s.startswith('UPDATE risk_summaries')]
+        assert (len(inserts), len(updates)) == (1, 2)
+
+        assert sorted(p.id for p in Prediction.query.all()) == sorted(ids)
+        assert {p.disease_category for p in Prediction.query.filter_by(user_id=1)} == {'diabetes'}
+        diabetes = RiskSummary.query.filter_by(user_id=1, disease='diabetes').one()
+        assert (diabetes.count, diabetes.pending_count, diabetes.latest_risk, diabetes.previous_risk,
+                diabetes.trend, diabetes.latest_prediction_id) == (3, 3, 70.0, 30.0, 'increasing', ids[2])
+        assert RiskSummary.query.filter_by(user_id=2).one().pending_count == 0
+
+        # A later batch folds into the existing summary
+        writer.save(**_fields(1, 'diabetes', 0.65))
+        writer.flush()
+        db.session.expire_all()
+        diabetes = RiskSummary.query.filter_by(user_id=1, disease='diabetes').one()
+        assert (diabetes.count, diabetes.latest_risk, diabetes.previous_risk, diabetes.trend) == \
+            (4, 65.0, 70.0, 'stable')
+
+        # sync=True bypasses the queue
+        writer.save(sync=True, **_fields(2, 'heart', 0.5))
+        assert writer.stats()['queue_depth'] == 0 and Prediction.query.count() == 6
+
+
+def test_rows_from_different_callers_share_a_flush():
+    # Symptom checks set original_prediction, the predict endpoints do not;
+    # either may come first in a batch
+    app = _app()
+    writer = PredictionWriter(mode='write_behind', flush_seconds=60, batch_size=100)
+    original = {'chief_complaint': 'cough'}
+    with app.app_context():
+        ids = [writer.save(**_fields(1, 'heart', 0.3)),
+               writer.save(**_fields(1, 'Bronchitis', 0.6, original_prediction=original)),
+               writer.save(**_fields(2, 'Asthma', 0.4, original_prediction=original)),
+               writer.save(**_fields(2, 'kidney', 0.5))]
+        assert writer.flush() == 4
+        assert writer.stats()['failed'] == 0
+        stored = {p.id: p.original_prediction for p in Prediction.query.all()}
+        assert stored == {ids[0]: None, ids[1]: original, ids[2]: original, ids[3]: None}
+        assert RiskSummary.query.count() == 4
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval():
+    app = _app()
+    writer = PredictionWriter(mode='write_behind', flush_seconds=60, batch_size=5)
+    with app.app_context():
+        for i in range(5):
+            writer.save(**_fields(1, 'kidney', 0.1 * i))
+        deadline = time.time() + 5
+        while writer.stats()['written'] < 5 and time.time() < deadline:
+            time.sleep(0.05)
+        assert writer.stats()['written'] == 5
+        assert RiskSummary.query.filter_by(user_id=1).one().count == 5
+
+
+def test_bad_row_is_dropped_without_losing_the_batch():
+    app = _app()
+    writer = PredictionWriter(mode='write_behind', flush_seconds=60, batch_size=100)
+    with app.app_context():
+        writer.save(**_fields(1, 'liver', 0.2))
+        writer.save(**_fields(1, 'liver', 0.4, prediction_result=None))
+        writer.save(**_fields(1, 'liver', 0.6))
+        assert writer.flush() == 2
+        assert Prediction.query.count() == 2
+        assert RiskSummary.query.filter_by(user_id=1).one().count == 2
+        stats = writer.stats()
+        assert (stats['written'], stats['failed']) == (2, 1)
+
+
+def test_queue_overflow_falls_back_to_a_sync_write():
+    app = _app()
+    writer = PredictionWriter(mode='write_behind', flush_seconds=60, batch_size=100, max_queue=1)
+    with app.app_context():
+        writer.save(**_fields(1, 'heart', 0.2))
+        overflow_id = writer.save(**_fields(1, 'heart', 0.3))
+        assert db.session.get(Prediction, overflow_id) is not None
+        assert writer.stats()['queue_full'] == 1
+        writer.flush()
+        assert Prediction.query.count() == 2
+
+
+def main():
+    print("=" * 60)
+    print("PREDICTION WRITER TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
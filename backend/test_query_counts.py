@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for the list endpoints of the blueprints.
+
+Each endpoint is called against an in-memory SQLite database with a few
+rows and with many, and must stay within a fixed number of SQL statements
+either way, so a query per row (N+1) fails the test.
+
+Run with pytest, or directly:
+    python test_query_counts.py
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, date, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Prediction, Appointment, ChatMessage, Consultation, DoctorAvailability
+from appointment_routes import appointment_bp
+from doctor_routes import doctor_bp
+from data_routes import data_bp
+from query_counter import count_queries, assert_max_queries
+
+# (url, session user, statement limit)
+ENDPOINTS = [
+    ('/api/doctor/pending-approvals', 'doctor', 3),
+    ('/api/appointments/patient', 'patient', 2),
+    ('/api/appointments/doctor', 'doctor', 2),
+    ('/api/appointments/1/messages', 'patient', 2),
+    ('/api/data/consultations', 'patient', 2),
+    ('/api/data/registered-doctors', None, 1),
+    ('/api/data/predictions', 'patient', 2),
+]
+
+
+def _make_app(rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(appointment_bp, url_prefix='/api/appointments')
+    app.register_blueprint(doctor_bp, url_prefix='/api/doctor')
+    app.register_blueprint(data_bp, url_prefix='/api/data')
+
+    with app.app_context():
+        db.create_all()
+        patient = User(name='Patient', email='p@example.com', password_hash='x', role='patient')
+        doctors = [User(name=f'Doctor {i}', email=f'd{i}@example.com', password_hash='x', role='doctor',
+                        doctor_id=f'DOC{i}') for i in range(rows)]
+        db.session.add_all([patient] + doctors)
+        db.session.flush()
+        tomorrow = date.today() + timedelta(days=1)
+        for i, doctor in enumerate(doctors):
+            db.session.add(DoctorAvailability(doctor_id=doctor.id, consultation_fee=500))
+            db.session.add(Prediction(user_id=patient.id, disease_type='diabetes', prediction_result='Low Risk',
+                                      probability=0.2, risk_level='Low'))
+            db.session.add(Appointment(appointment_id=str(uuid.uuid4()), doctor_id=doctors[0].id,
+                                       patient_id=patient.id, patient_name=patient.name, symptoms='cough',
+                                       appointment_date=tomorrow, appointment_time=time(9, i % 60),
+                                       status='accepted', video_room_id=str(uuid.uuid4())))
+            db.session.add(Consultation(patient_id=patient.id, doctor_id=doctor.id, consultation_type='video',
+                                        scheduled_at=datetime.utcnow()))
+        db.session.flush()
+        for i in range(rows):
+            sender = patient if i % 2 else doctors[0]
+            db.session.add(ChatMessage(appointment_id=1, sender_id=sender.id, message=f'message {i}'))
+        db.session.commit()
+        users = {'patient': patient.id, 'doctor': doctors[0].id}
+    return app, users
+
+
+def _statement_counts(rows):
+    app, users = _make_app(rows)
+    counts = {}
+    with app.app_context():
+        client = app.test_client()
+        for url, role, limit in ENDPOINTS:
+            with client.session_transaction() as s:
+                s.clear()
+                if role:
+                    s['user_id'] = users[role]
+            with assert_max_queries(db.engine, limit) as queries:
+                response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            counts[url] = queries.count
+    return counts
+
+
+def test_endpoints_stay_within_statement_limits():
+    few = _statement_counts(2)
+    many = _statement_counts(12)
+    # The statement count must not grow with the number of rows
+    assert few == many
+
+
+def test_assert_max_queries_lists_statements():
+    app, _ = _make_app(1)
+    with app.app_context():
+        try:
+            with assert_max_queries(db.engine, 1):
+                User.query.count()
+                Prediction.query.count()
+        except AssertionError as e:
+            assert '2 SQL statements' in str(e) and 'predictions' in str(e)
+        else:
+            raise AssertionError('expected the limit to fail')
+        with count_queries(db.engine) as queries:
+            pass
+        assert queries.count == 0
+
+
+def main():
+    print("=" * 60)
+    print("QUERY COUNT TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests for the report job queue (report_jobs.py) in a temporary directory:
+a job's way from queued through running to done, failed and crashed runs,
+the pending limit, recovery after a worker died, and expiry.
+
+Run with pytest, or directly:
+    python test_report_jobs.py
+"""
+import os
+import sys
+import time
+import socket
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from report_jobs import (ReportJobQueue, QueueFullError, QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+
+class Runner:
+    """Stand-in analysis: reports progress, then waits for release() before answering."""
+
+    def __init__(self, status_code=200, crash=False):
+        self.status_code = status_code
+        self.crash = crash
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.calls = []
+
+    def release(self):
+        self.released.set()
+
+    def __call__(self, filename, file_bytes, progress):
+        self.calls.append((filename, file_bytes))
+        progress('ocr', 40)
+        self.started.set()
+        self.released.wait(5)
+        if self.crash:
+            raise RuntimeError('analyzer crashed')
+        if self.status_code >= 400:
+            return {'error': 'No text found in report'}, self.status_code
+        return {'parameters': {'glucose': 110}}, self.status_code
+
+
+def _queue(runner, **kwargs):
+    return ReportJobQueue(runner, job_dir=os.path.join(tempfile.mkdtemp(), 'jobs'), **kwargs)
+
+
+def _wait_for(queue, job_id, states, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in states:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']}")
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def _insert(queue, job_id, status, owner, with_input=True):
+    now = time.time()
+    queue._db.execute(
+        'INSERT INTO report_jobs (id, status, stage, progress, filename, owner, created_at, updated_at) '
+        'VALUES (?, ?, ?, 50, ?, ?, ?, ?)', (job_id, status, status, 'report.pdf', owner, now, now))
+    if with_input:
+        with open(queue._input_path(job_id), 'wb') as f:
+            f.write(b'%PDF-')
+
+
+def test_job_goes_from_queued_to_running_to_succeeded():
+    runner = Runner()
+    queue = _queue(runner, max_workers=1)
+    blocker = queue.submit('first.pdf', b'1')
+    job_id = queue.submit('report.pdf', b'%PDF-')
+    # One worker: the second job waits while the first runs
+    runner.started.wait(5)
+    assert queue.get(blocker)['status'] == RUNNING and queue.get(blocker)['stage'] == 'ocr'
+    job = queue.get(job_id)
+    assert (job['status'], job['stage'], job['progress'], job['result']) == (QUEUED, QUEUED, 0, None)
+
+    runner.release()
+    job = _wait_for(queue, job_id, (SUCCEEDED,))
+    assert (job['stage'], job['progress'], job['status_code'], job['error']) == ('done', 100, 200, None)
+    assert job['result'] == {'parameters': {'glucose': 110}}
+    assert job['owner'] == queue.owner and runner.calls[1] == ('report.pdf', b'%PDF-')
+    # The upload is removed once the job is done
+    assert not os.path.exists(queue._input_path(job_id))
+    assert queue.stats()['jobs'] == {QUEUED: 0, RUNNING: 0, SUCCEEDED: 2, FAILED: 0}
+
+
+def test_error_response_and_crash_both_fail_the_job():
+    runner = Runner(status_code=422)
+    runner.release()
+    queue = _queue(runner)
+    job = _wait_for(queue, queue.submit('blank.pdf', b''), (SUCCEEDED, FAILED))
+    assert (job['status'], job['status_code'], job['error']) == (FAILED, 422, 'No text found in report')
+
+    runner = Runner(crash=True)
+    runner.release()
+    queue = _queue(runner)
+    job = _wait_for(queue, queue.submit('report.pdf', b'%PDF-'), (SUCCEEDED, FAILED))
+    assert (job['status'], job['status_code'], job['error']) == (FAILED, 500, 'analyzer crashed')
+
+
+def test_submit_refuses_when_too_many_are_pending():
+    runner = Runner()
+    queue = _queue(runner, max_workers=1, max_pending=2)
+    queue.submit('a.pdf', b'a')
+    queue.submit('b.pdf', b'b')
+    try:
+        queue.submit('c.pdf', b'c')
+        assert False, 'expected QueueFullError'
+    except QueueFullError:
+        pass
+    runner.release()
+
+
+def test_recover_requeues_jobs_of_dead_workers_only():
+    runner = Runner()
+    runner.release()
+    queue = _queue(runner)
+    host = socket.gethostname()
+    _insert(queue, 'orphaned', RUNNING, f'{host}:{_dead_pid()}')
+    _insert(queue, 'never-started', QUEUED, None)
+    _insert(queue, 'alive', RUNNING, f'{host}:{os.getppid()}')
+    _insert(queue, 'elsewhere', RUNNING, 'other-host:1')
+    _insert(queue, 'lost-upload', RUNNING, f'{host}:{_dead_pid()}', with_input=False)
+
+    assert queue.recover() == 2
+    for job_id in ('orphaned', 'never-started'):
+        job = _wait_for(queue, job_id, (SUCCEEDED,))
+        assert job['owner'] == queue.owner
+    assert queue.get('alive')['status'] == RUNNING
+    assert queue.get('elsewhere')['status'] == RUNNING
+    lost = queue.get('lost-upload')
+    assert (lost['status'], lost['status_code']) == (FAILED, 500)
+    # A second process recovering the same directory does not run them again
+    assert queue.recover() == 0
+    assert len(runner.calls) == 2
+
+
+def test_finished_jobs_expire():
+    runner = Runner()
+    runner.release()
+    queue = _queue(runner, ttl_hours=0)
+    job_id = queue.submit('report.pdf', b'%PDF-')
+    _wait_for(queue, job_id, (SUCCEEDED,))
+    _insert(queue, 'pending', QUEUED, None)
+    queue._last_cleanup = 0
+    assert queue.cleanup_expired() == 1
+    assert queue.get(job_id) is None and queue.get('pending') is not None
+    # At most once a minute
+    assert queue.cleanup_expired() == 0
+
+
+def main():
+    print("=" * 60)
+    print("REPORT JOB QUEUE TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the chatbot response cache (response_cache.py) with a stand-in
+encoder: which prompts normalize to the same key and which must not, variant
+keys, the similarity fallback, expiry and eviction.
+
+Run with pytest, or directly:
+    python test_response_cache.py
+"""
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from response_cache import ResponseCache, normalize_prompt, prompt_variant
+
+HEALTH = prompt_variant('health_info', 'You are a health assistant.')
+
+
+def bag_of_words(text):
+    """Stand-in sentence encoder: a hashed bag of words, so shared words mean similar vectors."""
+    vector = np.zeros(64)
+    for word in text.split():
+        vector[zlib.crc32(word.encode()) % 64] += 1
+    return vector
+
+
+def test_trivially_different_prompts_share_a_key():
+    assert normalize_prompt('What is  Diabetes??') == normalize_prompt('what is diabetes') == 'what is diabetes'
+    assert normalize_prompt(' Symptoms of flu:\n fever, cough ') == 'symptoms of flu fever cough'
+    assert normalize_prompt('STRASSE') == normalize_prompt('straße')
+
+    cache = ResponseCache()
+    cache.put(HEALTH, 'What is diabetes?', 'A condition of high blood sugar.')
+    assert cache.get(HEALTH, 'what is DIABETES') == ('A condition of high blood sugar.', 'exact')
+
+
+def test_different_prompts_do_not_collide():
+    # Non-Latin scripts keep their letters and vowel signs
+    hindi = ['मधुमेह क्या है?', 'बुखार क्या है?', 'मधुमेह क्या हैं?']
+    assert len({normalize_prompt(p) for p in hindi}) == 3
+    assert all(normalize_prompt(p) for p in hindi)
+    # Numbers keep their decimal points and ratios
+    numbers = ['Is glucose 5.5 normal?', 'Is glucose 55 normal?', 'Is glucose 5 5 normal?']
+    assert len({normalize_prompt(p) for p in numbers}) == 3
+    assert normalize_prompt('BP 120/80?') != normalize_prompt('BP 12080?')
+    assert normalize_prompt('Take it at 8:30.') == 'take it at 8:30'
+
+    cache = ResponseCache()
+    cache.put(HEALTH, hindi[0], 'मधुमेह ...')
+    assert cache.get(HEALTH, hindi[1]) == (None, None)
+
+
+def test_prompts_without_words_are_not_cached():
+    cache = ResponseCache()
+    cache.put(HEALTH, '???', 'Could you rephrase that?')
+    cache.put(HEALTH, '🙂', 'Hello!')
+    assert cache.get(HEALTH, '!!!') == (None, None)
+    assert cache.stats()['entries'] == 0
+
+
+def test_variants_keep_answers_apart():
+    meal = prompt_variant('meal_plan', 'You are a dietitian.')
+    assert prompt_variant('health_info', 'You are a health assistant.') == HEALTH
+    assert prompt_variant('health_info', 'You are a careful health assistant.') != HEALTH
+    assert HEALTH.startswith('health_info:')
+
+    cache = ResponseCache(encode=bag_of_words, similarity_threshold=0.5)
+    cache.put(HEALTH, 'diabetes diet', 'Limit sugar.')
+    cache.put(meal, 'diabetes diet', 'Breakfast: oats.')
+    assert cache.get(HEALTH, 'diabetes diet')[0] == 'Limit sugar.'
+    assert cache.get(meal, 'diabetes diet')[0] == 'Breakfast: oats.'
+    # An edited system prompt starts from an empty cache, for exact and similar matches alike
+    edited = prompt_variant('health_info', 'You are a careful health assistant.')
+    assert cache.get(edited, 'diabetes diet') == (None, None)
+    assert cache.stats()['variants'] == {HEALTH: 1, meal: 1}
+
+
+def test_similar_prompt_falls_back_to_the_nearest_answer():
+    cache = ResponseCache(encode=bag_of_words, similarity_threshold=0.8)
+    cache.put(HEALTH, 'what are the symptoms of diabetes', 'Thirst, fatigue.')
+    assert cache.get(HEALTH, 'what are the main symptoms of diabetes') == ('Thirst, fatigue.', 'similar')
+    assert cache.get(HEALTH, 'how is malaria treated') == (None, None)
+    stats = cache.stats()
+    assert (stats['similar_hits'], stats['misses'], stats['semantic']) == (1, 1, True)
+
+    # A failing encoder leaves exact matches working
+    def broken(text):
+        raise RuntimeError('encoder not loaded')
+
+    cache = ResponseCache(encode=broken)
+    cache.put(HEALTH, 'what is diabetes', 'High blood sugar.')
+    assert cache.get(HEALTH, 'What is diabetes?') == ('High blood sugar.', 'exact')
+    assert cache.get(HEALTH, 'what is diabetes mellitus') == (None, None)
+
+
+def test_hits_are_copies():
+    cache = ResponseCache()
+    cache.put(HEALTH, 'meal plan', {'meals': ['oats']})
+    answer, _ = cache.get(HEALTH, 'meal plan')
+    answer['meals'].append('cake')
+    assert cache.get(HEALTH, 'meal plan')[0] == {'meals': ['oats']}
+
+
+def test_entries_expire_and_are_evicted():
+    cache = ResponseCache(ttl_seconds=0.1, encode=bag_of_words, similarity_threshold=0.5)
+    cache.put(HEALTH, 'what is diabetes', 'High blood sugar.')
+    time.sleep(0.2)
+    assert cache.get(HEALTH, 'what is diabetes') == (None, None)
+    assert cache.get(HEALTH, 'what is diabetes exactly') == (None, None)
+    assert cache.stats()['expired'] == 1
+
+    cache = ResponseCache(max_items=2, encode=bag_of_words, similarity_threshold=0.5)
+    cache.put(HEALTH, 'first question', 'one')
+    cache.put(HEALTH, 'second question', 'two')
+    cache.get(HEALTH, 'first question')
+    cache.put(HEALTH, 'third question', 'three')
+    # The least recently used entry goes, along with its embedding
+    assert cache.get(HEALTH, 'second question')[1] != 'exact'
+    assert cache.get(HEALTH, 'first question')[0] == 'one'
+    assert len(cache._indexes[HEALTH].keys) == 2 and cache.stats()['evictions'] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResponseCache(enabled=False)
+    cache.put(HEALTH, 'what is diabetes', 'High blood sugar.')
+    assert cache.get(HEALTH, 'what is diabetes') == (None, None)
+    assert cache.stats()['entries'] == 0
+
+
+def main():
+    print("=" * 60)
+    print("RESPONSE CACHE TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
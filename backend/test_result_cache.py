@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for the result cache (result_cache.py) in a temporary directory: memory
+and disk hits, misses, version bumps, expiry, corrupt files, the disk tier
+being opt-in, and the permissions of what it writes.
+
+Run with pytest, or directly:
+    python test_result_cache.py
+"""
+import os
+import sys
+import stat
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from result_cache import ResultCache, cache_key, result_cache_settings
+
+REPORT = b'%PDF- Glucose 110 mg/dL'
+
+
+def _cache(**kwargs):
+    kwargs.setdefault('disk', True)
+    return ResultCache(cache_dir=os.path.join(tempfile.mkdtemp(), 'cache'), **kwargs)
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_memory_hit_returns_a_copy():
+    cache = _cache(disk=False)
+    key = cache_key(REPORT, 'v1')
+    assert cache.get('report', key) is None
+    cache.put('report', key, {'glucose': [110]})
+    value = cache.get('report', key)
+    assert value == {'glucose': [110]}
+    value['glucose'].append(0)
+    assert cache.get('report', key) == {'glucose': [110]}
+    stats = cache.stats()['namespaces']['report']
+    assert (stats['misses'], stats['memory_hits'], stats['disk_hits'], stats['stores']) == (1, 2, 0, 1)
+
+
+def test_disk_hit_from_another_worker():
+    cache = _cache()
+    key = cache_key(REPORT, 'v1')
+    cache.put('report', key, 'Glucose 110')
+    # A second instance over the same directory, as another worker would have
+    other = ResultCache(cache_dir=cache.cache_dir, disk=True)
+    assert other.get('report', key) == 'Glucose 110'
+    assert other.get('report', key) == 'Glucose 110'
+    stats = other.stats()['namespaces']['report']
+    assert (stats['disk_hits'], stats['memory_hits']) == (1, 1)
+
+
+def test_version_bump_misses():
+    cache = _cache()
+    cache.put('report', cache_key(REPORT, 'v1'), 'old parser')
+    assert cache_key(REPORT, 'v1') != cache_key(REPORT, 'v2')
+    assert cache_key(REPORT, 'v1') == cache_key(REPORT.decode(), 'v1')
+    assert cache.get('report', cache_key(REPORT, 'v2')) is None
+    assert cache.get_or_compute('report', cache_key(REPORT, 'v2'), lambda: 'new parser') == 'new parser'
+    assert cache.get('report', cache_key(REPORT, 'v1')) == 'old parser'
+
+
+def test_corrupt_file_is_dropped():
+    cache = _cache(memory_items=0)
+    key = cache_key(REPORT, 'v1')
+    cache.put('report', key, 'Glucose 110')
+    path = cache._path('report', key)
+    with open(path, 'w') as f:
+        f.write('{"created_at": ')
+    assert cache.get('report', key) is None
+    assert not os.path.exists(path)
+    assert cache.stats()['namespaces']['report']['misses'] == 1
+
+
+def test_expired_entries_miss_in_both_tiers():
+    cache = _cache(ttl_seconds=0.2)
+    key = cache_key(REPORT, 'v1')
+    cache.put('report', key, 'Glucose 110')
+    assert cache.get('report', key) == 'Glucose 110'
+    time.sleep(0.3)
+    assert cache.get('report', key) is None
+    assert not os.path.exists(cache._path('report', key))
+
+
+def test_get_or_compute_skips_vetoed_values():
+    cache = _cache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return ''
+
+    key = cache_key(REPORT, 'v1')
+    for _ in range(2):
+        assert cache.get_or_compute('report', key, compute, should_cache=bool) == ''
+    assert len(calls) == 2 and cache.stats()['namespaces']['report']['stores'] == 0
+
+
+def test_disk_tier_is_opt_in():
+    assert result_cache_settings()['disk'] is False
+    cache = _cache(disk=False)
+    cache.put('report', cache_key(REPORT, 'v1'), 'Glucose 110')
+    assert not os.path.exists(cache.cache_dir)
+    assert cache.stats()['disk'] is False
+
+
+def test_disk_entries_are_private_to_the_app_user():
+    cache = _cache()
+    os.makedirs(cache.cache_dir, mode=0o755)
+    key = cache_key(REPORT, 'v1')
+    cache.put('report', key, 'Glucose 110')
+    assert _mode(cache.cache_dir) == 0o700
+    assert _mode(os.path.dirname(cache._path('report', key))) == 0o700
+    assert _mode(cache._path('report', key)) == 0o600
+
+
+def test_disk_store_is_capped():
+    cache = _cache(max_disk_bytes=2000, memory_items=0)
+    keys = [cache_key(f'report {i}', 'v1') for i in range(20)]
+    for key in keys:
+        cache.put('report', key, 'x' * 200)
+        time.sleep(0.01)
+    assert cache.stats()['disk_bytes'] <= 2000
+    # The most recent entry survives eviction, the first one does not
+    assert cache.get('report', keys[-1]) == 'x' * 200
+    assert cache.get('report', keys[0]) is None
+
+
+def main():
+    print("=" * 60)
+    print("RESULT CACHE TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
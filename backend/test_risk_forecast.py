@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for the risk forecasting batch job (risk_forecast.py): the vectorized
+EWMA, trend band and change-point computation, and the stored forecasts read
+by GET /api/analytics/risk-forecast, against an in-memory SQLite database.
+
+Run with pytest, or directly:
+    python test_risk_forecast.py
+"""
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from config import db
+from models import User, Prediction, RiskForecast
+from health_analytics import analytics_bp
+import risk_forecast
+from risk_forecast import forecast_frame, run_forecasts, stale_user_ids
+
+START = pd.Timestamp('2026-01-01')
+
+
+def _frame(series):
+    rows = [(user_id, disease, START + pd.Timedelta(days=day), risk)
+            for (user_id, disease), points in series.items() for day, risk in points]
+    return pd.DataFrame(rows, columns=['user_id', 'disease', 'created_at', 'risk']).sample(frac=1, random_state=3)
+
+
+def test_trend_band_and_change_point():
+    noise = np.random.default_rng(1).normal(0, 3, 30)
+    result = forecast_frame(_frame({
+        (1, 'heart'): [(day, 20 + 2 * day) for day in range(10)],
+        (1, 'liver'): [(day, 20 if day < 4 else 60) for day in range(8)],
+        (2, 'diabetes'): [(day, 40 + noise[day]) for day in range(30)],
+        (3, 'kidney'): [(0, 40)],
+        (3, 'bone'): [(0, 10), (1, 30)],
+    }), horizon_days=10).set_index(['user_id', 'disease'])
+
+    heart = result.loc[(1, 'heart')]
+    assert heart['points'] == 10 and heart['current_risk'] == 38
+    assert np.isclose(heart['slope_per_day'], 2) and np.isclose(heart['forecast_risk'], 58)
+    assert heart['trend'] == 'increasing'
+    # A steady ramp is not a change point
+    assert pd.isna(heart['change_point_at'])
+
+    liver = result.loc[(1, 'liver')]
+    assert liver['change_point_at'] == START + pd.Timedelta(days=4)
+    assert liver['risk_before_change'] == 20 and liver['risk_after_change'] == 60
+
+    diabetes = result.loc[(2, 'diabetes')]
+    assert diabetes['trend'] == 'stable' and pd.isna(diabetes['change_point_at'])
+    assert diabetes['forecast_lower'] < diabetes['forecast_risk'] < diabetes['forecast_upper']
+    assert abs(diabetes['ewma_risk'] - 40) < 6
+
+    # Too few points to project: direction only
+    assert pd.isna(result.loc[(3, 'kidney')]['forecast_risk']) and result.loc[(3, 'kidney')]['trend'] == 'stable'
+    assert pd.isna(result.loc[(3, 'bone')]['forecast_risk']) and result.loc[(3, 'bone')]['trend'] == 'increasing'
+
+
+def _app(uri='sqlite://'):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'),
+                            User(id=2, name='Other', email='o@example.com', password_hash='x', role='patient')])
+        db.session.commit()
+    return app
+
+
+def _predict(user_id, disease, probability, days_ago):
+    db.session.add(Prediction(user_id=user_id, disease_type=disease, prediction_result='-', probability=probability,
+                              risk_level='Low', created_at=datetime.utcnow() - timedelta(days=days_ago)))
+    db.session.commit()
+
+
+def test_batch_job_writes_forecasts_for_stale_users():
+    app = _app()
+    with app.app_context():
+        for day, probability in enumerate([0.2, 0.3, 0.4, 0.5]):
+            _predict(1, 'heart', probability, days_ago=8 - 2 * day)
+        _predict(2, 'liver', 0.5, days_ago=1)
+        assert sorted(stale_user_ids()) == [1, 2]
+        assert run_forecasts(batch_users=1) == 2
+        assert stale_user_ids() == []
+        assert run_forecasts() == 0
+
+        _predict(2, 'liver', 0.6, days_ago=0)
+        assert stale_user_ids() == [2]
+        run_forecasts()
+        assert RiskForecast.query.filter_by(user_id=2).one().points == 2
+
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = 1
+        heart = client.get('/api/analytics/risk-forecast').get_json()['forecasts'][0]
+        trajectory = heart['trajectory']
+        assert heart['trend'] == 'increasing' and trajectory['up_to_date']
+        assert trajectory['points'] == 4 and np.isclose(trajectory['slope_per_week'], 35)
+        assert trajectory['forecast_risk'] == 100
+
+
+def test_concurrent_runs_do_not_collide():
+    # Two processes' runs on one database: the second waits for the first's batch
+    app = _app('sqlite:///' + os.path.join(tempfile.mkdtemp(), 'forecasts.db'))
+    with app.app_context():
+        for user_id in (1, 2):
+            for day, probability in enumerate([0.2, 0.3, 0.4]):
+                _predict(user_id, 'heart', probability, days_ago=6 - 2 * day)
+
+    errors = []
+
+    def run():
+        with app.app_context():
+            try:
+                run_forecasts(user_ids=[1, 2])
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with app.app_context():
+        assert sorted(f.user_id for f in RiskForecast.query.all()) == [1, 2]
+
+
+def test_run_gives_way_to_another_process_holding_the_lock():
+    app = _app()
+    claim = risk_forecast._claim_run
+    risk_forecast._claim_run = lambda conn: False
+    try:
+        with app.app_context():
+            _predict(1, 'heart', 0.4, days_ago=1)
+            assert run_forecasts() == 0
+            assert RiskForecast.query.count() == 0 and stale_user_ids() == [1]
+    finally:
+        risk_forecast._claim_run = claim
+
+
+def main():
+    print("=" * 60)
+    print("RISK FORECAST TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
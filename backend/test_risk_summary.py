@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the maintained per-user risk summaries (risk_summary.py), against
+an in-memory SQLite database: updates on insert, review and delete, the
+rebuild, and the analytics endpoints that read them.
+
+Run with pytest, or directly:
+    python test_risk_summary.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from sqlalchemy.orm import Session
+from config import db
+from models import User, Prediction, RiskSummary
+from health_analytics import analytics_bp
+from risk_summary import rebuild, pending_review_count
+from query_counter import count_queries
+
+
+def _app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SECRET_KEY'] = 'test'
+    db.init_app(app)
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, name='Patient', email='p@example.com', password_hash='x', role='patient'),
+                            User(id=2, name='Other', email='o@example.com', password_hash='x', role='patient')])
+        db.session.commit()
+    return app
+
+
+def _predict(user_id, disease, probability, days_ago=0):
+    pred = Prediction(user_id=user_id, disease_type=disease, prediction_result='-', probability=probability,
+                      risk_level='High' if probability > 0.5 else 'Low',
+                      created_at=datetime.utcnow() - timedelta(days=days_ago))
+    db.session.add(pred)
+    db.session.commit()
+    return pred
+
+
+def _summaries():
+    return {(s.user_id, s.disease): (s.count, s.pending_count, s.latest_risk, s.previous_risk, s.trend,
+                                     s.latest_prediction_id)
+            for s in RiskSummary.query.all()}
+
+
+def test_summary_follows_inserts_reviews_and_deletes():
+    app = _app()
+    with app.app_context():
+        first = _predict(1, 'diabetes', 0.2, days_ago=3)
+        second = _predict(1, 'diabetes', 0.6, days_ago=1)
+        _predict(2, 'heart', 0.4)
+        summary = _summaries()
+        assert summary[(1, 'diabetes')] == (2, 2, 60.0, 20.0, 'increasing', second.id)
+        assert summary[(2, 'heart')][:5] == (1, 1, 40.0, None, 'stable')
+        assert pending_review_count() == 3
+
+        second.status = 'clinically_verified'
+        db.session.commit()
+        assert _summaries()[(1, 'diabetes')][1] == 1 and pending_review_count() == 2
+
+        second.probability = 0.1
+        db.session.commit()
+        assert _summaries()[(1, 'diabetes')][2:5] == (10.0, 20.0, 'decreasing')
+
+        db.session.delete(second)
+        db.session.commit()
+        assert _summaries()[(1, 'diabetes')] == (1, 1, 20.0, None, 'stable', first.id)
+        db.session.delete(first)
+        db.session.commit()
+        assert (1, 'diabetes') not in _summaries()
+
+
+def test_rebuild_matches_incremental_updates():
+    app = _app()
+    with app.app_context():
+        for days_ago, probability in enumerate([0.3, 0.9, 0.5, 0.52]):
+            _predict(1, 'kidney', probability, days_ago=10 - days_ago)
+        pred = _predict(2, 'liver', 0.7)
+        pred.status = 'rejected_reeval_required'
+        db.session.commit()
+        incremental = _summaries()
+
+        assert rebuild(batch_size=1) == 2
+        assert _summaries() == incremental
+        assert incremental[(1, 'kidney')][2:5] == (52.0, 50.0, 'stable')
+        assert rebuild(user_id=2) == 1 and _summaries() == incremental
+
+
+def test_forecast_and_insights_read_the_summaries():
+    app = _app()
+    with app.app_context():
+        _predict(1, 'heart', 0.4, days_ago=2)
+        _predict(1, 'heart', 0.8)
+        _predict(1, 'liver', 0.2, days_ago=60)
+        _predict(1, 'liver', 0.3, days_ago=40)
+        _predict(1, 'liver', 0.5, days_ago=1)
+        _predict(1, 'kidney', 0.3, days_ago=20)
+        _predict(1, 'kidney', 0.5, days_ago=10)
+        _predict(1, 'kidney', 0.34, days_ago=0)
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = 1
+        with count_queries(db.engine) as queries:
+            forecasts = client.get('/api/analytics/risk-forecast').get_json()['forecasts']
+        # The summaries, the stored forecasts and the oldest risk in the window
+        assert queries.count == 3
+        # The change is against the oldest prediction of the last 30 days, not the one
+        # before the latest; liver was predicted only once in the window
+        assert sorted((f['disease'], f['current_risk'], f['previous_risk'], f['trend']) for f in forecasts) == \
+            [('heart', 80.0, 40.0, 'increasing'), ('kidney', 34.0, 30.0, 'stable')]
+
+        insights = client.get('/api/analytics/ai-copilot-insights').get_json()['insights']
+        assert insights[0]['type'] == 'critical' and insights[0]['disease'] == 'heart'
+
+
+def test_only_the_app_session_is_hooked():
+    app = _app()
+    with app.app_context():
+        with Session(db.engine) as other:
+            other.add(Prediction(user_id=1, disease_type='heart', prediction_result='-', probability=0.5))
+            other.commit()
+        assert RiskSummary.query.count() == 0
+        _predict(1, 'heart', 0.4)
+        assert RiskSummary.query.one().count == 1
+
+
+def main():
+    print("=" * 60)
+    print("RISK SUMMARY TESTS")
+    print("=" * 60)
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✓ {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Bot, Mic, MicOff } from 'lucide-react';
 import config from '../config';
+import { postEventStream } from '../utils/eventStream';
 
 const Chatbot = () => {
   const [open, setOpen] = useState(false);
@@ -15,6 +16,7 @@ const Chatbot = () => {
   const [recordingTime, setRecordingTime] = useState(0);
   const messagesEndRef = useRef(null);
   const recordingTimerRef = useRef(null);
+  const nextMessageId = useRef(1);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -24,13 +26,12 @@ const Chatbot = () => {
     scrollToBottom();
   }, [messages]);
 
-  const handleSend = async () => {
-    if (!input.trim()) return;
-    setMessages([...messages, { from: 'user', text: input }]);
-    setLoading(true);
-    setError(null);
-    const userInput = input;
-    setInput('');
+  const setBotText = (id, update) => {
+    setMessages(msgs => msgs.map(msg => (msg.id === id ? { ...msg, text: update(msg.text) } : msg)));
+  };
+
+  // Non-streaming request, used when the stream endpoint cannot be reached
+  const fetchReply = async (userInput) => {
     try {
       const res = await fetch(`${config.API_BASE}/groq-chat`, {
         method: 'POST',
@@ -62,6 +63,54 @@ const Chatbot = () => {
       setMessages(msgs => [...msgs, { from: 'bot', text: 'Network error. Please check your connection.' }]);
       setError('Network error');
     }
+  };
+
+  // Streams the answer into a bot message token by token
+  const streamReply = async (userInput) => {
+    const id = nextMessageId.current++;
+    let started = false;
+    const show = (text) => {
+      if (!started) {
+        started = true;
+        setLoading(false);
+        setMessages(msgs => [...msgs, { id, from: 'bot', text }]);
+      } else {
+        setBotText(id, () => text);
+      }
+    };
+
+    try {
+      await postEventStream(`${config.API_BASE}/groq-chat/stream`, { message: userInput }, (event, data) => {
+        if (event === 'token') {
+          if (started) {
+            setBotText(id, text => text + data.text);
+          } else {
+            show(data.text);
+          }
+        } else if (event === 'done') {
+          show(data.response);
+        } else if (event === 'error') {
+          show(data.response || 'Sorry, there was an error getting a response.');
+          setError(data.error || null);
+        }
+      });
+    } catch (err) {
+      if (started) {
+        setBotText(id, text => `${text}\n\n(Connection lost, the answer may be incomplete.)`);
+      } else {
+        await fetchReply(userInput);
+      }
+    }
+  };
+
+  const handleSend = async () => {
+    if (!input.trim()) return;
+    setMessages([...messages, { from: 'user', text: input }]);
+    setLoading(true);
+    setError(null);
+    const userInput = input;
+    setInput('');
+    await streamReply(userInput);
     setLoading(false);
   };
 
@@ -114,21 +163,7 @@ const Chatbot = () => {
             setMessages(msgs => [...msgs, { from: 'user', text: transcribedText }]);
             
             // Automatically send to chatbot
-            try {
-              const chatRes = await fetch(`${config.API_BASE}/groq-chat`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: transcribedText })
-              });
-              const chatData = await chatRes.json();
-              if (chatRes.ok && chatData.response) {
-                setMessages(msgs => [...msgs, { from: 'bot', text: chatData.response }]);
-              } else {
-                setMessages(msgs => [...msgs, { from: 'bot', text: 'Sorry, there was an error getting a response.' }]);
-              }
-            } catch (err) {
-              setMessages(msgs => [...msgs, { from: 'bot', text: 'Network error. Please check your connection.' }]);
-            }
+            await streamReply(transcribedText);
           } else {
             setMessages(msgs => [...msgs, { from: 'bot', text: data.error || 'Failed to transcribe audio.' }]);
           }
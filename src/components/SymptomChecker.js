@@ -20,6 +20,8 @@ import {
 } from '@mui/material';
 import { Activity, AlertTriangle, CheckCircle, ArrowRight, Mic, MicOff } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
+import config from '../config';
+import { postEventStream } from '../utils/eventStream';
 
 const SymptomChecker = () => {
   const [symptoms, setSymptoms] = useState('');
@@ -27,6 +29,7 @@ const SymptomChecker = () => {
   const [severity, setSeverity] = useState('');
   const [loading, setLoading] = useState(false);
   const [result, setResult] = useState(null);
+  const [streaming, setStreaming] = useState(false);
   const [error, setError] = useState('');
   const [recording, setRecording] = useState(false);
   const [mediaRecorder, setMediaRecorder] = useState(null);
@@ -135,8 +138,42 @@ const SymptomChecker = () => {
     setError('');
     setResult(null);
 
+    // Stream the analysis so each section appears as soon as the AI has written it
+    let received = false;
     try {
-      const response = await fetch('http://localhost:5000/api/symptom-checker', {
+      setStreaming(true);
+      await postEventStream(
+        `${config.API_BASE}/symptom-checker/stream`,
+        { symptoms, duration, severity },
+        (event, data) => {
+          received = true;
+          if (event === 'partial') {
+            setResult(prev => ({ ...(prev || {}), ...data }));
+          } else if (event === 'result') {
+            setResult(data);
+            console.log('✅ Symptom analysis saved successfully. Your report has been sent to doctors for review.');
+          } else if (event === 'error') {
+            setResult(null);
+            setError(data.error || 'Failed to analyze symptoms');
+          }
+        },
+        { credentials: 'include' }
+      );
+      setLoading(false);
+      setStreaming(false);
+      return;
+    } catch (err) {
+      setStreaming(false);
+      if (received) {
+        setResult(null);
+        setError('Connection lost while analyzing symptoms. Please try again.');
+        setLoading(false);
+        return;
+      }
+    }
+
+    try {
+      const response = await fetch(`${config.API_BASE}/symptom-checker`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
@@ -297,11 +334,20 @@ const SymptomChecker = () => {
             </Alert>
           )}
 
-          <Alert severity="success" sx={{ mb: 3 }}>
-            <Typography variant="body2" fontWeight={600}>
-              ✅ Your symptom analysis has been saved and sent to doctors for review. You can track the approval status in your Patient Dashboard.
-            </Typography>
-          </Alert>
+          {streaming ? (
+            <Box sx={{ mb: 3 }}>
+              <Typography variant="body2" color="textSecondary" gutterBottom>
+                Analyzing your symptoms...
+              </Typography>
+              <LinearProgress />
+            </Box>
+          ) : (
+            <Alert severity="success" sx={{ mb: 3 }}>
+              <Typography variant="body2" fontWeight={600}>
+                ✅ Your symptom analysis has been saved and sent to doctors for review. You can track the approval status in your Patient Dashboard.
+              </Typography>
+            </Alert>
+          )}
 
           {/* Symptom Comparison Card */}
           {result.has_past_history && result.symptom_comparison && (
@@ -443,122 +489,131 @@ const SymptomChecker = () => {
                 </Paper>
 
                 {/* Top condition block */}
-                <Paper
-                  elevation={0}
-                  sx={{
-                    p: 2.5,
-                    mb: 2.5,
-                    borderRadius: 2,
-                    border: '1px solid #e5e7eb'
-                  }}
-                >
-                  <Box
+                {result.top_prediction ? (
+                  <Paper
+                    elevation={0}
                     sx={{
-                      display: 'flex',
-                      justifyContent: 'space-between',
-                      alignItems: 'center',
-                      mb: 1.5
+                      p: 2.5,
+                      mb: 2.5,
+                      borderRadius: 2,
+                      border: '1px solid #e5e7eb'
                     }}
                   >
-                    <Box>
-                      <Typography
-                        variant="caption"
-                        color="textSecondary"
-                        sx={{ textTransform: 'uppercase', letterSpacing: 0.08 }}
-                      >
-                        Primary Suspected Condition
-                      </Typography>
-                      <Typography variant="h6" fontWeight={800}>
-                        {String(result.top_prediction.disease || 'Unknown')}
-                      </Typography>
-                    </Box>
-                    <Chip
-                      label={String(result.top_prediction.risk || 'Unknown')}
+                    <Box
                       sx={{
-                        bgcolor: getRiskColor(result.top_prediction.risk),
-                        color: 'white',
-                        fontWeight: 700,
-                        px: 1
+                        display: 'flex',
+                        justifyContent: 'space-between',
+                        alignItems: 'center',
+                        mb: 1.5
                       }}
-                    />
-                  </Box>
-
-                  <Grid container spacing={2}>
-                    <Grid item xs={12} sm={6}>
-                      <Typography variant="caption" color="textSecondary">
-                        Confidence Score
-                      </Typography>
-                      <Box sx={{ mt: 0.5 }}>
-                        <Box
-                          sx={{
-                            display: 'flex',
-                            justifyContent: 'space-between',
-                            mb: 0.5
-                          }}
+                    >
+                      <Box>
+                        <Typography
+                          variant="caption"
+                          color="textSecondary"
+                          sx={{ textTransform: 'uppercase', letterSpacing: 0.08 }}
                         >
-                          <Typography variant="body2" color="textSecondary">
-                            Model estimate
-                          </Typography>
-                          <Typography variant="body2" fontWeight={700}>
-                            {typeof result.top_prediction.confidence === 'number' 
-                              ? result.top_prediction.confidence 
-                              : String(result.top_prediction.confidence || '0')}%
-                          </Typography>
-                        </Box>
-                        <LinearProgress
-                          variant="determinate"
-                          value={result.top_prediction.confidence}
-                          sx={{
-                            height: 8,
-                            borderRadius: 4,
-                            bgcolor: '#e5e7eb',
-                            '& .MuiLinearProgress-bar': {
-                              bgcolor: getRiskColor(result.top_prediction.risk)
-                            }
-                          }}
-                        />
+                          Primary Suspected Condition
+                        </Typography>
+                        <Typography variant="h6" fontWeight={800}>
+                          {String(result.top_prediction.disease || 'Unknown')}
+                        </Typography>
                       </Box>
+                      <Chip
+                        label={String(result.top_prediction.risk || 'Unknown')}
+                        sx={{
+                          bgcolor: getRiskColor(result.top_prediction.risk),
+                          color: 'white',
+                          fontWeight: 700,
+                          px: 1
+                        }}
+                      />
+                    </Box>
+
+                    <Grid container spacing={2}>
+                      <Grid item xs={12} sm={6}>
+                        <Typography variant="caption" color="textSecondary">
+                          Confidence Score
+                        </Typography>
+                        <Box sx={{ mt: 0.5 }}>
+                          <Box
+                            sx={{
+                              display: 'flex',
+                              justifyContent: 'space-between',
+                              mb: 0.5
+                            }}
+                          >
+                            <Typography variant="body2" color="textSecondary">
+                              Model estimate
+                            </Typography>
+                            <Typography variant="body2" fontWeight={700}>
+                              {typeof result.top_prediction.confidence === 'number' 
+                                ? result.top_prediction.confidence 
+                                : String(result.top_prediction.confidence || '0')}%
+                            </Typography>
+                          </Box>
+                          <LinearProgress
+                            variant="determinate"
+                            value={result.top_prediction.confidence}
+                            sx={{
+                              height: 8,
+                              borderRadius: 4,
+                              bgcolor: '#e5e7eb',
+                              '& .MuiLinearProgress-bar': {
+                                bgcolor: getRiskColor(result.top_prediction.risk)
+                              }
+                            }}
+                          />
+                        </Box>
+                      </Grid>
+                      <Grid item xs={12} sm={6}>
+                        <Typography variant="caption" color="textSecondary">
+                          Suggested Next Step
+                        </Typography>
+                        <Typography variant="body2" sx={{ mt: 0.5 }}>
+                          {result.top_prediction.next_step ||
+                            'Schedule a clinical consultation and share this report with your doctor for confirmation.'}
+                        </Typography>
+                      </Grid>
                     </Grid>
-                    <Grid item xs={12} sm={6}>
-                      <Typography variant="caption" color="textSecondary">
-                        Suggested Next Step
-                      </Typography>
-                      <Typography variant="body2" sx={{ mt: 0.5 }}>
-                        {result.top_prediction.next_step ||
-                          'Schedule a clinical consultation and share this report with your doctor for confirmation.'}
-                      </Typography>
-                    </Grid>
-                  </Grid>
 
-                  {result.top_prediction.explanation && (
-                    <Alert
-                      severity="info"
-                      icon={<CheckCircle size={20} />}
-                      sx={{ mt: 2 }}
-                    >
-                      {String(result.top_prediction.explanation)}
-                    </Alert>
-                  )}
-
-                  {getModelPath(result.top_prediction.disease) && (
-                    <Button
-                      variant="contained"
-                      endIcon={<ArrowRight size={20} />}
-                      onClick={() =>
-                        navigate(getModelPath(result.top_prediction.disease))
-                      }
-                      sx={{
-                        mt: 2,
-                        bgcolor: '#2196f3',
-                        '&:hover': { bgcolor: '#1976d2' }
-                      }}
-                    >
-                      Run Detailed {result.top_prediction.disease} Assessment
-                    </Button>
-                  )}
-                </Paper>
+                    {result.top_prediction.explanation && (
+                      <Alert
+                        severity="info"
+                        icon={<CheckCircle size={20} />}
+                        sx={{ mt: 2 }}
+                      >
+                        {String(result.top_prediction.explanation)}
+                      </Alert>
+                    )}
+
+                    {getModelPath(result.top_prediction.disease) && (
+                      <Button
+                        variant="contained"
+                        endIcon={<ArrowRight size={20} />}
+                        onClick={() =>
+                          navigate(getModelPath(result.top_prediction.disease))
+                        }
+                        sx={{
+                          mt: 2,
+                          bgcolor: '#2196f3',
+                          '&:hover': { bgcolor: '#1976d2' }
+                        }}
+                      >
+                        Run Detailed {result.top_prediction.disease} Assessment
+                      </Button>
+                    )}
+                  </Paper>
+                ) : (
+                  <Box sx={{ display: 'flex', alignItems: 'center', p: 2.5, mb: 2.5 }}>
+                    <CircularProgress size={20} sx={{ mr: 1.5 }} />
+                    <Typography variant="body2" color="textSecondary">
+                      Identifying the most likely condition...
+                    </Typography>
+                  </Box>
+                )}
 
-                {result.other_conditions.length > 0 && (
+                {result.other_conditions && result.other_conditions.length > 0 && (
                   <>
                     <Typography variant="h6" fontWeight={700} gutterBottom sx={{ mt: 3 }}>
                       🔹 Other Possible Conditions
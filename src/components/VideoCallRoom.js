@@ -22,6 +22,7 @@ import {
   Person
 } from '@mui/icons-material';
 import { styled } from '@mui/material/styles';
+import config from '../config';
 
 const VideoContainer = styled(Box)(({ theme }) => ({
   position: 'relative',
@@ -74,15 +75,30 @@ const VideoCallRoom = ({ appointmentId, userRole, onEndCall }) => {
   const localVideoRef = useRef(null);
   const remoteVideoRef = useRef(null);
   const messagesEndRef = useRef(null);
+  const lastMessageIdRef = useRef(null);
 
   useEffect(() => {
     initializeMedia();
-    fetchMessages();
     if (userRole === 'doctor') {
       fetchPatientSummary();
     }
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
+
+    // Polls ask only for messages after the last one received. Where a chat stream
+    // server is configured, new messages are pushed over server-sent events instead;
+    // the browser reconnects on its own and resumes after the last message it received.
+    if (!config.CHAT_EVENTS_URL || typeof EventSource === 'undefined') {
+      fetchMessages();
+      const interval = setInterval(fetchMessages, 3000);
+      return () => clearInterval(interval);
+    }
+    const events = new EventSource(
+      `${config.CHAT_EVENTS_URL}/api/appointments/${appointmentId}/messages/events`,
+      { withCredentials: true }
+    );
+    events.addEventListener('message', (e) => {
+      mergeMessages([JSON.parse(e.data)]);
+    });
+    return () => events.close();
   }, []);
 
   useEffect(() => {
@@ -103,15 +119,30 @@ const VideoCallRoom = ({ appointmentId, userRole, onEndCall }) => {
     }
   };
 
+  // Adds messages not seen yet, keeping the list in id order
+  const mergeMessages = (incoming) => {
+    if (incoming.length === 0) return;
+    incoming.forEach(msg => {
+      lastMessageIdRef.current = Math.max(lastMessageIdRef.current || 0, msg.id);
+    });
+    setMessages(current => {
+      const known = new Set(current.map(msg => msg.id));
+      const added = incoming.filter(msg => !known.has(msg.id));
+      if (added.length === 0) return current;
+      return [...current, ...added].sort((a, b) => a.id - b.id);
+    });
+  };
+
   const fetchMessages = async () => {
     try {
+      const after = lastMessageIdRef.current ? `?after=${lastMessageIdRef.current}` : '';
       const response = await fetch(
-        `http://localhost:5000/api/appointments/${appointmentId}/messages`,
+        `http://localhost:5000/api/appointments/${appointmentId}/messages${after}`,
         { credentials: 'include' }
       );
       if (response.ok) {
         const data = await response.json();
-        setMessages(data.messages);
+        mergeMessages(data.messages);
       }
     } catch (err) {
       console.error('Error fetching messages:', err);
@@ -171,8 +202,11 @@ const VideoCallRoom = ({ appointmentId, userRole, onEndCall }) => {
       );
 
       if (response.ok) {
+        const data = await response.json();
         setNewMessage('');
-        fetchMessages();
+        if (data.data) {
+          mergeMessages([data.data]);
+        }
       }
     } catch (err) {
       console.error('Error sending message:', err);
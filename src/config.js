@@ -1,7 +1,9 @@
 // Centralized configuration for environment variables
 const config = {
   API_URL: process.env.REACT_APP_API_URL || 'http://localhost:5000',
-  API_BASE: process.env.REACT_APP_API_URL ? `${process.env.REACT_APP_API_URL}/api` : 'http://localhost:5000/api'
+  API_BASE: process.env.REACT_APP_API_URL ? `${process.env.REACT_APP_API_URL}/api` : 'http://localhost:5000/api',
+  // Server for consultation chat streams (async workers, CHAT_STREAMS_ENABLED=true); unset: poll
+  CHAT_EVENTS_URL: process.env.REACT_APP_CHAT_EVENTS_URL || ''
 };
 
 export default config;
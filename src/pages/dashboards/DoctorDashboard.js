@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Box, Container, Typography, Card, CardContent, Button, Chip, Grid, Alert, CircularProgress,
   Divider, Badge, Table, TableBody, TableCell, TableContainer, TableHead, TableRow, Paper,
@@ -11,6 +11,7 @@ import {
 import { styled } from '@mui/material/styles';
 import VideoCallRoom from '../../components/VideoCallRoom';
 import PrescriptionFormModal from '../../components/PrescriptionFormModal';
+import { fetchAllPages } from '../../utils/api';
 
 const StyledCard = styled(Card)(({ theme }) => ({
   borderRadius: theme.spacing(2),
@@ -44,6 +45,7 @@ const GlassCard = styled(Card)(({ theme }) => ({
 
 const DoctorDashboard = () => {
   const [appointments, setAppointments] = useState([]);
+  const appointmentsCursorRef = useRef(null);
   const [patients, setPatients] = useState([]);
   const [selectedPatient, setSelectedPatient] = useState(null);
   const [patientRecords, setPatientRecords] = useState([]);
@@ -135,16 +137,26 @@ const DoctorDashboard = () => {
     }
   };
 
+  // After the first load only appointments changed since the last response are
+  // fetched and merged in; unchanged polls are answered with 304 by the server.
+  // The list is paged, so every page is fetched
   const fetchAppointments = async () => {
     try {
-      const response = await fetch('http://localhost:5000/api/appointments/doctor', {
-        credentials: 'include'
-      });
-
-      if (!response.ok) throw new Error('Failed to fetch appointments');
-
-      const data = await response.json();
-      setAppointments(data.appointments);
+      const since = appointmentsCursorRef.current;
+      const url = since
+        ? `http://localhost:5000/api/appointments/doctor?since=${encodeURIComponent(since)}`
+        : 'http://localhost:5000/api/appointments/doctor';
+      const data = await fetchAllPages(url, 'appointments');
+      appointmentsCursorRef.current = data.cursor || null;
+      if (data.incremental) {
+        setAppointments(current => {
+          const changed = new Map(data.appointments.map(apt => [apt.id, apt]));
+          const merged = current.filter(apt => !changed.has(apt.id)).concat(data.appointments);
+          return merged.sort((a, b) => (a.created_at < b.created_at ? 1 : -1));
+        });
+      } else {
+        setAppointments(data.appointments);
+      }
     } catch (err) {
       setError(err.message);
     } finally {
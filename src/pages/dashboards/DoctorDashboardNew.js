@@ -11,6 +11,7 @@ import {
 import { styled } from '@mui/material/styles';
 import VideoCallRoom from '../../components/VideoCallRoom';
 import PrescriptionFormModal from '../../components/PrescriptionFormModal';
+import { fetchAllPages } from '../../utils/api';
 
 const StyledCard = styled(Card)(({ theme }) => ({
   borderRadius: theme.spacing(2),
@@ -71,9 +72,7 @@ const DoctorDashboard = () => {
 
   const fetchAppointments = async () => {
     try {
-      const response = await fetch('http://localhost:5000/api/appointments/doctor', { credentials: 'include' });
-      if (!response.ok) throw new Error('Failed to fetch appointments');
-      const data = await response.json();
+      const data = await fetchAllPages('http://localhost:5000/api/appointments/doctor', 'appointments');
       setAppointments(data.appointments);
     } catch (err) {
       setError(err.message);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import {
   Box,
@@ -64,6 +64,7 @@ import {
 } from 'chart.js';
 import AppointmentFormModal from '../../components/AppointmentFormModal';
 import VideoCallRoom from '../../components/VideoCallRoom';
+import { fetchAllPages } from '../../utils/api';
 
 ChartJS.register(
   CategoryScale,
@@ -76,6 +77,10 @@ ChartJS.register(
   Filler
 );
 
+// Health trends are charted one point per week (day/week/month are supported by the
+// API), so a long history still loads as a handful of points per disease
+const TRENDS_BUCKET = 'week';
+
 const StyledCard = styled(Card)(({ theme }) => ({
   borderRadius: theme.spacing(2),
   boxShadow: '0 4px 12px rgba(0,0,0,0.1)',
@@ -110,6 +115,9 @@ const StatusChip = styled(Chip)(({ status }) => ({
 const PatientDashboard = () => {
   const [appointments, setAppointments] = useState([]);
   const [predictions, setPredictions] = useState([]);
+  const [predictionsNextPage, setPredictionsNextPage] = useState(null);
+  const [predictionTotals, setPredictionTotals] = useState(null);
+  const olderPredictionsLoadedRef = useRef(false);
   const [doctors, setDoctors] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
@@ -160,13 +168,7 @@ const PatientDashboard = () => {
 
   const fetchAppointments = async () => {
     try {
-      const response = await fetch('http://localhost:5000/api/appointments/patient', {
-        credentials: 'include'
-      });
-
-      if (!response.ok) throw new Error('Failed to fetch appointments');
-
-      const data = await response.json();
+      const data = await fetchAllPages('http://localhost:5000/api/appointments/patient', 'appointments');
       setAppointments(data.appointments);
     } catch (err) {
       setError(err.message);
@@ -175,17 +177,39 @@ const PatientDashboard = () => {
     }
   };
 
-  const fetchPredictions = async () => {
+  // The history is paged newest first; before is the next_page cursor of the
+  // last page loaded. Without it the newest page is refreshed, keeping any
+  // older pages already loaded.
+  const fetchPredictions = async (before = null) => {
     try {
+      const params = new URLSearchParams({ fields: 'input_data,modified_prediction' });
+      if (before) params.set('before', before);
       console.log('🔍 Fetching predictions...');
-      const response = await fetch('http://localhost:5000/api/data/predictions', {
+      const response = await fetch(`http://localhost:5000/api/data/predictions?${params}`, {
         credentials: 'include'
       });
       if (response.ok) {
         const data = await response.json();
-        console.log('✅ Predictions fetched:', data.predictions?.length || 0);
-        console.log('📊 Sample prediction:', data.predictions?.[0]);
-        setPredictions(data.predictions || []);
+        const page = data.predictions || [];
+        console.log('✅ Predictions fetched:', page.length);
+        if (before) {
+          olderPredictionsLoadedRef.current = true;
+          setPredictions(prev => [...prev, ...page.filter(p => !prev.some(q => q.id === p.id))]);
+          setPredictionsNextPage(data.next_page);
+        } else {
+          setPredictionTotals(data.totals || null);
+          const ids = new Set(page.map(p => p.id));
+          const oldest = page.length > 0 ? page[page.length - 1].created_at : null;
+          setPredictions(prev => [
+            ...page,
+            ...(olderPredictionsLoadedRef.current && oldest
+              ? prev.filter(p => !ids.has(p.id) && p.created_at < oldest)
+              : [])
+          ]);
+          if (!olderPredictionsLoadedRef.current) {
+            setPredictionsNextPage(data.next_page);
+          }
+        }
       } else {
         console.error('❌ Failed to fetch predictions:', response.status);
       }
@@ -198,7 +222,7 @@ const PatientDashboard = () => {
     setAnalyticsLoading(true);
     try {
       const [trendsRes, forecastRes, insightsRes] = await Promise.all([
-        fetch('http://localhost:5000/api/analytics/health-trends', { credentials: 'include' }),
+        fetch(`http://localhost:5000/api/analytics/health-trends?bucket=${TRENDS_BUCKET}`, { credentials: 'include' }),
         fetch('http://localhost:5000/api/analytics/risk-forecast', { credentials: 'include' }),
         fetch('http://localhost:5000/api/analytics/ai-copilot-insights', { credentials: 'include' })
       ]);
@@ -406,6 +430,12 @@ const PatientDashboard = () => {
     return upcoming[0] || null;
   };
 
+  // Counts over the whole history, from the server: the list only holds the pages loaded so far
+  const totalPredictions = predictionTotals ? predictionTotals.total : predictions.length;
+  const predictionsWithStatus = (status) => (predictionTotals
+    ? predictionTotals.by_status[status] || 0
+    : predictions.filter(p => p.status === status).length);
+
   const getHealthScore = () => {
     if (!predictions || predictions.length === 0) return 92;
     const recent = predictions.slice(0, 6);
@@ -956,7 +986,7 @@ const PatientDashboard = () => {
                       <Typography variant="h6">Health Predictions</Typography>
                     </Box>
                     <Typography variant="h3" fontWeight={700}>
-                      {predictions.length}
+                      {totalPredictions}
                     </Typography>
                     <Typography variant="body2" color="textSecondary">
                       Total assessments
@@ -1265,14 +1295,30 @@ const PatientDashboard = () => {
                         {Object.entries(healthTrends).map(([disease, data]) => {
                           if (data.length === 0) return null;
                           
+                          const bandColor = disease === 'diabetes' ? 'rgba(255, 152, 0, 0.1)' : disease === 'heart' ? 'rgba(244, 67, 54, 0.1)' : disease === 'liver' ? 'rgba(156, 39, 176, 0.1)' : disease === 'bone' ? 'rgba(121, 85, 72, 0.1)' : 'rgba(33, 150, 243, 0.1)';
+                          // The week's average risk as the line, its lowest to highest as a shaded band
                           const chartData = {
-                            labels: data.map(d => new Date(d.date).toLocaleDateString('en-US', { month: 'short', day: 'numeric' })),
+                            labels: data.map(d => new Date(`${d.date}T00:00:00`).toLocaleDateString('en-US', { month: 'short', day: 'numeric' })),
                             datasets: [{
+                              label: 'Highest',
+                              data: data.map(d => d.max_risk),
+                              borderColor: 'transparent',
+                              backgroundColor: bandColor,
+                              pointRadius: 0,
+                              fill: '+1',
+                              tension: 0.4
+                            }, {
+                              label: 'Lowest',
+                              data: data.map(d => d.min_risk),
+                              borderColor: 'transparent',
+                              pointRadius: 0,
+                              fill: false,
+                              tension: 0.4
+                            }, {
                               label: `${disease.charAt(0).toUpperCase() + disease.slice(1)} Risk %`,
                               data: data.map(d => d.risk),
                               borderColor: disease === 'diabetes' ? '#ff9800' : disease === 'heart' ? '#f44336' : disease === 'liver' ? '#9c27b0' : disease === 'bone' ? '#795548' : '#2196f3',
-                              backgroundColor: disease === 'diabetes' ? 'rgba(255, 152, 0, 0.1)' : disease === 'heart' ? 'rgba(244, 67, 54, 0.1)' : disease === 'liver' ? 'rgba(156, 39, 176, 0.1)' : disease === 'bone' ? 'rgba(121, 85, 72, 0.1)' : 'rgba(33, 150, 243, 0.1)',
-                              fill: true,
+                              fill: false,
                               tension: 0.4
                             }]
                           };
@@ -1280,11 +1326,19 @@ const PatientDashboard = () => {
                           const options = {
                             responsive: true,
                             maintainAspectRatio: false,
+                            interaction: { mode: 'index', intersect: false },
                             plugins: {
                               legend: { display: false },
                               tooltip: {
+                                filter: (item) => item.datasetIndex === 2,
                                 callbacks: {
-                                  label: (context) => `Risk: ${context.parsed.y.toFixed(1)}%`
+                                  title: (items) => (items.length ? `Week of ${items[0].label}` : ''),
+                                  label: (context) => {
+                                    const point = data[context.dataIndex];
+                                    return point.count > 1
+                                      ? `Risk: ${point.risk.toFixed(1)}% avg (${point.min_risk.toFixed(1)}–${point.max_risk.toFixed(1)}%, ${point.count} checks)`
+                                      : `Risk: ${point.risk.toFixed(1)}%`;
+                                  }
                                 }
                               }
                             },
@@ -1829,6 +1883,13 @@ const PatientDashboard = () => {
                         ))}
                       </Grid>
                     )}
+                    {predictionsNextPage && (
+                      <Box sx={{ textAlign: 'center', mt: 3 }}>
+                        <Button variant="outlined" onClick={() => fetchPredictions(predictionsNextPage)}>
+                          Load older assessments
+                        </Button>
+                      </Box>
+                    )}
                   </CardContent>
                 </GlassCard>
               </Grid>
@@ -1841,7 +1902,7 @@ const PatientDashboard = () => {
                       Total Assessments
                     </Typography>
                     <Typography variant="h4" fontWeight={900}>
-                      {predictions.length}
+                      {totalPredictions}
                     </Typography>
                   </CardContent>
                 </StyledCard>
@@ -1853,7 +1914,7 @@ const PatientDashboard = () => {
                       Approved
                     </Typography>
                     <Typography variant="h4" fontWeight={900} sx={{ color: '#10b981' }}>
-                      {predictions.filter(p => p.status === 'clinically_verified').length}
+                      {predictionsWithStatus('clinically_verified')}
                     </Typography>
                   </CardContent>
                 </StyledCard>
@@ -1865,7 +1926,7 @@ const PatientDashboard = () => {
                       Pending Review
                     </Typography>
                     <Typography variant="h4" fontWeight={900} sx={{ color: '#f59e0b' }}>
-                      {predictions.filter(p => p.status === 'pending_review').length}
+                      {predictionsWithStatus('pending_review')}
                     </Typography>
                   </CardContent>
                 </StyledCard>
@@ -1877,7 +1938,7 @@ const PatientDashboard = () => {
                       Modified
                     </Typography>
                     <Typography variant="h4" fontWeight={900} sx={{ color: '#3b82f6' }}>
-                      {predictions.filter(p => p.status === 'modified_by_doctor').length}
+                      {predictionsWithStatus('modified_by_doctor')}
                     </Typography>
                   </CardContent>
                 </StyledCard>
@@ -2126,7 +2187,7 @@ const PatientDashboard = () => {
                       </Typography>
                     </Stack>
                     <Typography variant="h3" fontWeight={900} color="primary">
-                      {predictions.length}
+                      {totalPredictions}
                     </Typography>
                   </CardContent>
                 </StyledCard>
@@ -2171,7 +2232,7 @@ const PatientDashboard = () => {
                       </Typography>
                     </Stack>
                     <Typography variant="h3" fontWeight={900} sx={{ color: '#8B5CF6' }}>
-                      {predictions.filter(p => p.status !== 'pending_review').length}
+                      {totalPredictions - predictionsWithStatus('pending_review')}
                     </Typography>
                   </CardContent>
                 </StyledCard>
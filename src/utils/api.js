@@ -3,6 +3,26 @@ const API_ENDPOINT = `${API_BASE_URL}/api`;
 
 export { API_BASE_URL, API_ENDPOINT };
 
+// GET every page of a keyset-paged list, following next_page (passed back as
+// ?before=) until the last page. Returns the first page's body, with key
+// holding the rows of all the pages.
+export const fetchAllPages = async (url, key) => {
+  const separator = url.includes('?') ? '&' : '?';
+  let data = null;
+  let next = null;
+  do {
+    const pageUrl = next ? `${url}${separator}before=${encodeURIComponent(next)}` : url;
+    const response = await fetch(pageUrl, { credentials: 'include' });
+    if (!response.ok) {
+      throw new Error(`Failed to fetch ${key}`);
+    }
+    const page = await response.json();
+    data = data ? { ...data, [key]: data[key].concat(page[key]) } : page;
+    next = page.next_page;
+  } while (next);
+  return data;
+};
+
 export const savePrediction = async (predictionData) => {
   try {
     const response = await fetch(`${API_ENDPOINT}/data/predictions`, {
@@ -0,0 +1,61 @@
+// POST a JSON body and read the server-sent events of the response as they arrive.
+// EventSource only supports GET, so the stream is read from fetch's response body.
+// onEvent(name, data) is called for every event; comment lines (": ...") are skipped.
+// Throws if the request fails or the response is not an event stream, so callers
+// can fall back to the non-streaming endpoint.
+export const postEventStream = async (url, body, onEvent, options = {}) => {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+    ...options
+  });
+
+  const contentType = response.headers.get('Content-Type') || '';
+  if (!response.ok || !contentType.includes('text/event-stream') || !response.body) {
+    let data = {};
+    try {
+      data = await response.json();
+    } catch (err) {
+      // Not JSON either; report the status only
+    }
+    const error = new Error(data.error || `Stream request failed (${response.status})`);
+    error.status = response.status;
+    error.data = data;
+    throw error;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (frame) => {
+    let event = 'message';
+    const dataLines = [];
+    frame.split('\n').forEach(line => {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        dataLines.push(line.slice(5).replace(/^ /, ''));
+      }
+    });
+    if (dataLines.length > 0) {
+      onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r/g, '');
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+};